@@ -7,3 +7,4 @@ from batchglm.data import load_mtx_to_adata
 from batchglm.data import load_mtx_to_xarray
 from batchglm.data import load_recursive_mtx
 from batchglm.data import xarray_from_data
+from batchglm.data import SparseXArrayDataArray
@@ -1 +1,2 @@
 from . import glm_nb
+from . import numpy
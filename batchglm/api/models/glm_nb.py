@@ -1,2 +1,4 @@
 from batchglm.models.glm_nb import InputData, Model, Simulator
-from batchglm.train.tf.glm_nb import Estimator
\ No newline at end of file
+from batchglm.train.tf.glm_nb import Estimator
+from batchglm.train.sharded import fit_sharded
+from batchglm.train.numpy.glm_nb import EstimatorStacked
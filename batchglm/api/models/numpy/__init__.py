@@ -0,0 +1 @@
+from . import glm_nb
@@ -0,0 +1,2 @@
+from batchglm.models.glm_nb import InputData, Model, Simulator
+from batchglm.train.numpy.glm_nb import Estimator, EstimatorStacked
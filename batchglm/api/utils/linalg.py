@@ -1 +1 @@
-from batchglm.utils.linalg import stacked_lstsq, groupwise_solve_lm
+from batchglm.utils.linalg import stacked_lstsq, stacked_inv_sym, stacked_solve_sym, groupwise_solve_lm
@@ -52,20 +52,183 @@ def _sparse_to_xarray(data, dims):
     return X
 
 
+class SparseXArrayDataArray:
+    """
+    CSR-backed replacement for a two-dimensional xr.DataArray of shape (observations, features).
+
+    The sparse matrix is kept as-is; rows are only densified on request via `fetch()`.
+    Only the subset of the xr.DataArray interface which is needed by the input data classes is provided.
+    """
+    X: scipy.sparse.csr_matrix
+
+    def __init__(
+            self,
+            X,
+            dims: Union[Tuple, List] = ("observations", "features"),
+            coords: dict = None
+    ):
+        """
+        :param X: scipy.sparse matrix of shape `dims`; will be converted to canonical CSR format.
+        :param dims: tuple or list with two strings. Specifies the names of the dimensions.
+        :param coords: (optional) dict mapping the dimension names to coordinate arrays.
+        """
+        X = scipy.sparse.csr_matrix(X)
+        # canonical format (sorted indices, no duplicates) is required by `fetch()`
+        X.sum_duplicates()
+
+        self.X = X
+        self.dims = tuple(dims)
+        self.coords = dict(coords) if coords is not None else {}
+
+    @property
+    def shape(self):
+        return self.X.shape
+
+    @property
+    def dtype(self):
+        return self.X.dtype
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def nnz(self):
+        return self.X.nnz
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        Dense representation of the full matrix; only use this on small data.
+        """
+        return self.X.toarray()
+
+    def astype(self, dtype):
+        return type(self)(self.X.astype(dtype), dims=self.dims, coords=self.coords)
+
+    def _reduce(self, values, dim):
+        other_dim = self.dims[1] if dim == self.dims[0] else self.dims[0]
+        retval = xr.DataArray(np.asarray(values).reshape(-1), dims=(other_dim,))
+        if other_dim in self.coords:
+            retval.coords[other_dim] = self.coords[other_dim]
+        return retval
+
+    def any(self, dim):
+        axis = self.dims.index(dim)
+        return self._reduce((self.X != 0).getnnz(axis=axis) > 0, dim=dim)
+
+    def sum(self, dim):
+        axis = self.dims.index(dim)
+        return self._reduce(self.X.sum(axis=axis), dim=dim)
+
+    def mean(self, dim):
+        axis = self.dims.index(dim)
+        return self._reduce(self.X.mean(axis=axis), dim=dim)
+
+    def var(self, dim):
+        axis = self.dims.index(dim)
+        mean = np.asarray(self.X.mean(axis=axis))
+        mean_sq = np.asarray(self.X.multiply(self.X).mean(axis=axis))
+        return self._reduce(mean_sq - np.square(mean), dim=dim)
+
+    def multiply_rows(self, factors):
+        """
+        Multiply each row (observation) with the corresponding factor.
+
+        :param factors: vector of length `num_observations`
+        :return: new SparseXArrayDataArray
+        """
+        factors = np.asarray(factors).reshape(-1)
+        X = scipy.sparse.diags(factors).dot(self.X)
+        return type(self)(X, dims=self.dims, coords=self.coords)
+
+    def fetch(self, idx):
+        """
+        Densify the selected rows.
+
+        Sorted row indices result in sequential reads of the CSR buffers.
+
+        :param idx: integer index, slice or vector of row indices
+        :return: np.ndarray of shape (len(idx), num_features) or (num_features,) if `idx` is a scalar
+        """
+        X = self.X
+        if isinstance(idx, slice):
+            return X[idx].toarray()
+
+        idx = np.asarray(idx)
+        if idx.dtype == bool:
+            idx = np.nonzero(idx)[0]
+        if idx.ndim == 0:
+            return self.fetch(idx.reshape(1))[0]
+
+        starts = X.indptr[idx]
+        lengths = X.indptr[idx + 1] - starts
+
+        retval = np.zeros([idx.size, X.shape[1]], dtype=X.dtype)
+        num_entries = np.sum(lengths)
+        if num_entries > 0:
+            # position of each nonzero entry of the selected rows inside the CSR buffers
+            rows = np.repeat(np.arange(idx.size), lengths)
+            pos = np.arange(num_entries) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            pos += np.repeat(starts, lengths)
+
+            retval[rows, X.indices[pos]] = X.data[pos]
+
+        return retval
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            rows, cols = item
+        else:
+            rows, cols = item, slice(None)
+        if np.ndim(rows) == 0 and not isinstance(rows, slice):
+            rows = [rows]
+        if np.ndim(cols) == 0 and not isinstance(cols, slice):
+            cols = [cols]
+
+        coords = {}
+        for dim, sel in zip(self.dims, (rows, cols)):
+            if dim in self.coords:
+                coords[dim] = np.asarray(self.coords[dim])[sel]
+
+        return type(self)(self.X[rows][:, cols], dims=self.dims, coords=coords)
+
+    def __str__(self):
+        return "[%s.%s object at %s]: shape=%s, nnz=%d, dims=%s" % (
+            type(self).__module__,
+            type(self).__name__,
+            hex(id(self)),
+            str(self.shape),
+            self.nnz,
+            str(self.dims)
+        )
+
+    def __repr__(self):
+        return self.__str__()
+
+
 def xarray_from_data(
         data: Union[anndata.AnnData, xr.DataArray, xr.Dataset, np.ndarray],
-        dims: Union[Tuple, List] = ("observations", "features")
-) -> xr.DataArray:
+        dims: Union[Tuple, List] = ("observations", "features"),
+        keep_sparse: bool = False
+) -> Union[xr.DataArray, SparseXArrayDataArray]:
     """
     Parse any array-like object, xr.DataArray, xr.Dataset or anndata.Anndata and return a xarray containing
     the observations.
-    
+
     :param data: Array-like, xr.DataArray, xr.Dataset or anndata.Anndata object containing observations
     :param dims: tuple or list with two strings. Specifies the names of the xarray dimensions.
+    :param keep_sparse: If True, sparse input data will be returned as CSR-backed SparseXArrayDataArray
+        instead of being wrapped into a dask-backed xr.DataArray.
     :return: xr.DataArray of shape `dims`
     """
     if anndata is not None and isinstance(data, anndata.AnnData):
-        if scipy.sparse.issparse(data.X):
+        if scipy.sparse.issparse(data.X) and keep_sparse:
+            X = SparseXArrayDataArray(data.X, dims=dims, coords={
+                dims[0]: np.asarray(data.obs_names),
+                dims[1]: np.asarray(data.var_names),
+            })
+        elif scipy.sparse.issparse(data.X):
             X = _sparse_to_xarray(data.X, dims=dims)
             X.coords[dims[0]] = np.asarray(data.obs_names)
             X.coords[dims[1]] = np.asarray(data.var_names)
@@ -79,8 +242,12 @@ def xarray_from_data(
         X: xr.DataArray = data["X"]
     elif isinstance(data, xr.DataArray):
         X = data
+    elif isinstance(data, SparseXArrayDataArray):
+        X = data
     else:
-        if scipy.sparse.issparse(data):
+        if scipy.sparse.issparse(data) and keep_sparse:
+            X = SparseXArrayDataArray(data, dims=dims)
+        elif scipy.sparse.issparse(data):
             X = _sparse_to_xarray(data, dims=dims)
         else:
             X = xr.DataArray(data, dims=dims)
@@ -1,6 +1,7 @@
 import abc
 from enum import Enum
 import logging
+from typing import Union
 
 try:
     import anndata
@@ -85,10 +86,42 @@ class _Estimator_Base(_Model_Base, metaclass=abc.ABCMeta):
 
 
 class _EstimatorStore_XArray_Base():
+    # Estimator with an open session which evaluates the parameters in `_lazy_params` on first access.
+    _estim: Union[_Estimator_Base, None] = None
+    _lazy_params: list = []
 
     def __init__(self):
         pass
 
+    def _get_param(self, key: str):
+        """
+        Returns the stored value of parameter `key` and evaluates it on the estimator if it is lazy.
+
+        :param key: name of the parameter
+        """
+        if key not in self.params:
+            if self._estim is None or key not in self._lazy_params:
+                raise ValueError(
+                    "%s was not evaluated by the estimator, see the `outputs` argument of finalize()" % key
+                )
+            logger.debug("Evaluating %s", key)
+            self.params[key] = self._estim.to_xarray(key, coords=self.input_data.data)
+            self._lazy_params = [x for x in self._lazy_params if x != key]
+            if len(self._lazy_params) == 0:
+                self.close()
+        return self.params[key]
+
+    def close(self):
+        """
+        Closes the session of the estimator which is kept open for lazily evaluated parameters.
+        Parameters which have not been evaluated before are not available afterwards.
+        """
+        if self._estim is not None:
+            logger.debug("Closing session")
+            self._estim.close_session()
+        self._estim = None
+        self._lazy_params = []
+
     def initialize(self, **kwargs):
         raise NotImplementedError("This object only stores estimated values")
 
@@ -115,4 +148,4 @@ class _EstimatorStore_XArray_Base():
 
     @property
     def loss(self):
-        return self.params["loss"]
+        return self._get_param("loss")
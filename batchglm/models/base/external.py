@@ -1,2 +1,3 @@
 import batchglm.pkg_constants as pkg_constants
 import batchglm.data as data_utils
+import batchglm.utils.io as io_utils
@@ -1,7 +1,10 @@
 import abc
 import os
 import logging
+from typing import Union
 
+import numpy as np
+import scipy.sparse
 import xarray as xr
 
 try:
@@ -9,7 +12,7 @@ try:
 except ImportError:
     anndata = None
 
-from .external import pkg_constants, data_utils
+from .external import pkg_constants, data_utils, io_utils
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +36,7 @@ class _InputData_Base:
         raise NotImplementedError()
 
     @classmethod
-    def new(cls, data, observation_names=None, feature_names=None, cast_dtype=None):
+    def new(cls, data, observation_names=None, feature_names=None, cast_dtype=None, keep_sparse=False):
         """
         Create a new InputData object.
 
@@ -41,6 +44,7 @@ class _InputData_Base:
 
         Can be either:
             - np.ndarray: NumPy array containing the raw data
+            - scipy.sparse matrix: sparse matrix containing the raw data
             - anndata.AnnData: AnnData object containing the count data and optional the design models
                 stored as data.obsm[design_loc] and data.obsm[design_scale]
             - xr.DataArray: DataArray of shape ("observations", "features") containing the raw data
@@ -49,19 +53,29 @@ class _InputData_Base:
         :param observation_names: (optional) names of the observations.
         :param feature_names: (optional) names of the features.
         :param cast_dtype: data type of all data; should be either float32 or float64
+        :param keep_sparse: If True, sparse data will be kept in CSR format and only the requested rows will be
+            densified when fetching batches.
         :return: InputData object
         """
-        X = data_utils.xarray_from_data(data)
+        X = data_utils.xarray_from_data(data, keep_sparse=keep_sparse)
 
         if cast_dtype is not None:
             X = X.astype(cast_dtype)
             # X = X.chunk({"observations": 1})
 
-        retval = cls(xr.Dataset({
-            "X": X,
-        }, coords={
-            "feature_allzero": ~X.any(dim="observations")
-        }))
+        if isinstance(X, data_utils.SparseXArrayDataArray):
+            coords = {
+                "feature_allzero": ~X.any(dim="observations")
+            }
+            for dim, size in zip(X.dims, X.shape):
+                coords[dim] = X.coords.get(dim, np.arange(size))
+            retval = cls(xr.Dataset(coords=coords), sparse_X=X)
+        else:
+            retval = cls(xr.Dataset({
+                "X": X,
+            }, coords={
+                "feature_allzero": ~X.any(dim="observations")
+            }))
         if observation_names is not None:
             retval.observations = observation_names
         elif "observations" not in retval.data.coords:
@@ -75,54 +89,119 @@ class _InputData_Base:
         return retval
 
     @classmethod
-    def from_file(cls, path, group=""):
+    def from_file(cls, path, group="", backend: str = None):
         """
-        Loads pre-sampled data and parameters from specified HDF5 file
-        :param path: the path to the HDF5 file
-        :param group: the group inside the HDF5 file
+        Loads pre-sampled data and parameters from specified HDF5 file or zarr store
+        :param path: the path to the HDF5 file or zarr store
+        :param group: the group inside the HDF5 file or zarr store
+        :param backend: (optional) "netcdf" or "zarr", see `batchglm.utils.io.storage_backend()`.
         """
         path = os.path.expanduser(path)
 
-        data = xr.open_dataset(
-            path,
-            group=group,
-            engine=pkg_constants.XARRAY_NETCDF_ENGINE
-        )
+        data = io_utils.open_dataset(path, group=group, backend=backend)
+
+        if "X_csr_data" in data:
+            sparse_X = data_utils.SparseXArrayDataArray(
+                scipy.sparse.csr_matrix(
+                    (data["X_csr_data"].values, data["X_csr_indices"].values, data["X_csr_indptr"].values),
+                    shape=(data.dims["observations"], data.dims["features"])
+                ),
+                coords={
+                    "observations": data.coords["observations"].values,
+                    "features": data.coords["features"].values,
+                }
+            )
+            data = data.drop(["X_csr_data", "X_csr_indices", "X_csr_indptr"])
+            return cls(data, sparse_X=sparse_X)
 
         return cls(data)
 
-    def __init__(self, data):
+    def __init__(self, data, sparse_X: data_utils.SparseXArrayDataArray = None):
+        """
+        :param data: xr.Dataset containing the input data
+        :param sparse_X: (optional) CSR-backed data matrix; if specified, `data` does not contain "X".
+        """
         self.data = data
+        self._sparse_X = sparse_X
 
-    def save(self, path, group="", append=False):
+    def save(
+            self,
+            path,
+            group="",
+            append=False,
+            chunk_size: int = None,
+            feature_chunk_size: int = None,
+            backend: str = None,
+            compression: bool = None
+    ):
         """
-        Saves parameters and sampled data to specified file in HDF5 format
+        Saves parameters and sampled data to specified file in HDF5 format or to a zarr store
         :param path: the path to the target file where the data will be saved
         :param group: the group inside the HDF5 file where the data will be saved
         :param append: if False, existing files under the specified path will be replaced.
+        :param chunk_size: (optional) number of observations per chunk of the stored data matrix,
+            e.g. the batch size. Chunks can be read in one piece by `fetch_X()`, see `chunk_size`.
+        :param feature_chunk_size: (optional) number of features per chunk of the stored data matrix.
+            Chunks span all features by default.
+        :param backend: (optional) "netcdf" or "zarr", see `batchglm.utils.io.storage_backend()`.
+            The chunks of zarr stores can be read concurrently by several processes.
+        :param compression: (optional) whether to compress the data, see `batchglm.utils.io.write_dataset()`.
         """
         path = os.path.expanduser(path)
-        if os.path.exists(path) and not append:
-            os.remove(path)
+        backend = io_utils.storage_backend(path, backend)
+        if not append:
+            io_utils.remove_store(path)
 
         mode = "a"
         if not os.path.exists(path):
             mode = "w"
 
-        self.data.to_netcdf(
+        data = self.data
+        if self.is_sparse:
+            # store the CSR buffers as flat variables
+            data = data.assign(
+                X_csr_data=("X_nnz", self._sparse_X.X.data),
+                X_csr_indices=("X_nnz", self._sparse_X.X.indices),
+                X_csr_indptr=("X_indptr", self._sparse_X.X.indptr),
+            )
+
+        chunks = None
+        if (chunk_size is not None or feature_chunk_size is not None) and not self.is_sparse:
+            chunks = {"observations": self.num_observations, "features": self.num_features}
+            if chunk_size is not None:
+                chunks["observations"] = chunk_size
+            if feature_chunk_size is not None:
+                chunks["features"] = feature_chunk_size
+
+        io_utils.write_dataset(
+            data,
             path,
             group=group,
             mode=mode,
-            engine=pkg_constants.XARRAY_NETCDF_ENGINE
+            backend=backend,
+            chunks=chunks,
+            compression=compression
         )
 
     @property
-    def X(self) -> xr.DataArray:
+    def is_sparse(self) -> bool:
+        return self._sparse_X is not None
+
+    @property
+    def X(self) -> Union[xr.DataArray, data_utils.SparseXArrayDataArray]:
+        if self.is_sparse:
+            return self._sparse_X
         return self.data.X
 
     @X.setter
     def X(self, data):
-        self.data["X"] = data
+        if isinstance(data, data_utils.SparseXArrayDataArray):
+            if "X" in self.data:
+                del self.data["X"]
+            self._sparse_X = data
+        else:
+            self._sparse_X = None
+            self.data["X"] = data
 
     @property
     def num_observations(self):
@@ -156,31 +235,79 @@ class _InputData_Base:
     def feature_isallzero(self):
         return self.data.coords["feature_allzero"]
 
+    @property
+    def chunk_size(self) -> Union[int, None]:
+        """
+        Number of observations per chunk of the data matrix, i.e. of the dask array or of the on-disk
+        storage of a file opened by `from_file()`. None if the data matrix is not chunked.
+        """
+        if self.is_sparse:
+            return None
+        X = self.data.X
+        if X.chunks is not None:
+            return int(X.chunks[0][0])
+        chunksizes = X.encoding.get("chunksizes", None)
+        if chunksizes is not None:
+            return int(chunksizes[0])
+        return None
+
     def fetch_X(self, idx):
+        if self.is_sparse:
+            return self._sparse_X.fetch(idx)
+        chunk_size = self.chunk_size
+        if chunk_size is not None:
+            return self._fetch_X_by_chunks(idx, chunk_size)
         return self.X[idx].values
 
+    def _fetch_X_by_chunks(self, idx, chunk_size):
+        """
+        Reads each chunk which contains requested observations once as a contiguous range of observations
+        instead of indexing the chunked data with the individual observations.
+
+        :param idx: indices of the observations; runs of observations from the same chunk are read together.
+        """
+        idx = np.asarray(idx)
+        if idx.size == 0:
+            return self.X[idx].values
+        chunk_idx = idx // chunk_size
+        X = []
+        for run in np.split(idx, np.flatnonzero(np.diff(chunk_idx)) + 1):
+            start = np.min(run)
+            X.append(self.X[start:np.max(run) + 1].values[run - start])
+        return np.concatenate(X, axis=0)
+
     def set_chunk_size(self, cs: int):
+        if self.is_sparse:
+            # the CSR matrix is not chunked; rows are densified on demand
+            return
         self.X = self.X.chunk({"observations": cs})
 
     def __copy__(self):
-        return type(self)(self.data)
+        return type(self)(self.data, sparse_X=self._sparse_X)
 
     def __getitem__(self, item):
+        sparse_X = None
         if isinstance(item, slice):
             data = self.data.isel(observations=item)
+            if self.is_sparse:
+                sparse_X = self._sparse_X[item]
         elif isinstance(item, tuple):
             data = self.data.isel(observations=item[0], features=item[1])
+            if self.is_sparse:
+                sparse_X = self._sparse_X[item[0], item[1]]
         else:
             data = self.data.isel(observations=item)
+            if self.is_sparse:
+                sparse_X = self._sparse_X[item]
 
-        return type(self)(data)
+        return type(self)(data, sparse_X=sparse_X)
 
     def __str__(self):
         return "[%s.%s object at %s]: data=%s" % (
             type(self).__module__,
             type(self).__name__,
             hex(id(self)),
-            self.data
+            self.data if not self.is_sparse else "%s\nX=%s" % (self.data, self._sparse_X)
         )
 
     def __repr__(self):
@@ -9,7 +9,7 @@ try:
 except ImportError:
     anndata = None
 
-from .external import pkg_constants
+from .external import pkg_constants, io_utils
 
 logger = logging.getLogger(__name__)
 
@@ -83,54 +83,58 @@ class _Simulator_Base(metaclass=abc.ABCMeta):
         """
         pass
 
-    def load(self, path, group=""):
+    def load(self, path, group="", backend: str = None):
         """
-        Loads pre-sampled data and parameters from specified HDF5 file
-        :param path: the path to the HDF5 file
-        :param group: the group inside the HDF5 file
+        Loads pre-sampled data and parameters from specified HDF5 file or zarr store
+        :param path: the path to the HDF5 file or zarr store
+        :param group: the group inside the HDF5 file or zarr store
+        :param backend: (optional) "netcdf" or "zarr", see `batchglm.utils.io.storage_backend()`.
         """
         path = os.path.expanduser(path)
 
-        self.data = xr.open_dataset(
-            path,
-            group=os.path.join(group, "data"),
-            engine=pkg_constants.XARRAY_NETCDF_ENGINE
-        )
-        self.params = xr.open_dataset(
-            path,
-            group=os.path.join(group, "params"),
-            engine=pkg_constants.XARRAY_NETCDF_ENGINE
-        )
+        self.data = io_utils.open_dataset(path, group=os.path.join(group, "data"), backend=backend)
+        self.params = io_utils.open_dataset(path, group=os.path.join(group, "params"), backend=backend)
 
         self.num_features = self.data.dims["features"]
         self.num_observations = self.data.dims["observations"]
 
-    def save(self, path, group="", append=False):
+    def save(self, path, group="", append=False, chunk_size: int = None, backend: str = None, compression=None):
         """
-        Saves parameters and sampled data to specified file in HDF5 format
+        Saves parameters and sampled data to specified file in HDF5 format or to a zarr store
         :param path: the path to the target file where the data will be saved
         :param group: the group inside the HDF5 file where the data will be saved
         :param append: if False, existing files under the specified path will be replaced.
+        :param chunk_size: (optional) number of observations per chunk of the stored data, e.g. the batch size.
+        :param backend: (optional) "netcdf" or "zarr", see `batchglm.utils.io.storage_backend()`.
+        :param compression: (optional) whether to compress the data, see `batchglm.utils.io.write_dataset()`.
         """
         path = os.path.expanduser(path)
-        if os.path.exists(path) and not append:
-            os.remove(path)
+        backend = io_utils.storage_backend(path, backend)
+        if not append:
+            io_utils.remove_store(path)
 
         mode = "a"
         if not os.path.exists(path):
             mode = "w"
 
-        self.data.to_netcdf(
+        chunks = {"observations": chunk_size} if chunk_size is not None else None
+        io_utils.write_dataset(
+            self.data,
             path,
             group=os.path.join(group, "data"),
             mode=mode,
-            engine=pkg_constants.XARRAY_NETCDF_ENGINE
+            backend=backend,
+            chunks=chunks,
+            compression=compression
         )
-        self.params.to_netcdf(
+        io_utils.write_dataset(
+            self.params,
             path,
             group=os.path.join(group, "params"),
             mode="a",
-            engine=pkg_constants.XARRAY_NETCDF_ENGINE
+            backend=backend,
+            chunks=chunks,
+            compression=compression
         )
 
     def data_to_anndata(self):
@@ -1,6 +1,6 @@
-from .estimator import _Estimator_GLM, _EstimatorStore_XArray_GLM, ESTIMATOR_PARAMS
+from .estimator import _Estimator_GLM, _EstimatorStore_XArray_GLM, ESTIMATOR_PARAMS, ESTIMATOR_STORE_OUTPUTS
 from .input import InputData, INPUT_DATA_PARAMS
 from .model import _Model_GLM, _Model_XArray_GLM, MODEL_PARAMS, _model_from_params
 from .simulator import _Simulator_GLM
 from .utils import parse_design
-from .utils import closedform_glm_mean, closedform_glm_var
+from .utils import closedform_glm_mean, closedform_glm_var, normalize_by_size_factors, normalize_sparse_by_size_factors
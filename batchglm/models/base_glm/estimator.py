@@ -1,5 +1,8 @@
 import abc
 
+import numpy as np
+import xarray as xr
+
 try:
     import anndata
 except ImportError:
@@ -7,6 +10,7 @@ except ImportError:
 
 from .model import MODEL_PARAMS
 from .external import _Estimator_Base, _EstimatorStore_XArray_Base
+from .external import stacked_inv_sym
 
 ESTIMATOR_PARAMS = MODEL_PARAMS.copy()
 ESTIMATOR_PARAMS.update({
@@ -16,12 +20,16 @@ ESTIMATOR_PARAMS.update({
     "hessians": ("features", "delta_var0", "delta_var1"),
     "fisher_inv": ("features", "delta_var0", "delta_var1"),
 })
+# Parameters which are evaluated by the estimator for the estimator store:
+ESTIMATOR_STORE_OUTPUTS = ["a_var", "b_var", "loss", "log_likelihood", "gradients", "hessians"]
+
 
 class _Estimator_GLM(_Estimator_Base, metaclass=abc.ABCMeta):
     r"""
     Estimator base class for generalized linear models (GLMs).
     """
 
+
 class _EstimatorStore_XArray_GLM(_EstimatorStore_XArray_Base):
 
     def __init__(self):
@@ -29,16 +37,58 @@ class _EstimatorStore_XArray_GLM(_EstimatorStore_XArray_Base):
 
     @property
     def log_likelihood(self):
-        return self.params["log_likelihood"]
+        return self._get_param("log_likelihood")
 
     @property
     def gradients(self):
-        return self.params["gradients"]
+        return self._get_param("gradients")
 
     @property
     def hessians(self):
-        return self.params["hessians"]
+        return self._get_param("hessians")
 
     @property
     def fisher_inv(self):
+        if "fisher_inv" not in self.params:
+            # Computed lazily from the hessian as it is rarely needed for all features.
+            self.params["fisher_inv"] = self.get_fisher_inv()
         return self.params["fisher_inv"]
+
+    @property
+    def standard_errors(self):
+        return self.get_standard_errors()
+
+    def get_fisher_inv(self, features=None):
+        """
+        Inverse of the Fisher information matrix, i.e. the inverse of the negative hessian.
+
+        Hessians which are positive definite are inverted via the Cholesky decomposition
+        and the remaining ones via the pseudo-inverse.
+
+        :param features: (optional) names of the features to evaluate. All features are evaluated if None.
+        :return: xr.DataArray (features x delta_var0 x delta_var1)
+        """
+        if "fisher_inv" in self.params:
+            fisher_inv = self.params["fisher_inv"]
+            return fisher_inv if features is None else fisher_inv.sel(features=np.atleast_1d(features))
+
+        hessians = self.hessians
+        if features is not None:
+            hessians = hessians.sel(features=np.atleast_1d(features))
+        return hessians.copy(data=stacked_inv_sym(-hessians.values)).rename("fisher_inv")
+
+    def get_standard_errors(self, features=None):
+        """
+        Standard errors of the parameters, i.e. the square root of the diagonal of the inverse
+        Fisher information matrix, see get_fisher_inv().
+
+        :param features: (optional) names of the features to evaluate. All features are evaluated if None.
+        :return: xr.DataArray (features x delta_var0)
+        """
+        fisher_inv = self.get_fisher_inv(features=features)
+        diag = np.diagonal(fisher_inv.values, axis1=-2, axis2=-1)
+        return xr.DataArray(
+            np.sqrt(diag),
+            dims=("features", "delta_var0"),
+            coords={k: v for k, v in fisher_inv.coords.items() if k in ("features", "delta_var0")}
+        )
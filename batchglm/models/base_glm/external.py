@@ -5,5 +5,5 @@ from batchglm.models.base import _Simulator_Base
 from batchglm.models.base import INPUT_DATA_PARAMS
 
 import batchglm.data as data_utils
-from batchglm.utils.linalg import groupwise_solve_lm
-from batchglm.utils.numeric import weighted_mean, weighted_variance
\ No newline at end of file
+from batchglm.utils.linalg import groupwise_solve_lm, stacked_inv_sym
+from batchglm.utils.numeric import weighted_mean, weighted_variance, groupwise_mean
\ No newline at end of file
@@ -20,6 +20,9 @@ INPUT_DATA_PARAMS.update({
     "constraints_loc": ("design_loc_params", "loc_params"),
     "constraints_scale": ("design_scale_params", "scale_params"),
     "size_factors": ("observations",),
+    "design_loc_groups": ("design_groups", "design_loc_params"),
+    "design_scale_groups": ("design_groups", "design_scale_params"),
+    "design_group_idx": ("observations",),
 })
 
 class InputData(_InputData_Base):
@@ -45,7 +48,8 @@ class InputData(_InputData_Base):
             feature_names=None,
             design_loc_key="design_loc",
             design_scale_key="design_scale",
-            cast_dtype=None
+            cast_dtype=None,
+            keep_sparse=False
     ):
         """
         Create a new InputData object.
@@ -53,6 +57,7 @@ class InputData(_InputData_Base):
         :param data: Some data object.
             Can be either:
                 - np.ndarray: NumPy array containing the raw data
+                - scipy.sparse matrix: sparse matrix containing the raw data
                 - anndata.AnnData: AnnData object containing the count data and optional the design models
                     stored as data.obsm[design_loc] and data.obsm[design_scale]
                 - xr.DataArray: DataArray of shape ("observations", "features") containing the raw data
@@ -92,13 +97,17 @@ class InputData(_InputData_Base):
             Where to find `design_scale` if `data` is some anndata.AnnData or xarray.Dataset.
         :param cast_dtype:
             If this option is set, all provided data will be casted to this data type.
+        :param keep_sparse:
+            If True, sparse data will be kept in CSR format and only the requested rows will be densified
+            when fetching batches.
         :return: InputData object
         """
         retval = super(InputData, cls).new(
             data=data,
             observation_names=observation_names,
             feature_names=feature_names,
-            cast_dtype=cast_dtype
+            cast_dtype=cast_dtype,
+            keep_sparse=keep_sparse
         )
 
         design_loc = parse_design(
@@ -122,6 +131,7 @@ class InputData(_InputData_Base):
 
         retval.design_loc = design_loc
         retval.design_scale = design_scale
+        retval.update_design_groups()
 
         constraints_loc = parse_constraints(
             dmat=design_loc,
@@ -151,6 +161,7 @@ class InputData(_InputData_Base):
     @design_loc.setter
     def design_loc(self, data):
         self.data["design_loc"] = data
+        self._drop_design_groups()
 
     @property
     def design_loc_names(self) -> xr.DataArray:
@@ -167,6 +178,7 @@ class InputData(_InputData_Base):
     @design_scale.setter
     def design_scale(self, data):
         self.data["design_scale"] = data
+        self._drop_design_groups()
 
     @property
     def design_scale_names(self) -> xr.DataArray:
@@ -176,6 +188,62 @@ class InputData(_InputData_Base):
     def design_scale_names(self, data):
         self.data.coords["design_scale_params"] = data
 
+    def update_design_groups(self):
+        """
+        Find the unique rows of the joint location and scale design
+        and assign each observation to the index of its row.
+        """
+        design = np.hstack([np.asarray(self.design_loc), np.asarray(self.design_scale)])
+        design_groups, design_group_idx = np.unique(design, axis=0, return_inverse=True)
+
+        self.data["design_loc_groups"] = xr.DataArray(
+            dims=self.param_shapes()["design_loc_groups"],
+            data=design_groups[:, :self.num_design_loc_params]
+        )
+        self.data["design_scale_groups"] = xr.DataArray(
+            dims=self.param_shapes()["design_scale_groups"],
+            data=design_groups[:, self.num_design_loc_params:]
+        )
+        self.data["design_group_idx"] = xr.DataArray(
+            dims=self.param_shapes()["design_group_idx"],
+            data=np.reshape(design_group_idx, -1)
+        )
+
+    def _drop_design_groups(self):
+        for key in ["design_loc_groups", "design_scale_groups", "design_group_idx"]:
+            if key in self.data:
+                del self.data[key]
+
+    def _get_design_groups(self, key) -> xr.DataArray:
+        if key not in self.data:
+            self.update_design_groups()
+        return self.data[key]
+
+    @property
+    def design_loc_groups(self) -> xr.DataArray:
+        """
+        Unique rows of the location design, indexed by `design_group_idx`.
+        """
+        return self._get_design_groups("design_loc_groups")
+
+    @property
+    def design_scale_groups(self) -> xr.DataArray:
+        """
+        Unique rows of the scale design, indexed by `design_group_idx`.
+        """
+        return self._get_design_groups("design_scale_groups")
+
+    @property
+    def design_group_idx(self) -> xr.DataArray:
+        """
+        Index of the design group of each observation.
+        """
+        return self._get_design_groups("design_group_idx")
+
+    @property
+    def num_design_groups(self):
+        return self.design_loc_groups.shape[0]
+
     @property
     def constraints_loc(self) -> xr.DataArray:
         return self.data["constraints_loc"]
@@ -245,6 +313,9 @@ class InputData(_InputData_Base):
     def fetch_design_scale(self, idx):
         return self.design_scale[idx]
 
+    def fetch_design_group_idx(self, idx):
+        return self.design_group_idx[idx]
+
     def fetch_size_factors(self, idx):
         return self.size_factors[idx]
 
@@ -255,8 +326,9 @@ class InputData(_InputData_Base):
         :param cs: numer of observations in one chunk
         """
         super().set_chunk_size(cs)
-        self.design_loc = self.design_loc.chunk({"observations": cs})
-        self.design_scale = self.design_scale.chunk({"observations": cs})
+        # chunking does not change the design, so the design groups stay valid:
+        self.data["design_loc"] = self.design_loc.chunk({"observations": cs})
+        self.data["design_scale"] = self.design_scale.chunk({"observations": cs})
 
     def __str__(self):
         return "[%s.%s object at %s]: data=%s" % (
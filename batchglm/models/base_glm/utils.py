@@ -10,8 +10,9 @@ import pandas as pd
 
 import patsy
 
+from .external import data_utils
 from .external import groupwise_solve_lm
-from .external import weighted_mean, weighted_variance
+from .external import weighted_mean, weighted_variance, groupwise_mean
 
 
 def parse_design(
@@ -125,8 +126,18 @@ def closedform_glm_mean(
     :param link_fn: linker function for GLM
     :return: tuple: (groupwise_means, mu, rmsd)
     """
+    if isinstance(X, data_utils.SparseXArrayDataArray):
+        return _closedform_glm_mean_sparse(
+            X=X,
+            dmat=dmat,
+            constraints=constraints,
+            size_factors=size_factors,
+            weights=weights,
+            link_fn=link_fn
+        )
+
     if size_factors is not None:
-        X = np.divide(X, size_factors)
+        X = normalize_by_size_factors(X, size_factors)
 
     def apply_fun(grouping):
         grouped_data = X.assign_coords(group=((X.dims[0],), grouping)).groupby("group")
@@ -184,8 +195,18 @@ def closedform_glm_var(
     :param link_fn: linker function for GLM
     :return: tuple: (groupwise_variance, phi, rmsd)
     """
+    if isinstance(X, data_utils.SparseXArrayDataArray):
+        return _closedform_glm_var_sparse(
+            X=X,
+            dmat=dmat,
+            constraints=constraints,
+            size_factors=size_factors,
+            weights=weights,
+            link_fn=link_fn
+        )
+
     if size_factors is not None:
-        X = np.divide(X, size_factors)
+        X = normalize_by_size_factors(X, size_factors)
 
     def apply_fun(grouping):
         grouped_data = X.assign_coords(group=((X.dims[0],), grouping))
@@ -217,3 +238,105 @@ def closedform_glm_var(
     )
 
     return groupwise_variance, phi, rmsd
+
+
+def normalize_by_size_factors(
+        X: xr.DataArray,
+        size_factors
+) -> xr.DataArray:
+    """
+    Divides each observation of dense data by its size factor.
+
+    :param X: input data (observations x features)
+    :param size_factors: size factors of shape (observations,) or broadcasted to (observations, features)
+    :return: normalized data
+    """
+    size_factors = np.asarray(size_factors)
+    if size_factors.ndim == 1:
+        # broadcast across features without materializing (observations x features)
+        size_factors = np.expand_dims(size_factors, axis=-1)
+    return np.divide(X, size_factors)
+
+
+def normalize_sparse_by_size_factors(
+        X: data_utils.SparseXArrayDataArray,
+        size_factors
+) -> data_utils.SparseXArrayDataArray:
+    """
+    Divides each observation of CSR-backed data by its size factor without densifying the data.
+
+    :param X: CSR-backed input data
+    :param size_factors: size factors of shape (observations,) or broadcasted to (observations, features)
+    :return: normalized data
+    """
+    size_factors = np.asarray(size_factors)
+    if size_factors.ndim > 1:
+        # size factors are constant across features
+        size_factors = size_factors[:, 0]
+    return X.multiply_rows(np.reciprocal(size_factors))
+
+
+def _closedform_glm_mean_sparse(
+        X: data_utils.SparseXArrayDataArray,
+        dmat,
+        constraints=None,
+        size_factors=None,
+        weights=None,
+        link_fn: Union[callable, None] = None
+):
+    r"""
+    Equivalent of `closedform_glm_mean()` for CSR-backed data.
+    The group-wise means are computed on the sparse matrix directly.
+    """
+    if size_factors is not None:
+        X = normalize_sparse_by_size_factors(X, size_factors)
+
+    def apply_fun(grouping):
+        groupwise_means = groupwise_mean(X.X, grouping, weights=weights)
+
+        if link_fn is None:
+            return groupwise_means
+        else:
+            return link_fn(groupwise_means)
+
+    groupwise_means, mu, rmsd, rank, s = groupwise_solve_lm(
+        dmat=dmat,
+        apply_fun=apply_fun,
+        constraints=constraints
+    )
+
+    return groupwise_means, mu, rmsd
+
+
+def _closedform_glm_var_sparse(
+        X: data_utils.SparseXArrayDataArray,
+        dmat,
+        constraints=None,
+        size_factors=None,
+        weights=None,
+        link_fn: Union[callable, None] = None
+):
+    r"""
+    Equivalent of `closedform_glm_var()` for CSR-backed data.
+    The group-wise variances are computed as E[X^2] - E[X]^2 on the sparse matrix directly.
+    """
+    if size_factors is not None:
+        X = normalize_sparse_by_size_factors(X, size_factors)
+
+    def apply_fun(grouping):
+        groupwise_means = groupwise_mean(X.X, grouping, weights=weights)
+        groupwise_variance = groupwise_mean(X.X.multiply(X.X), grouping, weights=weights) - \
+            np.square(groupwise_means)
+
+        if link_fn is None:
+            return groupwise_variance
+        else:
+            return link_fn(groupwise_variance)
+
+    groupwise_variance, phi, rmsd, rank, s = groupwise_solve_lm(
+        dmat=dmat,
+        apply_fun=apply_fun,
+        constraints=constraints
+    )
+
+    return groupwise_variance, phi, rmsd
@@ -1,7 +1,7 @@
 import abc
 
 from .model import Model, Model_XArray
-from .external import _Estimator_GLM, _EstimatorStore_XArray_GLM, ESTIMATOR_PARAMS
+from .external import _Estimator_GLM, _EstimatorStore_XArray_GLM, ESTIMATOR_PARAMS, ESTIMATOR_STORE_OUTPUTS
 
 
 class AbstractEstimator(Model, _Estimator_GLM, metaclass=abc.ABCMeta):
@@ -17,14 +17,51 @@ class AbstractEstimator(Model, _Estimator_GLM, metaclass=abc.ABCMeta):
 
 class EstimatorStoreXArray(_EstimatorStore_XArray_GLM, AbstractEstimator, Model_XArray):
 
-    def __init__(self, estim: AbstractEstimator):
+    def __init__(self, estim: AbstractEstimator, outputs: list = None, lazy: bool = False):
+        """
+        :param estim: Estimator with an open session.
+        :param outputs: (optional) list of parameters which are evaluated now, see ESTIMATOR_STORE_OUTPUTS.
+            The coefficients "a_var" and "b_var" are always evaluated.
+            Defaults to all of ESTIMATOR_STORE_OUTPUTS if `lazy` is False and to the coefficients only otherwise.
+        :param lazy: Whether to keep `estim` and evaluate the remaining parameters of ESTIMATOR_STORE_OUTPUTS
+            on first access. The session of `estim` is closed once all of them are evaluated or close() is called.
+        """
         input_data = estim.input_data
+        if outputs is None:
+            outputs = [] if lazy else ESTIMATOR_STORE_OUTPUTS
+        for key in outputs:
+            if key not in ESTIMATOR_STORE_OUTPUTS and key != "fisher_inv":
+                raise ValueError("Unknown output %s" % key)
+        # The inverse Fisher information matrix is computed from the hessian on request.
+        fetch = ["a_var", "b_var"] + [x for x in ESTIMATOR_STORE_OUTPUTS if x in outputs]
+        if "fisher_inv" in outputs and "hessians" not in fetch:
+            fetch.append("hessians")
+        fetch = list(dict.fromkeys(fetch))
+
         # to_xarray triggers the get function of these properties and thereby
         # causes evaluation of the properties that have not been computed during
         # training, such as the hessian.
-        params = estim.to_xarray(
-            ["a_var", "b_var", "loss", "log_likelihood", "gradients", "hessians", "fisher_inv"],
-            coords=input_data.data
-        )
+        params = estim.to_xarray(fetch, coords=input_data.data)
+
+        Model_XArray.__init__(self, input_data, params)
+        if "fisher_inv" in outputs:
+            self.params["fisher_inv"] = self.get_fisher_inv()
+
+        if lazy:
+            self._estim = estim
+            self._lazy_params = [x for x in ESTIMATOR_STORE_OUTPUTS if x not in fetch]
+            if len(self._lazy_params) == 0:
+                self.close()
+
+    @classmethod
+    def from_params(cls, input_data, params):
+        """
+        Creates a store from parameters which were evaluated elsewhere, e.g. merged from several fits.
 
-        Model_XArray.__init__(self, input_data, params)
\ No newline at end of file
+        :param input_data: InputData which the parameters were fit on.
+        :param params: xr.Dataset with the estimated parameters, see EstimatorStoreXArray.__init__().
+        :return: EstimatorStoreXArray
+        """
+        store = cls.__new__(cls)
+        Model_XArray.__init__(store, input_data, params)
+        return store
@@ -1,10 +1,12 @@
-from batchglm.models.base_glm import _Estimator_GLM, _EstimatorStore_XArray_GLM, ESTIMATOR_PARAMS
+from batchglm.models.base_glm import _Estimator_GLM, _EstimatorStore_XArray_GLM, ESTIMATOR_PARAMS, ESTIMATOR_STORE_OUTPUTS
 from batchglm.models.base_glm import InputData, INPUT_DATA_PARAMS
 from batchglm.models.base_glm import _Model_GLM, _Model_XArray_GLM, MODEL_PARAMS, _model_from_params
 from batchglm.models.base_glm import _Simulator_GLM
 from batchglm.models.base_glm import closedform_glm_mean, closedform_glm_var
+from batchglm.models.base_glm import normalize_by_size_factors, normalize_sparse_by_size_factors
 
 import batchglm.data as data_utils
 import batchglm.utils.random as rand_utils
-from batchglm.utils.numeric import weighted_mean, weighted_variance
-from batchglm.utils.linalg import groupwise_solve_lm
\ No newline at end of file
+from batchglm.utils.numeric import weighted_mean, weighted_variance, groupwise_mean
+from batchglm.utils.linalg import groupwise_solve_lm
+from batchglm import pkg_constants
@@ -1,6 +1,12 @@
 from enum import Enum
 
+
 class TrainingStrategies(Enum):
+    """
+    Training strategies of negative binomial GLMs which are shared by the tensorflow and the numpy backend.
+
+    The numpy backend trains on the full data in all steps and ignores `use_batching`.
+    """
 
     AUTO = None
     DEFAULT = [
@@ -40,4 +46,4 @@ class TrainingStrategies(Enum):
             "use_batching": False,
             "optim_algo": "irls",
         },
-    ]
\ No newline at end of file
+    ]
@@ -1,10 +1,16 @@
+import logging
 from typing import Union
 
 import numpy as np
 import xarray as xr
 
 from .external import closedform_glm_mean, groupwise_solve_lm
-from .external import weighted_mean
+from .external import normalize_by_size_factors, normalize_sparse_by_size_factors
+from .external import weighted_mean, groupwise_mean
+from .external import data_utils
+from .external import pkg_constants
+
+logger = logging.getLogger(__name__)
 
 
 def closedform_nb_glm_logmu(
@@ -61,8 +67,20 @@ def closedform_nb_glm_logphi(
     :param groupwise_means: optional, in case if already computed this can be specified to spare double-calculation
     :return: tuple (groupwise_scales, logphi, rmsd)
     """
+    if isinstance(X, data_utils.SparseXArrayDataArray):
+        return _closedform_nb_glm_logphi_sparse(
+            X=X,
+            design_scale=design_scale,
+            constraints=constraints,
+            size_factors=size_factors,
+            weights=weights,
+            mu=mu,
+            groupwise_means=groupwise_means,
+            link_fn=link_fn
+        )
+
     if size_factors is not None:
-        X = np.divide(X, size_factors)
+        X = normalize_by_size_factors(X, size_factors)
 
     # to circumvent nonlocal error
     provided_groupwise_means = groupwise_means
@@ -137,3 +155,227 @@ def closedform_nb_glm_logphi(
     )
 
     return groupwise_scales, logphi, rmsd
+
+
+def _closedform_nb_glm_logphi_sparse(
+        X: data_utils.SparseXArrayDataArray,
+        design_scale: xr.DataArray,
+        constraints=None,
+        size_factors=None,
+        weights: Union[np.ndarray, xr.DataArray] = None,
+        mu=None,
+        groupwise_means=None,
+        link_fn=np.log
+):
+    r"""
+    Equivalent of `closedform_nb_glm_logphi()` for CSR-backed data.
+
+    The group-wise second moments are expanded as E[(X - mu)^2] = E[X^2] - 2 E[X * mu] + E[mu^2],
+    so that only products with the nonzero entries of `X` are required.
+    """
+    if size_factors is not None:
+        X = normalize_sparse_by_size_factors(X, size_factors)
+    X = X.X
+
+    provided_groupwise_means = groupwise_means
+    if mu is not None:
+        mu = np.asarray(mu)
+
+    def apply_fun(grouping):
+        if provided_groupwise_means is None:
+            groupwise_means = groupwise_mean(X, grouping, weights=weights)
+        else:
+            groupwise_means = np.asarray(provided_groupwise_means)
+
+        second_moment = groupwise_mean(X.multiply(X), grouping, weights=weights)
+        if mu is None:
+            variance = second_moment - 2 * groupwise_means * groupwise_mean(X, grouping, weights=weights) + \
+                       np.square(groupwise_means)
+        else:
+            variance = second_moment - 2 * groupwise_mean(X.multiply(mu), grouping, weights=weights) + \
+                       groupwise_mean(np.square(mu), grouping, weights=weights)
+
+        denominator = np.fmax(variance - groupwise_means, np.sqrt(np.nextafter(0, 1, dtype=variance.dtype)))
+        groupwise_scales = np.square(groupwise_means) / denominator
+
+        return link_fn(groupwise_scales)
+
+    groupwise_scales, logphi, rmsd, rank, _ = groupwise_solve_lm(
+        dmat=design_scale,
+        apply_fun=apply_fun,
+        constraints=constraints
+    )
+
+    return groupwise_scales, logphi, rmsd
+
+
+def param_bounds_nb_glm(dtype):
+    """
+    Bounds of the parameters of negative-binomial GLMs which are enforced by all training backends.
+
+    :param dtype: numpy dtype
+    :return: tuple (bounds_min, bounds_max) of dictionaries by parameter name
+    """
+    dtype = np.dtype(dtype)
+    dmax = np.finfo(dtype).max
+    dtype = dtype.type
+
+    sf = dtype(pkg_constants.ACCURACY_MARGIN_RELATIVE_TO_LIMIT)
+    bounds_min = {
+        "a_var": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
+        "b_var": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
+        "eta_loc": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
+        "eta_scale": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
+        "mu": np.nextafter(0, np.inf, dtype=dtype),
+        "r": np.nextafter(0, np.inf, dtype=dtype),
+        "probs": dtype(0),
+        "log_probs": np.log(np.nextafter(0, np.inf, dtype=dtype)),
+    }
+    bounds_max = {
+        "a_var": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
+        "b_var": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
+        "eta_loc": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
+        "eta_scale": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
+        "mu": np.nextafter(dmax, -np.inf, dtype=dtype) / sf,
+        "r": np.nextafter(dmax, -np.inf, dtype=dtype) / sf,
+        "probs": dtype(1),
+        "log_probs": dtype(0),
+    }
+    return bounds_min, bounds_max
+
+
+def init_par_nb_glm(
+        input_data,
+        init_a,
+        init_b,
+        init_model,
+        clip_param,
+        train_loc: bool = True
+):
+    r"""
+    Initial coefficients of negative-binomial GLMs which are shared by all training backends.
+
+    standard:
+    Only initialise intercept and keep other coefficients as zero.
+
+    closed-form:
+    Initialize with Maximum Likelihood / Maximum of Momentum estimators
+
+    Idea:
+    $$
+        \theta &= f(x) \\
+        \Rightarrow f^{-1}(\theta) &= x \\
+            &= (D \cdot D^{+}) \cdot x \\
+            &= D \cdot (D^{+} \cdot x) \\
+            &= D \cdot x' = f^{-1}(\theta)
+    $$
+
+    :param input_data: InputData
+    :param init_a: initial values or initialisation scheme of the mean model, see EstimatorAll
+    :param init_b: initial values or initialisation scheme of the dispersion model, see EstimatorAll
+    :param init_model: (optional) model whose coefficients are used for the initialisation
+    :param clip_param: function (param, name) which clips a parameter to the bounds of the estimator
+    :param train_loc: whether the mean model is trained if the initialisation does not decide this
+    :return: tuple (init_a, init_b, train_loc)
+    """
+    # Vector over observations, the closed-form estimators divide each observation by its size factor:
+    size_factors_init = input_data.size_factors
+
+    if isinstance(init_a, str):
+        # Chose option if auto was chosen
+        if init_a.lower() == "auto":
+            init_a = "closed_form"
+
+        if init_a.lower() == "closed_form":
+            try:
+                groupwise_means, init_a, rmsd_a = closedform_nb_glm_logmu(
+                    X=input_data.X,
+                    design_loc=input_data.design_loc,
+                    constraints_loc=input_data.constraints_loc,
+                    size_factors=size_factors_init,
+                    link_fn=lambda mu: np.log(clip_param(mu, "mu"))
+                )
+
+                # train mu, if the closed-form solution is inaccurate
+                train_loc = not np.all(rmsd_a == 0)
+
+                # Temporal fix: train mu if size factors are given as closed form may be different:
+                if input_data.size_factors is not None:
+                    train_loc = True
+
+                logger.debug("Using closed-form MLE initialization for mean")
+                logger.debug("RMSE of closed-form mean:\n%s", rmsd_a)
+                logger.debug("Should train mu: %s", train_loc)
+            except np.linalg.LinAlgError:
+                logger.warning("Closed form initialization failed!")
+        elif init_a.lower() == "standard":
+            overall_means = input_data.X.mean(dim="observations").values  # directly calculate the mean
+            overall_means = clip_param(overall_means, "mu")
+
+            init_a = np.zeros([input_data.num_loc_params, input_data.num_features])
+            init_a[0, :] = np.log(overall_means)
+            train_loc = True
+
+            logger.debug("Using standard initialization for mean")
+            logger.debug("Should train mu: %s", train_loc)
+
+    if isinstance(init_b, str):
+        if init_b.lower() == "auto":
+            init_b = "closed_form"
+
+        if init_b.lower() == "closed_form":
+            try:
+                init_a_xr = data_utils.xarray_from_data(init_a, dims=("loc_params", "features"))
+                init_a_xr.coords["loc_params"] = input_data.constraints_loc.coords["loc_params"]
+                # TODO: memory inefficient:
+                init_mu = np.exp(input_data.design_loc.dot(input_data.constraints_loc.dot(init_a_xr)))
+
+                groupwise_scales, init_b, rmsd_b = closedform_nb_glm_logphi(
+                    X=input_data.X,
+                    mu=init_mu,
+                    design_scale=input_data.design_scale,
+                    constraints=input_data.constraints_scale,
+                    size_factors=size_factors_init,
+                    groupwise_means=None,
+                    link_fn=lambda r: np.log(clip_param(r, "r"))
+                )
+
+                logger.info("Using closed-form MME initialization for dispersion")
+                logger.debug("RMSE of closed-form dispersion:\n%s", rmsd_b)
+            except np.linalg.LinAlgError:
+                logger.warning("Closed form initialization failed!")
+        elif init_b.lower() == "standard":
+            init_b = np.zeros([input_data.num_scale_params, input_data.X.shape[1]])
+
+            logger.info("Using standard initialization for dispersion")
+
+    if init_model is not None:
+        # Locations model:
+        if isinstance(init_a, str) and (init_a.lower() == "auto" or init_a.lower() == "init_model"):
+            my_loc_names = set(input_data.design_loc_names.values)
+            my_loc_names = my_loc_names.intersection(init_model.input_data.design_loc_names.values)
+
+            init_loc = np.zeros([input_data.num_loc_params, input_data.num_features])
+            for parm in my_loc_names:
+                init_idx = np.where(init_model.input_data.design_loc_names == parm)
+                my_idx = np.where(input_data.design_loc_names == parm)
+                init_loc[my_idx] = init_model.par_link_loc[init_idx]
+
+            init_a = init_loc
+            logger.info("Using initialization based on input model for mean")
+
+        # Scale model:
+        if isinstance(init_b, str) and (init_b.lower() == "auto" or init_b.lower() == "init_model"):
+            my_scale_names = set(input_data.design_scale_names.values)
+            my_scale_names = my_scale_names.intersection(init_model.input_data.design_scale_names.values)
+
+            init_scale = np.zeros([input_data.num_scale_params, input_data.num_features])
+            for parm in my_scale_names:
+                init_idx = np.where(init_model.input_data.design_scale_names == parm)
+                my_idx = np.where(input_data.design_scale_names == parm)
+                init_scale[my_idx] = init_model.par_link_scale[init_idx]
+
+            init_b = init_scale
+            logger.info("Using initialization based on input model for dispersion")
+
+    return init_a, init_b, train_loc
@@ -1,7 +1,11 @@
 import os
 import multiprocessing
 
-import tensorflow as tf
+try:
+    import tensorflow as tf
+except ImportError:
+    # The numpy backend (batchglm.train.numpy) does not require tensorflow.
+    tf = None
 
 TF_NUM_THREADS = int(os.environ.get('TF_NUM_THREADS', 0))
 TF_LOOP_PARALLEL_ITERATIONS = int(os.environ.get('TF_LOOP_PARALLEL_ITERATIONS', 10))
@@ -10,16 +14,39 @@ ACCURACY_MARGIN_RELATIVE_TO_LIMIT = float(os.environ.get('BATCHGLM_ACCURACY_MARG
 HESSIAN_MODE = str(os.environ.get('HESSIAN_MODE', "obs_batched"))
 JACOBIAN_MODE = str(os.environ.get('JACOBIAN_MODE', "analytic"))
 CHOLESKY_LSTSQS = True
+# Evaluate count-dependent likelihood and derivative terms only on the nonzero entries of each batch:
+SPARSE_KERNELS = bool(int(os.environ.get('BATCHGLM_SPARSE_KERNELS', 0)))
+# Evaluate log-likelihood, Jacobian, Fisher information matrix and Hessian from one model evaluation per batch:
+FUSED_STATISTICS = bool(int(os.environ.get('BATCHGLM_FUSED_STATISTICS', 1)))
+# Step sizes which are tried per feature by the line search of Newton-type optimizers ("nr_ls", "irls_ls"):
+NEWTON_LINE_SEARCH_STEPS = [1., 0.5, 0.25, 0.125, 0.0625]
+# Number of parameter and gradient differences which are kept per feature by the L-BFGS optimizer:
+LBFGS_HISTORY_SIZE = int(os.environ.get('BATCHGLM_LBFGS_HISTORY_SIZE', 10))
+# Number of pairs of column and observation which the stacked numpy estimator evaluates at once:
+STACKED_CHUNK_SIZE = int(os.environ.get('BATCHGLM_STACKED_CHUNK_SIZE', 2 ** 15))
+
+# Number of batches which the "streaming" input pipeline reads ahead of the training loop:
+STREAMING_READ_AHEAD = int(os.environ.get('BATCHGLM_STREAMING_READ_AHEAD', 4))
 
 XARRAY_NETCDF_ENGINE = "h5netcdf"
+# Storage backend of saved data and exports if it is not chosen per call: "netcdf" (HDF5 via h5netcdf) or "zarr":
+STORAGE_BACKEND = str(os.environ.get('BATCHGLM_STORAGE_BACKEND', "netcdf"))
+# Blosc compressor and compression level of zarr stores:
+ZARR_COMPRESSOR = str(os.environ.get('BATCHGLM_ZARR_COMPRESSOR', "zstd"))
+ZARR_COMPRESSION_LEVEL = int(os.environ.get('BATCHGLM_ZARR_COMPRESSION_LEVEL', 3))
+# Number of exports of the estimator which can wait for the background writer:
+EXPORT_QUEUE_SIZE = int(os.environ.get('BATCHGLM_EXPORT_QUEUE_SIZE', 2))
 
-TF_CONFIG_PROTO = tf.ConfigProto()
-TF_CONFIG_PROTO.allow_soft_placement = True
-TF_CONFIG_PROTO.log_device_placement = False
-TF_CONFIG_PROTO.gpu_options.allow_growth = True
+if tf is not None:
+    TF_CONFIG_PROTO = tf.ConfigProto()
+    TF_CONFIG_PROTO.allow_soft_placement = True
+    TF_CONFIG_PROTO.log_device_placement = False
+    TF_CONFIG_PROTO.gpu_options.allow_growth = True
 
-TF_CONFIG_PROTO.inter_op_parallelism_threads = 0 if TF_NUM_THREADS == 0 else 1
-TF_CONFIG_PROTO.intra_op_parallelism_threads = TF_NUM_THREADS
+    TF_CONFIG_PROTO.inter_op_parallelism_threads = 0 if TF_NUM_THREADS == 0 else 1
+    TF_CONFIG_PROTO.intra_op_parallelism_threads = TF_NUM_THREADS
+else:
+    TF_CONFIG_PROTO = None
 
 if TF_NUM_THREADS == 0:
     TF_NUM_THREADS = multiprocessing.cpu_count()
@@ -0,0 +1,3 @@
+from .estimator import EstimatorGLM
+from .estimator_stacked import EstimatorStackedGLM
+from .model import ProcessModelGLM
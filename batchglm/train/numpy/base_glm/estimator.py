@@ -0,0 +1,760 @@
+import abc
+from enum import Enum
+import logging
+import pprint
+import time
+from typing import Union, Iterable
+
+import numpy as np
+import scipy.sparse
+import xarray as xr
+
+from .external import InputData, _Model_GLM
+from .external import stacked_inv_sym, stacked_solve_sym
+from .external import pkg_constants
+from .model import ProcessModelGLM
+
+logger = logging.getLogger(__name__)
+
+
+class EstimatorGLM(ProcessModelGLM, metaclass=abc.ABCMeta):
+    """
+    Estimator for Generalized Linear Models (GLMs) which is evaluated with numpy instead of a tensorflow graph.
+
+    The statistics of all features are evaluated in one vectorised pass over the data and the
+    feature-wise systems of the Newton-type updates are solved by batched Cholesky decompositions.
+    This avoids graph construction and session overhead which dominate the run time of small problems.
+    The interface follows EstimatorAll of the tensorflow backend.
+    """
+
+    class TrainingStrategy(Enum):
+        pass
+
+    noise_model: str
+    termination_type: str
+    converged: np.ndarray
+
+    _train_loc: bool
+    _train_scale: bool
+
+    _a_var: Union[np.ndarray, None]
+    _b_var: Union[np.ndarray, None]
+    _global_step: int
+    # Values computed by `_get_unsafe()` at the current parameters:
+    _cache: dict
+
+    def __init__(
+            self,
+            input_data: InputData,
+            init_model: _Model_GLM = None,
+            init_a: Union[np.ndarray, str] = "AUTO",
+            init_b: Union[np.ndarray, str] = "AUTO",
+            quick_scale: bool = False,
+            termination_type: str = "by_feature",
+            noise_model: str = None,
+            dtype="float64",
+    ):
+        """
+        Create a new Estimator
+
+        :param input_data: InputData
+            The input data. Sparse data is densified.
+        :param init_model: (optional)
+            If provided, this model will be used to initialize this Estimator.
+        :param init_a: (Optional)
+            Low-level initial values for a, see EstimatorAll of the tensorflow backend.
+        :param init_b: (Optional)
+            Low-level initial values for b, see EstimatorAll of the tensorflow backend.
+        :param quick_scale: bool
+            Whether `scale` will be fitted faster and maybe less accurate.
+        :param termination_type: "by_feature" to stop updating each feature once it converged
+            or "global" to update all features until all of them converged.
+        :param noise_model: str {"nb"}
+            Noise model identifier.
+        :param dtype: Precision used in numpy.
+        """
+        if noise_model != "nb":
+            raise ValueError("noise model %s was not recognized" % noise_model)
+        self.noise_model = noise_model
+
+        if termination_type not in ["by_feature", "global"]:
+            raise ValueError("termination_type %s not recognized" % termination_type)
+        self.termination_type = termination_type
+
+        # validate design matrix:
+        if np.linalg.matrix_rank(input_data.design_loc) != np.linalg.matrix_rank(input_data.design_loc.T):
+            raise ValueError("design_loc matrix is not full rank")
+        if np.linalg.matrix_rank(input_data.design_scale) != np.linalg.matrix_rank(input_data.design_scale.T):
+            raise ValueError("design_scale matrix is not full rank")
+
+        self._input_data = input_data
+        self._train_loc = True
+        self._train_scale = not quick_scale
+        self.dtype = np.dtype(dtype)
+
+        (init_a, init_b) = self.init_par(
+            init_a=init_a,
+            init_b=init_b,
+            init_model=init_model
+        )
+        self._init_a = np.asarray(init_a).astype(dtype)
+        self._init_b = np.asarray(init_b).astype(dtype)
+
+        logger.debug(" * Loading data")
+        if input_data.is_sparse:
+            logger.warning("numpy backend densifies sparse input data")
+        self._X = np.asarray(input_data.fetch_X(np.arange(input_data.num_observations)), dtype=dtype)
+        if input_data.size_factors is not None:
+            self._size_factors = np.log(np.asarray(input_data.size_factors.values, dtype=dtype))
+        else:
+            self._size_factors = None
+
+        # The linear predictors are evaluated once per design group and the statistics
+        # are summed per design group before they are multiplied with the design:
+        design_idx = np.asarray(input_data.design_group_idx.values)
+        self._design_idx = design_idx
+        self._xh_loc = np.matmul(
+            np.asarray(input_data.design_loc_groups.values, dtype=dtype),
+            np.asarray(input_data.constraints_loc.values, dtype=dtype)
+        )
+        self._xh_scale = np.matmul(
+            np.asarray(input_data.design_scale_groups.values, dtype=dtype),
+            np.asarray(input_data.constraints_scale.values, dtype=dtype)
+        )
+        self._group_sum = scipy.sparse.csr_matrix(
+            (np.ones(design_idx.shape[0], dtype=dtype), (design_idx, np.arange(design_idx.shape[0]))),
+            shape=(input_data.num_design_groups, design_idx.shape[0])
+        )
+        self._feature_isnonzero = np.asarray(input_data.feature_isnonzero)
+
+        self._a_var = None
+        self._b_var = None
+        self._global_step = 0
+        self.converged = np.zeros([input_data.num_features], dtype=bool)
+        self.clear_cache()
+
+    def initialize(self):
+        """
+        Sets the parameters to their initial values and resets the convergence status.
+        """
+        self._a_var = np.copy(self._init_a)
+        self._b_var = np.copy(self._init_b)
+        self._global_step = 0
+        self.update_converged(False)
+
+    def close_session(self):
+        """
+        Releases the data, the estimator cannot be trained or evaluated afterwards.
+        """
+        if self._X is None:
+            return False
+        self._X = None
+        self._size_factors = None
+        self.clear_cache()
+        return True
+
+    def clear_cache(self):
+        """
+        Discards all values which were memoised by `get()`.
+        """
+        self._cache = {}
+
+    def update_converged(self, converged):
+        """
+        Sets the feature-wise convergence status.
+
+        Features which are all zero are always marked as converged as they carry no information
+        about the coefficients, their coefficients are set to the lower bounds in the output.
+
+        :param converged: boolean array (features) or scalar which is broadcasted to all features.
+        """
+        converged = np.broadcast_to(converged, self.converged.shape).copy()
+        self.converged = np.logical_or(converged, np.logical_not(self._feature_isnonzero))
+
+    def _update_converged_by_delta(self, metric_delta, stopping_criteria):
+        """
+        Marks features as converged if their convergence metric changed less than `stopping_criteria`.
+
+        Features with a non-finite convergence metric cannot improve anymore and are stopped as well.
+        """
+        converged = np.logical_or(self.converged, metric_delta < stopping_criteria)
+        not_finite = np.logical_and(np.logical_not(converged), np.logical_not(np.isfinite(metric_delta)))
+        if np.any(not_finite):
+            logger.warning("Stopping %i features with non-finite convergence metric", np.sum(not_finite))
+        self.update_converged(np.logical_or(converged, not_finite))
+
+    # ### Model and statistics
+
+    def _model(self, a_var, b_var, idx):
+        """
+        Evaluates the linear predictors on the features `idx`.
+
+        :return: tuple (X, eta_loc, eta_scale) of arrays (observations x features)
+        """
+        eta_loc = np.matmul(self._xh_loc, a_var)[self._design_idx]
+        eta_scale = np.matmul(self._xh_scale, b_var)[self._design_idx]
+        if self._size_factors is not None:
+            eta_loc = eta_loc + np.expand_dims(self._size_factors, axis=-1)
+        eta_loc = self.np_clip_param(eta_loc, "eta_loc")
+        eta_scale = self.np_clip_param(eta_scale, "eta_scale")
+        return self._X[:, idx], eta_loc, eta_scale
+
+    def _outer(self, W, xh_left, xh_right):
+        # Sum of the outer products of the design rows, weighted by W, per feature:
+        W = self._group_sum.dot(W)  # [design groups, features]
+        return np.einsum('gf,gi,gj->fij', W, xh_left, xh_right)
+
+    def _log_likelihood(self, a_var, b_var, idx):
+        X, eta_loc, eta_scale = self._model(a_var, b_var, idx)
+        return np.sum(self._log_probs(X=X, eta_loc=eta_loc, eta_scale=eta_scale), axis=0)
+
+    def _statistics(self, a_var, b_var, idx, fim=False, hessian=False):
+        """
+        Evaluates the log-likelihood, the Jacobian and optionally the blocks of the Fisher information
+        matrix and the Hessian of the features `idx` from a single evaluation of the model.
+
+        :param a_var: array (loc_params x features) with the mean model coefficients of the features `idx`
+        :param b_var: array (scale_params x features) with the dispersion model coefficients of the features `idx`
+        :param idx: indices of the features
+        :param fim: Whether to compute the mean model block of the Fisher information matrix
+            and the dispersion model block of the Hessian which are used by the IRLS update.
+        :param hessian: Whether to compute the full Hessian.
+        :return: dict with "log_likelihood" (features), "jac" (features x params)
+            and "fim_a", "hessian_bb" or "hessian" (features x params x params) if requested.
+        """
+        X, eta_loc, eta_scale = self._model(a_var, b_var, idx)
+        mu = np.exp(eta_loc)
+        r = np.exp(eta_scale)
+
+        stats = {}
+        stats["log_likelihood"] = np.sum(self._log_probs(X=X, eta_loc=eta_loc, eta_scale=eta_scale), axis=0)
+        jac_a = np.matmul(self._group_sum.dot(self._W_jac_a(X=X, mu=mu, r=r)).T, self._xh_loc)
+        jac_b = np.matmul(self._group_sum.dot(self._W_jac_b(X=X, mu=mu, r=r)).T, self._xh_scale)
+        stats["jac"] = np.concatenate([jac_a, jac_b], axis=1)
+
+        if fim or hessian:
+            hess_bb = self._outer(self._W_hess_bb(X=X, mu=mu, r=r), self._xh_scale, self._xh_scale)
+            stats["hessian_bb"] = hess_bb
+        if fim:
+            stats["fim_a"] = self._outer(self._W_fim_aa(mu=mu, r=r), self._xh_loc, self._xh_loc)
+        if hessian:
+            hess_aa = self._outer(self._W_hess_aa(X=X, mu=mu, r=r), self._xh_loc, self._xh_loc)
+            hess_ab = self._outer(self._W_hess_ab(X=X, mu=mu, r=r), self._xh_loc, self._xh_scale)
+            stats["hessian"] = np.concatenate([
+                np.concatenate([hess_aa, hess_ab], axis=2),
+                np.concatenate([np.transpose(hess_ab, axes=[0, 2, 1]), hess_bb], axis=2)
+            ], axis=1)
+        return stats
+
+    @abc.abstractmethod
+    def _log_probs(self, X, eta_loc, eta_scale):
+        """
+        Log-probabilities of the observations, see BasicModelGraph of the tensorflow backend.
+        """
+        pass
+
+    @abc.abstractmethod
+    def _W_jac_a(self, X, mu, r):
+        """
+        Coefficient invariant part of the mean model gradient, see JacobiansGLM._W_a().
+        """
+        pass
+
+    @abc.abstractmethod
+    def _W_jac_b(self, X, mu, r):
+        """
+        Coefficient invariant part of the dispersion model gradient, see JacobiansGLM._W_b().
+        """
+        pass
+
+    @abc.abstractmethod
+    def _W_fim_aa(self, mu, r):
+        """
+        Coefficient invariant part of the mean model FIM block, see FIMGLM._W_aa().
+        """
+        pass
+
+    @abc.abstractmethod
+    def _W_hess_aa(self, X, mu, r):
+        """
+        Coefficient invariant part of the mean model hessian block, see HessiansGLM._W_aa().
+        """
+        pass
+
+    @abc.abstractmethod
+    def _W_hess_bb(self, X, mu, r):
+        """
+        Coefficient invariant part of the dispersion model hessian block, see HessiansGLM._W_bb().
+        """
+        pass
+
+    @abc.abstractmethod
+    def _W_hess_ab(self, X, mu, r):
+        """
+        Coefficient invariant part of the off-diagonal hessian block, see HessiansGLM._W_ab().
+        """
+        pass
+
+    def _scale_terms(self, r):
+        """
+        Terms of _W_hess_bb() which only depend on the dispersion `r` and which are passed to it as keyword
+        arguments. EstimatorStackedGLM evaluates them once per column and design group instead of once per
+        observation.
+
+        :return: dict of arrays of the shape of `r`
+        """
+        return {}
+
+    # ### Training
+
+    def _newton_delta(self, stats, optim_algo, train_mu, train_r):
+        """
+        Solves the feature-wise systems of a Newton-type update.
+
+        "irls" uses the Fisher information matrix for the mean model and the Hessian for the dispersion model,
+        the blocks of both models are solved separately. "nr" solves the full Hessian.
+
+        :return: array (features x params) which is added to the coefficients
+        """
+        num_loc_params = self._a_var.shape[0]
+        jac = stats["jac"]
+        if optim_algo == "nr":
+            if train_mu and train_r:
+                return self._solve(-stats["hessian"], jac)
+            lhs = -stats["hessian_bb"] if train_r else -stats["hessian"][:, :num_loc_params, :num_loc_params]
+        else:
+            if train_mu and train_r:
+                return np.concatenate([
+                    self._solve(stats["fim_a"], jac[:, :num_loc_params]),
+                    self._solve(-stats["hessian_bb"], jac[:, num_loc_params:])
+                ], axis=1)
+            lhs = -stats["hessian_bb"] if train_r else stats["fim_a"]
+
+        delta = np.zeros_like(jac)
+        if train_mu:
+            delta[:, :num_loc_params] = self._solve(lhs, jac[:, :num_loc_params])
+        else:
+            delta[:, num_loc_params:] = self._solve(lhs, jac[:, num_loc_params:])
+        return delta
+
+    @staticmethod
+    def _solve(lhs, rhs):
+        # Features with non-finite statistics are not updated, their loss stops them from converging further.
+        finite = np.logical_and(
+            np.all(np.isfinite(lhs), axis=(1, 2)),
+            np.all(np.isfinite(rhs), axis=1)
+        )
+        delta = np.zeros_like(rhs)
+        if np.any(finite):
+            delta[finite] = stacked_solve_sym(lhs[finite], rhs[finite])
+        return delta
+
+    def _clip_params(self, params):
+        num_loc_params = self._a_var.shape[0]
+        return (
+            self.np_clip_param(params[:num_loc_params], "a_var"),
+            self.np_clip_param(params[num_loc_params:], "b_var")
+        )
+
+    def _line_search(self, params, delta, ll, idx):
+        """
+        Backtracks the step size of each feature along pkg_constants.NEWTON_LINE_SEARCH_STEPS.
+
+        Each feature takes the largest step which increases its log-likelihood and no step if there is none.
+
+        :return: tuple (a_var, b_var) of the coefficients of the features `idx` after the update
+        """
+        num_loc_params = self._a_var.shape[0]
+        params_new = np.copy(params)
+        pending = np.arange(len(idx))
+        for step in pkg_constants.NEWTON_LINE_SEARCH_STEPS:
+            if pending.size == 0:
+                break
+            a_new, b_new = self._clip_params(params[:, pending] + step * delta[:, pending])
+            ll_new = self._log_likelihood(a_new, b_new, idx[pending])
+            accept = ll_new > ll[pending]
+            params_new[:num_loc_params, pending[accept]] = a_new[:, accept]
+            params_new[num_loc_params:, pending[accept]] = b_new[:, accept]
+            pending = pending[np.logical_not(accept)]
+        return self._clip_params(params_new)
+
+    def _train_step(self, optim_algo, learning_rate, train_mu, train_r, line_search):
+        """
+        Performs one update of all features which have not converged yet.
+
+        :return: array (features) with the normalized negative log-likelihood of the updated
+            features before the update
+        """
+        if self.termination_type == "by_feature":
+            idx = np.where(np.logical_not(self.converged))[0]
+        else:
+            idx = np.where(self._feature_isnonzero)[0]
+
+        a_var = self._a_var[:, idx]
+        b_var = self._b_var[:, idx]
+        stats = self._statistics(
+            a_var, b_var, idx,
+            fim=optim_algo == "irls",
+            hessian=optim_algo == "nr"
+        )
+        delta = learning_rate * self._newton_delta(stats, optim_algo, train_mu=train_mu, train_r=train_r)
+
+        params = np.concatenate([a_var, b_var], axis=0)
+        if line_search:
+            a_new, b_new = self._line_search(params, delta.T, stats["log_likelihood"], idx)
+        else:
+            a_new, b_new = self._clip_params(params + delta.T)
+
+        self._a_var[:, idx] = a_new
+        self._b_var[:, idx] = b_new
+        self._global_step += 1
+        self.clear_cache()
+
+        metric = np.zeros(self.converged.shape, dtype=self.dtype)
+        metric[idx] = - stats["log_likelihood"] / self._num_observations(idx)
+        return metric
+
+    def _num_observations(self, idx):
+        """
+        Number of observations which the log-likelihood of the features `idx` is normalized by.
+        """
+        return self.input_data.num_observations
+
+    def train(
+            self,
+            *args,
+            learning_rate=None,
+            convergence_criteria="all_converged_ll",
+            stopping_criteria=None,
+            train_mu: bool = None,
+            train_r: bool = None,
+            use_batching=False,
+            optim_algo="irls",
+            **kwargs
+    ):
+        r"""
+        Starts training of the model
+
+        :param learning_rate: learning rate used for optimization, Newton-type updates should use 1.
+        :param convergence_criteria: criteria after which the training will be interrupted.
+            Currently implemented criterias:
+
+            - "step":
+              stop, when the step counter reaches `stopping_criteria`
+            - "all_converged_ll":
+              stop updating a feature, when the change of its normalized negative log-likelihood
+              between two steps is smaller than `stopping_criteria`
+        :param stopping_criteria: Additional parameter for convergence criteria.
+
+            See parameter `convergence_criteria` for exact meaning
+        :param train_mu: Set to True/False in order to enable/disable training of mu
+        :param train_r: Set to True/False in order to enable/disable training of r
+        :param use_batching: Not supported, all updates are computed on the full data.
+        :param optim_algo: name of the update. Can be:
+
+            - "IRLS": Fisher scoring of the mean model and Newton-Raphson steps of the dispersion model
+            - "Newton" or "NR": Newton-Raphson steps on the full Hessian
+            - "IRLS_LS" or "NR_LS": the above with a feature-wise line search so that
+              each feature only takes steps which increase its log-likelihood.
+        """
+        if self._a_var is None:
+            raise ValueError("Estimator was not initialized, call initialize() first")
+        if train_mu is None:
+            train_mu = self._train_loc
+        if train_r is None:
+            train_r = self._train_scale
+        if not train_mu and not train_r:
+            return
+
+        optim_algo_lower = optim_algo.lower()
+        line_search = optim_algo_lower.endswith("_ls")
+        if line_search:
+            optim_algo_lower = optim_algo_lower[:-len("_ls")]
+        if optim_algo_lower in ["newton", "newton-raphson", "newton_raphson", "nr"]:
+            optim_algo_lower = "nr"
+        elif optim_algo_lower in ["irls", "iwls"]:
+            optim_algo_lower = "irls"
+        else:
+            raise ValueError("optim_algo %s is not supported by the numpy backend" % optim_algo)
+
+        if learning_rate is None:
+            learning_rate = 1
+        if learning_rate != 1:
+            logger.warning(
+                "Newton-rhapson or IRLS in the numpy backend is used with learning rate " +
+                str(learning_rate) +
+                ". Newton-rhapson and IRLS should only be used with learning rate = 1."
+            )
+        if use_batching:
+            logger.debug("use_batching is not supported by the numpy backend, training on the full data")
+        if len(kwargs) > 0:
+            logger.debug("ignoring **kwargs: %s", kwargs)
+
+        def step():
+            t0 = time.time()
+            metric = self._train_step(
+                optim_algo=optim_algo_lower,
+                learning_rate=learning_rate,
+                train_mu=train_mu,
+                train_r=train_r,
+                line_search=line_search
+            )
+            logger.info(
+                "Step: \t%d\t loss: \t%f\t models converged \t%i\t in %s sec",
+                self._global_step,
+                np.sum(metric),
+                np.sum(self.converged).astype("int32"),
+                str(np.round(time.time() - t0, 3))
+            )
+            return metric
+
+        if convergence_criteria == "step":
+            if stopping_criteria is None:
+                stopping_criteria = 5000
+            while self._global_step < stopping_criteria:
+                step()
+        elif convergence_criteria == "all_converged_ll":
+            if stopping_criteria is None:
+                stopping_criteria = 0.05
+            metric_current = None
+            while not np.all(self.converged):
+                metric_prev = metric_current
+                # The loss is evaluated in the same pass over the data as the update:
+                metric_current = step()
+                if metric_prev is not None:
+                    # Converged features are not evaluated anymore, keep their last loss:
+                    if self.termination_type == "by_feature":
+                        metric_current = np.where(self.converged, metric_prev, metric_current)
+                    metric_delta = np.abs(metric_current - metric_prev)
+                    if self.termination_type == "by_feature":
+                        self._update_converged_by_delta(metric_delta, stopping_criteria)
+                    else:
+                        self.update_converged(np.all(metric_delta[self._feature_isnonzero] < stopping_criteria))
+        else:
+            raise ValueError("convergence_criteria %s is not supported by the numpy backend" % convergence_criteria)
+
+    def train_sequence(self, training_strategy):
+        if isinstance(training_strategy, Enum):
+            training_strategy = training_strategy.value
+        elif isinstance(training_strategy, str):
+            training_strategy = self.TrainingStrategies[training_strategy].value
+
+        if training_strategy is None:
+            training_strategy = self.TrainingStrategies.DEFAULT.value
+
+        logger.info("training strategy:\n%s", pprint.pformat(training_strategy))
+
+        for idx, d in enumerate(training_strategy):
+            self.update_converged(False)
+            logger.info("Beginning with training sequence #%d", idx + 1)
+            self.train(**d)
+            logger.info("Training sequence #%d complete", idx + 1)
+
+    # ### Outputs
+
+    def _output_params(self):
+        # All-zero features are set to the lower bounds of the coefficients as in the tensorflow backend:
+        bounds_min, _ = self.param_bounds(self.dtype)
+        a_var = np.where(self._feature_isnonzero, self._a_var, bounds_min["a_var"]).astype(self.dtype)
+        b_var = np.where(self._feature_isnonzero, self._b_var, bounds_min["b_var"]).astype(self.dtype)
+        return a_var, b_var
+
+    def _get_unsafe(self, key: Union[str, Iterable]):
+        """
+        Computes the value(s) specified by key at the current parameters.
+
+        Values are memoised until the parameters change: the log-likelihood, the gradients and
+        the Hessian are computed in a single pass over the data.
+        """
+        keys = [key] if isinstance(key, str) else list(key)
+
+        if any([k in ["loss", "log_likelihood", "gradients", "hessians", "fisher_inv"] for k in keys]) and \
+                "log_likelihood" not in self._cache:
+            a_var, b_var = self._output_params()
+            stats = self._statistics(
+                a_var, b_var, np.arange(a_var.shape[1]),
+                hessian=any([k in ["hessians", "fisher_inv"] for k in keys])
+            )
+            self._cache["log_likelihood"] = stats["log_likelihood"]
+            self._cache["gradients"] = - np.sum(stats["jac"], axis=1)
+            if "hessian" in stats:
+                self._cache["hessians"] = stats["hessian"]
+
+        values = {}
+        for k in keys:
+            if k == "a_var":
+                values[k] = self._output_params()[0]
+            elif k == "b_var":
+                values[k] = self._output_params()[1]
+            elif k == "loss":
+                values[k] = - np.sum(self._cache["log_likelihood"]) / self.input_data.num_observations
+            elif k in ["log_likelihood", "gradients"]:
+                values[k] = np.copy(self._cache[k])
+            elif k == "hessians":
+                values[k] = np.copy(self._get_hessians())
+            elif k == "fisher_inv":
+                values[k] = stacked_inv_sym(-self._get_hessians())
+            else:
+                values[k] = self.__getattribute__(k)
+
+        if isinstance(key, str):
+            return values[key]
+        else:
+            return values
+
+    def _get_hessians(self):
+        if "hessians" not in self._cache:
+            a_var, b_var = self._output_params()
+            self._cache["hessians"] = self._statistics(
+                a_var, b_var, np.arange(a_var.shape[1]), hessian=True
+            )["hessian"]
+        return self._cache["hessians"]
+
+    def get(self, key: Union[str, Iterable]):
+        """
+        Returns the values specified by key.
+
+        :param key: Either a string or an iterable list/set/tuple/etc. of strings
+        :return: Single array if `key` is a string or a dict {k: value} of arrays if `key` is a collection of strings
+        """
+        for k in ([key] if isinstance(key, str) else list(key)):
+            if k not in self.param_shapes():
+                raise ValueError("Unknown parameter %s" % k)
+        return self._get_unsafe(key)
+
+    @property
+    def global_step(self):
+        return self._global_step
+
+    @property
+    def input_data(self) -> InputData:
+        return self._input_data
+
+    @property
+    def a_var(self):
+        return self.to_xarray("a_var", coords=self.input_data.data.coords)
+
+    @property
+    def b_var(self):
+        return self.to_xarray("b_var", coords=self.input_data.data.coords)
+
+    @property
+    def loss(self):
+        return self.to_xarray("loss")
+
+    @property
+    def log_likelihood(self):
+        return self.to_xarray("log_likelihood", coords=self.input_data.data.coords)
+
+    @property
+    def gradients(self):
+        return self.to_xarray("gradients", coords=self.input_data.data.coords)
+
+    @property
+    def hessians(self):
+        return self.to_xarray("hessians", coords=self.input_data.data.coords)
+
+    @property
+    def fisher_inv(self):
+        return self.get_fisher_inv()
+
+    @property
+    def standard_errors(self):
+        return self.get_standard_errors()
+
+    def get_fisher_inv(self, features=None) -> xr.DataArray:
+        """
+        Evaluates the inverse of the Fisher information matrix, i.e. the inverse of the negative Hessian
+        of the full model, at the current parameters.
+
+        The Hessian is only evaluated on the selected features. It is inverted via the Cholesky
+        decomposition if it is positive definite and via the pseudo-inverse otherwise.
+
+        :param features: (optional) feature names, feature indices or boolean mask of the features to evaluate.
+            All features are evaluated if None.
+        :return: xr.DataArray (features x delta_var0 x delta_var1)
+        """
+        return self._run_feature_selection(
+            lambda hessians: stacked_inv_sym(-hessians),
+            dims=("features", "delta_var0", "delta_var1"),
+            features=features
+        )
+
+    def get_standard_errors(self, features=None) -> xr.DataArray:
+        """
+        Evaluates the standard errors of the parameters, i.e. the square root of the diagonal of the
+        inverse Fisher information matrix, see get_fisher_inv().
+
+        :param features: (optional) feature names, feature indices or boolean mask of the features to evaluate.
+            All features are evaluated if None.
+        :return: xr.DataArray (features x delta_var0)
+        """
+        return self._run_feature_selection(
+            lambda hessians: np.sqrt(np.diagonal(stacked_inv_sym(-hessians), axis1=-2, axis2=-1)),
+            dims=("features", "delta_var0"),
+            features=features
+        )
+
+    def _run_feature_selection(self, from_hessians, dims, features=None) -> xr.DataArray:
+        """
+        Evaluates `from_hessians` on the Hessians of the features selected by `features`.
+
+        The Hessian is only computed for the selected features unless it is memoised for all features.
+        """
+        feature_names = self.input_data.features
+        if features is None:
+            idx = np.arange(self.input_data.num_features)
+        else:
+            features = np.atleast_1d(np.asarray(features))
+            if features.dtype == bool:
+                idx = np.where(features)[0]
+            elif np.issubdtype(features.dtype, np.integer):
+                idx = features
+            else:
+                idx = feature_names.to_index().get_indexer(features)
+                if np.any(idx < 0):
+                    raise ValueError("unknown features: %s" % ", ".join([str(x) for x in features[idx < 0]]))
+
+        if "hessians" in self._cache:
+            hessians = self._cache["hessians"][idx]
+        else:
+            a_var, b_var = self._output_params()
+            hessians = self._statistics(a_var[:, idx], b_var[:, idx], idx, hessian=True)["hessian"]
+        output = xr.DataArray(from_hessians(hessians), dims=dims)
+
+        coords = self.input_data.data.coords
+        for i in output.dims:
+            if i == "features":
+                output.coords[i] = feature_names.values[idx]
+            elif i in coords:
+                output.coords[i] = coords[i]
+        return output
+
+    def finalize(self, outputs: list = None, lazy: bool = False):
+        """
+        Evaluates the estimated parameters and releases the data.
+
+        :param outputs: (optional) list of parameters to evaluate, see EstimatorAll.finalize()
+            of the tensorflow backend.
+        :param lazy: Whether to keep the data and evaluate all other parameters on first access
+            of the store. The data is released once all parameters are evaluated or `store.close()` is called.
+        :return: EstimatorStoreXArray
+        """
+        if self.noise_model == "nb":
+            from .external_nb import EstimatorStoreXArray
+        else:
+            raise ValueError("noise model not recognized")
+
+        store = EstimatorStoreXArray(self, outputs=outputs, lazy=lazy)
+        if not lazy:
+            self.close_session()
+        return store
+
+    @abc.abstractmethod
+    def init_par(
+            self,
+            init_a,
+            init_b,
+            init_model
+    ):
+        pass
@@ -0,0 +1,406 @@
+import abc
+import logging
+from typing import List, Union, Iterable
+
+import numpy as np
+
+from .estimator import EstimatorGLM
+from .external import pkg_constants
+
+logger = logging.getLogger(__name__)
+
+
+class EstimatorStackedGLM(EstimatorGLM, metaclass=abc.ABCMeta):
+    """
+    Fits several GLMs over the same features, e.g. on different subsets of observations or with
+    different designs, with one estimator.
+
+    The coefficients of all models are kept in one masked batched layout (params x models * features)
+    in which the designs of all models are padded to the largest number of location and scale parameters.
+    Each column belongs to one pair of model and feature, see `a_var_stacked` for the view
+    (models x params x features).
+
+    The statistics of all columns are evaluated in one vectorised pass: the observations of all models are
+    concatenated and each column only evaluates the observations of its own model. The linear predictors
+    are evaluated per design group of the padded designs and the statistics are summed per column and
+    design group before they are multiplied with the padded designs. The terms which only depend on the
+    dispersion are evaluated per column and design group as well, see EstimatorGLM._scale_terms().
+    The columns are processed in chunks of pkg_constants.STACKED_CHUNK_SIZE pairs of column and observation
+    to keep the intermediate vectors small. The padded parameters are masked:
+    their gradient is zero and their diagonal entry of the Fisher information matrix and of the negative
+    Hessian is one, such that they stay zero and the systems of all columns are solved in one batch.
+    Convergence is tracked per pair of model and feature, i.e. each model stops iterating on a feature
+    once it converged there.
+
+    The estimator of each model provides the data, the design and the initial coefficients of the model.
+    The outputs are returned per model, as lists in the order of the models.
+    """
+
+    estimators: List[EstimatorGLM]
+    num_models: int
+
+    def __init__(
+            self,
+            estimators: List[EstimatorGLM]
+    ):
+        """
+        :param estimators: list of estimators with identical features, one per model.
+            They provide the data, the design and the initial coefficients of each model.
+            The data of all models is copied into the stacked layout.
+        """
+        if len(estimators) == 0:
+            raise ValueError("no estimators given")
+        features = estimators[0].input_data.features.values
+        for estim in estimators[1:]:
+            if not np.array_equal(estim.input_data.features.values, features):
+                raise ValueError("all models have to be fit on the same features")
+
+        self.estimators = list(estimators)
+        self.num_models = len(estimators)
+        self.noise_model = estimators[0].noise_model
+        self.termination_type = estimators[0].termination_type
+        self.dtype = estimators[0].dtype
+
+        self._num_features = features.shape[0]
+        self._num_loc_params = np.array([estim._init_a.shape[0] for estim in estimators])
+        self._num_scale_params = np.array([estim._init_b.shape[0] for estim in estimators])
+        num_loc_params = np.max(self._num_loc_params)
+        num_scale_params = np.max(self._num_scale_params)
+
+        def pad(x, num_params):
+            return np.concatenate([x, np.zeros([num_params - x.shape[0], x.shape[1]], dtype=x.dtype)], axis=0)
+
+        self._init_a = np.concatenate([pad(estim._init_a, num_loc_params) for estim in estimators], axis=1)
+        self._init_b = np.concatenate([pad(estim._init_b, num_scale_params) for estim in estimators], axis=1)
+        self._train_loc = any([estim._train_loc for estim in estimators])
+        self._train_scale = any([estim._train_scale for estim in estimators])
+        self._feature_isnonzero = np.concatenate([estim._feature_isnonzero for estim in estimators])
+
+        # Observations of all models, features first so that each column reads a contiguous block:
+        self._num_observations_by_model = np.array([estim.input_data.num_observations for estim in estimators])
+        self._observation_offset = np.concatenate([[0], np.cumsum(self._num_observations_by_model)[:-1]])
+        self._X = np.ascontiguousarray(np.concatenate([estim._X for estim in estimators], axis=0).T)
+        if any([estim._size_factors is not None for estim in estimators]):
+            self._size_factors = np.concatenate([
+                estim._size_factors if estim._size_factors is not None
+                else np.zeros([estim.input_data.num_observations], dtype=self.dtype)
+                for estim in estimators
+            ])
+        else:
+            self._size_factors = None
+        # Design group of each observation within its model and the padded designs (models x groups x params):
+        self._design_idx = np.concatenate([estim._design_idx for estim in estimators])
+        self._num_groups = max([estim._xh_loc.shape[0] for estim in estimators])
+
+        def pad_design(xh, num_params):
+            padded = np.zeros([self._num_groups, num_params], dtype=self.dtype)
+            padded[:xh.shape[0], :xh.shape[1]] = xh
+            return padded
+
+        self._xh_loc = np.stack([pad_design(estim._xh_loc, num_loc_params) for estim in estimators])
+        self._xh_scale = np.stack([pad_design(estim._xh_scale, num_scale_params) for estim in estimators])
+        self._padded_loc = np.arange(num_loc_params) >= np.expand_dims(self._num_loc_params, axis=-1)
+        self._padded_scale = np.arange(num_scale_params) >= np.expand_dims(self._num_scale_params, axis=-1)
+        logger.info(
+            "stacked %i models with up to %i location and %i scale parameters",
+            self.num_models,
+            num_loc_params,
+            num_scale_params
+        )
+
+        self._a_var = None
+        self._b_var = None
+        self._global_step = 0
+        self.converged = np.zeros([self.num_models * self._num_features], dtype=bool)
+        self.clear_cache()
+
+    def close_session(self):
+        """
+        Releases the data of all models, the estimator cannot be trained or evaluated afterwards.
+        """
+        closed = [estim.close_session() for estim in self.estimators]
+        return EstimatorGLM.close_session(self) or any(closed)
+
+    # ### Model and statistics
+
+    def _chunks(self, idx):
+        """
+        Splits the columns `idx` into consecutive chunks of about pkg_constants.STACKED_CHUNK_SIZE pairs of
+        column and observation, such that the intermediate vectors of each chunk stay small.
+
+        :return: list of index vectors into `idx`
+        """
+        num_entries = np.cumsum(self._num_observations(idx))
+        total = num_entries[-1] if len(idx) > 0 else 0
+        bounds = np.searchsorted(num_entries, np.arange(0, total, pkg_constants.STACKED_CHUNK_SIZE)[1:])
+        return np.split(np.arange(len(idx)), np.unique(bounds))
+
+    def _model(self, a_var, b_var, idx):
+        """
+        Evaluates the linear predictors of the columns `idx` on the observations of their models.
+
+        :return: tuple (X, eta_loc, eta_scale, column, group) where X, eta_loc, column and group are vectors
+            with one entry per pair of column and observation of its model, `column` is the position in `idx`
+            and `group` the design group of the observation in its model. eta_scale (columns x groups) is
+            evaluated per design group as it does not depend on the size factors.
+        """
+        model_idx = idx // self._num_features
+        feature_idx = idx % self._num_features
+
+        num_observations = self._num_observations_by_model[model_idx]
+        column = np.repeat(np.arange(len(idx)), num_observations)
+        start = np.repeat(np.cumsum(num_observations) - num_observations, num_observations)
+        observation = np.repeat(self._observation_offset[model_idx], num_observations) + \
+            np.arange(column.shape[0]) - start
+        group = self._design_idx[observation]
+
+        # Linear predictors per column and design group of the padded designs:
+        eta_loc = np.einsum('cgp,pc->cg', self._xh_loc[model_idx], a_var)[column, group]
+        eta_scale = np.einsum('cgp,pc->cg', self._xh_scale[model_idx], b_var)
+        if self._size_factors is not None:
+            eta_loc = eta_loc + self._size_factors[observation]
+        eta_loc = self.np_clip_param(eta_loc, "eta_loc")
+        eta_scale = self.np_clip_param(eta_scale, "eta_scale")
+        return self._X[feature_idx[column], observation], eta_loc, eta_scale, column, group
+
+    def _log_likelihood(self, a_var, b_var, idx):
+        return np.concatenate([
+            self._log_likelihood_chunk(a_var[:, chunk], b_var[:, chunk], idx[chunk])
+            for chunk in self._chunks(idx)
+        ])
+
+    def _log_likelihood_chunk(self, a_var, b_var, idx):
+        X, eta_loc, eta_scale, column, group = self._model(a_var, b_var, idx)
+        log_probs = self._log_probs(X=X, eta_loc=eta_loc, eta_scale=eta_scale[column, group])
+        return np.bincount(column, weights=log_probs, minlength=len(idx)).astype(self.dtype)
+
+    def _statistics(self, a_var, b_var, idx, fim=False, hessian=False):
+        """
+        Evaluates the statistics of the columns `idx` on the observations of their models.
+
+        See EstimatorGLM._statistics(). The columns are evaluated in chunks, see `_chunks()`.
+        The padded parameters have a zero gradient and an identity diagonal entry in the Fisher information
+        matrix and a negative identity diagonal entry in the Hessian, such that their updates are zero.
+        """
+        stats = [
+            self._statistics_chunk(a_var[:, chunk], b_var[:, chunk], idx[chunk], fim=fim, hessian=hessian)
+            for chunk in self._chunks(idx)
+        ]
+        return {k: np.concatenate([x[k] for x in stats], axis=0) for k in stats[0].keys()}
+
+    def _statistics_chunk(self, a_var, b_var, idx, fim=False, hessian=False):
+        X, eta_loc, eta_scale, column, group = self._model(a_var, b_var, idx)
+        mu = np.exp(eta_loc)
+        # Terms which only depend on the dispersion are evaluated per column and design group:
+        r_groups = np.exp(eta_scale)
+        scale_terms = {k: v[column, group] for k, v in self._scale_terms(r_groups).items()}
+        eta_scale = eta_scale[column, group]
+        r = r_groups[column, group]
+
+        model_idx = idx // self._num_features
+        num_columns = len(idx)
+        xh_loc = self._xh_loc[model_idx]
+        xh_scale = self._xh_scale[model_idx]
+        # Sums over the observations per column and design group:
+        key = column * self._num_groups + group
+
+        def group_sum(W):
+            return np.bincount(key, weights=W, minlength=num_columns * self._num_groups).reshape(
+                [num_columns, self._num_groups]
+            ).astype(self.dtype)
+
+        def outer(W, xh_left, xh_right):
+            return np.einsum('cg,cgi,cgj->cij', group_sum(W), xh_left, xh_right)
+
+        def add_diagonal(x, padded, value):
+            d = np.arange(padded.shape[1])
+            x[:, d, d] += value * padded
+            return x
+
+        stats = {}
+        log_probs = self._log_probs(X=X, eta_loc=eta_loc, eta_scale=eta_scale)
+        stats["log_likelihood"] = np.bincount(column, weights=log_probs, minlength=num_columns).astype(self.dtype)
+        jac_a = np.einsum('cg,cgp->cp', group_sum(self._W_jac_a(X=X, mu=mu, r=r)), xh_loc)
+        jac_b = np.einsum('cg,cgp->cp', group_sum(self._W_jac_b(X=X, mu=mu, r=r)), xh_scale)
+        stats["jac"] = np.concatenate([jac_a, jac_b], axis=1)
+
+        padded_loc = self._padded_loc[model_idx]
+        padded_scale = self._padded_scale[model_idx]
+        if fim or hessian:
+            hess_bb = outer(self._W_hess_bb(X=X, mu=mu, r=r, **scale_terms), xh_scale, xh_scale)
+        if fim:
+            stats["fim_a"] = add_diagonal(outer(self._W_fim_aa(mu=mu, r=r), xh_loc, xh_loc), padded_loc, 1)
+        if hessian:
+            hess_aa = outer(self._W_hess_aa(X=X, mu=mu, r=r), xh_loc, xh_loc)
+            hess_ab = outer(self._W_hess_ab(X=X, mu=mu, r=r), xh_loc, xh_scale)
+            stats["hessian"] = add_diagonal(
+                np.concatenate([
+                    np.concatenate([hess_aa, hess_ab], axis=2),
+                    np.concatenate([np.transpose(hess_ab, axes=[0, 2, 1]), hess_bb], axis=2)
+                ], axis=1),
+                np.concatenate([padded_loc, padded_scale], axis=1),
+                -1
+            )
+        if fim or hessian:
+            stats["hessian_bb"] = add_diagonal(hess_bb, padded_scale, -1)
+        return stats
+
+    def _num_observations(self, idx):
+        return self._num_observations_by_model[idx // self._num_features]
+
+    # ### Outputs
+
+    @property
+    def input_data(self) -> list:
+        """
+        Input data of each model.
+        """
+        return [estim.input_data for estim in self.estimators]
+
+    @property
+    def a_var_stacked(self) -> np.ndarray:
+        """
+        Location coefficients of all models (models x loc_params x features), padded with zeros.
+        """
+        a_var = self._a_var.reshape([self._a_var.shape[0], self.num_models, self._num_features])
+        return np.transpose(a_var, [1, 0, 2])
+
+    @property
+    def b_var_stacked(self) -> np.ndarray:
+        """
+        Scale coefficients of all models (models x scale_params x features), padded with zeros.
+        """
+        b_var = self._b_var.reshape([self._b_var.shape[0], self.num_models, self._num_features])
+        return np.transpose(b_var, [1, 0, 2])
+
+    @property
+    def converged_by_model(self) -> np.ndarray:
+        """
+        Convergence status of each pair of model and feature (models x features).
+        """
+        return self.converged.reshape([self.num_models, self._num_features])
+
+    def _split_estimators(self, keys: list):
+        """
+        Hands the coefficients of the stacked fit to the estimator of each model.
+
+        The log-likelihood, the gradients and the Hessians which `keys` depend on are evaluated once for all
+        models at the stacked coefficients and memoised by the estimator of each model until the next update.
+
+        :param keys: parameters which are evaluated next, see EstimatorGLM.get().
+        """
+        compute_hessian = any([k in ["hessians", "fisher_inv"] for k in keys])
+        compute_stats = compute_hessian or any([k in ["loss", "log_likelihood", "gradients"] for k in keys])
+        if not compute_stats and self._cache.get("split_step", None) == self._global_step:
+            return
+        if compute_stats and "log_likelihood" in self._cache and (not compute_hessian or "hessians" in self._cache):
+            return
+
+        if compute_stats:
+            a_var, b_var = self._output_params()
+            stats = self._statistics(a_var, b_var, np.arange(a_var.shape[1]), hessian=compute_hessian)
+            self._cache["log_likelihood"] = stats["log_likelihood"]
+            self._cache["gradients"] = - np.sum(stats["jac"], axis=1)
+            if compute_hessian:
+                self._cache["hessians"] = stats["hessian"]
+
+        num_loc_params = self._a_var.shape[0]
+        for k, estim in enumerate(self.estimators):
+            cols = np.arange(k * self._num_features, (k + 1) * self._num_features)
+            loc_idx = np.arange(self._num_loc_params[k])
+            scale_idx = np.arange(self._num_scale_params[k])
+            params_idx = np.concatenate([loc_idx, num_loc_params + scale_idx])
+            estim._a_var = self._a_var[np.ix_(loc_idx, cols)]
+            estim._b_var = self._b_var[np.ix_(scale_idx, cols)]
+            estim._global_step = self._global_step
+            estim.converged = self.converged[cols]
+            estim.clear_cache()
+            if "log_likelihood" in self._cache:
+                estim._cache["log_likelihood"] = self._cache["log_likelihood"][cols]
+                # The gradients of the padded parameters are zero:
+                estim._cache["gradients"] = self._cache["gradients"][cols]
+            if "hessians" in self._cache:
+                estim._cache["hessians"] = self._cache["hessians"][np.ix_(cols, params_idx, params_idx)]
+        self._cache["split_step"] = self._global_step
+
+    def get(self, key: Union[str, Iterable]) -> list:
+        """
+        Returns the values specified by key for each model.
+
+        :param key: Either a string or an iterable list/set/tuple/etc. of strings
+        :return: list with one value per model, see EstimatorGLM.get()
+        """
+        keys = [key] if isinstance(key, str) else list(key)
+        self._split_estimators(keys)
+        return [estim.get(key) for estim in self.estimators]
+
+    def _by_model(self, name: str) -> list:
+        self._split_estimators([name])
+        return [getattr(estim, name) for estim in self.estimators]
+
+    @property
+    def a_var(self) -> list:
+        return self._by_model("a_var")
+
+    @property
+    def b_var(self) -> list:
+        return self._by_model("b_var")
+
+    @property
+    def loss(self) -> list:
+        return self._by_model("loss")
+
+    @property
+    def log_likelihood(self) -> list:
+        return self._by_model("log_likelihood")
+
+    @property
+    def gradients(self) -> list:
+        return self._by_model("gradients")
+
+    @property
+    def hessians(self) -> list:
+        return self._by_model("hessians")
+
+    def get_fisher_inv(self, features=None) -> list:
+        """
+        Evaluates the inverse of the Fisher information matrix of each model, see EstimatorGLM.get_fisher_inv().
+
+        :return: list with one xr.DataArray (features x delta_var0 x delta_var1) per model
+        """
+        self._split_estimators(["hessians"] if features is None else [])
+        return [estim.get_fisher_inv(features=features) for estim in self.estimators]
+
+    def get_standard_errors(self, features=None) -> list:
+        """
+        Evaluates the standard errors of the parameters of each model, see EstimatorGLM.get_standard_errors().
+
+        :return: list with one xr.DataArray (features x delta_var0) per model
+        """
+        self._split_estimators(["hessians"] if features is None else [])
+        return [estim.get_standard_errors(features=features) for estim in self.estimators]
+
+    def finalize(self, outputs: list = None, lazy: bool = False) -> list:
+        """
+        Splits the stacked fit into one store per model.
+
+        The log-likelihood, the gradients and the Hessians which are requested in `outputs` are evaluated
+        once for all models at the stacked coefficients and handed to the estimator of each model,
+        which builds its store from them.
+
+        :param outputs: (optional) list of parameters to evaluate, see EstimatorGLM.finalize().
+        :param lazy: Whether to evaluate the remaining parameters of each store on first access,
+            see EstimatorGLM.finalize(). These are evaluated by the estimator of each model.
+        :return: list of EstimatorStoreXArray in the order of the models.
+        """
+        if outputs is None:
+            requested = [] if lazy else ["loss", "log_likelihood", "gradients", "hessians"]
+        else:
+            requested = outputs
+        self._split_estimators(requested)
+
+        stores = [estim.finalize(outputs=outputs, lazy=lazy) for estim in self.estimators]
+        self.clear_cache()
+        if not lazy:
+            EstimatorGLM.close_session(self)
+        return stores
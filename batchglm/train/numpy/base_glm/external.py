@@ -0,0 +1,6 @@
+import batchglm.data as data_utils
+
+from batchglm.models.base_glm import InputData, _Model_GLM
+
+from batchglm.utils.linalg import stacked_inv_sym, stacked_solve_sym
+from batchglm import pkg_constants
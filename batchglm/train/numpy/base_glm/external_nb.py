@@ -0,0 +1 @@
+from batchglm.models.glm_nb import EstimatorStoreXArray
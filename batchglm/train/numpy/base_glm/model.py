@@ -0,0 +1,26 @@
+import abc
+
+import numpy as np
+
+
+class ProcessModelGLM:
+    """
+    Parameter bounds of a GLM which are enforced on the coefficients and linear predictors
+    by the numpy backend, see ProcessModelBase of the tensorflow backend.
+    """
+
+    @abc.abstractmethod
+    def param_bounds(self, dtype):
+        pass
+
+    def np_clip_param(
+            self,
+            param,
+            name
+    ):
+        bounds_min, bounds_max = self.param_bounds(param.dtype)
+        return np.clip(
+            param,
+            bounds_min[name],
+            bounds_max[name]
+        )
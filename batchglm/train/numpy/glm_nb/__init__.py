@@ -0,0 +1,2 @@
+from .estimator import Estimator, EstimatorStacked
+from .model import ProcessModel
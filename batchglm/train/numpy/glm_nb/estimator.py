@@ -0,0 +1,132 @@
+import logging
+from typing import Union
+
+import numpy as np
+import scipy.special
+
+from .external import AbstractEstimator, EstimatorGLM, EstimatorStackedGLM, InputData, Model
+from .external import init_par_nb_glm, TrainingStrategies
+from .model import ProcessModel
+
+logger = logging.getLogger(__name__)
+
+
+class Estimator(EstimatorGLM, AbstractEstimator, ProcessModel):
+    """
+    Estimator for Generalized Linear Models (GLMs) with negative binomial noise which is evaluated with numpy.
+    Uses the natural logarithm as linker function.
+
+    This is a drop-in replacement of the tensorflow Estimator for problems which only require
+    Newton-type training on the full data, see EstimatorGLM.
+    """
+
+    def __init__(
+            self,
+            input_data: InputData,
+            init_model: Model = None,
+            init_a: Union[np.ndarray, str] = "AUTO",
+            init_b: Union[np.ndarray, str] = "AUTO",
+            quick_scale: bool = False,
+            termination_type: str = "by_feature",
+            dtype="float64",
+    ):
+        self.TrainingStrategies = TrainingStrategies
+        EstimatorGLM.__init__(
+            self=self,
+            input_data=input_data,
+            init_model=init_model,
+            init_a=init_a,
+            init_b=init_b,
+            quick_scale=quick_scale,
+            termination_type=termination_type,
+            noise_model="nb",
+            dtype=dtype
+        )
+
+    @classmethod
+    def param_shapes(cls) -> dict:
+        return AbstractEstimator.param_shapes()
+
+    def _log_probs(self, X, eta_loc, eta_scale):
+        r = np.exp(eta_scale)
+        log_r_plus_mu = np.log(r + np.exp(eta_loc))
+        log_probs = scipy.special.gammaln(r + X) - \
+            scipy.special.gammaln(X + 1) - scipy.special.gammaln(r) + \
+            X * (eta_loc - log_r_plus_mu) + \
+            r * (eta_scale - log_r_plus_mu)
+        return self.np_clip_param(log_probs, "log_probs")
+
+    def _W_jac_a(self, X, mu, r):
+        return X - (X + r) * mu / (mu + r)
+
+    def _W_jac_b(self, X, mu, r):
+        r_plus_mu = r + mu
+        r_plus_x = r + X
+        const1 = scipy.special.digamma(r_plus_x) - scipy.special.digamma(r)
+        const2 = - r_plus_x / r_plus_mu
+        const3 = np.log(r) + 1 - np.log(r_plus_mu)
+        return r * (const1 + const2 + const3)
+
+    def _W_fim_aa(self, mu, r):
+        return mu * r / (r + mu)
+
+    def _W_hess_aa(self, X, mu, r):
+        return - mu * (X / r + 1) / np.square(mu / r + 1)
+
+    def _W_hess_ab(self, X, mu, r):
+        return mu * r * (X - mu) / np.square(mu + r)
+
+    def _scale_terms(self, r):
+        return {"trigamma_r": scipy.special.polygamma(1, r)}
+
+    def _W_hess_bb(self, X, mu, r, trigamma_r=None):
+        if trigamma_r is None:
+            trigamma_r = scipy.special.polygamma(1, r)
+        r_plus_mu = r + mu
+        r_plus_x = r + X
+        const1 = scipy.special.digamma(r_plus_x) + r * scipy.special.polygamma(1, r_plus_x)
+        const2 = - (scipy.special.digamma(r) + r * trigamma_r)
+        const3 = - (mu * r_plus_x + 2 * r * r_plus_mu) / np.square(r_plus_mu)
+        const4 = np.log(r) + 2 - np.log(r_plus_mu)
+        return r * (const1 + const2 + const3 + const4)
+
+    def init_par(
+            self,
+            init_a,
+            init_b,
+            init_model
+    ):
+        """
+        See init_par_nb_glm().
+        """
+        init_a, init_b, self._train_loc = init_par_nb_glm(
+            input_data=self.input_data,
+            init_a=init_a,
+            init_b=init_b,
+            init_model=init_model,
+            clip_param=self.np_clip_param,
+            train_loc=self._train_loc
+        )
+        return init_a, init_b
+
+
+class EstimatorStacked(EstimatorStackedGLM, Estimator):
+    """
+    Fits several GLMs with negative binomial noise over the same features with one estimator,
+    see EstimatorStackedGLM.
+    """
+
+    def __init__(
+            self,
+            input_data: list,
+            **estimator_kwargs
+    ):
+        """
+        :param input_data: list of InputData with identical features, one per model.
+        :param estimator_kwargs: further arguments of the estimator of each model, see Estimator.
+        """
+        self.TrainingStrategies = TrainingStrategies
+        EstimatorStackedGLM.__init__(
+            self=self,
+            estimators=[Estimator(input_data=x, **estimator_kwargs) for x in input_data]
+        )
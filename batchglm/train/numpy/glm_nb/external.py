@@ -0,0 +1,5 @@
+from batchglm.models.glm_nb import AbstractEstimator, EstimatorStoreXArray, InputData, Model
+from batchglm.models.glm_nb.utils import init_par_nb_glm, param_bounds_nb_glm
+from batchglm.models.glm_nb.training_strategies import TrainingStrategies
+
+from batchglm.train.numpy.base_glm import EstimatorGLM, EstimatorStackedGLM, ProcessModelGLM
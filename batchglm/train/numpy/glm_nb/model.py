@@ -0,0 +1,11 @@
+from .external import ProcessModelGLM
+from .external import param_bounds_nb_glm
+
+
+class ProcessModel(ProcessModelGLM):
+
+    def param_bounds(
+            self,
+            dtype
+    ):
+        return param_bounds_nb_glm(dtype)
@@ -0,0 +1,254 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import List, Union
+
+import numpy as np
+import scipy.sparse
+import xarray as xr
+
+import batchglm.data as data_utils
+from batchglm.train.worker import init_worker
+
+logger = logging.getLogger(__name__)
+
+# Number of observations which are copied at once when X is written to the shared file:
+_WRITE_BLOCK_SIZE = 10000
+
+
+def feature_costs(input_data) -> np.ndarray:
+    """
+    Estimates the relative cost of fitting each feature.
+
+    The cost of a feature is the number of observations, i.e. the evaluation of the model, plus the number
+    of nonzero counts, i.e. the count-dependent terms of the likelihood and its derivatives.
+    Features which are all zero are not trained and have a negligible cost.
+
+    :param input_data: InputData
+    :return: np.ndarray (features)
+    """
+    if input_data.is_sparse:
+        nnz = input_data.X.X.getnnz(axis=0)
+    else:
+        nnz = (input_data.X != 0).sum(dim="observations").values
+    costs = np.asarray(input_data.num_observations + nnz, dtype=np.float64)
+    costs[input_data.feature_isallzero.values] = 1.
+    return costs
+
+
+def partition_features(costs: np.ndarray, num_shards: int) -> List[np.ndarray]:
+    """
+    Partitions features into shards of similar total cost.
+
+    Features are assigned in the order of decreasing cost to the shard with the lowest total cost
+    (longest processing time first).
+
+    :param costs: cost of each feature, see feature_costs().
+    :param num_shards: number of shards.
+    :return: list of sorted feature indices per shard; empty shards are dropped.
+    """
+    costs = np.asarray(costs)
+    num_shards = max(min(int(num_shards), costs.shape[0]), 1)
+    shard_costs = np.zeros([num_shards])
+    assignment = np.zeros([costs.shape[0]], dtype=np.int64)
+    for i in np.argsort(-costs, kind="stable"):
+        shard = np.argmin(shard_costs)
+        assignment[i] = shard
+        shard_costs[shard] += costs[i]
+    logger.debug("shard costs: %s", shard_costs)
+
+    shards = [np.where(assignment == shard)[0] for shard in range(num_shards)]
+    return [idx for idx in shards if idx.shape[0] > 0]
+
+
+def _write_shared_X(input_data, path) -> dict:
+    """
+    Writes X once to `path` so that all workers can map it read-only instead of receiving a copy.
+
+    Dense data is stored column-major so that the columns of a feature are contiguous.
+    Sparse data is stored as the buffers of a CSC matrix.
+
+    :return: dict describing the files, which is passed to `_load_shared_X()`.
+    """
+    X = input_data.X
+    if input_data.is_sparse:
+        X = X.X.tocsc()
+        files = {}
+        for key in ["data", "indices", "indptr"]:
+            files[key] = os.path.join(path, "X_csc_%s.npy" % key)
+            np.save(files[key], getattr(X, key))
+        return {"sparse": True, "shape": X.shape, "files": files}
+
+    file = os.path.join(path, "X.npy")
+    X_shared = np.lib.format.open_memmap(file, mode="w+", dtype=X.dtype, shape=X.shape, fortran_order=True)
+    for i in range(0, X.shape[0], _WRITE_BLOCK_SIZE):
+        X_shared[i:i + _WRITE_BLOCK_SIZE] = X[i:i + _WRITE_BLOCK_SIZE].values
+    X_shared.flush()
+    del X_shared
+    return {"sparse": False, "shape": X.shape, "file": file}
+
+
+def _load_shared_X(shared_X: dict, idx: np.ndarray):
+    """
+    Maps the data written by `_write_shared_X()` and copies the columns of the features in `idx`.
+    """
+    if shared_X["sparse"]:
+        buffers = {key: np.load(file, mmap_mode="r") for key, file in shared_X["files"].items()}
+        X = scipy.sparse.csc_matrix(
+            (buffers["data"], buffers["indices"], buffers["indptr"]),
+            shape=shared_X["shape"],
+            copy=False
+        )
+        return X[:, idx]
+
+    X = np.load(shared_X["file"], mmap_mode="r")
+    return np.asarray(X[:, idx])
+
+
+def _fit_shard(args):
+    """
+    Fits one shard of features; runs in a worker process.
+
+    Only picklable arguments are passed in and only the estimated parameters are passed back,
+    such that no tensorflow state is shared between processes.
+    """
+    (input_data_cls, data, shared_X, idx, noise_model, backend, training_strategy,
+     estimator_kwargs, outputs) = args
+
+    data = data.isel(features=idx)
+    X = _load_shared_X(shared_X, idx)
+    if scipy.sparse.issparse(X):
+        X = data_utils.SparseXArrayDataArray(
+            X,
+            dims=("observations", "features"),
+            coords={"observations": data.coords["observations"], "features": data.coords["features"]}
+        )
+        input_data = input_data_cls(data, sparse_X=X)
+    else:
+        data["X"] = xr.DataArray(X, dims=("observations", "features"))
+        input_data = input_data_cls(data)
+
+    if backend == "tf":
+        if noise_model == "nb":
+            from batchglm.train.tf.glm_nb import Estimator
+        else:
+            raise ValueError("noise model %s not recognized" % noise_model)
+        estimator_kwargs = dict(estimator_kwargs)
+        estimator_kwargs.setdefault("training_strategy", training_strategy)
+    elif backend == "numpy":
+        if noise_model == "nb":
+            from batchglm.train.numpy.glm_nb import Estimator
+        else:
+            raise ValueError("noise model %s not recognized" % noise_model)
+    else:
+        raise ValueError("backend %s not recognized" % backend)
+
+    estimator = Estimator(input_data=input_data, **estimator_kwargs)
+    estimator.initialize()
+    estimator.train_sequence(training_strategy=training_strategy)
+    store = estimator.finalize(outputs=outputs)
+    return store.params.load()
+
+
+def _merge_params(params: List[xr.Dataset], shards: List[np.ndarray]) -> xr.Dataset:
+    """
+    Concatenates the parameters of all shards along the features and restores the original feature order.
+
+    Variables without a feature dimension, such as the loss, are summed over the shards.
+    """
+    order = np.argsort(np.concatenate(shards))
+    merged = {}
+    for key in params[0].data_vars:
+        if "features" in params[0][key].dims:
+            merged[key] = xr.concat([p[key] for p in params], dim="features").isel(features=order)
+        else:
+            merged[key] = sum([p[key] for p in params])
+    return xr.Dataset(merged)
+
+
+def fit_sharded(
+        input_data,
+        num_shards: int = None,
+        num_workers: int = None,
+        training_strategy: Union[list, str, Enum] = "DEFAULT",
+        estimator_kwargs: dict = None,
+        outputs: list = None,
+        costs: np.ndarray = None,
+        noise_model: str = "nb",
+        backend: str = "tf",
+        threads_per_worker: int = None,
+        tmp_dir: str = None,
+):
+    """
+    Fits the features of `input_data` in several worker processes.
+
+    The features of a GLM are fit independently of each other. The features are partitioned into
+    shards of similar cost, see partition_features(), and each shard is fit by its own estimator in
+    a separate process which is started via "spawn" and therefore shares no tensorflow state with the
+    calling process. X is written to a temporary file once and mapped read-only by all workers.
+
+    :param input_data: InputData to fit.
+    :param num_shards: number of shards. Defaults to `num_workers`.
+    :param num_workers: number of worker processes. Defaults to the number of CPUs.
+    :param training_strategy: training strategy which is passed to `train_sequence()` of each estimator.
+    :param estimator_kwargs: (optional) further arguments of the estimator, e.g. `batch_size` or `quick_scale`.
+    :param outputs: (optional) list of parameters to evaluate, see EstimatorStoreXArray.
+    :param costs: (optional) cost of each feature which is balanced across shards. Defaults to feature_costs().
+    :param noise_model: noise model of the estimator.
+    :param backend: "tf" or "numpy"; the estimator implementation which is used in each worker.
+    :param threads_per_worker: (optional) number of tensorflow and BLAS threads of each worker, see
+        batchglm.train.worker.init_worker(). Defaults to splitting the available CPUs evenly between the workers.
+    :param tmp_dir: (optional) directory for the shared copy of X. Defaults to the system's temporary directory.
+    :return: EstimatorStoreXArray covering all features in their original order.
+    """
+    if noise_model == "nb":
+        from batchglm.models.glm_nb import EstimatorStoreXArray
+    else:
+        raise ValueError("noise model %s not recognized" % noise_model)
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    if num_shards is None:
+        num_shards = num_workers
+    if threads_per_worker is None:
+        threads_per_worker = max(multiprocessing.cpu_count() // num_workers, 1)
+    if estimator_kwargs is None:
+        estimator_kwargs = {}
+    if costs is None:
+        costs = feature_costs(input_data)
+
+    shards = partition_features(costs, num_shards)
+    logger.info("fitting %i features in %i shards with %i workers", input_data.num_features, len(shards), num_workers)
+
+    # X is shared through the file; the remaining data (design, constraints, size factors) is small.
+    data = input_data.data.drop("X") if "X" in input_data.data else input_data.data.copy()
+    # Design matrices may be backed by patsy.DesignMatrix, which cannot be pickled.
+    for key in data.data_vars:
+        if isinstance(data[key].data, np.ndarray):
+            data[key] = data[key].copy(data=np.asarray(data[key].data))
+
+    path = tempfile.mkdtemp(prefix="batchglm_shards_", dir=tmp_dir)
+    try:
+        shared_X = _write_shared_X(input_data, path)
+        args = [
+            (type(input_data), data, shared_X, idx, noise_model, backend, training_strategy,
+             estimator_kwargs, outputs)
+            for idx in shards
+        ]
+        # The thread limits are set in each worker before the estimator is imported there,
+        # the environment of the calling process is not modified.
+        with ProcessPoolExecutor(
+                max_workers=min(num_workers, len(shards)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(threads_per_worker,)
+        ) as executor:
+            params = list(executor.map(_fit_shard, args))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    return EstimatorStoreXArray.from_params(input_data, _merge_params(params, shards))
@@ -3,13 +3,15 @@ from typing import Dict, Any, Union, List, Iterable
 import os
 import time
 import datetime
+import json
 
 import numpy as np
 import xarray as xr
 import tensorflow as tf
 
-from .external import _Estimator_Base, pkg_constants, stat_utils
-from batchglm.train.tf.train import StopAtLossHook, TimedRunHook
+from .external import _Estimator_Base, pkg_constants, stat_utils, io_utils
+from batchglm.train.tf.train import StopAtLossHook, TimedRunHook, TrainingStateSaverListener, \
+    DeferredCheckpointSaverHook
 
 
 class TFEstimatorGraph(metaclass=abc.ABCMeta):
@@ -18,11 +20,13 @@ class TFEstimatorGraph(metaclass=abc.ABCMeta):
     init_op: tf.Tensor
     train_op: tf.Tensor
     global_step: tf.Tensor
+    data_init_ops: List[tf.Operation]
 
     def __init__(self, graph=None):
         if graph is None:
             graph = tf.Graph()
         self.graph = graph
+        self.data_init_ops = []
 
 
 class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
@@ -33,15 +37,30 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
 
     _param_decorators: Dict[str, callable]
 
+    # Values fetched by `_get_unsafe()` and the global step at which they were evaluated:
+    _cache: Dict[str, Any]
+    _cache_step: Union[int, None]
+
+    # Index of the stage of `train_sequence()` in progress, -1 if no training sequence is in progress:
+    train_stage: int
+    # One entry {"global_step", "train_stage", "loss", "num_converged"} per step of feature-wise training:
+    convergence_history: List[dict]
+
     def __init__(self, tf_estimator_graph):
         self.model = tf_estimator_graph
         self.session = None
 
         self._param_decorators = dict()
+        self.clear_cache()
+        self.train_stage = -1
+        self.convergence_history = []
 
     def initialize(self):
         self.close_session()
+        self.clear_cache()
         self.feed_dict = {}
+        self.train_stage = -1
+        self.convergence_history = []
 
         self.session = tf.Session(config=pkg_constants.TF_CONFIG_PROTO)
 
@@ -54,15 +73,69 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
         except (tf.errors.OpError, RuntimeError):
             return False
 
-    def run(self, tensor):
-        return self.session.run(tensor, feed_dict=self.feed_dict)
+    def run(self, tensor, feed_dict=None):
+        if feed_dict is None:
+            feed_dict = self.feed_dict
+        return self.session.run(tensor, feed_dict=feed_dict)
+
+    def _should_stop(self) -> bool:
+        """
+        Whether training was interrupted, e.g. by a stop hook of a monitored session.
+        """
+        return False
+
+    def _step_complete(self):
+        """
+        Called by the training loops once the state of a training step, e.g. the convergence mask, was written
+        to the graph. See `MonitoredTFEstimator`, which saves the checkpoint of the step from here.
+        """
+        pass
+
+    def clear_cache(self):
+        """
+        Discards all values which were memoised by `get()`.
+        """
+        self._cache = {}
+        self._cache_step = None
+
+    def _validate_cache(self):
+        # The parameters only change with the global step during training.
+        step = self.run(self.model.global_step)
+        if step != self._cache_step:
+            self._cache = {"global_step": step}
+            self._cache_step = step
+
+    def _get_cached(self, key: str) -> Union[Any, None]:
+        """
+        Returns the memoised value of `key` at the current parameters or None if it was not evaluated yet.
+        """
+        self._validate_cache()
+        return self._copy_cached(key)
+
+    def _copy_cached(self, key):
+        # Callers must not modify the memoised arrays.
+        value = self._cache.get(key, None)
+        return np.copy(value) if isinstance(value, np.ndarray) else value
 
     def _get_unsafe(self, key: Union[str, Iterable]) -> Union[Any, Dict[str, Any]]:
+        """
+        Evaluates the tensor(s) specified by key.
+
+        Values are memoised per global step: All requested values that were not evaluated at the current
+        parameters yet are fetched in a single `session.run()`, repeated requests are served from memory.
+        """
+        keys = [key] if isinstance(key, str) else list(key)
+
+        self._validate_cache()
+        missing = list(dict.fromkeys([k for k in keys if k not in self._cache]))
+        if len(missing) > 0:
+            self._cache.update(self.run({k: self.model.__getattribute__(k) for k in missing}))
+
+        values = {k: self._copy_cached(k) for k in keys}
         if isinstance(key, str):
-            return self.run(self.model.__getattribute__(key))
-        elif isinstance(key, Iterable):
-            d = {s: self.model.__getattribute__(s) for s in key}
-            return self.run(d)
+            return values[key]
+        else:
+            return values
 
     def get(self, key: Union[str, Iterable]) -> Union[Any, Dict[str, Any]]:
         """
@@ -88,6 +161,72 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
     def loss(self):
         return self._get_unsafe("loss")
 
+    def update_converged(self, converged, metric=None):
+        """
+        Sets the feature-wise convergence status and writes it to the convergence mask in the graph.
+
+        :param converged: boolean array (features) or scalar which is broadcasted to all features.
+        :param metric: (optional) feature-wise convergence metric which is written to the graph in the same run,
+            so that a training stage which is restored from a checkpoint can continue from it.
+            NaN or a scalar NaN resets it.
+        """
+        model_vars = self.model.model_vars
+        converged = np.broadcast_to(converged, model_vars.converged_ph.shape.as_list()).copy()
+        model_vars.converged = converged
+        ops = [model_vars.assign_converged]
+        feed_dict = {model_vars.converged_ph: converged}
+        if metric is not None:
+            ops.append(model_vars.assign_convergence_metric)
+            feed_dict[model_vars.convergence_metric_ph] = np.broadcast_to(
+                metric,
+                model_vars.convergence_metric_ph.shape.as_list()
+            )
+        self.run(ops, feed_dict=feed_dict)
+        # Statistics which are restricted to the non-converged features depend on the mask:
+        self.clear_cache()
+
+    def _update_converged_by_delta(self, metric_delta, stopping_criteria, metric=None):
+        """
+        Marks features as converged if their convergence metric changed less than `stopping_criteria`.
+
+        Features with a non-finite convergence metric cannot improve anymore and are stopped as well,
+        so that single pathological features do not keep all other features iterating.
+
+        :param metric: (optional) current feature-wise convergence metric, see `update_converged()`.
+        """
+        converged = np.logical_or(self.model.model_vars.converged, metric_delta < stopping_criteria)
+        not_finite = np.logical_and(np.logical_not(converged), np.logical_not(np.isfinite(metric_delta)))
+        if np.any(not_finite):
+            tf.logging.warning("Stopping %i features with non-finite convergence metric", np.sum(not_finite))
+        self.update_converged(np.logical_or(converged, not_finite), metric=metric)
+
+    def update_train_stage(self, train_stage: int):
+        """
+        Sets the stage of `train_sequence()` in progress and writes it to the graph.
+
+        :param train_stage: index of the training stage or -1 if the training sequence is complete.
+        """
+        model_vars = self.model.model_vars
+        self.train_stage = int(train_stage)
+        self.run(model_vars.assign_train_stage, feed_dict={model_vars.train_stage_ph: self.train_stage})
+
+    def _restored_convergence_metric(self):
+        """
+        Returns the feature-wise convergence metric of the current training stage or None if it was not evaluated yet.
+        """
+        metric = self.run(self.model.model_vars.convergence_metric)
+        if np.all(np.isnan(metric)):
+            return None
+        return metric
+
+    def _record_convergence(self, train_step, loss):
+        self.convergence_history.append({
+            "global_step": int(train_step),
+            "train_stage": self.train_stage,
+            "loss": float(loss),
+            "num_converged": int(np.sum(self.model.model_vars.converged))
+        })
+
     def _train_to_convergence(self,
                               loss,
                               train_op,
@@ -126,7 +265,7 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
             else:
                 return False
 
-        while True:
+        while not self._should_stop():
             t0 = time.time()
             train_step, global_loss, _ = self.session.run(
                 (self.model.global_step, loss, train_op),
@@ -146,6 +285,7 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
                 previous_loss_hist = np.copy(loss_hist)
 
             loss_hist[(train_step - 1) % len(loss_hist)] = global_loss
+            self._step_complete()
 
             # check convergence every N steps:
             if should_stop(train_step):
@@ -161,6 +301,7 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
               stopping_criteria=None,
               loss=None,
               train_op=None,
+              train_loss_by_feature=None,
               **kwargs):
         """
         Starts training of the model
@@ -189,8 +330,14 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
         :param loss_window_size: specifies `N` in `convergence_criteria`.
         :param loss: uses this loss tensor if specified
         :param train_op: uses this training operation if specified
+        :param train_loss_by_feature: feature-wise loss tensor which is evaluated by `train_op`
+            at the parameters before the update.
+
+            If specified, "all_converged_ll" uses this tensor instead of evaluating the loss in a separate run
+            after each step. The convergence metric is then the difference between consecutive steps.
         """
         # feed_dict = dict() if feed_dict is None else feed_dict.copy()
+        self.clear_cache()
 
         # default values:
         if loss_window_size is None:
@@ -210,14 +357,15 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
             train_op = self.model.train_op
 
         if convergence_criteria == "step":
-            train_step = self.session.run(self.model.global_step, feed_dict=feed_dict)
-            while train_step < stopping_criteria:
+            train_step = self.run(self.model.global_step, feed_dict=feed_dict)
+            while train_step < stopping_criteria and not self._should_stop():
                 t0 = time.time()
                 train_step, global_loss, _ = self.session.run(
                     (self.model.global_step, loss, train_op),
                     feed_dict=feed_dict
                 )
                 t1 = time.time()
+                self._step_complete()
 
                 tf.logging.info(
                     "Step: %d\tloss: %s",
@@ -225,16 +373,47 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
                     global_loss,
                     str(np.round(t1 - t0, 3))
                 )
+        elif convergence_criteria == "all_converged_ll" and train_loss_by_feature is not None:
+            # Continues from the metric of a restored checkpoint:
+            metric_current = self._restored_convergence_metric()
+            while np.any(self.model.model_vars.converged == False) and not self._should_stop():
+                t0 = time.time()
+                metric_prev = metric_current
+                # The loss is evaluated in the same pass over the data as the update:
+                train_step, metric_current, _ = self.session.run(
+                    (self.model.global_step, train_loss_by_feature, train_op),
+                    feed_dict=feed_dict
+                )
+                if metric_prev is not None:
+                    # Converged features are not evaluated anymore, keep their last loss:
+                    metric_current = np.where(self.model.model_vars.converged, metric_prev, metric_current)
+                    metric_delta = np.abs(metric_current - metric_prev)
+
+                    # Update convergence status of non-converged features:
+                    self._update_converged_by_delta(metric_delta, stopping_criteria, metric=metric_current)
+                else:
+                    self.update_converged(self.model.model_vars.converged, metric=metric_current)
+                t1 = time.time()
+                self._record_convergence(train_step, np.sum(metric_current))
+                self._step_complete()
+
+                tf.logging.info(
+                    "Step: \t%d\t loss: \t%f\t models converged \t%i\t in %s sec",
+                    train_step,
+                    np.sum(metric_current),
+                    np.sum(self.model.model_vars.converged).astype("int32"),
+                    str(np.round(t1 - t0, 3))
+                )
         elif convergence_criteria in ["all_converged_ll", "all_converged_theta"]:
             # Evaluate initial value of convergence metric:
             if convergence_criteria == "all_converged_theta":
-                metric_current = self.session.run(self.model.model_vars.params)
+                metric_current = self.run(self.model.model_vars.params, feed_dict=feed_dict)
             elif convergence_criteria == "all_converged_ll":
-                metric_current = self.session.run(self.model.full_data_model.norm_neg_log_likelihood)
+                metric_current = self.run(self.model.full_data_model.norm_neg_log_likelihood, feed_dict=feed_dict)
             else:
                 raise ValueError("convergence_criterium %s not recgonized" % convergence_criteria)
 
-            while np.any(self.model.model_vars.converged == False):
+            while np.any(self.model.model_vars.converged == False) and not self._should_stop():
                 # Update convergence metric reference:
                 t0 = time.time()
                 metric_prev = metric_current
@@ -244,22 +423,25 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
                 )
                 # Evaluate convergence metric:
                 if convergence_criteria == "all_converged_theta":
-                    metric_current = self.session.run(self.model.model_vars.params)
+                    metric_current = self.run(self.model.model_vars.params, feed_dict=feed_dict)
                     metric_delta = np.abs(np.exp(metric_prev) - np.exp(metric_current))
                     # Evaluate convergence based on maximally varying parameter per gene:
                     metric_delta = np.max(metric_delta, axis=0)
                 elif convergence_criteria == "all_converged_ll":
-                    metric_current = self.session.run(self.model.full_data_model.norm_neg_log_likelihood)
+                    metric_current = self.run(self.model.full_data_model.norm_neg_log_likelihood, feed_dict=feed_dict)
                     metric_delta = np.abs(metric_current - metric_prev)
                 else:
                     raise ValueError("convergence_criterium %s not recgonized" % convergence_criteria)
 
                 # Update convergence status of non-converged features:
-                self.model.model_vars.converged = np.logical_or(
-                    self.model.model_vars.converged,
-                    metric_delta < stopping_criteria
+                self._update_converged_by_delta(
+                    metric_delta,
+                    stopping_criteria,
+                    metric=metric_current if convergence_criteria == "all_converged_ll" else None
                 )
                 t1 = time.time()
+                self._record_convergence(train_step, global_loss)
+                self._step_complete()
 
                 tf.logging.info(
                     "Step: \t%d\t loss: \t%f\t models converged \t%i\t in %s sec",
@@ -282,11 +464,17 @@ class TFEstimator(_Estimator_Base, metaclass=abc.ABCMeta):
 class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
     session: tf.train.MonitoredSession
     working_dir: str
+    _checkpoint_hook: Union[DeferredCheckpointSaverHook, None]
+
+    # Written next to the checkpoints in `working_dir`, see `_training_state()`:
+    TRAINING_STATE_FILE = "training_state.json"
 
     def __init__(self, tf_estimator_graph: TFEstimatorGraph):
         super().__init__(tf_estimator_graph)
 
         self.working_dir = None
+        self.data_feed_dict = {}
+        self._checkpoint_hook = None
 
     def run(self, tensor, feed_dict=None):
         if feed_dict is None:
@@ -297,6 +485,13 @@ class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
         else:
             return self.session.run(tensor, feed_dict=feed_dict)
 
+    def _should_stop(self) -> bool:
+        return isinstance(self.session, tf.train.MonitoredSession) and self.session.should_stop()
+
+    def _step_complete(self):
+        if self._checkpoint_hook is not None:
+            self._checkpoint_hook.save_pending(self.session._tf_sess())
+
     @abc.abstractmethod
     def _scaffold(self) -> tf.train.Scaffold:
         """
@@ -320,19 +515,25 @@ class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
             export_secs=None,
             export: list = None,
             export_compression=True,
+            export_overflow="block",
             use_monitored_session=True,
     ):
         """
         Initializes this Estimator.
         
         If specified, previous checkpoints will be loaded from `working_dir`.
+        Checkpoints contain the feature-wise convergence mask and the stage of `train_sequence()` in progress,
+        such that a restored estimator only continues training the features which have not converged yet.
+        The checkpoint of a training step is saved once the convergence state of this step was updated.
+        The convergence history is written to `TRAINING_STATE_FILE` next to each checkpoint.
 
         :param working_dir: working directory for all actions requiring writing files to disk
         :param save_checkpoint_steps: number of steps after which a new checkpoint will be created
         :param save_checkpoint_secs: period of time after which a new checkpoint will be created
         :param save_summaries_steps: number of steps after which a new summary will be created
         :param save_summaries_secs: period of time after which a new summary will be created
-        :param stop_at_step: the step after which the training will be interrupted
+        :param stop_at_step: the step after which the training will be interrupted.
+            An interrupted training sequence can be resumed from the checkpoints in `working_dir`.
         :param stop_below_loss_change: training will be interrupted as soon as the loss improvement drops
             below this value
         :param loss_averaging_steps: if `stop_below_loss_change` is used, this parameter specifies the number of
@@ -343,11 +544,18 @@ class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
             Useful in cases where the loss is not monotonously falling, e.g. when using mini-batches.
         :param export: list of parameter names.
         
-            These parameters will be fetched from `model` and exported as NetCDF4-formatted `xarray.dataset`'s.
+            These parameters will be fetched from `model` and appended along the dimension "global_step"
+            of one store in `working_dir`, see `_save_timestep()`. A store of an earlier run in `working_dir`
+            is replaced, unless training resumes from a checkpoint: then, only the time steps after the
+            restored step are removed.
             See keys of `estimator.PARAMS` for possible parameters.
         :param export_steps: number of steps after which the parameters specified in `export` will be exported
         :param export_secs: time period after which the parameters specified in `export` will be exported
         :param export_compression: Enable compression for exported data. Defaults to `True`.
+            A string selects the blosc codec of zarr stores, e.g. "lz4".
+        :param export_overflow: What happens if pkg_constants.EXPORT_QUEUE_SIZE exports are waiting
+            for the background writer: "block" the training loop until the writer catches up
+            or "drop" the export.
         :param use_monitored_session: if True, uses tf.train.MonitoredTrainingSession instead of tf.Session.
 
             tf.train.MonitoredTrainingSession is needed for certain features like checkpoint and summary saving.
@@ -355,8 +563,10 @@ class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
         """
 
         self.close_session()
+        self.clear_cache()
         self.feed_dict = {}
         self.working_dir = working_dir
+        self._checkpoint_hook = None
 
         if working_dir is None and not all(val is None for val in [
             save_checkpoint_steps,
@@ -378,9 +588,25 @@ class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
                     run_steps=export_steps if export_steps is not None else None,
                     run_secs=export_secs if export_secs is not None else None,
                     call_request_tensors={p: self.model.__getattribute__(p) for p in export},
-                    call_fn=lambda sess, step, time_measures, data: self._save_timestep(step, time_measures, data),
+                    call_fn=lambda sess, step, time_measures, data: self._save_timestep(
+                        step, time_measures, data, compression=export_compression
+                    ),
                     asynchronous=True,
+                    queue_size=pkg_constants.EXPORT_QUEUE_SIZE,
+                    overflow=export_overflow,
                 ))
+            if save_checkpoint_steps is not None or save_checkpoint_secs is not None:
+                self._checkpoint_hook = DeferredCheckpointSaverHook(
+                    checkpoint_dir=self.working_dir,
+                    save_steps=save_checkpoint_steps,
+                    save_secs=save_checkpoint_secs,
+                    scaffold=scaffold,
+                    listeners=[TrainingStateSaverListener(
+                        path=os.path.join(self.working_dir, self.TRAINING_STATE_FILE),
+                        state_fn=self._training_state
+                    )]
+                )
+                hooks.append(self._checkpoint_hook)
             if stop_at_step is not None:
                 hooks.append(tf.train.StopAtStepHook(last_step=stop_at_step))
             if stop_below_loss_change is not None:
@@ -397,49 +623,120 @@ class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
                     checkpoint_dir=self.working_dir,
                     scaffold=scaffold,
                     hooks=hooks,
-                    save_checkpoint_steps=save_checkpoint_steps,
-                    save_checkpoint_secs=save_checkpoint_secs,
+                    # checkpoints are saved by the CheckpointSaverHook above:
+                    save_checkpoint_steps=None,
+                    save_checkpoint_secs=None,
                     save_summaries_steps=save_summaries_steps,
                     save_summaries_secs=save_summaries_secs,
 
                 )
             else:
                 self.session = tf.Session(config=pkg_constants.TF_CONFIG_PROTO)
-                self.session.run(scaffold.init_op, feed_dict=self.feed_dict)
+                self.session.run(scaffold.init_op, feed_dict=scaffold.init_feed_dict)
+
+            # Data kept inside of the graph is neither part of the checkpoints nor of `init_op`;
+            # load it separately and in order, as the input pipelines may depend on it:
+            for op in self.model.data_init_ops:
+                self.run(op, feed_dict=self.data_feed_dict)
+
+        self._restore_training_state()
+        # The checkpoint of the initial or restored state is due since the session was created:
+        self._step_complete()
+        if export_secs is not None or export_steps is not None:
+            self._reset_export_store(compression=export_compression)
+
+    def _training_state(self) -> dict:
+        """
+        State which is not part of the graph and therefore written next to each checkpoint.
+        """
+        return {"convergence_history": list(self.convergence_history)}
+
+    def _restore_training_state(self):
+        """
+        Mirrors the convergence mask and the training stage of the graph, which were either initialized or
+        restored from a checkpoint, and loads the convergence history of the restored checkpoint.
+        """
+        model_vars = self.model.model_vars
+        converged, train_stage, global_step = self.run(
+            (model_vars.converged_mask, model_vars.train_stage, self.model.global_step)
+        )
+        model_vars.converged = converged
+        self.train_stage = int(train_stage)
+        self.convergence_history = []
+
+        if self.working_dir is not None and global_step > 0:
+            path = os.path.join(self.working_dir, self.TRAINING_STATE_FILE)
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    state = json.load(f)
+                # The state may have been written after a later step than the restored checkpoint:
+                self.convergence_history = [
+                    x for x in state["convergence_history"] if x["global_step"] <= global_step
+                ]
+            if self.train_stage >= 0:
+                tf.logging.info(
+                    "Restored training stage %d at step %d with %d of %d features converged",
+                    self.train_stage,
+                    global_step,
+                    np.sum(converged),
+                    converged.shape[0]
+                )
+
+    def _export_store(self):
+        """
+        Storage backend and path of the store in `working_dir` which the exported time steps are appended to.
+        """
+        backend = io_utils.storage_backend(backend=pkg_constants.STORAGE_BACKEND)
+        path = os.path.join(self.working_dir, "estimation.%s" % ("zarr" if backend == "zarr" else "h5"))
+        return backend, path
+
+    def _reset_export_store(self, compression=True):
+        """
+        Prepares the export store in `working_dir` for this run.
+
+        A new run starts a fresh store. A run which was restored from a checkpoint keeps the time steps up to
+        the restored step and drops the later ones, which were exported by the interrupted run after its last
+        checkpoint and will be exported again.
+        """
+        backend, path = self._export_store()
+        global_step = self.run(self.model.global_step)
+        if global_step == 0:
+            io_utils.remove_store(path)
+        else:
+            io_utils.truncate_appended(path, dim="global_step", last=global_step, backend=backend,
+                                       compression=compression if compression is not None else False)
 
     def _save_timestep(self, step: int, time_measures: List[float], data: dict, compression=True):
         """
         Saves one time step. Special method for TimedRunHook
-        
+
+        All time steps are appended along the dimension "global_step" of one store in `working_dir`,
+        "estimation.zarr" or "estimation.h5" depending on pkg_constants.STORAGE_BACKEND.
+        See `batchglm.utils.io.open_appended()` to load them.
+
         :param step: the current step which should be saved
         :param data: dict {"param" : data} containing the data which should be saved to disk
         :param compression: if None, no compression will be used.
-            Otherwise the specified compression will be used for all variables.
+            Otherwise, variables are compressed with zlib (netcdf) or blosc (zarr).
+            A string selects the blosc codec, e.g. "lz4" for fast compression.
         """
         # get shape of params
         shapes = self.param_shapes()
 
         # create mapping: {key: (dimensions, data)}
-        xarray = {key: (shapes[key], data) for (key, data) in data.items()}
+        xarray = {key: (("global_step",) + tuple(shapes[key]), np.expand_dims(data, axis=0))
+                  for (key, data) in data.items()}
 
         xarray = xr.Dataset(xarray)
-        xarray.coords["global_step"] = (), step
-        xarray.coords["current_time"] = (), datetime.datetime.now()
-        xarray.coords["time_elapsed"] = (), (np.sum(time_measures) if len(time_measures) > 0 else 0)
-
-        encoding = None
-        if compression:
-            opts = dict()
-            opts["zlib"] = True
-
-            encoding = {var: opts for var in xarray.data_vars if xarray[var].shape != ()}
+        xarray.coords["global_step"] = ("global_step",), [step]
+        xarray.coords["current_time"] = ("global_step",), [np.datetime64(datetime.datetime.now(), "us")]
+        xarray.coords["time_elapsed"] = ("global_step",), [np.sum(time_measures) if len(time_measures) > 0 else 0.]
 
-        path = os.path.join(self.working_dir, "estimation-%d.h5" % step)
-        tf.logging.info("Exporting data to %s" % path)
-        xarray.to_netcdf(path=path,
-                         engine=pkg_constants.XARRAY_NETCDF_ENGINE,
-                         encoding=encoding)
-        tf.logging.info("Exporting to %s finished" % path)
+        backend, path = self._export_store()
+        tf.logging.info("Exporting step %d to %s" % (step, path))
+        io_utils.append_dataset(xarray, path, dim="global_step", backend=backend,
+                                compression=compression if compression is not None else False)
+        tf.logging.info("Exporting step %d finished" % step)
 
     def train(self, *args,
               use_stop_hooks=False,
@@ -459,6 +756,7 @@ class MonitoredTFEstimator(TFEstimator, metaclass=abc.ABCMeta):
                     (self.model.global_step, self.model.loss, self.model.train_op),
                     feed_dict=kwargs.get("feed_dict", None)
                 )
+                self._step_complete()
 
                 tf.logging.info("Step: %d\tloss: %f" % (train_step, loss_res))
         else:
@@ -2,3 +2,4 @@ from batchglm.models.base import _Estimator_Base
 
 import batchglm.utils.stats as stat_utils
 from batchglm import pkg_constants
+import batchglm.utils.io as io_utils
@@ -1,5 +1,6 @@
-from .estimator_graph import GradientGraphGLM, NewtonGraphGLM, TrainerGraphGLM, EstimatorGraphGLM, FullDataModelGraphGLM, BatchedDataModelGraphGLM
+from .estimator_graph import GradientGraphGLM, NewtonGraphGLM, LBFGSGraphGLM, TrainerGraphGLM, EstimatorGraphGLM, FullDataModelGraphGLM, BatchedDataModelGraphGLM
 from .hessians import HessiansGLM
 from .fim import FIMGLM
 from .jacobians import JacobiansGLM
-from .model import ESTIMATOR_PARAMS, ProcessModelGLM, ModelVarsGLM, BasicModelGraphGLM
+from .model import ESTIMATOR_PARAMS, ProcessModelGLM, ModelVarsGLM, ModelVarsSubsetGLM, BasicModelGraphGLM
+from .model import unpack_batch, gather_batch_features
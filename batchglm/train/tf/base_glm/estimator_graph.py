@@ -13,12 +13,28 @@ except ImportError:
 
 from .model import ModelVarsGLM, BasicModelGraphGLM
 from .external import TFEstimatorGraph
-from .external import train_utils
+from .external import op_utils, train_utils
 from .external import pkg_constants
 
 logger = logging.getLogger(__name__)
 
 
+def _get_statistic(statistics, name):
+    """
+    Returns the attribute `name` of a statistics object or None if the statistics were not built.
+    """
+    return getattr(statistics, name) if statistics is not None else None
+
+
+def _concat_updates(update_a, update_b):
+    """
+    Stacks the updates of the mean and the dispersion model or returns None if they were not built.
+    """
+    if update_a is None or update_b is None:
+        return None
+    return tf.concat([update_a, update_b], axis=0)
+
+
 class FullDataModelGraphGLM:
     """
     Computational graph to evaluate model on full data set.
@@ -34,28 +50,65 @@ class FullDataModelGraphGLM:
 
         - The model likelihood (cost function value).
         - Model Jacobian matrix for trainer parameters (for training).
-        - Model Jacobian matrix for all parameters (for downstream usage,
-        e.g. hypothesis tests which can also be performed on closed form MLEs).
-        - Model Hessian matrix for trainer parameters (for training).
+        - Model Hessian and Fisher information matrix for trainer parameters (for training),
+        only if an optimizer which uses them is built.
         - Model Hessian matrix for all parameters (for downstream usage,
         e.g. hypothesis tests which can also be performed on closed form MLEs).
+        - Model Jacobian, Hessian and Fisher information matrix for trained parameters
+        of the non-converged features only (for training with feature-wise termination).
+        - Model Hessian matrix for all parameters on a subset of features which is selected at runtime
+        (for downstream usage of the inverse Fisher information matrix of features of interest).
     """
     log_likelihood: tf.Tensor
     norm_log_likelihood: tf.Tensor
     norm_neg_log_likelihood: tf.Tensor
     loss: tf.Tensor
 
-    jac: tf.Tensor
     jac_train: tf.Tensor
+    jac_train_nr: Union[tf.Tensor, None]
+    jac_train_irls: Union[tf.Tensor, None]
 
     hessians: tf.Tensor
-    hessians_train: tf.Tensor
+    hessians_train: Union[tf.Tensor, None]
 
-    fim: tf.Tensor
-    fim_train: tf.Tensor
+    fim_train: Union[tf.Tensor, None]
+
+    idx_active: Union[tf.Tensor, None]
+    jac_active: Union[tf.Tensor, None]
+    jac_active_nr: Union[tf.Tensor, None]
+    jac_active_irls: Union[tf.Tensor, None]
+    hessians_active: Union[tf.Tensor, None]
+    fim_active: Union[tf.Tensor, None]
+
+    feature_selection: tf.Tensor
+    hessians_selected: tf.Tensor
+
+    norm_neg_log_likelihood_at: callable
+
+    norm_neg_log_likelihood_gradient: Union[tf.Tensor, None]
+    norm_neg_log_likelihood_nr: Union[tf.Tensor, None]
+    norm_neg_log_likelihood_irls: Union[tf.Tensor, None]
 
     noise_model: str
 
+    def norm_neg_log_likelihood_by_name(self, name: str) -> Union[tf.Tensor, None]:
+        """
+        Returns the feature-wise loss which is evaluated in the same pass over the data as the
+        train op of the given optimizer. It is evaluated at the parameters before the update.
+
+        :param name: name of the optimizer, see MultiTrainer.train_op_by_name()
+        :return: tensor (features) or None if the statistics of this optimizer do not provide the loss.
+        """
+        name_lower = name.lower()
+        if name_lower in ["newton", "newton-raphson", "newton_raphson", "nr", "newton_ls", "nr_ls"]:
+            return self.norm_neg_log_likelihood_nr
+        elif name_lower in ["irls", "iwls", "irls_ls", "iwls_ls"]:
+            return self.norm_neg_log_likelihood_irls
+        elif name_lower in ["gradient_descent", "gd", "adam", "adagrad", "rmsprop", "lbfgs"]:
+            return self.norm_neg_log_likelihood_gradient
+        else:
+            return None
+
 
 class BatchedDataModelGraphGLM:
     """
@@ -74,6 +127,8 @@ class BatchedDataModelGraphGLM:
     loss: tf.Tensor
 
     jac_train: tf.Tensor
+    jac_train_nr: tf.Tensor
+    jac_train_irls: tf.Tensor
     hessians_train: tf.Tensor
     fim_train: tf.Tensor
 
@@ -90,6 +145,10 @@ class GradientGraphGLM:
     converged features if feature-wise termination is chosen.
     The latter have to be distinguished as there are different jacobians
     and hessians for the full and the batched data.
+
+    The convergence mask and the active set only apply to the update tensors gradients_full and
+    gradients_batch. The reported gradients gradients_full_all are evaluated on all features
+    of the full data.
     """
     model_vars: tf.Tensor
     full_data_model: tf.Tensor
@@ -98,6 +157,9 @@ class GradientGraphGLM:
 
     nr_update_full: Union[tf.Tensor, None]
     nr_update_batched: Union[tf.Tensor, None]
+    gradients_full: tf.Tensor
+    gradients_full_all: tf.Tensor
+    gradients_batch: Union[tf.Tensor, None]
 
     def __init__(
             self,
@@ -106,41 +168,38 @@ class GradientGraphGLM:
             train_scale
     ):
         if train_loc or train_scale:
+            # The batched statistics are not built if no trainer uses batching.
+            batched = self.batched_data_model.jac_train is not None
             if termination_type == "by_feature":
                 logger.debug(" ** Build gradients for training graph: by_feature")
                 self.gradients_full_byfeature()
-                self.gradients_batched_byfeature()
+                if batched:
+                    self.gradients_batched_byfeature()
             elif termination_type == "global":
                 logger.debug(" ** Build gradients for training graph: global")
                 self.gradients_full_global()
-                self.gradients_batched_global()
+                if batched:
+                    self.gradients_batched_global()
             else:
                 raise ValueError("convergence_type %s not recognized." % termination_type)
 
             # Pad gradients to receive update tensors that match
             # the shape of model_vars.params.
-            if train_loc:
-                if train_scale:
-                    gradients_batch = self.gradients_batch_raw
-                    gradients_full = self.gradients_full_raw
-                else:
-                    gradients_batch = tf.concat([
-                        self.gradients_batch_raw,
-                        tf.zeros_like(self.model_vars.b_var)
-                    ], axis=0)
-                    gradients_full = tf.concat([
-                        self.gradients_full_raw,
-                        tf.zeros_like(self.model_vars.b_var)
-                    ], axis=0)
-            elif train_scale:
-                gradients_batch = tf.concat([
-                    tf.zeros_like(self.model_vars.a_var),
-                    self.gradients_batch_raw
-                ], axis=0)
-                gradients_full = tf.concat([
-                    tf.zeros_like(self.model_vars.a_var),
-                    self.gradients_full_raw
-                ], axis=0)
+            gradients_full = self._pad_gradients(self.gradients_full_raw, train_loc=train_loc, train_scale=train_scale)
+            # Only evaluated if the gradients are fetched as output:
+            gradients_full_all = self._pad_gradients(
+                tf.transpose(self.full_data_model.jac_train.neg_jac),
+                train_loc=train_loc,
+                train_scale=train_scale
+            )
+            if batched:
+                gradients_batch = self._pad_gradients(
+                    self.gradients_batch_raw,
+                    train_loc=train_loc,
+                    train_scale=train_scale
+                )
+            else:
+                gradients_batch = None
         else:
             # These gradients are returned for convergence evaluation.
             # In this case, closed form estimates were used, one could
@@ -148,36 +207,41 @@ class GradientGraphGLM:
             # this to speed up run time.
             gradients_batch = tf.zeros_like(self.model_vars.params)
             gradients_full = tf.zeros_like(self.model_vars.params)
+            gradients_full_all = gradients_full
 
         self.gradients_full = gradients_full
+        self.gradients_full_all = gradients_full_all
         self.gradients_batch = gradients_batch
 
-    def gradients_full_byfeature(self):
-        gradients_full_all = tf.transpose(self.full_data_model.jac_train.neg_jac)
-        gradients_full = tf.concat([
-            # tf.gradients(full_data_model.norm_neg_log_likelihood,
-            #             model_vars.params_by_gene[i])[0]
-            tf.expand_dims(gradients_full_all[:, i], axis=-1)
-            if not self.model_vars.converged[i]
-            else tf.zeros([param_grad_vec.shape[1], 1], dtype=dtype)
-            for i in range(self.model_vars.n_features)
-        ], axis=1)
+    def _pad_gradients(self, gradients, train_loc, train_scale):
+        if train_loc and train_scale:
+            return gradients
+        elif train_loc:
+            return tf.concat([gradients, tf.zeros_like(self.model_vars.b_var)], axis=0)
+        else:
+            return tf.concat([tf.zeros_like(self.model_vars.a_var), gradients], axis=0)
 
+    def gradients_full_byfeature(self):
+        gradients_full = tf.transpose(op_utils.scatter_rows(
+            indices=self.full_data_model.idx_active,
+            values=self.full_data_model.jac_active.neg_jac,
+            num_rows=tf.shape(self.model_vars.params, out_type=tf.int64)[1]
+        ))
         self.gradients_full_raw = gradients_full
 
     def gradients_batched_byfeature(self):
-        gradients_batch_all = tf.transpose(self.batched_data_model.jac_train.neg_jac)
-        gradients_batch = tf.concat([
-            # tf.gradients(batch_model.norm_neg_log_likelihood,
-            #             model_vars.params_by_gene[i])[0]
-            tf.expand_dims(gradients_batch_all[:, i], axis=-1)
-            if not self.model_vars.converged[i]
-            else tf.zeros([param_grad_vec.shape[1], 1], dtype=dtype)
-            for i in range(self.model_vars.n_features)
-        ], axis=1)
-
+        gradients_batch = tf.transpose(self._mask_converged(self.batched_data_model.jac_train.neg_jac))
         self.gradients_batch_raw = gradients_batch
 
+    def _mask_converged(self, x):
+        """
+        Sets the rows of already converged features to zero.
+
+        :param x: tensor (features x params)
+        :return: tensor (features x params)
+        """
+        return tf.where(self.model_vars.converged_mask, tf.zeros_like(x), x)
+
     def gradients_full_global(self):
         gradients_full = tf.transpose(self.full_data_model.jac_train.neg_jac)
         self.gradients_full_raw = gradients_full
@@ -199,6 +263,17 @@ class NewtonGraphGLM:
     converged features if feature-wise termination is chosen.
     The latter have to be distinguished as there are different jacobians
     and hessians for the full and the batched data.
+
+    The systems are solved feature-wise with op_utils.robust_solve(): all systems
+    are first solved via the Cholesky decomposition and only the systems of features
+    for which it fails fall back to a pseudo-inverse instead of producing NaNs.
+    The condition numbers of the full data systems are reported by feature in
+    nr_condition_full and irls_condition_full (the larger one of the mean and the
+    dispersion model block).
+
+    The line search variants of the full data updates (optimizers "nr_ls" and "irls_ls")
+    scale the update of each feature by the largest step size which decreases the loss
+    of this feature, see line_search_update().
     """
     model_vars: tf.Tensor
     full_data_model: tf.Tensor
@@ -210,8 +285,12 @@ class NewtonGraphGLM:
     nr_update_batched: Union[tf.Tensor, None]
     irls_update_full: Union[tf.Tensor, None]
     irls_update_batched: Union[tf.Tensor, None]
-
-    idx_nonconverged: np.ndarray
+    nr_condition_full: Union[tf.Tensor, None]
+    irls_condition_full: Union[tf.Tensor, None]
+    nr_ls_update_full: Union[tf.Tensor, None]
+    irls_ls_update_full: Union[tf.Tensor, None]
+    nr_ls_step_size: Union[tf.Tensor, None]
+    irls_ls_step_size: Union[tf.Tensor, None]
 
     def __init__(
             self,
@@ -220,15 +299,35 @@ class NewtonGraphGLM:
             train_mu,
             train_r
     ):
+        # The right hand sides are taken from the Jacobians that are evaluated
+        # together with the respective left hand side. Statistics which are not
+        # used by any provided optimizer are not built and are None.
+        if termination_type == "by_feature":
+            # Full data statistics are only evaluated on the active features.
+            full_jac_nr = self.full_data_model.jac_active_nr
+            full_jac_irls = self.full_data_model.jac_active_irls
+            full_hessians = self.full_data_model.hessians_active
+            full_fim = self.full_data_model.fim_active
+        else:
+            full_jac_nr = self.full_data_model.jac_train_nr
+            full_jac_irls = self.full_data_model.jac_train_irls
+            full_hessians = self.full_data_model.hessians_train
+            full_fim = self.full_data_model.fim_train
+        batched_jac_nr = self.batched_data_model.jac_train_nr
+        batched_jac_irls = self.batched_data_model.jac_train_irls
+        batched_hessians = self.batched_data_model.hessians_train
+        batched_fim = self.batched_data_model.fim_train
+
+        provide_nr_ls = provide_optimizers.get("nr_ls", False)
+        provide_irls_ls = provide_optimizers.get("irls_ls", False)
         if train_mu or train_r:
-            if provide_optimizers["nr"]:
-                nr_update_full_raw, nr_update_batched_raw = self.build_updates(
-                    full_lhs=self.full_data_model.hessians_train.neg_hessian,
-                    batched_lhs=self.batched_data_model.hessians_train.neg_hessian,
-                    full_rhs=self.full_data_model.jac_train.neg_jac,
-                    batched_rhs=self.batched_data_model.jac_train.neg_jac,
-                    termination_type=termination_type,
-                    psd=False
+            if provide_optimizers["nr"] or provide_nr_ls:
+                nr_update_full_raw, nr_update_batched_raw, nr_condition_full = self.build_updates(
+                    full_lhs=_get_statistic(full_hessians, "neg_hessian"),
+                    batched_lhs=_get_statistic(batched_hessians, "neg_hessian"),
+                    full_rhs=_get_statistic(full_jac_nr, "neg_jac"),
+                    batched_rhs=_get_statistic(batched_jac_nr, "neg_jac"),
+                    termination_type=termination_type
                 )
                 nr_update_full, nr_update_batched = self.pad_updates(
                     train_mu=train_mu,
@@ -239,51 +338,55 @@ class NewtonGraphGLM:
             else:
                 nr_update_full = None
                 nr_update_batched = None
+                nr_condition_full = None
 
-            if provide_optimizers["irls"]:
+            if provide_optimizers["irls"] or provide_irls_ls:
                 # Compute a and b model updates separately.
                 if train_mu:
-                    # The FIM of the mean model is guaranteed to be
-                    # positive semi-definite and can therefore be inverted
-                    # with the Cholesky decomposition. This information is
-                    # passed here with psd=True.
-                    irls_update_a_full, irls_update_a_batched = self.build_updates(
-                        full_lhs=self.full_data_model.fim_train.fim_a,
-                        batched_lhs=self.batched_data_model.fim_train.fim_a,
-                        full_rhs=self.full_data_model.jac_train.neg_jac_a,
-                        batched_rhs=self.batched_data_model.jac_train.neg_jac_a,
-                        termination_type=termination_type,
-                        psd=True
+                    irls_update_a_full, irls_update_a_batched, irls_condition_a_full = self.build_updates(
+                        full_lhs=_get_statistic(full_fim, "fim_a"),
+                        batched_lhs=_get_statistic(batched_fim, "fim_a"),
+                        full_rhs=_get_statistic(full_jac_irls, "neg_jac_a"),
+                        batched_rhs=_get_statistic(batched_jac_irls, "neg_jac_a"),
+                        termination_type=termination_type
                     )
                 else:
                     irls_update_a_full = None
                     irls_update_a_batched = None
+                    irls_condition_a_full = None
 
                 if train_r:
-                    irls_update_b_full, irls_update_b_batched = self.build_updates(
-                        full_lhs=self.full_data_model.fim_train.fim_b,
-                        batched_lhs=self.batched_data_model.fim_train.fim_b,
-                        full_rhs=self.full_data_model.jac_train.neg_jac_b,
-                        batched_rhs=self.batched_data_model.jac_train.neg_jac_b,
-                        termination_type=termination_type,
-                        psd=True  # TODO proove
+                    irls_update_b_full, irls_update_b_batched, irls_condition_b_full = self.build_updates(
+                        full_lhs=_get_statistic(full_fim, "fim_b"),
+                        batched_lhs=_get_statistic(batched_fim, "fim_b"),
+                        full_rhs=_get_statistic(full_jac_irls, "neg_jac_b"),
+                        batched_rhs=_get_statistic(batched_jac_irls, "neg_jac_b"),
+                        termination_type=termination_type
                     )
                 else:
                     irls_update_b_full = None
                     irls_update_b_batched = None
+                    irls_condition_b_full = None
 
                 if train_mu and train_r:
-                    irls_update_full_raw = tf.concat([irls_update_a_full, irls_update_b_full], axis=0)
-                    irls_update_batched_raw = tf.concat([irls_update_a_batched, irls_update_b_batched], axis=0)
+                    irls_update_full_raw = _concat_updates(irls_update_a_full, irls_update_b_full)
+                    irls_update_batched_raw = _concat_updates(irls_update_a_batched, irls_update_b_batched)
+                    if irls_condition_a_full is not None:
+                        irls_condition_full = tf.maximum(irls_condition_a_full, irls_condition_b_full)
+                    else:
+                        irls_condition_full = None
                 elif train_mu:
                     irls_update_full_raw = irls_update_a_full
                     irls_update_batched_raw = irls_update_a_batched
+                    irls_condition_full = irls_condition_a_full
                 elif train_r:
                     irls_update_full_raw = irls_update_b_full
                     irls_update_batched_raw = irls_update_b_batched
+                    irls_condition_full = irls_condition_b_full
                 else:
                     irls_update_full_raw = None
                     irls_update_batched_raw = None
+                    irls_condition_full = None
 
                 irls_update_full, irls_update_batched = self.pad_updates(
                     train_mu=train_mu,
@@ -294,16 +397,70 @@ class NewtonGraphGLM:
             else:
                 irls_update_full = None
                 irls_update_batched = None
+                irls_condition_full = None
         else:
             nr_update_full = None
             nr_update_batched = None
+            nr_condition_full = None
             irls_update_full = None
             irls_update_batched = None
+            irls_condition_full = None
 
         self.nr_update_full = nr_update_full
         self.nr_update_batched = nr_update_batched
         self.irls_update_full = irls_update_full
         self.irls_update_batched = irls_update_batched
+        self.nr_condition_full = nr_condition_full
+        self.irls_condition_full = irls_condition_full
+
+        if provide_nr_ls and nr_update_full is not None:
+            with tf.name_scope("nr_line_search"):
+                self.nr_ls_update_full, self.nr_ls_step_size = self.line_search_update(nr_update_full)
+        else:
+            self.nr_ls_update_full = None
+            self.nr_ls_step_size = None
+        if provide_irls_ls and irls_update_full is not None:
+            with tf.name_scope("irls_line_search"):
+                self.irls_ls_update_full, self.irls_ls_step_size = self.line_search_update(irls_update_full)
+        else:
+            self.irls_ls_update_full = None
+            self.irls_ls_step_size = None
+
+    def line_search_update(
+            self,
+            update
+    ):
+        """
+        Backtracking line search along a full data update, vectorised across features.
+
+        The loss of each feature is evaluated at all step sizes in pkg_constants.NEWTON_LINE_SEARCH_STEPS
+        in one pass over the data. Each feature takes the largest step which decreases its loss.
+        Features for which none of the steps decreases the loss keep their parameters.
+
+        :param update: tensor (all model parameters x features) which is subtracted from the parameters.
+        :return: tuple (scaled update, step size by feature)
+        """
+        params = self.model_vars.params
+        steps = [0.] + list(pkg_constants.NEWTON_LINE_SEARCH_STEPS)
+        candidates = tf.stack([params - step * update for step in steps])
+
+        loss = self.full_data_model.norm_neg_log_likelihood_at(candidates)
+        # Non-finite losses are never accepted as the comparison is false.
+        accepted = tf.less(loss[1:], loss[:1])
+        step_sizes = tf.broadcast_to(
+            tf.expand_dims(tf.constant(steps[1:], dtype=params.dtype), axis=-1),
+            tf.shape(accepted)
+        )
+        step_size = tf.reduce_max(tf.where(accepted, step_sizes, tf.zeros_like(step_sizes)), axis=0)
+        if self.full_data_model.idx_active is not None:
+            # The loss is only evaluated on the active features, the other ones are not updated.
+            step_size = tf.scatter_nd(
+                tf.expand_dims(self.full_data_model.idx_active, axis=-1),
+                step_size,
+                shape=tf.shape(params, out_type=tf.int64)[1:]
+            )
+
+        return update * tf.expand_dims(step_size, axis=0), step_size
 
     def build_updates(
             self,
@@ -311,35 +468,34 @@ class NewtonGraphGLM:
             batched_rhs,
             full_rhs,
             batched_lhs,
-            termination_type: str,
-            psd
+            termination_type: str
     ):
+        """
+        Builds the full data and the batched update of a Newton-type optimizer.
+
+        The update of a data model whose statistics were not built is None.
+
+        :return: tuple (update_full, update_batched, condition_full)
+        """
         if termination_type == "by_feature":
-            update_full = self.newton_type_update_full_byfeature(
-                lhs=full_lhs,
-                rhs=full_rhs,
-                psd=psd
-            )
-            update_batched = self.newton_type_update_batched_byfeature(
-                lhs=batched_lhs,
-                rhs=batched_rhs,
-                psd=psd
-            )
+            update_full_fn = self.newton_type_update_full_byfeature
+            update_batched_fn = self.newton_type_update_batched_byfeature
         elif termination_type == "global":
-            update_full = self.newton_type_update_full_global(
-                lhs=full_lhs,
-                rhs=full_rhs,
-                psd=psd
-            )
-            update_batched = self.newton_type_update_batched_global(
-                lhs=batched_lhs,
-                rhs=batched_rhs,
-                psd=psd
-            )
+            update_full_fn = self.newton_type_update_full_global
+            update_batched_fn = self.newton_type_update_batched_global
         else:
             raise ValueError("convergence_type %s not recognized." % termination_type)
 
-        return update_full, update_batched
+        if full_lhs is not None:
+            update_full, condition_full = update_full_fn(lhs=full_lhs, rhs=full_rhs)
+        else:
+            update_full, condition_full = None, None
+        if batched_lhs is not None:
+            update_batched, _ = update_batched_fn(lhs=batched_lhs, rhs=batched_rhs)
+        else:
+            update_batched = None
+
+        return update_full, update_batched, condition_full
 
     def pad_updates(
             self,
@@ -350,131 +506,230 @@ class NewtonGraphGLM:
     ):
         # Pad update vectors to receive update tensors that match
         # the shape of model_vars.params.
-        if train_mu:
-            if train_r:
-                netwon_type_update_full = update_full_raw
-                newton_type_update_batched = update_batched_raw
-            else:
-                netwon_type_update_full = tf.concat([
-                    update_full_raw,
-                    tf.zeros_like(self.model_vars.b_var)
-                ], axis=0)
-                newton_type_update_batched = tf.concat([
-                    update_batched_raw,
-                    tf.zeros_like(self.model_vars.b_var)
-                ], axis=0)
-        elif train_r:
-            netwon_type_update_full = tf.concat([
-                tf.zeros_like(self.model_vars.a_var),
-                update_full_raw
-            ], axis=0)
-            newton_type_update_batched = tf.concat([
-                tf.zeros_like(self.model_vars.a_var),
-                update_batched_raw
-            ], axis=0)
-        else:
+        if not train_mu and not train_r:
             raise ValueError("No training necessary")
 
-        return netwon_type_update_full, newton_type_update_batched
+        def pad(update):
+            if update is None or (train_mu and train_r):
+                return update
+            elif train_mu:
+                return tf.concat([update, tf.zeros_like(self.model_vars.b_var)], axis=0)
+            else:
+                return tf.concat([tf.zeros_like(self.model_vars.a_var), update], axis=0)
+
+        return pad(update_full_raw), pad(update_batched_raw)
 
     def newton_type_update_full_byfeature(
             self,
             lhs,
-            rhs,
-            psd
+            rhs
     ):
-        # Compute parameter update for non-converged gene only.
-        delta_t_bygene_nonconverged = tf.squeeze(tf.matrix_solve_ls(
-            tf.gather(
-                lhs,
-                indices=self.idx_nonconverged,
-                axis=0),
-            tf.expand_dims(
-                tf.gather(
-                    rhs,
-                    indices=self.idx_nonconverged,
-                    axis=0)
-                , axis=-1),
-            fast=psd and pkg_constants.CHOLESKY_LSTSQS
-        ), axis=-1)
+        # lhs and rhs are only evaluated on the active features.
+        delta_t_active, condition_active = op_utils.robust_solve(
+            lhs,
+            rhs,
+            cholesky=pkg_constants.CHOLESKY_LSTSQS
+        )
         # Write parameter updates into matrix of size of all parameters which
         # contains zero entries for updates of already converged genes.
-        delta_t_bygene_full = tf.concat([
-            tf.gather(delta_t_bygene_nonconverged,
-                      indices=np.where(self.idx_nonconverged == i)[0],
-                      axis=0)
-            if not self.model_vars.converged[i]
-            else tf.zeros([1, rhs.shape[1]])
-            for i in range(self.model_vars.n_features)
-        ], axis=0)
-        nr_update_full = tf.transpose(delta_t_bygene_full)
-
-        return nr_update_full
+        num_features = tf.shape(self.model_vars.params, out_type=tf.int64)[1]
+        nr_update_full = tf.transpose(op_utils.scatter_rows(
+            indices=self.full_data_model.idx_active,
+            values=delta_t_active,
+            num_rows=num_features
+        ))
+        condition_full = tf.scatter_nd(
+            tf.expand_dims(self.full_data_model.idx_active, axis=-1),
+            condition_active,
+            shape=tf.expand_dims(num_features, axis=0)
+        )
+
+        return nr_update_full, condition_full
 
     def newton_type_update_batched_byfeature(
             self,
             lhs,
-            rhs,
-            psd
+            rhs
+    ):
+        return self._newton_type_update_nonconverged(lhs=lhs, rhs=rhs)
+
+    def _newton_type_update_nonconverged(
+            self,
+            lhs,
+            rhs
     ):
-        # Compute parameter update for non-converged gene only.
-        delta_batched_t_bygene_nonconverged = tf.squeeze(tf.matrix_solve_ls(
-            tf.gather(
-                lhs,
-                indices=self.idx_nonconverged,
-                axis=0),
-            tf.expand_dims(
-                tf.gather(
-                    rhs,
-                    indices=self.idx_nonconverged,
-                    axis=0)
-                , axis=-1),
-            fast=psd and pkg_constants.CHOLESKY_LSTSQS
-        ), axis=-1)
+        """
+        Computes the parameter update for non-converged features only.
+
+        The set of non-converged features is read from `model_vars.converged_mask`
+        at runtime, updates of converged features are zero.
+
+        :param lhs: tensor (features x params x params)
+        :param rhs: tensor (features x params)
+        :return: tuple (update, condition_number) with the update tensor (params x features) and the
+            condition numbers of the systems by feature which are zero for converged features.
+        """
+        idx_nonconverged = tf.where(tf.logical_not(self.model_vars.converged_mask))
+        delta_t_nonconverged, condition_nonconverged = op_utils.robust_solve(
+            tf.gather_nd(lhs, indices=idx_nonconverged),
+            tf.gather_nd(rhs, indices=idx_nonconverged),
+            cholesky=pkg_constants.CHOLESKY_LSTSQS
+        )
         # Write parameter updates into matrix of size of all parameters which
         # contains zero entries for updates of already converged genes.
-        delta_batched_t_bygene_full = tf.concat([
-            tf.gather(delta_batched_t_bygene_nonconverged,
-                      indices=np.where(self.idx_nonconverged == i)[0],
-                      axis=0)
-            if not self.model_vars.converged[i]
-            else tf.zeros([1, rhs.shape[1]])
-            for i in range(self.model_vars.n_features)
-        ], axis=0)
-        nr_update_batched = tf.transpose(delta_batched_t_bygene_full)
-
-        return nr_update_batched
+        delta_t = tf.scatter_nd(
+            indices=idx_nonconverged,
+            updates=delta_t_nonconverged,
+            shape=tf.shape(rhs, out_type=tf.int64)
+        )
+        condition = tf.scatter_nd(
+            indices=idx_nonconverged,
+            updates=condition_nonconverged,
+            shape=tf.shape(rhs, out_type=tf.int64)[:1]
+        )
+        return tf.transpose(delta_t), condition
 
     def newton_type_update_full_global(
             self,
             lhs,
-            rhs,
-            psd
+            rhs
     ):
-        delta_t = tf.squeeze(tf.matrix_solve_ls(
+        delta_t, condition = op_utils.robust_solve(
             lhs,
-            # (full_data_model.hessians + tf.transpose(full_data_model.hessians, perm=[0, 2, 1])) / 2,  # symmetrization, don't need this with closed forms
-            tf.expand_dims(rhs, axis=-1),
-            fast=psd and pkg_constants.CHOLESKY_LSTSQS
-        ), axis=-1)
+            rhs,
+            cholesky=pkg_constants.CHOLESKY_LSTSQS
+        )
         nr_update_full = tf.transpose(delta_t)
 
-        return nr_update_full
+        return nr_update_full, condition
 
     def newton_type_update_batched_global(
             self,
             lhs,
-            rhs,
-            psd
+            rhs
     ):
-        delta_batched_t = tf.squeeze(tf.matrix_solve_ls(
+        delta_batched_t, condition = op_utils.robust_solve(
             lhs,
-            tf.expand_dims(rhs, axis=-1),
-            fast=psd and pkg_constants.CHOLESKY_LSTSQS
-        ), axis=-1)
+            rhs,
+            cholesky=pkg_constants.CHOLESKY_LSTSQS
+        )
         nr_update_batched = tf.transpose(delta_batched_t)
 
-        return nr_update_batched
+        return nr_update_batched, condition
+
+
+class LBFGSGraphGLM:
+    """
+    Define a limited-memory BFGS update on the full data set which is batched across features.
+
+    Each feature keeps its own history of the last pkg_constants.LBFGS_HISTORY_SIZE parameter and
+    gradient differences in graph variables. The direction is evaluated with the two-loop recursion
+    from the analytic gradients of the full data model, so that no [features, p, p] systems are formed.
+    The step size is chosen per feature by line_search_update().
+
+    The update lbfgs_update_full is applied together with lbfgs_state_update which writes the history.
+    The history is discarded if the previous training step was not an L-BFGS step.
+    """
+    model_vars: ModelVarsGLM
+    full_data_model: FullDataModelGraphGLM
+    gradients_full: tf.Tensor
+
+    lbfgs_update_full: Union[tf.Tensor, None]
+    lbfgs_state_update: Union[tf.Operation, None]
+    lbfgs_step_size: Union[tf.Tensor, None]
+
+    def __init__(
+            self,
+            provide_optimizers,
+            train_mu,
+            train_r
+    ):
+        if (train_mu or train_r) and provide_optimizers.get("lbfgs", False):
+            with tf.name_scope("lbfgs"):
+                self.lbfgs_update_full, self.lbfgs_step_size, self.lbfgs_state_update = self.build_lbfgs()
+        else:
+            self.lbfgs_update_full = None
+            self.lbfgs_step_size = None
+            self.lbfgs_state_update = None
+
+    def build_lbfgs(self):
+        params = self.model_vars.params
+        dtype = params.dtype.base_dtype
+        history_size = pkg_constants.LBFGS_HISTORY_SIZE
+        shape = params.shape.as_list()
+        global_step = tf.train.get_or_create_global_step()
+
+        # State of the optimizer, the history is ordered from the oldest to the latest pair.
+        s_history = tf.Variable(tf.zeros([history_size] + shape, dtype=dtype), trainable=False, name="s_history")
+        y_history = tf.Variable(tf.zeros([history_size] + shape, dtype=dtype), trainable=False, name="y_history")
+        rho_history = tf.Variable(tf.zeros([history_size, shape[1]], dtype=dtype), trainable=False, name="rho")
+        params_prev = tf.Variable(tf.zeros(shape, dtype=dtype), trainable=False, name="params_prev")
+        gradients_prev = tf.Variable(tf.zeros(shape, dtype=dtype), trainable=False, name="gradients_prev")
+        last_step = tf.Variable(tf.constant(-1, dtype=global_step.dtype.base_dtype), trainable=False, name="last_step")
+
+        gradients = tf.where(tf.is_nan(self.gradients_full), tf.zeros_like(self.gradients_full), self.gradients_full)
+        params_current = tf.identity(params)
+
+        # Add the pair of the previous step to the history of each feature which satisfies the curvature condition.
+        is_continued = tf.equal(global_step, last_step)
+        s = params_current - params_prev
+        y = gradients - gradients_prev
+        sy = tf.reduce_sum(s * y, axis=0)
+        push = tf.logical_and(is_continued, tf.logical_and(sy > 0, tf.is_finite(sy)))
+
+        def _update_history(history, value):
+            history_new = tf.concat([history[1:], tf.expand_dims(value, axis=0)], axis=0)
+            mask = tf.broadcast_to(push, tf.shape(history_new))
+            history_new = tf.where(mask, history_new, history)
+            # Start with an empty history if the optimizer is (re-)started:
+            return tf.where(
+                tf.broadcast_to(is_continued, tf.shape(history_new)),
+                history_new,
+                tf.zeros_like(history_new)
+            )
+
+        s_new = _update_history(s_history, s)
+        y_new = _update_history(y_history, y)
+        rho_new = _update_history(rho_history, tf.where(push, tf.reciprocal(sy), tf.zeros_like(sy)))
+
+        # Two-loop recursion, empty entries of the history have rho = 0 and do not contribute.
+        q = gradients
+        alphas = []
+        for i in reversed(range(history_size)):
+            alpha = rho_new[i] * tf.reduce_sum(s_new[i] * q, axis=0)
+            q = q - tf.expand_dims(alpha, axis=0) * y_new[i]
+            alphas.insert(0, alpha)
+
+        # Scaling of the initial inverse hessian approximation: based on the latest pair if there is one
+        # and such that the first step is at most of unit length otherwise.
+        yy = tf.reduce_sum(y_new[-1] * y_new[-1], axis=0)
+        has_history = rho_new[-1] > 0
+        gradient_norm = tf.sqrt(tf.reduce_sum(gradients * gradients, axis=0))
+        gamma = tf.where(
+            has_history,
+            tf.reduce_sum(s_new[-1] * y_new[-1], axis=0) / tf.where(has_history, yy, tf.ones_like(yy)),
+            tf.reciprocal(tf.maximum(gradient_norm, tf.ones_like(gradient_norm)))
+        )
+        r = tf.expand_dims(gamma, axis=0) * q
+        for i in range(history_size):
+            beta = rho_new[i] * tf.reduce_sum(y_new[i] * r, axis=0)
+            r = r + tf.expand_dims(alphas[i] - beta, axis=0) * s_new[i]
+
+        update, step_size = self.line_search_update(r)
+
+        # The state is written after all values above were read from the current state.
+        with tf.control_dependencies([update, s_new, y_new, rho_new, params_current]):
+            state_update = tf.group(
+                tf.assign(s_history, s_new),
+                tf.assign(y_history, y_new),
+                tf.assign(rho_history, rho_new),
+                tf.assign(params_prev, params_current),
+                tf.assign(gradients_prev, gradients),
+                # The next L-BFGS step continues this one if no other optimizer was run in between:
+                tf.assign(last_step, global_step + 1)
+            )
+
+        return update, step_size, state_update
 
 
 class TrainerGraphGLM:
@@ -512,8 +767,10 @@ class TrainerGraphGLM:
         with tf.name_scope("training_graphs"):
             global_step = tf.train.get_or_create_global_step()
 
-            # Create trainers that produce training operations.
-            if train_loc or train_scale:
+            # Create trainers that produce training operations. The trainers on batched and on
+            # full data are only built if the training strategy uses them.
+            if (train_loc or train_scale) and provide_optimizers.get("batched", True) and \
+                    self.gradients_batch is not None:
                 trainer_batch = train_utils.MultiTrainer(
                     variables=self.model_vars.params,
                     gradients=self.gradients_batch,
@@ -531,12 +788,16 @@ class TrainerGraphGLM:
                 trainer_batch = None
                 batch_gradient = None
 
-            if train_loc or train_scale:
+            if (train_loc or train_scale) and provide_optimizers.get("full", True):
                 trainer_full = train_utils.MultiTrainer(
                     variables=self.model_vars.params,
                     gradients=self.gradients_full,
                     newton_delta=self.nr_update_full,
                     irls_delta=self.irls_update_full,
+                    newton_ls_delta=self.nr_ls_update_full,
+                    irls_ls_delta=self.irls_ls_update_full,
+                    lbfgs_delta=self.lbfgs_update_full,
+                    lbfgs_state_update=self.lbfgs_state_update,
                     learning_rate=self.learning_rate,
                     global_step=global_step,
                     apply_gradients=lambda grad: tf.where(tf.is_nan(grad), tf.zeros_like(grad), grad),
@@ -549,21 +810,6 @@ class TrainerGraphGLM:
                 trainer_full = None
                 full_gradient = None
 
-        # # ### BFGS implementation using SciPy L-BFGS
-        # with tf.name_scope("bfgs"):
-        #     feature_idx = tf.placeholder(dtype="int64", shape=())
-        #
-        #     X_s = tf.gather(X, feature_idx, axis=1)
-        #     a_s = tf.gather(a, feature_idx, axis=1)
-        #     b_s = tf.gather(b, feature_idx, axis=1)
-        #
-        #     model = BasicModelGraph(X_s, design_loc, design_scale, a_s, b_s, size_factors=size_factors)
-        #
-        #     trainer = tf.contrib.opt.ScipyOptimizerInterface(
-        #         model.loss,
-        #         method='L-BFGS-B',
-        #         options={'maxiter': maxiter})
-
         self.global_step = global_step
 
         self.trainer_batch = trainer_batch
@@ -579,7 +825,7 @@ class TrainerGraphGLM:
         pass
 
 
-class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, TrainerGraphGLM):
+class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, LBFGSGraphGLM, TrainerGraphGLM):
     """
     The estimator graphs are all graph necessary to perform parameter updates and to
     summarise a current parameter estimate.
@@ -608,6 +854,8 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
             num_scale_params,
             graph: tf.Graph,
             batch_size: int,
+            design_loc: np.ndarray,
+            design_scale: np.ndarray,
             constraints_loc: xr.DataArray,
             constraints_scale: xr.DataArray,
             dtype
@@ -623,6 +871,10 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
         :param num_design_scale_params: int
             Number of parameters per feature in scale model.
         :param graph: tf.Graph
+        :param design_loc: nd.array (design groups x mean model parameters)
+            Unique rows of the location design model.
+        :param design_scale: nd.array (design groups x dispersion model parameters)
+            Unique rows of the scale design model.
         :param constraints_loc: tensor (all parameters x dependent parameters)
             Tensor that encodes how complete parameter set which includes dependent
             parameters arises from indepedent parameters: all = <constraints, indep>.
@@ -647,16 +899,27 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
         self.num_scale_params = num_scale_params
         self.batch_size = batch_size
 
-        self.constraints_loc = self._set_constraints(
-            constraints=constraints_loc,
-            num_design_params=self.num_design_loc_params,
-            dtype=dtype
-        )
-        self.constraints_scale = self._set_constraints(
-            constraints=constraints_scale,
-            num_design_params=self.num_design_scale_params,
-            dtype=dtype
-        )
+        # The design matrices are cached in non-checkpointed variables of shape (design groups x parameters),
+        # batches only carry the group index of each observation. All data-dependent inputs are loaded by
+        # feeding `data_placeholders` to `data_init_ops`, so that this graph can be reused for all data sets
+        # of the same shape.
+        self.data_placeholders = {}
+        with tf.name_scope("input_design"):
+            self.design_loc = self._data_variable(name="design_loc", shape=design_loc.shape, dtype=dtype)
+            self.design_scale = self._data_variable(name="design_scale", shape=design_scale.shape, dtype=dtype)
+
+            self.constraints_loc = self._set_constraints(
+                constraints=constraints_loc,
+                num_design_params=self.num_design_loc_params,
+                name="constraints_loc",
+                dtype=dtype
+            )
+            self.constraints_scale = self._set_constraints(
+                constraints=constraints_scale,
+                num_design_params=self.num_design_scale_params,
+                name="constraints_scale",
+                dtype=dtype
+            )
 
         self.learning_rate = tf.placeholder(dtype, shape=(), name="learning_rate")
 
@@ -681,6 +944,12 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
             train_mu=train_loc,
             train_r=train_scale
         )
+        LBFGSGraphGLM.__init__(
+            self=self,
+            provide_optimizers=provide_optimizers,
+            train_mu=train_loc,
+            train_r=train_scale
+        )
         TrainerGraphGLM.__init__(
             self=self,
             provide_optimizers=provide_optimizers,
@@ -693,9 +962,27 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
             self.init_op = tf.global_variables_initializer()
             self.init_ops = []
 
+    def _data_variable(
+            self,
+            name,
+            shape,
+            dtype
+    ):
+        """
+        Creates a variable which caches data-dependent input and registers its initialization.
+
+        :param name: key of the placeholder in `data_placeholders`
+        :param shape: static shape of the input
+        :param dtype: data type of the input
+        :return: tf.Variable, loaded by `data_init_ops`
+        """
+        var = op_utils.caching_placeholder(dtype=dtype, shape=shape, name=name, collections=[], use_resource=True)
+        self.data_placeholders[name] = var.initial_value
+        self.data_init_ops.append(var.initializer)
+        return var
+
     def _set_out_var(
             self,
-            feature_isnonzero,
             dtype
     ):
         # ### output values:
@@ -704,6 +991,12 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
             logger.debug(" ** Build training graph: output")
             bounds_min, bounds_max = self.param_bounds(dtype)
 
+            feature_isnonzero = self._data_variable(
+                name="feature_isnonzero",
+                shape=[self.num_features],
+                dtype=tf.bool
+            )
+
             param_nonzero_a_var = tf.broadcast_to(feature_isnonzero, [self.num_loc_params, self.num_features])
             alt_a = tf.broadcast_to(bounds_min["a_var"], [self.num_loc_params, self.num_features])
             a_var = tf.where(
@@ -727,6 +1020,7 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
             self,
             constraints,
             num_design_params,
+            name,
             dtype
     ):
         if constraints is None:
@@ -736,7 +1030,7 @@ class EstimatorGraphGLM(TFEstimatorGraph, GradientGraphGLM, NewtonGraphGLM, Trai
             )
         else:
             assert constraints.shape[0] == num_design_params, "constraint dimension mismatch"
-            return tf.cast(constraints, dtype=dtype)
+            return self._data_variable(name=name, shape=constraints.shape, dtype=dtype)
 
     @abc.abstractmethod
     def param_bounds(self):
@@ -25,6 +25,8 @@ class FIMGLM:
             self,
             batched_data: tf.data.Dataset,
             sample_indices: tf.Tensor,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -40,6 +42,10 @@ class FIMGLM:
         :param batched_data:
             Dataset iterator over mini-batches of data (used for training) or tf.Tensors of mini-batch.
         :param sample_indices: Indices of samples to be used.
+        :param design_loc: tensor (design groups x mean model parameters)
+            Unique rows of the location design model; the batches contain the group index of each observation.
+        :param design_scale: tensor (design groups x dispersion model parameters)
+            Unique rows of the scale design model; the batches contain the group index of each observation.
         :param constraints_loc: np.ndarray (constraints on mean model x mean model parameters)
             Constraints for location model.
             Array with constraints in rows and model parameters in columns.
@@ -87,6 +93,8 @@ class FIMGLM:
         fim_a, fim_b = self.analytic(
             batched_data=batched_data,
             sample_indices=sample_indices,
+            design_loc=design_loc,
+            design_scale=design_scale,
             constraints_loc=constraints_loc,
             constraints_scale=constraints_scale,
             model_vars=model_vars,
@@ -102,6 +110,8 @@ class FIMGLM:
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -21,6 +21,8 @@ class HessiansGLM:
             self,
             batched_data: tf.data.Dataset,
             sample_indices: tf.Tensor,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -36,6 +38,10 @@ class HessiansGLM:
         :param batched_data:
             Dataset iterator over mini-batches of data (used for training) or tf.Tensors of mini-batch.
         :param sample_indices: Indices of samples to be used.
+        :param design_loc: tensor (design groups x mean model parameters)
+            Unique rows of the location design model; the batches contain the group index of each observation.
+        :param design_scale: tensor (design groups x dispersion model parameters)
+            Unique rows of the scale design model; the batches contain the group index of each observation.
         :param constraints_loc: np.ndarray (constraints on mean model x mean model parameters)
             Constraints for location model.
             Array with constraints in rows and model parameters in columns.
@@ -86,6 +92,8 @@ class HessiansGLM:
             H = self.byobs(
                 batched_data=batched_data,
                 sample_indices=sample_indices,
+                design_loc=design_loc,
+                design_scale=design_scale,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 model_vars=model_vars,
@@ -96,6 +104,8 @@ class HessiansGLM:
             H = self.byfeature(
                 batched_data=batched_data,
                 sample_indices=sample_indices,
+                design_loc=design_loc,
+                design_scale=design_scale,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 model_vars=model_vars,
@@ -106,6 +116,8 @@ class HessiansGLM:
             H = self.tf_byfeature(
                 batched_data=batched_data,
                 sample_indices=sample_indices,
+                design_loc=design_loc,
+                design_scale=design_scale,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 model_vars=model_vars,
@@ -149,6 +161,8 @@ class HessiansGLM:
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -161,6 +175,8 @@ class HessiansGLM:
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -173,6 +189,8 @@ class HessiansGLM:
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -22,6 +22,8 @@ class JacobiansGLM:
             batched_data: tf.data.Dataset,
             sample_indices: tf.Tensor,
             batch_model,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -40,6 +42,10 @@ class JacobiansGLM:
             Indices of samples to be used.
         :param batch_model: BasicModelGraph instance
             Allows evaluation of jacobian via tf.gradients as it contains model graph.
+        :param design_loc: tensor (design groups x mean model parameters)
+            Unique rows of the location design model; the batches contain the group index of each observation.
+        :param design_scale: tensor (design groups x dispersion model parameters)
+            Unique rows of the scale design model; the batches contain the group index of each observation.
         :param constraints_loc: np.ndarray (constraints on mean model x mean model parameters)
             Constraints for location model.
             Array with constraints in rows and model parameters in columns.
@@ -87,6 +93,8 @@ class JacobiansGLM:
             J = self.analytic(
                 batched_data=batched_data,
                 sample_indices=sample_indices,
+                design_loc=design_loc,
+                design_scale=design_scale,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 model_vars=model_vars,
@@ -98,6 +106,8 @@ class JacobiansGLM:
                 batched_data=batched_data,
                 sample_indices=sample_indices,
                 batch_model=batch_model,
+                design_loc=design_loc,
+                design_scale=design_scale,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 model_vars=model_vars,
@@ -143,6 +153,8 @@ class JacobiansGLM:
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -156,6 +168,8 @@ class JacobiansGLM:
             batched_data,
             sample_indices,
             batch_model,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
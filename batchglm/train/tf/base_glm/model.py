@@ -18,6 +18,31 @@ ESTIMATOR_PARAMS.update({
 })
 
 
+def unpack_batch(data):
+    """
+    Unpacks a batch of data as yielded by the `fetch_fn` of an estimator.
+
+    :param data: tuple (X, design_idx, size_factors) or (X, design_idx) if there are no size factors
+    :return: tuple (X, design_idx, size_factors) with size_factors set to None if absent
+    """
+    if len(data) == 3:
+        return tuple(data)
+    X, design_idx = data
+    return X, design_idx, None
+
+
+def gather_batch_features(data, idx):
+    """
+    Restricts a batch of data as yielded by the `fetch_fn` of an estimator to a subset of features.
+
+    :param data: tuple (X, design_idx, size_factors) or (X, design_idx) if there are no size factors
+    :param idx: 1D tensor of feature indices to keep
+    :return: tuple of the same structure as `data` with X restricted to the columns `idx`
+    """
+    X = tf.gather(data[0], indices=idx, axis=1)
+    return (X,) + tuple(data[1:])
+
+
 class ProcessModelGLM(ProcessModelBase):
 
     @abc.abstractmethod
@@ -42,7 +67,18 @@ class ModelVarsGLM(ProcessModelGLM):
     a_var: tf.Variable
     b_var: tf.Variable
     params: tf.Variable
+    init_a_ph: tf.Tensor
+    init_b_ph: tf.Tensor
     converged: np.ndarray
+    converged_mask: tf.Variable
+    converged_ph: tf.Tensor
+    assign_converged: tf.Operation
+    convergence_metric: tf.Variable
+    convergence_metric_ph: tf.Tensor
+    assign_convergence_metric: tf.Operation
+    train_stage: tf.Variable
+    train_stage_ph: tf.Tensor
+    assign_train_stage: tf.Operation
 
     def __init__(
             self,
@@ -57,9 +93,9 @@ class ModelVarsGLM(ProcessModelGLM):
 
         :param dtype: Precision used in tensorflow.
         :param init_a: nd.array (mean model size x features)
-            Initialisation for all parameters of mean model.
+            Initialisation for all parameters of mean model. Defines the shape of `init_a_ph`.
         :param init_b: nd.array (dispersion model size x features)
-            Initialisation for all parameters of dispersion model.
+            Initialisation for all parameters of dispersion model. Defines the shape of `init_b_ph`.
         :param constraints_loc: tensor (all parameters x dependent parameters)
             Tensor that encodes how complete parameter set which includes dependent
             parameters arises from indepedent parameters: all = <constraints, indep>.
@@ -74,12 +110,13 @@ class ModelVarsGLM(ProcessModelGLM):
         """
         with tf.name_scope(name):
             with tf.name_scope("initialization"):
+                # The initial values are fed when running the initializer of `params`,
+                # so that the graph can be reused for other initializations of the same shape.
+                self.init_a_ph = tf.placeholder(dtype, shape=np.shape(init_a), name="init_a")
+                self.init_b_ph = tf.placeholder(dtype, shape=np.shape(init_b), name="init_b")
 
-                init_a = tf.convert_to_tensor(init_a, dtype=dtype)
-                init_b = tf.convert_to_tensor(init_b, dtype=dtype)
-
-                init_a = self.tf_clip_param(init_a, "a_var")
-                init_b = self.tf_clip_param(init_b, "b_var")
+                init_a = self.tf_clip_param(self.init_a_ph, "a_var")
+                init_b = self.tf_clip_param(self.init_b_ph, "b_var")
 
         # Param is the only tf.Variable in the graph.
         # a_var and b_var have to be slices of params.
@@ -113,15 +150,81 @@ class ModelVarsGLM(ProcessModelGLM):
         # Properties to follow gene-wise convergence.
         self.converged = np.repeat(a=False, repeats=self.params.shape[1])  # Initialise to non-converged.
         self.n_features = self.params.shape[1]
+        # The convergence status is mirrored into the graph so that feature-wise
+        # termination can be evaluated at runtime without rebuilding the graph.
+        self.converged_mask = tf.Variable(
+            self.converged,
+            dtype=tf.bool,
+            trainable=False,
+            name="converged"
+        )
+        self.converged_ph = tf.placeholder(tf.bool, shape=self.converged.shape, name="converged_ph")
+        self.assign_converged = tf.assign(self.converged_mask, self.converged_ph)
+        # The progress of `train_sequence()` is kept in the graph as well so that it is part of the checkpoints:
+        # the last feature-wise convergence metric (NaN if not evaluated yet in this stage) and
+        # the index of the training stage in progress (-1 if no training sequence is in progress).
+        self.convergence_metric = tf.Variable(
+            np.tile(np.nan, self.converged.shape),
+            dtype=dtype,
+            trainable=False,
+            name="convergence_metric"
+        )
+        self.convergence_metric_ph = tf.placeholder(dtype, shape=self.converged.shape, name="convergence_metric_ph")
+        self.assign_convergence_metric = tf.assign(self.convergence_metric, self.convergence_metric_ph)
+        self.train_stage = tf.Variable(-1, dtype=tf.int64, trainable=False, name="train_stage")
+        self.train_stage_ph = tf.placeholder(tf.int64, shape=(), name="train_stage_ph")
+        self.assign_train_stage = tf.assign(self.train_stage, self.train_stage_ph)
         #self.params_by_gene = params_by_gene
         #self.a_by_gene = a_by_gene
         #self.b_by_gene = b_by_gene
 
+    def gather_features(self, idx):
+        """
+        Restricts the model variables to a subset of features.
+
+        :param idx: 1D tensor of feature indices to keep
+        :return: ModelVarsSubsetGLM
+        """
+        return ModelVarsSubsetGLM(model_vars=self, idx=idx)
+
     @abc.abstractmethod
     def param_bounds(self, dtype):
         pass
 
 
+class ModelVarsSubsetGLM:
+    """ View on the columns of a subset of features of ModelVarsGLM.
+
+    params, a_var and b_var are defined as in ModelVarsGLM but restricted to the features `idx`
+    so that model statistics can be evaluated on these features only.
+    """
+
+    a_var: tf.Tensor
+    b_var: tf.Tensor
+    params: tf.Tensor
+    idx: tf.Tensor
+
+    def __init__(
+            self,
+            model_vars: ModelVarsGLM,
+            idx
+    ):
+        """
+
+        :param model_vars: ModelVarsGLM
+            Model variables to restrict.
+        :param idx: 1D tensor of feature indices to keep
+        """
+        params = tf.gather(model_vars.params, indices=idx, axis=1)
+        a_var = params[0:model_vars.a_var.shape[0]]
+        b_var = params[model_vars.a_var.shape[0]:]
+
+        self.a_var = model_vars.tf_clip_param(a_var, "a_var")
+        self.b_var = model_vars.tf_clip_param(b_var, "b_var")
+        self.params = params
+        self.idx = idx
+
+
 class BasicModelGraphGLM(ProcessModelGLM):
     """
 
@@ -129,6 +232,7 @@ class BasicModelGraphGLM(ProcessModelGLM):
     X: tf.Tensor
     design_loc: tf.Tensor
     design_scale: tf.Tensor
+    design_idx: tf.Tensor
     constraints_loc: tf.Tensor
     constraints_scale: tf.Tensor
 
@@ -149,7 +253,8 @@ class BasicModelGraphGLM(ProcessModelGLM):
             a_var,
             b_var,
             dtype,
-            size_factors=None
+            size_factors=None,
+            design_idx=None
     ):
         """
 
@@ -157,8 +262,10 @@ class BasicModelGraphGLM(ProcessModelGLM):
             The input data.
         :param design_loc: Some matrix format (observations x mean model parameters)
             The location design model. Optional if already specified in `data`
+            If `design_idx` is given, this only contains the unique rows (design groups x mean model parameters).
         :param design_scale: Some matrix format (observations x dispersion model parameters)
             The scale design model. Optional if already specified in `data`
+            If `design_idx` is given, this only contains the unique rows (design groups x dispersion model parameters).
         :param constraints_loc: tensor (all parameters x dependent parameters)
             Tensor that encodes how complete parameter set which includes dependent
             parameters arises from indepedent parameters: all = <constraints, indep>.
@@ -172,20 +279,27 @@ class BasicModelGraphGLM(ProcessModelGLM):
         :param b_var: tf.Variable or tensor (dispersion model size x features)
             Dispersion model variables.
         :param dtype: Precision used in tensorflow.
-        :param size_factors: tensor (observations x features)
-            Constant scaling factors for mean model, such as library size factors.
+        :param size_factors: tensor (observations)
+            Constant scaling factors for mean model in the linker space, such as log library size factors.
+        :param design_idx: tensor (observations)
+            Index of the row in `design_loc` and `design_scale` of each observation.
+            If given, the linear predictors are evaluated once per design group and gathered.
         """
         eta_loc = tf.matmul(design_loc, tf.matmul(constraints_loc, a_var))
+        eta_scale = tf.matmul(design_scale, tf.matmul(constraints_scale, b_var))
+        if design_idx is not None:
+            eta_loc = tf.gather(eta_loc, design_idx)
+            eta_scale = tf.gather(eta_scale, design_idx)
+
         if size_factors is not None:
-            eta_loc = tf.add(eta_loc, size_factors)
+            eta_loc = tf.add(eta_loc, tf.expand_dims(size_factors, axis=-1))
         eta_loc = self.tf_clip_param(eta_loc, "eta_loc")
-
-        eta_scale = tf.matmul(design_scale, tf.matmul(constraints_scale, b_var))
         eta_scale = self.tf_clip_param(eta_scale, "eta_scale")
 
         self.X = X
         self.design_loc = design_loc
         self.design_scale = design_scale
+        self.design_idx = design_idx
         self.constraints_loc = constraints_loc
         self.constraints_scale = constraints_scale
         self.a_var = a_var
@@ -2,4 +2,5 @@ from .estimator import EstimatorAll
 from .estimator_graph import EstimatorGraphAll
 from .fim import FIMGLMALL
 from .jacobians import JacobiansGLMALL
-from .hessians import HessianGLMALL
\ No newline at end of file
+from .hessians import HessianGLMALL
+from .statistics import StatisticsGLMALL
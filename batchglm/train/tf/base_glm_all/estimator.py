@@ -7,12 +7,18 @@ from enum import Enum
 import tensorflow as tf
 
 import numpy as np
+import xarray as xr
 
 from .estimator_graph import EstimatorGraphAll
-from .external import MonitoredTFEstimator, InputData, _Model_GLM
+from .external import MonitoredTFEstimator, InputData, _Model_GLM, op_utils, train_utils
+from .external import stacked_inv_sym
+from .external import pkg_constants
 
 logger = logging.getLogger(__name__)
 
+# Estimator graphs which are shared by all estimators with the same template key, see `EstimatorAll.__init__()`:
+_graph_templates = {}
+
 
 class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
     """
@@ -41,6 +47,11 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
             termination_type: str = "by_feature",
             extended_summary=False,
             noise_model: str = None,
+            input_pipeline: str = "py_func",
+            reuse_graph: bool = False,
+            training_strategy: Union[list, str, Enum] = "AUTO",
+            sampler: str = "AUTO",
+            block_size: int = None,
             dtype="float64",
     ):
         """
@@ -76,10 +87,16 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
         :param quick_scale: bool
             Whether `scale` will be fitted faster and maybe less accurate.
         :param model: EstimatorGraph
-            EstimatorGraph to use. Basically for debugging.
+            EstimatorGraph to use instead of building a new one. It has to be built for data of the same shape
+            and with the same settings, e.g. `estimator.model` of another estimator. Requires
+            `input_pipeline="resident"`.
         :param provide_optimizers:
 
             E.g. {"gd": True, "adam": True, "adagrad": True, "rmsprop": True, "nr": True, "irls": True}
+            The line search variants of the Newton-type optimizers are built if "nr_ls" or "irls_ls" are set
+            and L-BFGS is built if "lbfgs" is set. The optimizers on batched and on full data can be left out
+            by setting "batched" or "full" to False.
+            If None, only the optimizers and statistics which are used by `training_strategy` are built.
         :param termination_type:
         :param extended_summary:
         :param dtype: Precision used in tensorflow.
@@ -87,6 +104,38 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
         Useful in scenarios where fitting the exact `scale` is not absolutely necessary.
         :param extended_summary: Include detailed information in the summaries.
             Will drastically increase runtime of summary writer, use only for debugging.
+        :param input_pipeline: How batches are fetched from `input_data`:
+
+            - "py_func": fetch each batch by calling the getters of `input_data` via tf.py_func.
+              Works with any InputData, including out-of-memory data.
+            - "resident": load the data, the design group index and the size factors once into graph-side
+              variables and fetch batches via tf.gather. Requires that the data fits into memory.
+            - "streaming": like "py_func", but aligned to the chunks of the data matrix (see
+              `InputData.chunk_size`), e.g. of a file which was opened with `InputData.from_file()`.
+              Full data passes read the chunks in storage order with pkg_constants.STREAMING_READ_AHEAD
+              batches of read-ahead and batched training uses the "blocks" sampler by default.
+              The batches of full data passes have at least one whole chunk, i.e. they are larger than
+              `4 * batch_size` observations if the chunks are; the batches of batched training keep `batch_size`.
+        :param sampler: How the observations of the batches of batched training are drawn:
+
+            - "window": shuffle the observations with a buffer of twice the batch size, i.e. draw each batch
+              from a window which slides over the observations in storage order.
+            - "blocks": shuffle the order of blocks of `block_size` consecutive observations and the
+              observations within each block. Gives random batches which only touch a few blocks.
+            - "AUTO": "blocks" if the data matrix is chunked (see `InputData.chunk_size`) or streamed,
+              "window" otherwise.
+        :param block_size: Number of observations per block of the "blocks" sampler.
+            Defaults to the chunk size of the data matrix, so that each block is read from one chunk,
+            or to `batch_size` if the data matrix is not chunked.
+        :param training_strategy: Training strategy which is used to derive `provide_optimizers` if it is None:
+            entry or name of an entry of `TrainingStrategies` or list of settings of `train()`.
+            Other strategies can still be passed to `train_sequence()` if they only use the built optimizers.
+        :param reuse_graph: Share the graph with all estimators of the same template key, i.e. of the same noise
+            model, data shape, design shape, dtype and optimizers. Such estimators only feed their data
+            and initial parameters into the shared graph, and `initialize()` re-initializes an idle session of a
+            closed estimator instead of creating a new one. Requires `input_pipeline="resident"`.
+            Estimators which share a graph have to be trained one after another as the graph holds the
+            feature-wise convergence status. See also `clear_graph_templates()`.
         """
         if noise_model == "nb":
             from .external_nb import EstimatorGraph
@@ -100,31 +149,202 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
         if np.linalg.matrix_rank(input_data.design_scale) != np.linalg.matrix_rank(input_data.design_scale.T):
             raise ValueError("design_scale matrix is not full rank")
 
+        if input_pipeline not in ["resident", "py_func", "streaming"]:
+            raise ValueError("input_pipeline %s not recognized" % input_pipeline)
+        if (reuse_graph or model is not None) and input_pipeline != "resident":
+            # The py_func pipeline is bound to the input data of the estimator which built the graph.
+            raise ValueError("reusing a graph requires input_pipeline=\"resident\"")
+        self.input_pipeline = input_pipeline
+
+        if sampler.lower() == "auto":
+            if input_pipeline == "streaming" or input_data.chunk_size is not None:
+                sampler = "blocks"
+            else:
+                sampler = "window"
+        if sampler not in ["window", "blocks"]:
+            raise ValueError("sampler %s not recognized" % sampler)
+        if sampler == "blocks" and block_size is None:
+            block_size = input_data.chunk_size if input_data.chunk_size is not None else batch_size
+        self.sampler = sampler
+        self.block_size = block_size
+
+        if provide_optimizers is None:
+            provide_optimizers = self._provide_optimizers_by_strategy(training_strategy)
+
         # ### initialization
-        if model is None:
+        self._input_data = input_data
+        self._train_loc = True
+        self._train_scale = not quick_scale
+
+        (init_a, init_b) = self.init_par(
+            init_a=init_a,
+            init_b=init_b,
+            init_model=init_model
+        )
+        init_a = init_a.astype(dtype)
+        init_b = init_b.astype(dtype)
+
+        template_key = self._graph_template_key(
+            input_data=input_data,
+            batch_size=batch_size,
+            provide_optimizers=provide_optimizers,
+            termination_type=termination_type,
+            extended_summary=extended_summary,
+            dtype=dtype
+        )
+        if model is None and reuse_graph:
+            model = _graph_templates.get(template_key, None)
+        if model is not None:
+            if getattr(model, "template_key", None) != template_key:
+                raise ValueError("model was built for data of a different shape or with different settings")
+            logger.debug(" * Reusing graph")
+        else:
             if graph is None:
                 graph = tf.Graph()
 
-            self._input_data = input_data
-            self._train_loc = True
-            self._train_scale = not quick_scale
+            # ### prepare fetch_fn:
+            if input_pipeline == "resident":
+                fetch_fn, data_placeholders, data_init_op = self._resident_fetch_fn(
+                    graph=graph,
+                    input_data=input_data,
+                    dtype=dtype
+                )
+            else:
+                fetch_fn = self._py_func_fetch_fn(
+                    input_data=input_data,
+                    dtype=dtype
+                )
+                data_placeholders, data_init_op = {}, None
+
+            chunk_size = None
+            if input_pipeline == "streaming":
+                chunk_size = input_data.chunk_size
+                if chunk_size is None:
+                    logger.warning("input data is not chunked, streaming blocks of batch_size observations")
+                    chunk_size = batch_size
+
+            logger.debug(" * Building graph")
+            with graph.as_default():
+                # create model
+                model = EstimatorGraph(
+                    fetch_fn=fetch_fn,
+                    num_observations=input_data.num_observations,
+                    num_features=input_data.num_features,
+                    num_design_loc_params=input_data.num_design_loc_params,
+                    num_design_scale_params=input_data.num_design_scale_params,
+                    num_loc_params=input_data.num_loc_params,
+                    num_scale_params=input_data.num_scale_params,
+                    design_loc=input_data.design_loc_groups.values,
+                    design_scale=input_data.design_scale_groups.values,
+                    batch_size=batch_size,
+                    graph=graph,
+                    init_a=init_a,
+                    init_b=init_b,
+                    constraints_loc=input_data.constraints_loc,
+                    constraints_scale=input_data.constraints_scale,
+                    provide_optimizers=provide_optimizers,
+                    train_loc=self._train_loc,
+                    train_scale=self._train_scale,
+                    termination_type=termination_type,
+                    extended_summary=extended_summary,
+                    noise_model=self.noise_model,
+                    chunk_size=chunk_size,
+                    sampler=sampler,
+                    block_size=block_size,
+                    dtype=dtype
+                )
+            if data_init_op is not None:
+                # graph-side data has to be loaded before the input pipelines are initialized
+                model.data_init_ops.insert(0, data_init_op)
+            model.data_placeholders.update(data_placeholders)
+            model.template_key = template_key
+            # Sessions of closed estimators which can be re-initialized for the next estimator of this graph:
+            model.idle_sessions = []
+            if reuse_graph:
+                _graph_templates[template_key] = model
 
-            (init_a, init_b) = self.init_par(
-                init_a=init_a,
-                init_b=init_b,
-                init_model=init_model
-            )
-            init_a = init_a.astype(dtype)
-            init_b = init_b.astype(dtype)
+        logger.debug(" * Initialize graph")
+        MonitoredTFEstimator.__init__(self, model)
+        self.init_feed_dict = {
+            model.model_vars.init_a_ph: init_a,
+            model.model_vars.init_b_ph: init_b,
+        }
+        self.data_feed_dict = self._data_feed_dict(
+            input_data=input_data,
+            dtype=dtype
+        )
+        self._reuse_graph = reuse_graph
+        self._session_reusable = False
+
+    def _graph_template_key(
+            self,
+            input_data: InputData,
+            batch_size,
+            provide_optimizers,
+            termination_type,
+            extended_summary,
+            dtype
+    ):
+        """
+        Collects everything which determines the structure of the estimator graph.
+
+        Estimators with the same key can share one graph as they only differ in the fed data and initialization.
+        """
+        return (
+            self.noise_model,
+            self.input_pipeline,
+            np.dtype(dtype).name,
+            input_data.num_observations,
+            input_data.num_features,
+            input_data.num_design_loc_params,
+            input_data.num_design_scale_params,
+            input_data.num_loc_params,
+            input_data.num_scale_params,
+            input_data.num_design_groups,
+            input_data.size_factors is not None,
+            batch_size,
+            self.sampler,
+            self.block_size,
+            tuple(sorted(provide_optimizers.items())) if provide_optimizers is not None else None,
+            self._train_loc,
+            self._train_scale,
+            termination_type,
+            extended_summary,
+            pkg_constants.FUSED_STATISTICS,
+            pkg_constants.HESSIAN_MODE,
+            pkg_constants.JACOBIAN_MODE,
+            pkg_constants.SPARSE_KERNELS,
+        )
+
+    @staticmethod
+    def clear_graph_templates():
+        """
+        Forgets all shared graphs (see `reuse_graph`) and closes their idle sessions.
+        """
+        for model in _graph_templates.values():
+            while len(model.idle_sessions) > 0:
+                model.idle_sessions.pop().close()
+        _graph_templates.clear()
 
-        # ### prepare fetch_fn:
+    @staticmethod
+    def _py_func_fetch_fn(
+            input_data: InputData,
+            dtype
+    ):
+        """
+        Builds a `fetch_fn` which calls the getters of `input_data` via tf.py_func.
+
+        :param input_data: InputData
+        :param dtype: Precision used in tensorflow.
+        :return: fetch_fn
+        """
         def fetch_fn(idx):
             r"""
             Documentation of tensorflow coding style in this function:
             tf.py_func defines a python function (the getters of the InputData object slots)
             as a tensorflow operation. Here, the shape of the tensor is lost and
-            has to be set with set_shape. For size factors, we use explicit broadcasting
-            as explained below.
+            has to be set with set_shape. Size factors are yielded as a vector over observations
+            and are left out of the batch if there are none.
             """
             # Catch dimension collapse error if idx is only one element long, ie. 0D:
             if len(idx.shape) == 0:
@@ -139,23 +359,14 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
             X_tensor.set_shape(idx.get_shape().as_list() + [input_data.num_features])
             X_tensor = tf.cast(X_tensor, dtype=dtype)
 
-            design_loc_tensor = tf.py_func(
-                func=input_data.fetch_design_loc,
+            # The design matrices are graph constants, only the design group of each observation is fetched:
+            design_idx_tensor = tf.py_func(
+                func=input_data.fetch_design_group_idx,
                 inp=[idx],
-                Tout=input_data.design_loc.dtype,
+                Tout=input_data.design_group_idx.dtype,
                 stateful=False
             )
-            design_loc_tensor.set_shape(idx.get_shape().as_list() + [input_data.num_design_loc_params])
-            design_loc_tensor = tf.cast(design_loc_tensor, dtype=dtype)
-
-            design_scale_tensor = tf.py_func(
-                func=input_data.fetch_design_scale,
-                inp=[idx],
-                Tout=input_data.design_scale.dtype,
-                stateful=False
-            )
-            design_scale_tensor.set_shape(idx.get_shape().as_list() + [input_data.num_design_scale_params])
-            design_scale_tensor = tf.cast(design_scale_tensor, dtype=dtype)
+            design_idx_tensor.set_shape(idx.get_shape())
 
             if input_data.size_factors is not None:
                 size_factors_tensor = tf.log(tf.py_func(
@@ -165,59 +376,151 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
                     stateful=False
                 ))
                 size_factors_tensor.set_shape(idx.get_shape())
-                # Here, we broadcast the size_factor tensor to the batch size,
-                # note that this should not consum any more memory than
-                # keeping the 1D array and performing implicit broadcasting in 
-                # the arithmetic operations in the graph.
-                size_factors_tensor = tf.expand_dims(size_factors_tensor, axis=-1)
                 size_factors_tensor = tf.cast(size_factors_tensor, dtype=dtype)
+
+                # return idx, data
+                return idx, (X_tensor, design_idx_tensor, size_factors_tensor)
             else:
-                size_factors_tensor = tf.constant(0, shape=[1, 1], dtype=dtype)
-            size_factors_tensor = tf.broadcast_to(size_factors_tensor,
-                                                  shape=[tf.size(idx), input_data.num_features])
+                return idx, (X_tensor, design_idx_tensor)
+
+        return fetch_fn
+
+    @staticmethod
+    def _resident_fetch_fn(
+            graph: tf.Graph,
+            input_data: InputData,
+            dtype
+    ):
+        """
+        Builds a `fetch_fn` which gathers batches from graph-side copies of the input data
+        and of the design group index.
 
-            # return idx, data
-            return idx, (X_tensor, design_loc_tensor, design_scale_tensor, size_factors_tensor)
+        The data is held in variables which are initialized by feeding their placeholders,
+        see `_data_feed_dict()`. These variables are not part of the checkpoints.
 
-        logger.debug(" * Building graph")
+        :param graph: tf.Graph which will contain the estimator graph
+        :param input_data: InputData
+        :param dtype: Precision used in tensorflow.
+        :return: tuple (fetch_fn, data_placeholders, data_init_op)
+        """
         with graph.as_default():
-            # create model
-            model = EstimatorGraph(
-                fetch_fn=fetch_fn,
-                feature_isnonzero=input_data.feature_isnonzero,
-                num_observations=input_data.num_observations,
-                num_features=input_data.num_features,
-                num_design_loc_params=input_data.num_design_loc_params,
-                num_design_scale_params=input_data.num_design_scale_params,
-                num_loc_params=input_data.num_loc_params,
-                num_scale_params=input_data.num_scale_params,
-                batch_size=batch_size,
-                graph=graph,
-                init_a=init_a,
-                init_b=init_b,
-                constraints_loc=input_data.constraints_loc,
-                constraints_scale=input_data.constraints_scale,
-                provide_optimizers=provide_optimizers,
-                train_loc=self._train_loc,
-                train_scale=self._train_scale,
-                termination_type=termination_type,
-                extended_summary=extended_summary,
-                noise_model=self.noise_model,
-                dtype=dtype
-            )
+            with tf.name_scope("input_data"):
+                X_var = op_utils.caching_placeholder(
+                    dtype=dtype, shape=input_data.X.shape, name="X", collections=[], use_resource=True
+                )
+                design_idx_var = op_utils.caching_placeholder(
+                    dtype=input_data.design_group_idx.dtype, shape=input_data.design_group_idx.shape,
+                    name="design_idx", collections=[], use_resource=True
+                )
+                data_vars = {
+                    "X": X_var,
+                    "design_idx": design_idx_var,
+                }
+                if input_data.size_factors is not None:
+                    size_factors_var = op_utils.caching_placeholder(
+                        dtype=dtype, shape=input_data.size_factors.shape, name="size_factors", collections=[],
+                        use_resource=True
+                    )
+                    data_vars["size_factors"] = size_factors_var
+                else:
+                    size_factors_var = None
+
+                data_placeholders = {k: v.initial_value for k, v in data_vars.items()}
+                data_init_op = tf.group(*[v.initializer for v in data_vars.values()], name="data_init_op")
 
-        logger.debug(" * Initialize graph")
-        MonitoredTFEstimator.__init__(self, model)
+        def fetch_fn(idx):
+            # Catch dimension collapse error if idx is only one element long, ie. 0D:
+            if len(idx.shape) == 0:
+                idx = tf.expand_dims(idx, axis=0)
+
+            X_tensor = tf.gather(X_var, idx)
+            design_idx_tensor = tf.gather(design_idx_var, idx)
+
+            if size_factors_var is not None:
+                size_factors_tensor = tf.gather(size_factors_var, idx)
+                return idx, (X_tensor, design_idx_tensor, size_factors_tensor)
+            else:
+                return idx, (X_tensor, design_idx_tensor)
+
+        return fetch_fn, data_placeholders, data_init_op
+
+    def _data_feed_dict(
+            self,
+            input_data: InputData,
+            dtype
+    ):
+        """
+        Maps the placeholders of the data-dependent graph inputs (`model.data_placeholders`) to the values
+        of `input_data`.
+
+        :param input_data: InputData
+        :param dtype: Precision used in tensorflow.
+        :return: feed dict for `model.data_init_ops`
+        """
+        placeholders = self.model.data_placeholders
+        values = {
+            "design_loc": lambda: np.asarray(input_data.design_loc_groups.values, dtype=dtype),
+            "design_scale": lambda: np.asarray(input_data.design_scale_groups.values, dtype=dtype),
+            "constraints_loc": lambda: np.asarray(input_data.constraints_loc.values, dtype=dtype),
+            "constraints_scale": lambda: np.asarray(input_data.constraints_scale.values, dtype=dtype),
+            "feature_isnonzero": lambda: np.asarray(input_data.feature_isnonzero),
+            "X": lambda: np.asarray(input_data.X.values, dtype=dtype),
+            "design_idx": lambda: np.asarray(input_data.design_group_idx.values),
+            "size_factors": lambda: np.log(np.asarray(input_data.size_factors.values, dtype=dtype)),
+        }
+        if "X" in placeholders and input_data.is_sparse:
+            logger.warning("resident input pipeline densifies sparse input data")
+
+        return {ph: values[k]() for k, ph in placeholders.items()}
 
     def _scaffold(self):
         with self.model.graph.as_default():
             scaffold = tf.train.Scaffold(
                 init_op=self.model.init_op,
+                init_feed_dict=self.init_feed_dict,
                 summary_op=self.model.merged_summary,
                 saver=self.model.saver,
             )
         return scaffold
 
+    def initialize(self, **kwargs):
+        """
+        Initializes the session, the model variables and the graph-side data.
+
+        If the graph is shared (see `reuse_graph`) and no session options are given, an idle session of a closed
+        estimator of the same graph is re-initialized if there is one. Otherwise, a new session is created,
+        see `MonitoredTFEstimator.initialize()`.
+        """
+        reusable = self._reuse_graph and len(kwargs) == 0
+        if reusable and len(self.model.idle_sessions) > 0:
+            logger.debug(" * Reusing idle session")
+            self.close_session()
+            self.clear_cache()
+            self.feed_dict = {}
+            self.working_dir = None
+            self._checkpoint_hook = None
+
+            self.session = self.model.idle_sessions.pop()
+            self.run(self.model.init_op, feed_dict=self.init_feed_dict)
+            for op in self.model.data_init_ops:
+                self.run(op, feed_dict=self.data_feed_dict)
+            # The convergence mask was reset by `init_op`, the mirror on the shared graph has to follow:
+            self._restore_training_state()
+        else:
+            MonitoredTFEstimator.initialize(self, **kwargs)
+        self._session_reusable = reusable
+
+    def close_session(self):
+        """
+        Closes the session. The session of a shared graph is kept open for the next estimator of this graph.
+        """
+        if self._session_reusable and self.session is not None:
+            self.model.idle_sessions.append(self.session)
+            self.session = None
+            self._session_reusable = False
+            return True
+        return MonitoredTFEstimator.close_session(self)
+
     def train(self, *args,
               learning_rate=None,
               convergence_criteria="t_test",
@@ -263,6 +566,12 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
             - "Adagrad"
             - "RMSprop"
             - "GradientDescent" or "GD"
+            - "Newton" or "NR"
+            - "IRLS"
+            - "NR_LS" or "IRLS_LS": Newton-type updates of the full data set with a feature-wise line search.
+              Each feature only takes steps which decrease its loss.
+            - "LBFGS": limited-memory BFGS on the full data set with a history and a line search per feature.
+              It only uses the Jacobian and is suited for models with many coefficients.
 
             See :func:train_utils.MultiTrainer.train_op_by_name for further details.
         """
@@ -280,11 +589,15 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
                 optim_algo.lower() == "newton_raphson" or \
                 optim_algo.lower() == "nr" or \
                 optim_algo.lower() == "irls" or \
-                optim_algo.lower() == "iwls":
+                optim_algo.lower() == "iwls" or \
+                optim_algo.lower() == "newton_ls" or \
+                optim_algo.lower() == "nr_ls" or \
+                optim_algo.lower() == "irls_ls" or \
+                optim_algo.lower() == "iwls_ls":
             newton_type_mode = True
         # Set learning rae defaults if not set by user.
         if learning_rate is None:
-            if newton_type_mode:
+            if newton_type_mode or optim_algo.lower() == "lbfgs":
                 learning_rate = 1
             else:
                 learning_rate = 0.5
@@ -314,11 +627,17 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
 
         if train_mu or train_r:
             if use_batching:
+                if self.model.trainer_batch is None:
+                    raise ValueError("Training on batched data was not provided in initialization.")
                 loss = self.model.batched_data_model.loss
                 train_op = self.model.trainer_batch.train_op_by_name(optim_algo)
+                train_loss_by_feature = None
             else:
+                if self.model.trainer_full is None:
+                    raise ValueError("Training on full data was not provided in initialization.")
                 loss = self.model.full_data_model.loss
                 train_op = self.model.trainer_full.train_op_by_name(optim_algo)
+                train_loss_by_feature = self.model.full_data_model.norm_neg_log_likelihood_by_name(optim_algo)
 
             super().train(*args,
                           feed_dict={"learning_rate:0": learning_rate},
@@ -327,9 +646,16 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
                           stopping_criteria=stopping_criteria,
                           loss=loss,
                           train_op=train_op,
+                          train_loss_by_feature=train_loss_by_feature,
                           **kwargs)
 
-    def train_sequence(self, training_strategy):
+    def _resolve_training_strategy(self, training_strategy) -> list:
+        """
+        Returns the list of training settings of a training strategy.
+
+        :param training_strategy: entry or name of an entry of `TrainingStrategies` or list of training settings
+        :return: list of dicts with the keyword arguments of `train()`
+        """
         if isinstance(training_strategy, Enum):
             training_strategy = training_strategy.value
         elif isinstance(training_strategy, str):
@@ -338,13 +664,74 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
         if training_strategy is None:
             training_strategy = self.TrainingStrategies.DEFAULT.value
 
+        return training_strategy
+
+    def _provide_optimizers_by_strategy(self, training_strategy) -> dict:
+        """
+        Derives the optimizers which have to be built for a training strategy.
+
+        The trainers on batched and on full data are only built if a step of the strategy uses them,
+        see the keys "batched" and "full" of `provide_optimizers`.
+
+        :param training_strategy: see `_resolve_training_strategy()`
+        :return: provide_optimizers
+        """
+        provide_optimizers = {
+            "gd": False, "adam": False, "adagrad": False, "rmsprop": False,
+            "nr": False, "irls": False, "nr_ls": False, "irls_ls": False, "lbfgs": False,
+            "batched": False, "full": False
+        }
+        for d in self._resolve_training_strategy(training_strategy):
+            provide_optimizers[train_utils.MultiTrainer.optimizer_key(d.get("optim_algo", "gradient_descent"))] = True
+            # Same default as in `train()`:
+            if d.get("use_batching", True):
+                provide_optimizers["batched"] = True
+            else:
+                provide_optimizers["full"] = True
+        return provide_optimizers
+
+    def train_sequence(self, training_strategy):
+        """
+        Runs the stages of a training strategy one after another.
+
+        If the estimator was restored from a checkpoint of an interrupted training sequence, see `initialize()`,
+        the stages which were completed before are skipped and the interrupted stage only continues on the
+        features which have not converged yet. The training strategy has to be the same as before the interruption.
+        If a stop hook interrupts the training, e.g. `stop_at_step` of `initialize()`, the remaining stages are not run.
+
+        :param training_strategy: see `TrainingStrategy`.
+        """
+        training_strategy = self._resolve_training_strategy(training_strategy)
+
         logger.info("training strategy:\n%s", pprint.pformat(training_strategy))
 
+        resume_stage = self.train_stage
+        if resume_stage >= len(training_strategy):
+            raise ValueError(
+                "restored training stage #%d does not exist in a training strategy with %d stages" %
+                (resume_stage + 1, len(training_strategy))
+            )
         for idx, d in enumerate(training_strategy):
-            self.model.model_vars.converged = False
-            logger.info("Beginning with training sequence #%d", idx + 1)
+            if idx < resume_stage:
+                logger.info("Skipping training sequence #%d, completed before the checkpoint", idx + 1)
+                continue
+            elif idx == resume_stage:
+                logger.info(
+                    "Resuming training sequence #%d with %d of %d features converged",
+                    idx + 1,
+                    np.sum(self.model.model_vars.converged),
+                    self.model.model_vars.converged.shape[0]
+                )
+            else:
+                self.update_train_stage(idx)
+                self.update_converged(False, metric=np.nan)
+                logger.info("Beginning with training sequence #%d", idx + 1)
             self.train(**d)
+            if self._should_stop():
+                logger.info("Training sequence #%d interrupted at step %d", idx + 1, self.global_step)
+                return
             logger.info("Training sequence #%d complete", idx + 1)
+        self.update_train_stage(-1)
 
     @property
     def input_data(self) -> InputData:
@@ -376,17 +763,107 @@ class EstimatorAll(MonitoredTFEstimator, metaclass=abc.ABCMeta):
 
     @property
     def fisher_inv(self):
-        return self.to_xarray("fisher_inv", coords=self.input_data.data.coords)
+        return self.get_fisher_inv()
+
+    @property
+    def standard_errors(self):
+        return self.get_standard_errors()
+
+    def get_fisher_inv(self, features=None) -> xr.DataArray:
+        """
+        Evaluates the inverse of the Fisher information matrix, i.e. the inverse of the negative Hessian
+        of the full model, at the current parameters.
+
+        The Hessian is only evaluated on the selected features. It is inverted via the Cholesky
+        decomposition if it is positive definite and via the pseudo-inverse otherwise.
 
-    def finalize(self):
+        :param features: (optional) feature names, feature indices or boolean mask of the features to evaluate.
+            All features are evaluated if None.
+        :return: xr.DataArray (features x delta_var0 x delta_var1)
+        """
+        return self._run_feature_selection(
+            self.model.fisher_inv,
+            dims=("features", "delta_var0", "delta_var1"),
+            features=features,
+            from_hessians=lambda hessians: stacked_inv_sym(-hessians)
+        )
+
+    def get_standard_errors(self, features=None) -> xr.DataArray:
+        """
+        Evaluates the standard errors of the parameters, i.e. the square root of the diagonal of the
+        inverse Fisher information matrix, see get_fisher_inv().
+
+        :param features: (optional) feature names, feature indices or boolean mask of the features to evaluate.
+            All features are evaluated if None.
+        :return: xr.DataArray (features x delta_var0)
+        """
+        return self._run_feature_selection(
+            self.model.standard_errors,
+            dims=("features", "delta_var0"),
+            features=features,
+            from_hessians=lambda hessians: np.sqrt(np.diagonal(stacked_inv_sym(-hessians), axis1=-2, axis2=-1))
+        )
+
+    def _run_feature_selection(self, tensor, dims, features=None, from_hessians=None) -> xr.DataArray:
+        """
+        Evaluates `tensor` on the features selected by `features`.
+
+        If the hessian of all features was already evaluated at the current parameters, the result
+        is computed from it by `from_hessians` instead of another pass over the data.
+        """
+        feature_names = self.input_data.features
+        if features is None:
+            idx = np.arange(self.input_data.num_features)
+        else:
+            features = np.atleast_1d(np.asarray(features))
+            if features.dtype == bool:
+                idx = np.where(features)[0]
+            elif np.issubdtype(features.dtype, np.integer):
+                idx = features
+            else:
+                idx = feature_names.to_index().get_indexer(features)
+                if np.any(idx < 0):
+                    raise ValueError("unknown features: %s" % ", ".join([str(x) for x in features[idx < 0]]))
+
+        hessians = self._get_cached("hessians") if from_hessians is not None else None
+        if hessians is not None:
+            values = from_hessians(hessians[idx])
+        else:
+            feed_dict = self.feed_dict.copy()
+            feed_dict[self.model.full_data_model.feature_selection] = idx
+            values = self.run(tensor, feed_dict=feed_dict)
+        output = xr.DataArray(values, dims=dims)
+
+        coords = self.input_data.data.coords
+        for i in output.dims:
+            if i == "features":
+                output.coords[i] = feature_names.values[idx]
+            elif i in coords:
+                output.coords[i] = coords[i]
+        return output
+
+    def finalize(self, outputs: list = None, lazy: bool = False):
+        """
+        Evaluates the estimated parameters and closes the session.
+
+        :param outputs: (optional) list of parameters to evaluate, out of
+            "a_var", "b_var", "loss", "log_likelihood", "gradients", "hessians" and "fisher_inv".
+            The coefficients a_var and b_var are always evaluated. Only parameters which are requested
+            here cause a pass over the data, e.g. the hessian is only evaluated if it is requested.
+            Defaults to all but "fisher_inv" if `lazy` is False and to the coefficients only otherwise.
+        :param lazy: Whether to keep the session open and evaluate all other parameters on first access
+            of the store. The session is closed once all parameters are evaluated or `store.close()` is called.
+        :return: EstimatorStoreXArray
+        """
         if self.noise_model == "nb":
             from .external_nb import EstimatorStoreXArray
         else:
             raise ValueError("noise model not recognized")
 
-        store = EstimatorStoreXArray(self)
-        logger.debug("Closing session")
-        self.close_session()
+        store = EstimatorStoreXArray(self, outputs=outputs, lazy=lazy)
+        if not lazy:
+            logger.debug("Closing session")
+            self.close_session()
         return store
 
     @abc.abstractmethod
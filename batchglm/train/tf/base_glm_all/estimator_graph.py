@@ -7,12 +7,187 @@ import xarray as xr
 
 from .external import GradientGraphGLM, NewtonGraphGLM, TrainerGraphGLM
 from .external import EstimatorGraphGLM, FullDataModelGraphGLM, BatchedDataModelGraphGLM
-from .external import op_utils
+from .external import op_utils, unpack_batch, gather_batch_features
 from .external import pkg_constants
+from .statistics import StatisticsGLMALL
 
 logger = logging.getLogger(__name__)
 
 
+def _use_fused_statistics():
+    return pkg_constants.FUSED_STATISTICS and \
+        pkg_constants.JACOBIAN_MODE == "analytic" and \
+        pkg_constants.HESSIAN_MODE == "obs_batched"
+
+
+def _train_statistics(
+        batched_data,
+        sample_indices,
+        batch_model,
+        design_loc,
+        design_scale,
+        constraints_loc,
+        constraints_scale,
+        model_vars,
+        train_a,
+        train_b,
+        noise_model: str,
+        iterator,
+        dtype,
+        compute_hessian: bool = True,
+        compute_fim: bool = True
+):
+    """
+    Builds the Jacobian, Hessian and Fisher information matrix of the trained submodel.
+
+    If fused statistics are used, the Hessian and the Fisher information matrix are each evaluated
+    together with the Jacobian and the log-likelihood in a single pass over the data.
+
+    :param compute_hessian: Whether to build the Hessian, i.e. whether a Newton-Raphson type optimizer is used.
+    :param compute_fim: Whether to build the Fisher information matrix, i.e. whether an IRLS type optimizer is used.
+    :return: tuple (jac, hessians, fim, jac_nr, jac_irls) with the Jacobian for gradient-based
+        optimizers, the Hessian, the Fisher information matrix and the Jacobians which are
+        evaluated in the same pass as the Hessian and the Fisher information matrix.
+        Statistics which are not built are None.
+    """
+    if noise_model == "nb":
+        from .external_nb import Jacobians, Hessians, FIM, Statistics
+    else:
+        raise ValueError("noise model not rewcognized")
+
+    if _use_fused_statistics():
+        def statistics(fim, hessian):
+            return Statistics(
+                batched_data=batched_data,
+                sample_indices=sample_indices,
+                batch_model=batch_model,
+                design_loc=design_loc,
+                design_scale=design_scale,
+                constraints_loc=constraints_loc,
+                constraints_scale=constraints_scale,
+                model_vars=model_vars,
+                noise_model=noise_model,
+                iterator=iterator,
+                update_a=train_a,
+                update_b=train_b,
+                compute_fim=fim,
+                compute_hessian=hessian,
+                dtype=dtype
+            )
+
+        jac = statistics(fim=False, hessian=False)
+        hessians = statistics(fim=False, hessian=True) if compute_hessian else None
+        fim = statistics(fim=True, hessian=False) if compute_fim else None
+        return jac, hessians, fim, hessians, fim
+
+    jac = Jacobians(
+        batched_data=batched_data,
+        sample_indices=sample_indices,
+        batch_model=batch_model,
+        design_loc=design_loc,
+        design_scale=design_scale,
+        constraints_loc=constraints_loc,
+        constraints_scale=constraints_scale,
+        model_vars=model_vars,
+        mode=pkg_constants.JACOBIAN_MODE,
+        noise_model=noise_model,
+        iterator=iterator,
+        jac_a=train_a,
+        jac_b=train_b,
+        dtype=dtype
+    )
+    if compute_hessian:
+        hessians = Hessians(
+            batched_data=batched_data,
+            sample_indices=sample_indices,
+            design_loc=design_loc,
+            design_scale=design_scale,
+            constraints_loc=constraints_loc,
+            constraints_scale=constraints_scale,
+            model_vars=model_vars,
+            mode=pkg_constants.HESSIAN_MODE,
+            noise_model=noise_model,
+            iterator=iterator,
+            hess_a=train_a,
+            hess_b=train_b,
+            dtype=dtype
+        )
+    else:
+        hessians = None
+    if compute_fim:
+        fim = FIM(
+            batched_data=batched_data,
+            sample_indices=sample_indices,
+            design_loc=design_loc,
+            design_scale=design_scale,
+            constraints_loc=constraints_loc,
+            constraints_scale=constraints_scale,
+            model_vars=model_vars,
+            mode=pkg_constants.HESSIAN_MODE,
+            noise_model=noise_model,
+            iterator=iterator,
+            update_a=train_a,
+            update_b=train_b,
+            dtype=dtype
+        )
+    else:
+        fim = None
+    return jac, hessians, fim, jac, jac
+
+
+def _block_sample_indices(block_start, block_size: int, num_observations):
+    """
+    Yields the observations of one block in random order.
+
+    :param block_start: index of the first observation of the block.
+    :param block_size: number of observations per block.
+    :param num_observations: number of observations; the last block may be incomplete.
+    :return: tf.data.Dataset of observation indices
+    """
+    idx = tf.range(block_start, tf.minimum(block_start + block_size, num_observations))
+    return tf.data.Dataset.from_tensor_slices(tf.random_shuffle(idx))
+
+
+def _sample_indices(num_observations, batch_size: int, sampler: str = "window", block_size: int = None):
+    """
+    Builds the infinite stream of sorted batches of observation indices for batched training.
+
+    :param num_observations: number of observations.
+    :param batch_size: number of observations per batch.
+    :param sampler: How observations are drawn:
+
+        - "window": shuffle all observations with a buffer of `2 * batch_size` observations, i.e.
+          each batch is drawn from a window which slides over the observations in storage order.
+        - "blocks": shuffle the order of the blocks of `block_size` consecutive observations and the
+          observations within each block. Each batch touches about `batch_size / block_size + 1` blocks,
+          so blocks which match the chunks of the storage give I/O locality.
+    :param block_size: number of observations per block of the "blocks" sampler.
+    :return: tf.data.Dataset of index vectors (batch_size)
+    """
+    if sampler == "window":
+        data_indices = tf.data.Dataset.from_tensor_slices((
+            tf.range(num_observations, name="sample_index")
+        ))
+        training_data = data_indices.apply(tf.contrib.data.shuffle_and_repeat(buffer_size=2 * batch_size))
+    elif sampler == "blocks":
+        if block_size is None:
+            block_size = batch_size
+        num_blocks = (num_observations + block_size - 1) // block_size
+        block_starts = tf.data.Dataset.from_tensor_slices((
+            tf.range(0, num_observations, block_size, name="block_start")
+        ))
+        training_data = block_starts.apply(tf.contrib.data.shuffle_and_repeat(buffer_size=num_blocks))
+        training_data = training_data.flat_map(
+            lambda x: _block_sample_indices(x, block_size=block_size, num_observations=num_observations)
+        )
+    else:
+        raise ValueError("sampler %s not recognized" % sampler)
+
+    training_data = training_data.batch(batch_size, drop_remainder=True)
+    training_data = training_data.map(tf.contrib.framework.sort)  # sort indices
+    return training_data
+
+
 class FullDataModelGraph(FullDataModelGraphGLM):
     """
     Computational graph to evaluate negative binomial GLM metrics on full data set.
@@ -24,12 +199,18 @@ class FullDataModelGraph(FullDataModelGraphGLM):
             fetch_fn,
             batch_size: Union[int, tf.Tensor],
             model_vars,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             train_a,
             train_b,
             noise_model: str,
-            dtype
+            dtype,
+            active_set: bool = False,
+            compute_hessian: bool = True,
+            compute_fim: bool = True,
+            read_ahead: int = 1
     ):
         """
         :param sample_indices:
@@ -40,6 +221,10 @@ class FullDataModelGraph(FullDataModelGraphGLM):
             Size of mini-batches used.
         :param model_vars: ModelVars
             Variables of model. Contains tf.Variables which are optimized.
+        :param design_loc: tensor (design groups x mean model parameters)
+            Unique rows of the location design model, indexed by the group index of the observations.
+        :param design_scale: tensor (design groups x dispersion model parameters)
+            Unique rows of the scale design model, indexed by the group index of the observations.
         :param constraints_loc: tensor (all parameters x dependent parameters)
             Tensor that encodes how complete parameter set which includes dependent
             parameters arises from indepedent parameters: all = <constraints, indep>.
@@ -55,9 +240,21 @@ class FullDataModelGraph(FullDataModelGraphGLM):
         :param train_r: bool
             Whether to train dispersion model. If False, the initialisation is kept.
         :param dtype: Precision used in tensorflow.
+        :param active_set: bool
+            Whether to additionally build the Jacobian, Hessian and Fisher information matrix of the trained
+            submodel on the active (not yet converged) features only. These are used for feature-wise
+            termination so that the cost of a training step shrinks as features converge.
+        :param compute_hessian: bool
+            Whether to build the Hessian of the trained submodel, which is only used by Newton-Raphson type
+            optimizers.
+        :param compute_fim: bool
+            Whether to build the Fisher information matrix of the trained submodel, which is only used by IRLS
+            type optimizers.
+        :param read_ahead: int
+            Number of batches which are fetched ahead of their evaluation.
         """
         if noise_model == "nb":
-            from .external_nb import BasicModelGraph, Jacobians, Hessians, FIM
+            from .external_nb import BasicModelGraph, Jacobians, Hessians, FIM, Statistics
         else:
             raise ValueError("noise model not rewcognized")
         self.noise_model = noise_model
@@ -66,10 +263,10 @@ class FullDataModelGraph(FullDataModelGraphGLM):
 
         batched_data = dataset.batch(batch_size)
         batched_data = batched_data.map(fetch_fn, num_parallel_calls=pkg_constants.TF_NUM_THREADS)
-        batched_data = batched_data.prefetch(1)
+        batched_data = batched_data.prefetch(read_ahead)
 
         def map_model(idx, data) -> BasicModelGraph:
-            X, design_loc, design_scale, size_factors = data
+            X, design_idx, size_factors = unpack_batch(data)
             model = BasicModelGraph(
                 X=X,
                 design_loc=design_loc,
@@ -79,7 +276,8 @@ class FullDataModelGraph(FullDataModelGraphGLM):
                 a_var=model_vars.a_var,
                 b_var=model_vars.b_var,
                 dtype=dtype,
-                size_factors=size_factors)
+                size_factors=size_factors,
+                design_idx=design_idx)
             return model
 
         model = map_model(*fetch_fn(sample_indices))
@@ -97,117 +295,218 @@ class FullDataModelGraph(FullDataModelGraphGLM):
         with tf.name_scope("loss"):
             loss = tf.reduce_sum(norm_neg_log_likelihood)
 
-        with tf.name_scope("hessians"):
-            # Hessian of full model for reporting.
-            hessians_full = Hessians(
-                batched_data=batched_data,
-                sample_indices=sample_indices,
-                constraints_loc=constraints_loc,
-                constraints_scale=constraints_scale,
-                model_vars=model_vars,
-                mode=pkg_constants.HESSIAN_MODE,
-                noise_model=noise_model,
-                iterator=True,
-                hess_a=True,
-                hess_b=True,
-                dtype=dtype
-            )
-            # Hessian of submodel which is to be trained.
-            if train_a or train_b:
-                if not train_a or not train_b:
-                    hessians_train = Hessians(
-                        batched_data=batched_data,
-                        sample_indices=sample_indices,
-                        constraints_loc=constraints_loc,
-                        constraints_scale=constraints_scale,
-                        model_vars=model_vars,
-                        mode=pkg_constants.HESSIAN_MODE,
-                        noise_model=noise_model,
-                        iterator=True,
-                        hess_a=train_a,
-                        hess_b=train_b,
-                        dtype=dtype
-                    )
-                else:
-                    hessians_train = hessians_full
-            else:
-                hessians_train = None
+        if train_a or train_b:
+            with tf.name_scope("train"):
+                (jacobian_train, hessians_train, fim_train,
+                 jacobian_train_nr, jacobian_train_irls) = _train_statistics(
+                    batched_data=batched_data,
+                    sample_indices=sample_indices,
+                    batch_model=None,
+                    design_loc=design_loc,
+                    design_scale=design_scale,
+                    constraints_loc=constraints_loc,
+                    constraints_scale=constraints_scale,
+                    model_vars=model_vars,
+                    train_a=train_a,
+                    train_b=train_b,
+                    noise_model=noise_model,
+                    iterator=True,
+                    dtype=dtype,
+                    compute_hessian=compute_hessian,
+                    compute_fim=compute_fim
+                )
+        else:
+            jacobian_train = None
+            hessians_train = None
+            fim_train = None
+            jacobian_train_nr = None
+            jacobian_train_irls = None
+
+        # Hessian of the full model for reporting:
+        if hessians_train is not None and train_a and train_b:
+            hessians_full = hessians_train
+        elif _use_fused_statistics():
+            with tf.name_scope("statistics"):
+                hessians_full = Statistics(
+                    batched_data=batched_data,
+                    sample_indices=sample_indices,
+                    batch_model=None,
+                    design_loc=design_loc,
+                    design_scale=design_scale,
+                    constraints_loc=constraints_loc,
+                    constraints_scale=constraints_scale,
+                    model_vars=model_vars,
+                    noise_model=noise_model,
+                    iterator=True,
+                    update_a=True,
+                    update_b=True,
+                    compute_fim=False,
+                    compute_hessian=True,
+                    dtype=dtype
+                )
+        else:
+            with tf.name_scope("hessians"):
+                hessians_full = Hessians(
+                    batched_data=batched_data,
+                    sample_indices=sample_indices,
+                    design_loc=design_loc,
+                    design_scale=design_scale,
+                    constraints_loc=constraints_loc,
+                    constraints_scale=constraints_scale,
+                    model_vars=model_vars,
+                    mode=pkg_constants.HESSIAN_MODE,
+                    noise_model=noise_model,
+                    iterator=True,
+                    hess_a=True,
+                    hess_b=True,
+                    dtype=dtype
+                )
 
-            fim_full = FIM(
-                batched_data=batched_data,
-                sample_indices=sample_indices,
-                constraints_loc=constraints_loc,
-                constraints_scale=constraints_scale,
-                model_vars=model_vars,
-                mode=pkg_constants.HESSIAN_MODE,
-                noise_model=noise_model,
-                iterator=True,
-                update_a=True,
-                update_b=True,
-                dtype=dtype
-            )
-            # Fisher information matrix of submodel which is to be trained.
-            if train_a or train_b:
-                if not train_a or not train_b:
-                    fim_train = FIM(
-                        batched_data=batched_data,
-                        sample_indices=sample_indices,
+        if active_set and (train_a or train_b):
+            with tf.name_scope("active_set"):
+                # Statistics of the trained submodel restricted to the features which have not converged yet.
+                # The active features are read from the convergence mask at runtime and both the
+                # observations and the model variables are restricted to these features.
+                idx_active = tf.where(tf.logical_not(model_vars.converged_mask))[:, 0]
+                model_vars_active = model_vars.gather_features(idx_active)
+
+                batched_data_active = dataset.batch(batch_size)
+                batched_data_active = batched_data_active.map(fetch_fn, num_parallel_calls=pkg_constants.TF_NUM_THREADS)
+                batched_data_active = batched_data_active.map(
+                    lambda idx, data: (idx, gather_batch_features(data, idx_active))
+                )
+                batched_data_active = batched_data_active.prefetch(read_ahead)
+
+                (jacobian_active, hessians_active, fim_active,
+                 jacobian_active_nr, jacobian_active_irls) = _train_statistics(
+                    batched_data=batched_data_active,
+                    sample_indices=sample_indices,
+                    batch_model=None,
+                    design_loc=design_loc,
+                    design_scale=design_scale,
+                    constraints_loc=constraints_loc,
+                    constraints_scale=constraints_scale,
+                    model_vars=model_vars_active,
+                    train_a=train_a,
+                    train_b=train_b,
+                    noise_model=noise_model,
+                    iterator=True,
+                    dtype=dtype,
+                    compute_hessian=compute_hessian,
+                    compute_fim=compute_fim
+                )
+        else:
+            idx_active = None
+            batched_data_active = None
+            hessians_active = None
+            fim_active = None
+            jacobian_active = None
+            jacobian_active_nr = None
+            jacobian_active_irls = None
+
+        num_loc_params = model_vars.a_var.shape[0]
+
+        def norm_neg_log_likelihood_at(params):
+            """
+            Evaluates the feature-wise loss at several candidate parameter sets in one pass over the data.
+
+            The loss is evaluated on the active features only if the active set is used.
+
+            :param params: tensor (candidates x all model parameters x features)
+            :return: tensor (candidates x features) or (candidates x active features)
+            """
+            if idx_active is not None:
+                params = tf.gather(params, indices=idx_active, axis=2)
+                data = batched_data_active
+            else:
+                data = batched_data
+            num_candidates = params.shape[0].value
+
+            def map_candidates(idx, data):
+                X, design_idx, size_factors = unpack_batch(data)
+                return tf.stack([
+                    BasicModelGraph(
+                        X=X,
+                        design_loc=design_loc,
+                        design_scale=design_scale,
                         constraints_loc=constraints_loc,
                         constraints_scale=constraints_scale,
-                        model_vars=model_vars,
-                        mode=pkg_constants.HESSIAN_MODE,
-                        noise_model=noise_model,
-                        iterator=True,
-                        update_a=train_a,
-                        update_b=train_b,
-                        dtype=dtype
-                    )
-                else:
-                    fim_train = fim_full
-            else:
-                fim_train = None
+                        a_var=model_vars.tf_clip_param(params[i, :num_loc_params], "a_var"),
+                        b_var=model_vars.tf_clip_param(params[i, num_loc_params:], "b_var"),
+                        dtype=dtype,
+                        size_factors=size_factors,
+                        design_idx=design_idx
+                    ).log_likelihood
+                    for i in range(num_candidates)
+                ])
+
+            ll = op_utils.map_reduce(
+                last_elem=tf.gather(sample_indices, tf.size(sample_indices) - 1),
+                data=data,
+                map_fn=map_candidates,
+                parallel_iterations=pkg_constants.TF_LOOP_PARALLEL_ITERATIONS
+            )
+            return - ll / tf.cast(tf.size(sample_indices), dtype=ll.dtype)
+
+        with tf.name_scope("feature_selection"):
+            # Hessian of the full model on a subset of features which can be selected at runtime,
+            # e.g. to evaluate the inverse Fisher information matrix only for features of interest.
+            feature_selection = tf.placeholder_with_default(
+                tf.range(tf.shape(model_vars.a_var, out_type=tf.int64)[1]),
+                shape=(None,),
+                name="feature_selection"
+            )
+            model_vars_selected = model_vars.gather_features(feature_selection)
 
-        with tf.name_scope("jacobians"):
-            # Jacobian of full model for reporting.
-            jacobian_full = Jacobians(
-                batched_data=batched_data,
-                sample_indices=sample_indices,
-                batch_model=None,
-                constraints_loc=constraints_loc,
-                constraints_scale=constraints_scale,
-                model_vars=model_vars,
-                mode=pkg_constants.JACOBIAN_MODE,
-                noise_model=noise_model,
-                iterator=True,
-                jac_a=True,
-                jac_b=True,
-                dtype=dtype
+            batched_data_selected = dataset.batch(batch_size)
+            batched_data_selected = batched_data_selected.map(
+                fetch_fn,
+                num_parallel_calls=pkg_constants.TF_NUM_THREADS
             )
-            # Jacobian of submodel which is to be trained.
-            if train_a or train_b:
-                if not train_a or not train_b:
-                    jacobian_train = Jacobians(
-                        batched_data=batched_data,
-                        sample_indices=sample_indices,
-                        batch_model=None,
-                        constraints_loc=constraints_loc,
-                        constraints_scale=constraints_scale,
-                        model_vars=model_vars,
-                        mode=pkg_constants.JACOBIAN_MODE,
-                        noise_model=noise_model,
-                        iterator=True,
-                        jac_a=train_a,
-                        jac_b=train_b,
-                        dtype=dtype
-                    )
-                else:
-                    jacobian_train = jacobian_full
+            batched_data_selected = batched_data_selected.map(
+                lambda idx, data: (idx, gather_batch_features(data, feature_selection))
+            )
+            batched_data_selected = batched_data_selected.prefetch(read_ahead)
+
+            if _use_fused_statistics():
+                hessians_selected = Statistics(
+                    batched_data=batched_data_selected,
+                    sample_indices=sample_indices,
+                    batch_model=None,
+                    design_loc=design_loc,
+                    design_scale=design_scale,
+                    constraints_loc=constraints_loc,
+                    constraints_scale=constraints_scale,
+                    model_vars=model_vars_selected,
+                    noise_model=noise_model,
+                    iterator=True,
+                    update_a=True,
+                    update_b=True,
+                    compute_fim=False,
+                    compute_hessian=True,
+                    dtype=dtype
+                )
             else:
-                jacobian_train = None
+                hessians_selected = Hessians(
+                    batched_data=batched_data_selected,
+                    sample_indices=sample_indices,
+                    design_loc=design_loc,
+                    design_scale=design_scale,
+                    constraints_loc=constraints_loc,
+                    constraints_scale=constraints_scale,
+                    model_vars=model_vars_selected,
+                    mode=pkg_constants.HESSIAN_MODE,
+                    noise_model=noise_model,
+                    iterator=True,
+                    hess_a=True,
+                    hess_b=True,
+                    dtype=dtype
+                )
 
         self.X = model.X
         self.design_loc = model.design_loc
         self.design_scale = model.design_scale
+        self.design_idx = model.design_idx
 
         self.batched_data = batched_data
 
@@ -226,15 +525,54 @@ class FullDataModelGraph(FullDataModelGraphGLM):
         self.norm_neg_log_likelihood = norm_neg_log_likelihood
         self.loss = loss
 
-        self.jac = jacobian_full.jac
         self.jac_train = jacobian_train
+        self.jac_train_nr = jacobian_train_nr
+        self.jac_train_irls = jacobian_train_irls
 
         self.hessians = hessians_full
         self.hessians_train = hessians_train
 
-        self.fim = fim_full
         self.fim_train = fim_train
 
+        self.idx_active = idx_active
+        self.jac_active = jacobian_active
+        self.jac_active_nr = jacobian_active_nr
+        self.jac_active_irls = jacobian_active_irls
+        self.hessians_active = hessians_active
+        self.fim_active = fim_active
+
+        self.feature_selection = feature_selection
+        self.hessians_selected = hessians_selected
+
+        self.norm_neg_log_likelihood_at = norm_neg_log_likelihood_at
+
+        # Feature-wise loss which is evaluated in the same pass over the data as the statistics
+        # of the respective optimizer, at the parameters before the update:
+        if idx_active is not None:
+            train_statistics = (jacobian_active, jacobian_active_nr, jacobian_active_irls)
+        else:
+            train_statistics = (jacobian_train, jacobian_train_nr, jacobian_train_irls)
+        (
+            self.norm_neg_log_likelihood_gradient,
+            self.norm_neg_log_likelihood_nr,
+            self.norm_neg_log_likelihood_irls
+        ) = [
+            self._train_norm_neg_log_likelihood(statistics=x, idx_active=idx_active)
+            for x in train_statistics
+        ]
+
+    def _train_norm_neg_log_likelihood(self, statistics, idx_active):
+        if not isinstance(statistics, StatisticsGLMALL):
+            return None
+        if idx_active is None:
+            return statistics.norm_neg_log_likelihood
+        # Converged features are not part of the active set and are set to zero.
+        return tf.scatter_nd(
+            tf.expand_dims(idx_active, axis=-1),
+            statistics.norm_neg_log_likelihood,
+            shape=tf.shape(self.norm_neg_log_likelihood, out_type=tf.int64)
+        )
+
 
 class BatchedDataModelGraph(BatchedDataModelGraphGLM):
     """
@@ -248,12 +586,19 @@ class BatchedDataModelGraph(BatchedDataModelGraphGLM):
             batch_size: Union[int, tf.Tensor],
             buffer_size: int,
             model_vars,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             train_a,
             train_b,
             noise_model: str,
-            dtype
+            dtype,
+            compute_statistics: bool = True,
+            compute_hessian: bool = True,
+            compute_fim: bool = True,
+            sampler: str = "window",
+            block_size: int = None
     ):
         """
         :param fetch_fn:
@@ -262,6 +607,10 @@ class BatchedDataModelGraph(BatchedDataModelGraphGLM):
             Size of mini-batches used.
         :param model_vars: ModelVars
             Variables of model. Contains tf.Variables which are optimized.
+        :param design_loc: tensor (design groups x mean model parameters)
+            Unique rows of the location design model, indexed by the group index of the observations.
+        :param design_scale: tensor (design groups x dispersion model parameters)
+            Unique rows of the scale design model, indexed by the group index of the observations.
         :param constraints_loc: tensor (all parameters x dependent parameters)
             Tensor that encodes how complete parameter set which includes dependent
             parameters arises from indepedent parameters: all = <constraints, indep>.
@@ -277,108 +626,89 @@ class BatchedDataModelGraph(BatchedDataModelGraphGLM):
         :param train_r: bool
             Whether to train dispersion model. If False, the initialisation is kept.
         :param dtype: Precision used in tensorflow.
+        :param compute_statistics: bool
+            Whether to build the training statistics of the batches, i.e. whether training uses batching.
+        :param compute_hessian: bool
+            Whether to build the Hessian of the trained submodel, which is only used by Newton-Raphson.
+        :param compute_fim: bool
+            Whether to build the Fisher information matrix of the trained submodel, which is only used by IRLS.
+        :param sampler: str
+            How the observations of the batches are drawn, "window" or "blocks", see `_sample_indices()`.
+        :param block_size: int
+            Number of observations per block of the "blocks" sampler. Defaults to `batch_size`.
         """
         if noise_model == "nb":
-            from .external_nb import BasicModelGraph, Jacobians, Hessians, FIM
+            from .external_nb import BasicModelGraph
         else:
             raise ValueError("noise model not rewcognized")
         self.noise_model = noise_model
 
 
         with tf.name_scope("input_pipeline"):
-            data_indices = tf.data.Dataset.from_tensor_slices((
-                tf.range(num_observations, name="sample_index")
-            ))
-            training_data = data_indices.apply(tf.contrib.data.shuffle_and_repeat(buffer_size=2 * batch_size))
-            training_data = training_data.batch(batch_size, drop_remainder=True)
-            training_data = training_data.map(tf.contrib.framework.sort)  # sort indices
+            training_data = _sample_indices(
+                num_observations=num_observations,
+                batch_size=batch_size,
+                sampler=sampler,
+                block_size=block_size
+            )
             training_data = training_data.map(fetch_fn, num_parallel_calls=pkg_constants.TF_NUM_THREADS)
             training_data = training_data.prefetch(buffer_size)
 
-            iterator = training_data.make_one_shot_iterator()
+            # Initializable iterator, as `fetch_fn` may capture graph-side data:
+            iterator = training_data.make_initializable_iterator()
 
             batch_sample_index, batch_data = iterator.get_next()
-            (batch_X, batch_design_loc, batch_design_scale, batch_size_factors) = batch_data
+            (batch_X, batch_design_idx, batch_size_factors) = unpack_batch(batch_data)
 
         with tf.name_scope("batch"):
             batch_model = BasicModelGraph(
                 X=batch_X,
-                design_loc=batch_design_loc,
-                design_scale=batch_design_scale,
+                design_loc=design_loc,
+                design_scale=design_scale,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 a_var=model_vars.a_var,
                 b_var=model_vars.b_var,
                 dtype=dtype,
-                size_factors=batch_size_factors
+                size_factors=batch_size_factors,
+                design_idx=batch_design_idx
             )
 
-            # Define the jacobian on the batched model for newton-rhapson:
-            # (note that these are the Jacobian matrix blocks
-            # of the trained subset of parameters).
-            if train_a or train_b:
-                batch_jac = Jacobians(
+            # Define the jacobian, hessian and IRLS components on the batched model:
+            # (note that these are the matrix blocks of the trained subset of parameters).
+            if (train_a or train_b) and compute_statistics:
+                (batch_jac, batch_hessians, batch_fim,
+                 batch_jac_nr, batch_jac_irls) = _train_statistics(
                     batched_data=batch_data,
                     sample_indices=batch_sample_index,
                     batch_model=batch_model,
+                    design_loc=design_loc,
+                    design_scale=design_scale,
                     constraints_loc=constraints_loc,
                     constraints_scale=constraints_scale,
                     model_vars=model_vars,
-                    mode=pkg_constants.JACOBIAN_MODE,
+                    train_a=train_a,
+                    train_b=train_b,
                     noise_model=noise_model,
                     iterator=False,
-                    jac_a=train_a,
-                    jac_b=train_b,
-                    dtype=dtype
+                    dtype=dtype,
+                    compute_hessian=compute_hessian,
+                    compute_fim=compute_fim
                 )
             else:
                 batch_jac = None
-
-            # Define the hessian on the batched model for newton-rhapson:
-            # (note that these are the Hessian matrix blocks
-            # of the trained subset of parameters).
-            if train_a or train_b:
-                batch_hessians = Hessians(
-                    batched_data=batch_data,
-                    sample_indices=batch_sample_index,
-                    constraints_loc=constraints_loc,
-                    constraints_scale=constraints_scale,
-                    model_vars=model_vars,
-                    mode=pkg_constants.HESSIAN_MODE,
-                    noise_model=noise_model,
-                    iterator=False,
-                    hess_a=train_a,
-                    hess_b=train_b,
-                    dtype=dtype
-                )
-            else:
                 batch_hessians = None
-
-            # Define the IRLS components on the batched model:
-            # (note that these are the IRLS matrix blocks
-            # of the trained subset of parameters).
-            if train_a or train_b:
-                batch_fim = FIM(
-                    batched_data=batch_data,
-                    sample_indices=batch_sample_index,
-                    constraints_loc=constraints_loc,
-                    constraints_scale=constraints_scale,
-                    model_vars=model_vars,
-                    mode=pkg_constants.HESSIAN_MODE,
-                    noise_model=noise_model,
-                    iterator=False,
-                    update_a=train_a,
-                    update_b=train_b,
-                    dtype=dtype
-                )
-            else:
                 batch_fim = None
+                batch_jac_nr = None
+                batch_jac_irls = None
 
         self.X = batch_model.X
         self.design_loc = batch_model.design_loc
         self.design_scale = batch_model.design_scale
+        self.design_idx = batch_model.design_idx
 
         self.batched_data = batch_data
+        self.iterator_initializer = iterator.initializer
 
         self.mu = batch_model.mu
         self.r = batch_model.r
@@ -395,6 +725,8 @@ class BatchedDataModelGraph(BatchedDataModelGraphGLM):
         self.loss = batch_model.loss
 
         self.jac_train = batch_jac
+        self.jac_train_nr = batch_jac_nr
+        self.jac_train_irls = batch_jac_irls
         self.hessians_train = batch_hessians
         self.fim_train = batch_fim
 
@@ -406,16 +738,21 @@ class EstimatorGraphAll(EstimatorGraphGLM):
     mu: tf.Tensor
     sigma2: tf.Tensor
 
+    # Set by the estimator which built this graph, see `EstimatorAll.__init__()`:
+    template_key: tuple
+    idle_sessions: list
+
     def __init__(
             self,
             fetch_fn,
-            feature_isnonzero,
             num_observations,
             num_features,
             num_design_loc_params,
             num_design_scale_params,
             num_loc_params,
             num_scale_params,
+            design_loc: np.ndarray,
+            design_scale: np.ndarray,
             constraints_loc: xr.DataArray,
             constraints_scale: xr.DataArray,
             graph: tf.Graph = None,
@@ -428,15 +765,15 @@ class EstimatorGraphAll(EstimatorGraphGLM):
             termination_type: str = "global",
             extended_summary=False,
             noise_model: str = None,
+            chunk_size: int = None,
+            sampler: str = "window",
+            block_size: int = None,
             dtype="float32"
     ):
         """
 
         :param fetch_fn:
             TODO
-        :param feature_isnonzero:
-            Whether all observations of a feature are zero. Features for which this
-            is the case are not fitted.
         :param num_observations: int
             Number of observations.
         :param num_features: int
@@ -445,13 +782,19 @@ class EstimatorGraphAll(EstimatorGraphGLM):
             Number of parameters per feature in mean model.
         :param num_design_scale_params: int
             Number of parameters per feature in scale model.
+        :param design_loc: nd.array (design groups x mean model parameters)
+            Unique rows of the location design model. `fetch_fn` yields the group index of each observation.
+        :param design_scale: nd.array (design groups x dispersion model parameters)
+            Unique rows of the scale design model. `fetch_fn` yields the group index of each observation.
         :param graph: tf.Graph
         :param batch_size: int
             Size of mini-batches used.
         :param init_a: nd.array (mean model size x features)
-            Initialisation for all parameters of mean model.
+            Initialisation for all parameters of mean model. Only its shape is part of the graph,
+            the values are fed to `model_vars.init_a_ph` when running `init_op`.
         :param init_b: nd.array (dispersion model size x features)
-            Initialisation for all parameters of dispersion model.
+            Initialisation for all parameters of dispersion model. Only its shape is part of the graph,
+            the values are fed to `model_vars.init_b_ph` when running `init_op`.
         :param constraints_loc: tensor (all parameters x dependent parameters)
             Tensor that encodes how complete parameter set which includes dependent
             parameters arises from indepedent parameters: all = <constraints, indep>.
@@ -466,9 +809,22 @@ class EstimatorGraphAll(EstimatorGraphGLM):
             Whether to train mean model. If False, the initialisation is kept.
         :param train_scale: bool
             Whether to train dispersion model. If False, the initialisation is kept.
-        :param provide_optimizers:
+        :param provide_optimizers: dict
+            Optimizers to build, see `EstimatorAll.__init__()`. Only the statistics which are used by these
+            optimizers are built. The trainers on batched and on full data are only built if "batched"
+            and "full" are not set to False, respectively.
         :param termination_type:
         :param extended_summary:
+        :param chunk_size: int
+            (Optional) number of observations per chunk of the storage of the input data which is streamed
+            by `fetch_fn`. If given, full data passes use batches of whole chunks and read
+            pkg_constants.STREAMING_READ_AHEAD batches ahead. Their batch size of `4 * batch_size` is rounded up
+            to whole chunks, i.e. it is one chunk if `chunk_size` is larger; a warning is logged in this case.
+            The batches of batched training always have `batch_size` observations, see `_sample_indices()`.
+        :param sampler: str
+            How the observations of the batches of batched training are drawn, see `_sample_indices()`.
+        :param block_size: int
+            Number of observations per block of the "blocks" sampler.
         :param dtype: Precision used in tensorflow.
         """
         if noise_model == "nb":
@@ -487,6 +843,8 @@ class EstimatorGraphAll(EstimatorGraphGLM):
             num_scale_params=num_scale_params,
             graph=graph,
             batch_size=batch_size,
+            design_loc=design_loc,
+            design_scale=design_scale,
             constraints_loc=constraints_loc,
             constraints_scale=constraints_scale,
             dtype=dtype
@@ -500,13 +858,32 @@ class EstimatorGraphAll(EstimatorGraphGLM):
                     dtype=dtype,
                     init_a=init_a,
                     init_b=init_b,
-                    constraints_loc=constraints_loc,
-                    constraints_scale=constraints_scale
+                    constraints_loc=self.constraints_loc,
+                    constraints_scale=self.constraints_scale
                 )
-                self.idx_nonconverged = np.where(self.model_vars.converged == False)[0]
 
             # ### performance related settings
             buffer_size = 4
+            full_batch_size = batch_size * buffer_size
+            read_ahead = 1
+            if chunk_size is not None:
+                if chunk_size > full_batch_size:
+                    logger.warning(
+                        "chunk size %i exceeds the full data batch size %i, full data passes use batches of one chunk",
+                        chunk_size,
+                        full_batch_size
+                    )
+                # Round up to whole chunks so that each chunk is read by a single batch of a full data pass:
+                full_batch_size = -(-full_batch_size // chunk_size) * chunk_size
+                read_ahead = pkg_constants.STREAMING_READ_AHEAD
+
+            # Only build the statistics which are used by the provided optimizers:
+            provide_batched = provide_optimizers.get("batched", True)
+            provide_full = provide_optimizers.get("full", True)
+            provide_nr = provide_optimizers.get("nr", False)
+            provide_irls = provide_optimizers.get("irls", False)
+            provide_nr_full = provide_full and (provide_nr or provide_optimizers.get("nr_ls", False))
+            provide_irls_full = provide_full and (provide_irls or provide_optimizers.get("irls_ls", False))
 
             with tf.name_scope("batched_data"):
                 logger.debug(" ** Build batched data model")
@@ -516,13 +893,21 @@ class EstimatorGraphAll(EstimatorGraphGLM):
                     batch_size=batch_size,
                     buffer_size=buffer_size,
                     model_vars=self.model_vars,
-                    constraints_loc=constraints_loc,
-                    constraints_scale=constraints_scale,
+                    design_loc=self.design_loc,
+                    design_scale=self.design_scale,
+                    constraints_loc=self.constraints_loc,
+                    constraints_scale=self.constraints_scale,
                     train_a=train_loc,
                     train_b=train_scale,
                     noise_model=noise_model,
-                    dtype=dtype
+                    dtype=dtype,
+                    compute_statistics=provide_batched,
+                    compute_hessian=provide_nr,
+                    compute_fim=provide_irls,
+                    sampler=sampler,
+                    block_size=block_size
                 )
+                self.data_init_ops.append(self.batched_data_model.iterator_initializer)
 
             with tf.name_scope("full_data"):
                 logger.debug(" ** Build full data model")
@@ -535,14 +920,20 @@ class EstimatorGraphAll(EstimatorGraphGLM):
                 self.full_data_model = FullDataModelGraph(
                     sample_indices=sample_selection,
                     fetch_fn=fetch_fn,
-                    batch_size=batch_size * buffer_size,
+                    batch_size=full_batch_size,
                     model_vars=self.model_vars,
-                    constraints_loc=constraints_loc,
-                    constraints_scale=constraints_scale,
+                    design_loc=self.design_loc,
+                    design_scale=self.design_scale,
+                    constraints_loc=self.constraints_loc,
+                    constraints_scale=self.constraints_scale,
                     train_a=train_loc,
                     train_b=train_scale,
                     noise_model=noise_model,
-                    dtype=dtype
+                    dtype=dtype,
+                    active_set=termination_type == "by_feature",
+                    compute_hessian=provide_nr_full,
+                    compute_fim=provide_irls_full,
+                    read_ahead=read_ahead
                 )
 
             self._run_trainer_init(
@@ -555,15 +946,17 @@ class EstimatorGraphAll(EstimatorGraphGLM):
 
             # Define output metrics:
             self._set_out_var(
-                feature_isnonzero=feature_isnonzero,
                 dtype=dtype
             )
             self.loss = self.full_data_model.loss
             self.log_likelihood = self.full_data_model.log_likelihood
             self.hessians = self.full_data_model.hessians.hessian
-            self.fisher_inv = op_utils.pinv(self.full_data_model.hessians.neg_hessian)  # TODO switch for fim?
+            with tf.name_scope("fisher_inv"):
+                # Only evaluated on request, for the features in `full_data_model.feature_selection`.
+                self.fisher_inv = op_utils.robust_inverse(self.full_data_model.hessians_selected.neg_hessian)
+                self.standard_errors = tf.sqrt(tf.matrix_diag_part(self.fisher_inv))
             # Summary statistics on feature-wise model gradients:
-            self.gradients = tf.reduce_sum(tf.transpose(self.gradients_full), axis=1)
+            self.gradients = tf.reduce_sum(tf.transpose(self.gradients_full_all), axis=1)
 
         with tf.name_scope('summaries'):
             tf.summary.histogram('a_var', self.model_vars.a_var)
@@ -3,11 +3,12 @@ import batchglm.data as data_utils
 import batchglm.train.tf.ops as op_utils
 import batchglm.train.tf.train as train_utils
 from batchglm.train.tf.base import TFEstimatorGraph, MonitoredTFEstimator
-from batchglm.train.tf.base_glm import GradientGraphGLM, NewtonGraphGLM, TrainerGraphGLM, EstimatorGraphGLM, FullDataModelGraphGLM, BatchedDataModelGraphGLM, BasicModelGraphGLM
+from batchglm.train.tf.base_glm import GradientGraphGLM, NewtonGraphGLM, LBFGSGraphGLM, TrainerGraphGLM, EstimatorGraphGLM, FullDataModelGraphGLM, BatchedDataModelGraphGLM, BasicModelGraphGLM
 from batchglm.train.tf.base_glm import ESTIMATOR_PARAMS, ProcessModelGLM, ModelVarsGLM, FIMGLM, HessiansGLM, JacobiansGLM
+from batchglm.train.tf.base_glm import unpack_batch, gather_batch_features
 
 from batchglm.models.base_glm import InputData, _Model_GLM
 
 import batchglm.utils.random as rand_utils
-from batchglm.utils.linalg import groupwise_solve_lm
+from batchglm.utils.linalg import groupwise_solve_lm, stacked_inv_sym
 from batchglm import pkg_constants
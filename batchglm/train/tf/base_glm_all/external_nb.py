@@ -1,6 +1,6 @@
 from batchglm.train.tf.glm_nb import EstimatorGraph
 from batchglm.train.tf.glm_nb import BasicModelGraph, ModelVars, ProcessModel
-from batchglm.train.tf.glm_nb import Hessians, FIM, Jacobians
+from batchglm.train.tf.glm_nb import Hessians, FIM, Jacobians, Statistics
 
 from batchglm.models.glm_nb import AbstractEstimator, EstimatorStoreXArray, InputData, Model
 from batchglm.models.glm_nb.utils import closedform_nb_glm_logmu, closedform_nb_glm_logphi
\ No newline at end of file
@@ -3,7 +3,7 @@ import tensorflow as tf
 import logging
 
 from .external import FIMGLM, ModelVarsGLM
-from .external import op_utils
+from .external import op_utils, unpack_batch
 from .external import pkg_constants
 
 logger = logging.getLogger(__name__)
@@ -19,6 +19,8 @@ class FIMGLMALL(FIMGLM):
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -37,7 +39,7 @@ class FIMGLMALL(FIMGLM):
         else:
             raise ValueError("noise model %s was not recognized" % self.noise_model)
 
-        def _a_byobs(design_loc, constraints_loc, mu, r):
+        def _a_byobs(design_loc, design_idx, constraints_loc, mu, r):
             """
             Compute the mean model diagonal block of the
             closed form hessian of base_glm_all model by observation across features
@@ -61,12 +63,13 @@ class FIMGLMALL(FIMGLM):
             # actually needed but only its marginal across features, the final hessian block shape.
             # Here, we use the einsum to efficiently perform the two outer products and the marginalisation.
             XH = tf.matmul(design_loc, constraints_loc)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             FIM = tf.einsum('ofc,od->fcd',
                             tf.einsum('of,oc->ofc', W, XH),
                             XH)
             return FIM
 
-        def _b_byobs(X, design_scale, constraints_scale, mu, r):
+        def _b_byobs(X, design_scale, design_idx, constraints_scale, mu, r):
             """
             Compute the dispersion model diagonal block of the
             closed form hessian of base_glm_all model by observation across features.
@@ -83,6 +86,7 @@ class FIMGLMALL(FIMGLM):
             # actually needed but only its marginal across features, the final hessian block shape.
             # Here, we use the Einstein summation to efficiently perform the two outer products and the marginalisation.
             XH = tf.matmul(design_scale, constraints_scale)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             FIM = tf.einsum('ofc,od->fcd',
                             tf.einsum('of,oc->ofc', W, XH),
                             XH)
@@ -100,20 +104,21 @@ class FIMGLMALL(FIMGLM):
                 Containing the following parameters:
                 - X: tf.tensor observations x features
                     Observation by observation and feature.
-                - size_factors: tf.tensor observations x features
-                    Model size factors by observation and feature.
+                - size_factors: tf.tensor observations
+                    Model size factors by observation, None if there are no size factors.
                 - params: tf.tensor features x coefficients
                     Estimated model variables.
             :return H: tf.tensor features x coefficients x coefficients
                 Hessian evaluated on a single observation, provided in data.
             """
-            X, design_loc, design_scale, size_factors = data
+            X, design_idx, size_factors = unpack_batch(data)
             a_split, b_split = tf.split(params, tf.TensorShape([p_shape_a, p_shape_b]))
 
             model = BasicModelGraph(
                 X=X,
                 design_loc=design_loc,
                 design_scale=design_scale,
+                design_idx=design_idx,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 a_var=a_split,
@@ -130,14 +135,40 @@ class FIMGLMALL(FIMGLM):
             # Here, the non-zero model-wise diagonal blocks are computed and returned
             # as a dictionary. The according score function vectors are also returned as a dictionary.
             if self._update_a and self._update_b:
-                fim_a = _a_byobs(design_loc=design_loc, constraints_loc=constraints_loc, mu=mu, r=r)
-                fim_b = _b_byobs(X=X, design_scale=design_scale, constraints_scale=constraints_scale, mu=mu, r=r)
+                fim_a = _a_byobs(
+                    design_loc=design_loc,
+                    design_idx=design_idx,
+                    constraints_loc=constraints_loc,
+                    mu=mu,
+                    r=r
+                )
+                fim_b = _b_byobs(
+                    X=X,
+                    design_scale=design_scale,
+                    design_idx=design_idx,
+                    constraints_scale=constraints_scale,
+                    mu=mu,
+                    r=r
+                )
             elif self._update_a and not self._update_b:
-                fim_a = _a_byobs(design_loc=design_loc, constraints_loc=constraints_loc, mu=mu, r=r)
+                fim_a = _a_byobs(
+                    design_loc=design_loc,
+                    design_idx=design_idx,
+                    constraints_loc=constraints_loc,
+                    mu=mu,
+                    r=r
+                )
                 fim_b = tf.zeros(shape=())
             elif not self._update_a and self._update_b:
                 fim_a = tf.zeros(shape=())
-                fim_b = _b_byobs(X=X, design_scale=design_scale, constraints_scale=constraints_scale, mu=mu, r=r)
+                fim_b = _b_byobs(
+                    X=X,
+                    design_scale=design_scale,
+                    design_idx=design_idx,
+                    constraints_scale=constraints_scale,
+                    mu=mu,
+                    r=r
+                )
             else:
                 raise ValueError("either require hess_a or hess_b")
 
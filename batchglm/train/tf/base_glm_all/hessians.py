@@ -4,7 +4,7 @@ from typing import List
 import numpy as np
 import tensorflow as tf
 
-from .external import op_utils
+from .external import op_utils, unpack_batch
 from .external import pkg_constants
 from .external import ModelVarsGLM, HessiansGLM
 
@@ -25,6 +25,8 @@ class HessianGLMALL(HessiansGLM):
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -43,7 +45,7 @@ class HessianGLMALL(HessiansGLM):
         else:
             raise ValueError("noise model %s was not recognized" % self.noise_model)
 
-        def _aa_byobs_batched(X, design_loc, constraints_loc, mu, r):
+        def _aa_byobs_batched(X, design_loc, design_idx, constraints_loc, mu, r):
             """
             Compute the mean model diagonal block of the
             closed form hessian of base_glm_all model by observation across features
@@ -68,12 +70,13 @@ class HessianGLMALL(HessiansGLM):
             # actually needed but only its marginal across features, the final hessian block shape.
             # Here, we use the einsum to efficiently perform the two outer products and the marginalisation.
             XH = tf.matmul(design_loc, constraints_loc)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             Hblock = tf.einsum('ofc,od->fcd',
                                tf.einsum('of,oc->ofc', W, XH),
                                XH)
             return Hblock
 
-        def _bb_byobs_batched(X, design_scale, constraints_scale, mu, r):
+        def _bb_byobs_batched(X, design_scale, design_idx, constraints_scale, mu, r):
             """
             Compute the dispersion model diagonal block of the
             closed form hessian of base_glm_all model by observation across features.
@@ -90,12 +93,13 @@ class HessianGLMALL(HessiansGLM):
             # actually needed but only its marginal across features, the final hessian block shape.
             # Here, we use the Einstein summation to efficiently perform the two outer products and the marginalisation.
             XH = tf.matmul(design_scale, constraints_scale)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             Hblock = tf.einsum('ofc,od->fcd',
                                tf.einsum('of,oc->ofc', W, XH),
                                XH)
             return Hblock
 
-        def _ab_byobs_batched(X, design_loc, design_scale, constraints_loc, constraints_scale, mu, r):
+        def _ab_byobs_batched(X, design_loc, design_scale, design_idx, constraints_loc, constraints_scale, mu, r):
             """
             Compute the mean-dispersion model off-diagonal block of the
             closed form hessian of base_glm_all model by observastion across features.
@@ -117,6 +121,7 @@ class HessianGLMALL(HessiansGLM):
             # Here, we use the Einstein summation to efficiently perform the two outer products and the marginalisation.
             XHloc = tf.matmul(design_loc, constraints_loc)
             XHscale = tf.matmul(design_scale, constraints_scale)
+            W = op_utils.groupwise_sum(W, design_idx, XHscale)  # [design groups, features]
             Hblock = tf.einsum('ofc,od->fcd',
                                tf.einsum('of,oc->ofc', W, XHloc),
                                XHscale)
@@ -134,20 +139,21 @@ class HessianGLMALL(HessiansGLM):
                 Containing the following parameters:
                 - X: tf.tensor observations x features
                     Observation by observation and feature.
-                - size_factors: tf.tensor observations x features
-                    Model size factors by observation and feature.
+                - size_factors: tf.tensor observations
+                    Model size factors by observation, None if there are no size factors.
                 - params: tf.tensor features x coefficients
                     Estimated model variables.
             :return H: tf.tensor features x coefficients x coefficients
                 Hessian evaluated on a single observation, provided in data.
             """
-            X, design_loc, design_scale, size_factors = data
+            X, design_idx, size_factors = unpack_batch(data)
             a_split, b_split = tf.split(params, tf.TensorShape([p_shape_a, p_shape_b]))
 
             model = BasicModelGraph(
                 X=X,
                 design_loc=design_loc,
                 design_scale=design_scale,
+                design_idx=design_idx,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 a_var=a_split,
@@ -162,6 +168,7 @@ class HessianGLMALL(HessiansGLM):
                 H_aa = _aa_byobs_batched(
                     X=X,
                     design_loc=design_loc,
+                    design_idx=design_idx,
                     constraints_loc=constraints_loc,
                     mu=mu,
                     r=r
@@ -169,6 +176,7 @@ class HessianGLMALL(HessiansGLM):
                 H_bb = _bb_byobs_batched(
                     X=X,
                     design_scale=design_scale,
+                    design_idx=design_idx,
                     constraints_scale=constraints_scale,
                     mu=mu,
                     r=r
@@ -177,6 +185,7 @@ class HessianGLMALL(HessiansGLM):
                     X=X,
                     design_loc=design_loc,
                     design_scale=design_scale,
+                    design_idx=design_idx,
                     constraints_loc=constraints_loc,
                     constraints_scale=constraints_scale,
                     mu=mu,
@@ -192,6 +201,7 @@ class HessianGLMALL(HessiansGLM):
                 H = _aa_byobs_batched(
                     X=X,
                     design_loc=design_loc,
+                    design_idx=design_idx,
                     constraints_loc=constraints_loc,
                     mu=mu,
                     r=r
@@ -200,6 +210,7 @@ class HessianGLMALL(HessiansGLM):
                 H = _bb_byobs_batched(
                     X=X,
                     design_scale=design_scale,
+                    design_idx=design_idx,
                     constraints_scale=constraints_scale,
                     mu=mu,
                     r=r
@@ -244,6 +255,8 @@ class HessianGLMALL(HessiansGLM):
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -266,6 +279,7 @@ class HessianGLMALL(HessiansGLM):
         def _aa_byfeature(
                 X,
                 design_loc,
+                design_idx,
                 constraints_loc,
                 mu,
                 r
@@ -290,6 +304,7 @@ class HessianGLMALL(HessiansGLM):
             # this was a feature before but is no recycled into coefficients.
             # const = tf.broadcast_to(const, shape=design_loc.shape)  # [observations, coefficients]
             XH = tf.matmul(design_loc, constraints_loc)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             Hblock = tf.matmul(  # [coefficients, coefficients]
                 tf.transpose(XH),  # [coefficients, observations]
                 tf.multiply(XH, W)  # [observations, coefficients]
@@ -299,6 +314,7 @@ class HessianGLMALL(HessiansGLM):
         def _bb_byfeature(
                 X,
                 design_scale,
+                design_idx,
                 constraints_scale,
                 mu,
                 r
@@ -316,6 +332,7 @@ class HessianGLMALL(HessiansGLM):
             # this was a feature before but is no recycled into coefficients.
             # const = tf.broadcast_to(const, shape=design_scale.shape)  # [observations, coefficients]
             XH = tf.matmul(design_scale, constraints_scale)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             Hblock = tf.matmul(  # [coefficients, coefficients]
                 tf.transpose(XH),  # [coefficients, observations]
                 tf.multiply(XH, W)  # [observations, coefficients]
@@ -326,6 +343,7 @@ class HessianGLMALL(HessiansGLM):
                 X,
                 design_loc,
                 design_scale,
+                design_idx,
                 constraints_loc,
                 constraints_scale,
                 mu,
@@ -349,6 +367,7 @@ class HessianGLMALL(HessiansGLM):
             # const = tf.broadcast_to(const, shape=design_scale.shape)  # [observations, coefficients_scale]
             XHloc = tf.matmul(design_loc, constraints_loc)
             XHscale = tf.matmul(design_scale, constraints_scale)
+            W = op_utils.groupwise_sum(W, design_idx, XHscale)  # [design groups, features]
             Hblock = tf.matmul(  # [coefficients_loc, coefficients_scale]
                 tf.transpose(XHloc),  # [coefficients_loc, observations]
                 tf.multiply(XHscale, W)  # [observations, coefficients_scale]
@@ -364,14 +383,11 @@ class HessianGLMALL(HessiansGLM):
                     Containing the following parameters:
                     - X_t: tf.tensor observations x features .T
                         Observation by observation and feature.
-                    - size_factors_t: tf.tensor observations x features .T
-                        Model size factors by observation and feature.
                     - params_t: tf.tensor features x coefficients .T
                         Estimated model variables.
                 """
-                X_t, size_factors_t, params_t = data
+                X_t, params_t = data
                 X = tf.transpose(X_t)
-                size_factors = tf.transpose(size_factors_t)
                 params = tf.transpose(params_t)  # design_params x features
                 a_split, b_split = tf.split(params, tf.TensorShape([p_shape_a, p_shape_b]))
 
@@ -379,6 +395,7 @@ class HessianGLMALL(HessiansGLM):
                     X=X,
                     design_loc=design_loc,
                     design_scale=design_scale,
+                    design_idx=design_idx,
                     constraints_loc=constraints_loc,
                     constraints_scale=constraints_scale,
                     a_var=a_split,
@@ -393,6 +410,7 @@ class HessianGLMALL(HessiansGLM):
                     H_aa = _aa_byfeature(
                         X=X,
                         design_loc=design_loc,
+                        design_idx=design_idx,
                         constraints_loc=constraints_loc,
                         mu=mu,
                         r=r
@@ -400,6 +418,7 @@ class HessianGLMALL(HessiansGLM):
                     H_bb = _bb_byfeature(
                         X=X,
                         design_scale=design_scale,
+                        design_idx=design_idx,
                         constraints_scale=constraints_scale,
                         mu=mu,
                         r=r
@@ -408,6 +427,7 @@ class HessianGLMALL(HessiansGLM):
                         X=X,
                         design_loc=design_loc,
                         design_scale=design_scale,
+                        design_idx=design_idx,
                         constraints_loc=constraints_loc,
                         constraints_scale=constraints_scale,
                         mu=mu,
@@ -423,6 +443,7 @@ class HessianGLMALL(HessiansGLM):
                     H = _aa_byfeature(
                         X=X,
                         design_loc=design_loc,
+                        design_idx=design_idx,
                         constraints_loc=constraints_loc,
                         mu=mu,
                         r=r
@@ -431,6 +452,7 @@ class HessianGLMALL(HessiansGLM):
                     H = _bb_byfeature(
                         X=X,
                         design_scale=design_scale,
+                        design_idx=design_idx,
                         constraints_scale=constraints_scale,
                         mu=mu,
                         r=r
@@ -440,14 +462,13 @@ class HessianGLMALL(HessiansGLM):
 
                 return [H]
 
-            X, design_loc, design_scale, size_factors = data
+            X, design_idx, size_factors = unpack_batch(data)
             X_t = tf.transpose(tf.expand_dims(X, axis=0), perm=[2, 0, 1])
-            size_factors_t = tf.transpose(tf.expand_dims(size_factors, axis=0), perm=[2, 0, 1])
             params_t = tf.transpose(tf.expand_dims(params, axis=0), perm=[2, 0, 1])
 
             H = tf.map_fn(
                 fn=_assemble_byfeature,
-                elems=(X_t, size_factors_t, params_t),
+                elems=(X_t, params_t),
                 dtype=[dtype],
                 parallel_iterations=pkg_constants.TF_LOOP_PARALLEL_ITERATIONS
             )
@@ -481,6 +502,8 @@ class HessianGLMALL(HessiansGLM):
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc: np.ndarray,
             constraints_scale: np.ndarray,
             model_vars: ModelVarsGLM,
@@ -511,6 +534,7 @@ class HessianGLMALL(HessiansGLM):
                 X,
                 design_loc,
                 design_scale,
+                design_idx,
                 constraints_loc,
                 constraints_scale,
                 params,
@@ -529,22 +553,20 @@ class HessianGLMALL(HessiansGLM):
             # Hessian computation will be mapped across genes/features.
             # The map function maps across dimension zero, the slices have to
             # be 2D tensors to fit into BasicModelGraph, accordingly,
-            # X, size_factors and params have to be reshaped to have genes in the first dimension
+            # X and params have to be reshaped to have genes in the first dimension
             # and cells or parameters with an extra padding dimension in the second
-            # and third dimension. Note that size_factors is not a 1xobservations array
-            # but is implicitly broadcasted to observations x features in Estimator.
+            # and third dimension. Note that size_factors is a vector over observations
+            # which is shared by all genes and therefore not mapped.
             X_t = tf.transpose(tf.expand_dims(X, axis=0), perm=[2, 0, 1])
-            size_factors_t = tf.transpose(tf.expand_dims(size_factors, axis=0), perm=[2, 0, 1])
             params_t = tf.transpose(tf.expand_dims(params, axis=0), perm=[2, 0, 1])
 
             def hessian(data):
                 """ Helper function that computes hessian for a given gene.
 
-                :param data: tuple (X_t, size_factors_t, params_t)
+                :param data: tuple (X_t, params_t)
                 """
                 # Extract input data:
-                X_t, size_factors_t, params_t = data
-                size_factors = tf.transpose(size_factors_t)  # observations x features
+                X_t, params_t = data
                 X = tf.transpose(X_t)  # observations x features
                 params = tf.transpose(params_t)  # design_params x features
 
@@ -556,6 +578,7 @@ class HessianGLMALL(HessiansGLM):
                     X=X,
                     design_loc=design_loc,
                     design_scale=design_scale,
+                    design_idx=design_idx,
                     constraints_loc=constraints_loc,
                     constraints_scale=constraints_scale,
                     a_var=a_split,
@@ -579,7 +602,7 @@ class HessianGLMALL(HessiansGLM):
             # Map hessian computation across genes
             H = tf.map_fn(
                 fn=hessian,
-                elems=(X_t, size_factors_t, params_t),
+                elems=(X_t, params_t),
                 dtype=[dtype],
                 parallel_iterations=pkg_constants.TF_LOOP_PARALLEL_ITERATIONS
             )
@@ -589,11 +612,12 @@ class HessianGLMALL(HessiansGLM):
             return H
 
         def _map(idx, data):
-            X, design_loc, design_scale, size_factors = data
+            X, design_idx, size_factors = unpack_batch(data)
             return feature_wises_batch(
                 X=X,
                 design_loc=design_loc,
                 design_scale=design_scale,
+                design_idx=design_idx,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 params=model_vars.params,
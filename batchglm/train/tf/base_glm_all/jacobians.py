@@ -4,7 +4,7 @@ from typing import List
 import tensorflow as tf
 
 from .external import ModelVarsGLM, JacobiansGLM
-from .external import op_utils
+from .external import op_utils, unpack_batch
 from .external import pkg_constants
 
 logger = logging.getLogger(__name__)
@@ -23,6 +23,8 @@ class JacobiansGLMALL(JacobiansGLM):
             self,
             batched_data,
             sample_indices,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -38,7 +40,7 @@ class JacobiansGLMALL(JacobiansGLM):
         else:
             raise ValueError("noise model %s was not recognized" % self.noise_model)
 
-        def _a_byobs(X, design_loc, constraints_loc, mu, r):
+        def _a_byobs(X, design_loc, design_idx, constraints_loc, mu, r):
             """
             Compute the mean model block of the jacobian.
 
@@ -53,15 +55,17 @@ class JacobiansGLMALL(JacobiansGLM):
             """
             W = self._W_a(X=X, mu=mu, r=r)  # [observations, features]
             XH = tf.matmul(design_loc, constraints_loc)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             Jblock = tf.matmul(tf.transpose(W), XH)  # [features, coefficients]
             return Jblock
 
-        def _b_byobs(X, design_scale, constraints_scale, mu, r):
+        def _b_byobs(X, design_scale, design_idx, constraints_scale, mu, r):
             """
             Compute the dispersion model block of the jacobian.
             """
             W = self._W_b(X=X, mu=mu, r=r)  # [observations, features]
             XH = tf.matmul(design_scale, constraints_scale)
+            W = op_utils.groupwise_sum(W, design_idx, XH)  # [design groups, features]
             Jblock = tf.matmul(tf.transpose(W), XH)  # [features, coefficients]
             return Jblock
 
@@ -77,19 +81,20 @@ class JacobiansGLMALL(JacobiansGLM):
                 Containing the following parameters:
                 - X: tf.tensor observations x features
                     Observation by observation and feature.
-                - size_factors: tf.tensor observations x features
-                    Model size factors by observation and feature.
+                - size_factors: tf.tensor observations
+                    Model size factors by observation, None if there are no size factors.
                 - params: tf.tensor features x coefficients
                     Estimated model variables.
             :return J: tf.tensor features x coefficients
                 Jacobian evaluated on a single observation, provided in data.
             """
-            X, design_loc, design_scale, size_factors = data
+            X, design_idx, size_factors = unpack_batch(data)
 
             model = BasicModelGraph(
                 X=X,
                 design_loc=design_loc,
                 design_scale=design_scale,
+                design_idx=design_idx,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 a_var=model_vars.a_var,
@@ -101,13 +106,41 @@ class JacobiansGLMALL(JacobiansGLM):
             r = model.r
 
             if self._compute_jac_a and self._compute_jac_b:
-                J_a = _a_byobs(X=X, design_loc=design_loc, constraints_loc=constraints_loc, mu=mu, r=r)
-                J_b = _b_byobs(X=X, design_scale=design_scale, constraints_scale=constraints_scale, mu=mu, r=r)
+                J_a = _a_byobs(
+                    X=X,
+                    design_loc=design_loc,
+                    design_idx=design_idx,
+                    constraints_loc=constraints_loc,
+                    mu=mu,
+                    r=r
+                )
+                J_b = _b_byobs(
+                    X=X,
+                    design_scale=design_scale,
+                    design_idx=design_idx,
+                    constraints_scale=constraints_scale,
+                    mu=mu,
+                    r=r
+                )
                 J = tf.concat([J_a, J_b], axis=1)
             elif self._compute_jac_a and not self._compute_jac_b:
-                J = _a_byobs(X=X, design_loc=design_loc, constraints_loc=constraints_loc, mu=mu, r=r)
+                J = _a_byobs(
+                    X=X,
+                    design_loc=design_loc,
+                    design_idx=design_idx,
+                    constraints_loc=constraints_loc,
+                    mu=mu,
+                    r=r
+                )
             elif not self._compute_jac_a and self._compute_jac_b:
-                J = _b_byobs(X=X, design_scale=design_scale, constraints_scale=constraints_scale, mu=mu, r=r)
+                J = _b_byobs(
+                    X=X,
+                    design_scale=design_scale,
+                    design_idx=design_idx,
+                    constraints_scale=constraints_scale,
+                    mu=mu,
+                    r=r
+                )
             else:
                 raise ValueError("either require jac_a or jac_b")
 
@@ -145,6 +178,8 @@ class JacobiansGLMALL(JacobiansGLM):
             batched_data,
             sample_indices,
             batch_model,
+            design_loc,
+            design_scale,
             constraints_loc,
             constraints_scale,
             model_vars: ModelVarsGLM,
@@ -186,19 +221,20 @@ class JacobiansGLMALL(JacobiansGLM):
                 Containing the following parameters:
                 - X: tf.tensor observations x features
                     Observation by observation and feature.
-                - size_factors: tf.tensor observations x features
-                    Model size factors by observation and feature.
+                - size_factors: tf.tensor observations
+                    Model size factors by observation, None if there are no size factors.
                 - params: tf.tensor features x coefficients
                     Estimated model variables.
             :return J: tf.tensor features x coefficients
                 Jacobian evaluated on a single observation, provided in data.
             """
-            X, design_loc, design_scale, size_factors = data
+            X, design_idx, size_factors = unpack_batch(data)
 
             model = BasicModelGraph(
                 X=X,
                 design_loc=design_loc,
                 design_scale=design_scale,
+                design_idx=design_idx,
                 constraints_loc=constraints_loc,
                 constraints_scale=constraints_scale,
                 a_var=model_vars.a_var,
@@ -0,0 +1,286 @@
+import logging
+
+import tensorflow as tf
+
+from .external import ModelVarsGLM
+from .external import op_utils, unpack_batch
+from .external import pkg_constants
+
+logger = logging.getLogger(__name__)
+
+
+class StatisticsGLMALL:
+    """
+    Compute the log-likelihood, Jacobian, Fisher information matrix and Hessian
+    of a GLM in a single pass over the data.
+
+    Jacobians, FIM and Hessians each iterate over the data and evaluate the model
+    on every batch separately. Here, the model is evaluated once per batch and all
+    requested statistics are computed from the same mu and r. The results are exposed
+    under the attribute names of JacobiansGLM, FIMGLM and HessiansGLM so that
+    an instance can be used in place of any of these.
+
+    Only the closed forms evaluated by observation batches are supported, this corresponds
+    to JACOBIAN_MODE "analytic" and HESSIAN_MODE "obs_batched".
+    """
+
+    noise_model: str
+
+    _update_a: bool
+    _update_b: bool
+    _compute_fim: bool
+    _compute_hessian: bool
+
+    log_likelihood: tf.Tensor
+    norm_log_likelihood: tf.Tensor
+    norm_neg_log_likelihood: tf.Tensor
+
+    jac: tf.Tensor
+    neg_jac: tf.Tensor
+
+    fim_a: tf.Tensor
+    fim_b: tf.Tensor
+
+    hessian: tf.Tensor
+    neg_hessian: tf.Tensor
+
+    def __init__(
+            self,
+            batched_data,
+            sample_indices: tf.Tensor,
+            batch_model,
+            design_loc,
+            design_scale,
+            constraints_loc,
+            constraints_scale,
+            model_vars: ModelVarsGLM,
+            noise_model: str,
+            dtype,
+            iterator=True,
+            update_a=True,
+            update_b=True,
+            compute_fim=True,
+            compute_hessian=False
+    ):
+        """ Return computational graph for all requested statistics.
+
+        :param batched_data:
+            Dataset iterator over mini-batches of data (used for training) or tf.Tensors of mini-batch.
+        :param sample_indices: Indices of samples to be used.
+        :param batch_model: BasicModelGraph instance or None
+            Model evaluated on `batched_data` if `iterator` is False. The model is built here if None.
+        :param design_loc: tensor (design groups x mean model parameters)
+            Unique rows of the location design model; the batches contain the group index of each observation.
+        :param design_scale: tensor (design groups x dispersion model parameters)
+            Unique rows of the scale design model; the batches contain the group index of each observation.
+        :param constraints_loc: tensor (all parameters x dependent parameters)
+            Tensor that encodes how complete parameter set which includes dependent
+            parameters arises from indepedent parameters: all = <constraints, indep>.
+            This tensor describes this relation for the mean model.
+        :param constraints_scale: tensor (all parameters x dependent parameters)
+            Tensor that encodes how complete parameter set which includes dependent
+            parameters arises from indepedent parameters: all = <constraints, indep>.
+            This tensor describes this relation for the dispersion model.
+        :param model_vars: ModelVarsGLM or ModelVarsSubsetGLM
+            Variables of model.
+        :param noise_model: str {"nb"}
+            Noise model identifier.
+        :param dtype: Precision used in tensorflow.
+        :param iterator: bool
+            Whether batched_data is an iterator or a tensor (such as single yield of an iterator).
+        :param update_a: bool
+            Wether to compute the statistics for a parameters.
+        :param update_b: bool
+            Wether to compute the statistics for b parameters.
+        :param compute_fim: bool
+            Wether to compute the blocks of the Fisher information matrix.
+        :param compute_hessian: bool
+            Wether to compute the Hessian. If both update_a and update_b are true,
+            the entire hessian with the off-diagonal a-b block is computed.
+        """
+        if not update_a and not update_b:
+            raise ValueError("either require update_a or update_b")
+
+        self.noise_model = noise_model
+        self._update_a = update_a
+        self._update_b = update_b
+        self._compute_fim = compute_fim
+        self._compute_hessian = compute_hessian
+
+        if self.noise_model == "nb":
+            from .external_nb import BasicModelGraph
+        else:
+            raise ValueError("noise model %s was not recognized" % self.noise_model)
+
+        XH_loc = tf.matmul(design_loc, constraints_loc)
+        XH_scale = tf.matmul(design_scale, constraints_scale)
+        zero = tf.zeros(shape=(), dtype=dtype)
+
+        def _outer(W, design_idx, XH_left, XH_right):
+            # Marginal of the two outer products between the feature-wise constants and the
+            # design matrix across observations, see HessianGLMALL.byobs().
+            W = op_utils.groupwise_sum(W, design_idx, XH_right)  # [design groups, features]
+            return tf.einsum('ofc,od->fcd', tf.einsum('of,oc->ofc', W, XH_left), XH_right)
+
+        def _assemble_batch(model, design_idx):
+            """
+            Evaluates all statistics on a batch of observations from a single model evaluation.
+
+            :return: tuple (ll, J_a, J_b, FIM_a, FIM_b, H_aa, H_bb, H_ab) with scalar zeros
+                for all statistics that are not requested.
+            """
+            X = model.X
+            mu = model.mu
+            r = model.r
+
+            ll = model.log_likelihood
+            J_a, J_b, fim_a, fim_b, H_aa, H_bb, H_ab = [zero] * 7
+            if self._update_a:
+                W = op_utils.groupwise_sum(self._W_jac_a(X=X, mu=mu, r=r), design_idx, XH_loc)
+                J_a = tf.matmul(tf.transpose(W), XH_loc)  # [features, coefficients]
+                if self._compute_fim:
+                    fim_a = _outer(self._W_fim_aa(mu=mu, r=r), design_idx, XH_loc, XH_loc)
+                if self._compute_hessian:
+                    H_aa = _outer(self._W_hess_aa(X=X, mu=mu, r=r), design_idx, XH_loc, XH_loc)
+            if self._update_b:
+                W = op_utils.groupwise_sum(self._W_jac_b(X=X, mu=mu, r=r), design_idx, XH_scale)
+                J_b = tf.matmul(tf.transpose(W), XH_scale)  # [features, coefficients]
+                if self._compute_fim:
+                    fim_b = _outer(self._W_fim_bb(X=X, mu=mu, r=r), design_idx, XH_scale, XH_scale)
+                if self._compute_hessian:
+                    H_bb = _outer(self._W_hess_bb(X=X, mu=mu, r=r), design_idx, XH_scale, XH_scale)
+            if self._update_a and self._update_b and self._compute_hessian:
+                H_ab = _outer(self._W_hess_ab(X=X, mu=mu, r=r), design_idx, XH_loc, XH_scale)
+
+            return ll, J_a, J_b, fim_a, fim_b, H_aa, H_bb, H_ab
+
+        def _map_batch(idx, data):
+            X, design_idx, size_factors = unpack_batch(data)
+            model = BasicModelGraph(
+                X=X,
+                design_loc=design_loc,
+                design_scale=design_scale,
+                design_idx=design_idx,
+                constraints_loc=constraints_loc,
+                constraints_scale=constraints_scale,
+                a_var=model_vars.a_var,
+                b_var=model_vars.b_var,
+                dtype=dtype,
+                size_factors=size_factors
+            )
+            return _assemble_batch(model=model, design_idx=design_idx)
+
+        def _red(prev, cur):
+            """
+            Reduction operation for all statistics across observation batches.
+            """
+            return tuple([tf.add(p, c) for p, c in zip(prev, cur)])
+
+        if iterator:
+            stats = op_utils.map_reduce(
+                last_elem=tf.gather(sample_indices, tf.size(sample_indices) - 1),
+                data=batched_data,
+                map_fn=_map_batch,
+                reduce_fn=_red,
+                parallel_iterations=pkg_constants.TF_LOOP_PARALLEL_ITERATIONS
+            )
+        elif batch_model is not None:
+            stats = _assemble_batch(model=batch_model, design_idx=batch_model.design_idx)
+        else:
+            stats = _map_batch(idx=sample_indices, data=batched_data)
+        ll, J_a, J_b, fim_a, fim_b, H_aa, H_bb, H_ab = stats
+
+        self.log_likelihood = ll
+        self.norm_log_likelihood = ll / tf.cast(tf.size(sample_indices), dtype=ll.dtype)
+        self.norm_neg_log_likelihood = - self.norm_log_likelihood
+
+        # Assign jacobian blocks as in JacobiansGLM.
+        if self._update_a and self._update_b:
+            J = tf.concat([J_a, J_b], axis=1)
+        elif self._update_a:
+            J = J_a
+            J_b = None
+        else:
+            J = J_b
+            J_a = None
+        self.jac = J
+        self.jac_a = J_a
+        self.jac_b = J_b
+        self.neg_jac = tf.negative(J)
+        self.neg_jac_a = tf.negative(J_a) if J_a is not None else None
+        self.neg_jac_b = tf.negative(J_b) if J_b is not None else None
+
+        # Assign fisher information matrix blocks as in FIMGLM.
+        self.fim_a = fim_a if self._compute_fim else None
+        self.fim_b = fim_b if self._compute_fim else None
+
+        # Assign hessian blocks as in HessiansGLM.
+        if self._compute_hessian:
+            if self._update_a and self._update_b:
+                H_ba = tf.transpose(H_ab, perm=[0, 2, 1])
+                H = tf.concat(
+                    [tf.concat([H_aa, H_ab], axis=2),
+                     tf.concat([H_ba, H_bb], axis=2)],
+                    axis=1
+                )
+            elif self._update_a:
+                H = H_aa
+                H_bb = None
+            else:
+                H = H_bb
+                H_aa = None
+            self.hessian = H
+            self.hessian_aa = H_aa
+            self.hessian_bb = H_bb
+            self.neg_hessian = tf.negative(H)
+            self.neg_hessian_aa = tf.negative(H_aa) if H_aa is not None else None
+            self.neg_hessian_bb = tf.negative(H_bb) if H_bb is not None else None
+        else:
+            self.hessian = None
+            self.hessian_aa = None
+            self.hessian_bb = None
+            self.neg_hessian = None
+            self.neg_hessian_aa = None
+            self.neg_hessian_bb = None
+
+    def _W_jac_a(self, X, mu, r):
+        """
+        Coefficient invariant part of the mean model gradient, see JacobiansGLM._W_a().
+        """
+        raise NotImplementedError()
+
+    def _W_jac_b(self, X, mu, r):
+        """
+        Coefficient invariant part of the dispersion model gradient, see JacobiansGLM._W_b().
+        """
+        raise NotImplementedError()
+
+    def _W_fim_aa(self, mu, r):
+        """
+        Coefficient invariant part of the mean model FIM block, see FIMGLM._W_aa().
+        """
+        raise NotImplementedError()
+
+    def _W_fim_bb(self, X, mu, r):
+        """
+        Coefficient invariant part of the dispersion model FIM block, see FIMGLM._W_bb().
+        """
+        raise NotImplementedError()
+
+    def _W_hess_aa(self, X, mu, r):
+        """
+        Coefficient invariant part of the mean model hessian block, see HessiansGLM._W_aa().
+        """
+        raise NotImplementedError()
+
+    def _W_hess_bb(self, X, mu, r):
+        """
+        Coefficient invariant part of the dispersion model hessian block, see HessiansGLM._W_bb().
+        """
+        raise NotImplementedError()
+
+    def _W_hess_ab(self, X, mu, r):
+        """
+        Coefficient invariant part of the off-diagonal hessian block, see HessiansGLM._W_ab().
+        """
+        raise NotImplementedError()
@@ -4,3 +4,4 @@ from .model import BasicModelGraph, ModelVars, ProcessModel
 from .hessians import Hessians
 from .fim import FIM
 from .jacobians import Jacobians
+from .statistics import Statistics
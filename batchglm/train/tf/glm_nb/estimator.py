@@ -1,15 +1,14 @@
 import logging
 from typing import Union
+from enum import Enum
 
 import numpy as np
 import tensorflow as tf
 
 from .external import AbstractEstimator, EstimatorAll, ESTIMATOR_PARAMS, InputData, Model
-from .external import data_utils
-from .external import closedform_nb_glm_logmu, closedform_nb_glm_logphi
+from .external import init_par_nb_glm, TrainingStrategies
 from .estimator_graph import EstimatorGraph
 from .model import ProcessModel
-from .training_strategies import TrainingStrategies
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +32,11 @@ class Estimator(EstimatorAll, AbstractEstimator, ProcessModel):
             provide_optimizers: dict = None,
             termination_type: str = "by_feature",
             extended_summary=False,
+            input_pipeline: str = "py_func",
+            reuse_graph: bool = False,
+            training_strategy: Union[list, str, Enum] = "AUTO",
+            sampler: str = "AUTO",
+            block_size: int = None,
             dtype="float64",
     ):
         self.TrainingStrategies = TrainingStrategies
@@ -50,6 +54,11 @@ class Estimator(EstimatorAll, AbstractEstimator, ProcessModel):
             termination_type=termination_type,
             extended_summary=extended_summary,
             noise_model="nb",
+            input_pipeline=input_pipeline,
+            reuse_graph=reuse_graph,
+            training_strategy=training_strategy,
+            sampler=sampler,
+            block_size=block_size,
             dtype=dtype
         )
 
@@ -63,130 +72,17 @@ class Estimator(EstimatorAll, AbstractEstimator, ProcessModel):
             init_b,
             init_model
     ):
-        r"""
-        standard:
-        Only initialise intercept and keep other coefficients as zero.
-
-        closed-form:
-        Initialize with Maximum Likelihood / Maximum of Momentum estimators
-
-        Idea:
-        $$
-            \theta &= f(x) \\
-            \Rightarrow f^{-1}(\theta) &= x \\
-                &= (D \cdot D^{+}) \cdot x \\
-                &= D \cdot (D^{+} \cdot x) \\
-                &= D \cdot x' = f^{-1}(\theta)
-        $$
         """
-
-        size_factors_init = self.input_data.size_factors
-        if size_factors_init is not None:
-            size_factors_init = np.expand_dims(size_factors_init, axis=1)
-            size_factors_init = np.broadcast_to(
-                array=size_factors_init,
-                shape=[self.input_data.num_observations, self.input_data.num_features]
-            )
-
-        if isinstance(init_a, str):
-            # Chose option if auto was chosen
-            if init_a.lower() == "auto":
-                init_a = "closed_form"
-
-            if init_a.lower() == "closed_form":
-                try:
-                    groupwise_means, init_a, rmsd_a = closedform_nb_glm_logmu(
-                        X=self.input_data.X,
-                        design_loc=self.input_data.design_loc,
-                        constraints_loc=self.input_data.constraints_loc,
-                        size_factors=size_factors_init,
-                        link_fn=lambda mu: np.log(self.np_clip_param(mu, "mu"))
-                    )
-
-                    # train mu, if the closed-form solution is inaccurate
-                    self._train_loc = not np.all(rmsd_a == 0)
-
-                    # Temporal fix: train mu if size factors are given as closed form may be different:
-                    if self.input_data.size_factors is not None:
-                        self._train_loc = True
-
-                    logger.debug("Using closed-form MLE initialization for mean")
-                    logger.debug("RMSE of closed-form mean:\n%s", rmsd_a)
-                    logger.debug("Should train mu: %s", self._train_loc)
-                except np.linalg.LinAlgError:
-                    logger.warning("Closed form initialization failed!")
-            elif init_a.lower() == "standard":
-                overall_means = self.input_data.X.mean(dim="observations").values  # directly calculate the mean
-                overall_means = self.np_clip_param(overall_means, "mu")
-
-                init_a = np.zeros([self.input_data.num_loc_params, self.input_data.num_features])
-                init_a[0, :] = np.log(overall_means)
-                self._train_loc = True
-
-                logger.debug("Using standard initialization for mean")
-                logger.debug("Should train mu: %s", self._train_loc)
-
-        if isinstance(init_b, str):
-            if init_b.lower() == "auto":
-                init_b = "closed_form"
-
-            if init_b.lower() == "closed_form":
-                try:
-                    init_a_xr = data_utils.xarray_from_data(init_a, dims=("loc_params", "features"))
-                    init_a_xr.coords["loc_params"] = self.input_data.constraints_loc.coords["loc_params"]
-                    # TODO: memory inefficient:
-                    init_mu = np.exp(self.input_data.design_loc.dot(self.input_data.constraints_loc.dot(init_a_xr)))
-
-                    groupwise_scales, init_b, rmsd_b = closedform_nb_glm_logphi(
-                        X=self.input_data.X,
-                        mu=init_mu,
-                        design_scale=self.input_data.design_scale,
-                        constraints=self.input_data.constraints_scale,
-                        size_factors=size_factors_init,
-                        groupwise_means=None,
-                        link_fn=lambda r: np.log(self.np_clip_param(r, "r"))
-                    )
-
-                    logger.info("Using closed-form MME initialization for dispersion")
-                    logger.debug("RMSE of closed-form dispersion:\n%s", rmsd_b)
-                    logger.info("Should train r: %s", self._train_scale)
-                except np.linalg.LinAlgError:
-                    logger.warning("Closed form initialization failed!")
-            elif init_b.lower() == "standard":
-                init_b = np.zeros([self.input_data.num_scale_params, self.input_data.X.shape[1]])
-
-                logger.info("Using standard initialization for dispersion")
-                logger.info("Should train r: %s", self._train_scale)
-
-        if init_model is not None:
-            # Locations model:
-            if isinstance(init_a, str) and (init_a.lower() == "auto" or init_a.lower() == "init_model"):
-                my_loc_names = set(self.input_data.design_loc_names.values)
-                my_loc_names = my_loc_names.intersection(init_model.input_data.design_loc_names.values)
-
-                init_loc = np.zeros([self.input_data.num_loc_params, self.input_data.num_features])
-                for parm in my_loc_names:
-                    init_idx = np.where(init_model.input_data.design_loc_names == parm)
-                    my_idx = np.where(self.input_data.design_loc_names == parm)
-                    init_loc[my_idx] = init_model.par_link_loc[init_idx]
-
-                init_a = init_loc
-                logger.info("Using initialization based on input model for mean")
-
-            # Scale model:
-            if isinstance(init_b, str) and (init_b.lower() == "auto" or init_b.lower() == "init_model"):
-                my_scale_names = set(self.input_data.design_scale_names.values)
-                my_scale_names = my_scale_names.intersection(init_model.input_data.design_scale_names.values)
-
-                init_scale = np.zeros([self.input_data.num_scale_params, self.input_data.num_features])
-                for parm in my_scale_names:
-                    init_idx = np.where(init_model.input_data.design_scale_names == parm)
-                    my_idx = np.where(self.input_data.design_scale_names == parm)
-                    init_scale[my_idx] = init_model.par_link_scale[init_idx]
-
-                init_b = init_scale
-                logger.info("Using initialization based on input model for dispersion")
-
+        See init_par_nb_glm().
+        """
+        init_a, init_b, self._train_loc = init_par_nb_glm(
+            input_data=self.input_data,
+            init_a=init_a,
+            init_b=init_b,
+            init_model=init_model,
+            clip_param=self.np_clip_param,
+            train_loc=self._train_loc
+        )
         return init_a, init_b
 
     @property
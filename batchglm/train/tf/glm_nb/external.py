@@ -3,6 +3,8 @@ import batchglm.data as data_utils
 from batchglm.models.glm_nb import AbstractEstimator, EstimatorStoreXArray, InputData, Model
 from batchglm.models.base_glm.utils import closedform_glm_mean, closedform_glm_var
 from batchglm.models.glm_nb.utils import closedform_nb_glm_logmu, closedform_nb_glm_logphi
+from batchglm.models.glm_nb.utils import init_par_nb_glm, param_bounds_nb_glm
+from batchglm.models.glm_nb.training_strategies import TrainingStrategies
 
 import batchglm.train.tf.ops as op_utils
 import batchglm.train.tf.train as train_utils
@@ -12,7 +14,7 @@ from batchglm.train.tf.base_glm import GradientGraphGLM, NewtonGraphGLM, Trainer
 from batchglm.train.tf.base_glm import ESTIMATOR_PARAMS, ProcessModelGLM, ModelVarsGLM
 from batchglm.train.tf.base_glm import HessiansGLM, FIMGLM, JacobiansGLM
 
-from batchglm.train.tf.base_glm_all import EstimatorAll, EstimatorGraphAll, FIMGLMALL, HessianGLMALL, JacobiansGLMALL
+from batchglm.train.tf.base_glm_all import EstimatorAll, EstimatorGraphAll, FIMGLMALL, HessianGLMALL, JacobiansGLMALL, StatisticsGLMALL
 
 import batchglm.utils.random as rand_utils
 from batchglm.utils.linalg import groupwise_solve_lm
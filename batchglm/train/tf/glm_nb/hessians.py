@@ -3,6 +3,7 @@ import tensorflow as tf
 import logging
 
 from .external import HessianGLMALL
+from .external import op_utils, pkg_constants
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,9 @@ class Hessians(HessianGLMALL):
             mu,
             r,
     ):
+        if pkg_constants.SPARSE_KERNELS:
+            return self._W_ab_sparse(X=X, mu=mu, r=r)
+
         const = tf.multiply(
             mu * r,
             tf.divide(
@@ -45,6 +49,9 @@ class Hessians(HessianGLMALL):
             mu,
             r,
     ):
+        if pkg_constants.SPARSE_KERNELS:
+            return self._W_bb_sparse(X=X, mu=mu, r=r)
+
         scalar_one = tf.constant(1, shape=(), dtype=X.dtype)
         scalar_two = tf.constant(2, shape=(), dtype=X.dtype)
         # Pre-define sub-graphs that are used multiple times:
@@ -74,4 +81,65 @@ class Hessians(HessianGLMALL):
         const = tf.multiply(r, const)
         return const
 
+    def _W_ab_sparse(
+            self,
+            X,
+            mu,
+            r,
+    ):
+        r"""
+        Sparse evaluation of `_W_ab()`:
+
+        .. math::
+            W_{ab} = - \frac{\mu^2 r}{(\mu + r)^2} + X \frac{\mu r}{(\mu + r)^2}
+
+        The second term is only computed on the nonzero entries of `X`.
+        """
+        idx_nz, X_nz, mu_nz, r_nz = op_utils.gather_nonzero(X, mu, r)
+        const_nz = X_nz * mu_nz * r_nz / tf.square(mu_nz + r_nz)
+        const_zero = tf.negative(tf.square(mu) * r / tf.square(mu + r))
+        const = op_utils.scatter_nonzero(idx_nz, const_nz, like=const_zero) + const_zero
+        return const
+
+    def _W_bb_sparse(
+            self,
+            X,
+            mu,
+            r,
+    ):
+        r"""
+        Sparse evaluation of `_W_bb()`.
+
+        The closed form for X = 0, in which all digamma and trigamma terms cancel, is evaluated densely:
 
+        .. math::
+            r \left( \log \frac{r}{r + \mu} + 2 - \frac{\mu r + 2 r (r + \mu)}{(r + \mu)^2} \right)
+
+        The count-dependent correction is only computed on the nonzero entries of `X`:
+
+        .. math::
+            r \left( \psi(r + X) - \psi(r) + r (\psi_1(r + X) - \psi_1(r)) - \frac{\mu X}{(r + \mu)^2} \right)
+        """
+        scalar_one = tf.constant(1, shape=(), dtype=X.dtype)
+        scalar_two = tf.constant(2, shape=(), dtype=X.dtype)
+
+        idx_nz, X_nz, mu_nz, r_nz = op_utils.gather_nonzero(X, mu, r)
+        r_plus_x_nz = r_nz + X_nz
+        const_nz = tf.add_n([
+            tf.math.digamma(x=r_plus_x_nz) - tf.math.digamma(x=r_nz),
+            r_nz * (
+                tf.math.polygamma(a=scalar_one, x=r_plus_x_nz) - tf.math.polygamma(a=scalar_one, x=r_nz)
+            ),
+            tf.negative(mu_nz * X_nz / tf.square(r_nz + mu_nz))
+        ])
+        const_nz = r_nz * const_nz
+
+        r_plus_mu = r + mu
+        const_zero = tf.add_n([
+            tf.log(r) - tf.log(r_plus_mu),
+            scalar_two * tf.ones_like(r),
+            tf.negative((mu * r + scalar_two * r * r_plus_mu) / tf.square(r_plus_mu))
+        ])
+        const_zero = r * const_zero
+        const = op_utils.scatter_nonzero(idx_nz, const_nz, like=const_zero) + const_zero
+        return const
@@ -3,6 +3,7 @@ import logging
 import tensorflow as tf
 
 from .external import JacobiansGLMALL
+from .external import op_utils, pkg_constants
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,9 @@ class Jacobians(JacobiansGLMALL):
             mu,
             r,
     ):
+        if pkg_constants.SPARSE_KERNELS:
+            return self._W_a_sparse(X=X, mu=mu, r=r)
+
         const = tf.multiply(  # [observations, features]
             tf.add(X, r),
             tf.divide(
@@ -25,6 +29,25 @@ class Jacobians(JacobiansGLMALL):
         const = tf.subtract(X, const)
         return const
 
+    def _W_a_sparse(
+            self,
+            X,
+            mu,
+            r,
+    ):
+        r"""
+        Sparse evaluation of `_W_a()`:
+
+        .. math::
+            W_a = X \frac{r}{\mu + r} - \frac{\mu r}{\mu + r}
+
+        The first term is only computed on the nonzero entries of `X`.
+        """
+        idx_nz, X_nz, mu_nz, r_nz = op_utils.gather_nonzero(X, mu, r)
+        const_nz = X_nz * r_nz / (mu_nz + r_nz)
+        const_zero = tf.negative(mu * r / (mu + r))
+        const = op_utils.scatter_nonzero(idx_nz, const_nz, like=const_zero) + const_zero
+        return const
 
     def _W_b(
             self,
@@ -32,6 +55,9 @@ class Jacobians(JacobiansGLMALL):
             mu,
             r,
     ):
+        if pkg_constants.SPARSE_KERNELS:
+            return self._W_b_sparse(X=X, mu=mu, r=r)
+
         scalar_one = tf.constant(1, shape=(), dtype=X.dtype)
         # Pre-define sub-graphs that are used multiple times:
         r_plus_mu = r + mu
@@ -49,3 +75,28 @@ class Jacobians(JacobiansGLMALL):
         const = tf.add_n([const1, const2, const3])  # [observations, features]
         const = r * const
         return const
+
+    def _W_b_sparse(
+            self,
+            X,
+            mu,
+            r,
+    ):
+        r"""
+        Sparse evaluation of `_W_b()`:
+
+        .. math::
+            W_b = r \left( \log \frac{r}{r + \mu} + \frac{\mu}{r + \mu} \right) +
+                r \left( \psi(r + X) - \psi(r) - \frac{X}{r + \mu} \right)
+
+        The first term is the closed form for X = 0, the second term is only computed on the nonzero entries of `X`.
+        """
+        idx_nz, X_nz, mu_nz, r_nz = op_utils.gather_nonzero(X, mu, r)
+        const_nz = r_nz * (
+            tf.math.digamma(x=r_nz + X_nz) - tf.math.digamma(x=r_nz) - X_nz / (r_nz + mu_nz)
+        )
+
+        r_plus_mu = r + mu
+        const_zero = r * (tf.log(r) - tf.log(r_plus_mu) + mu / r_plus_mu)
+        const = op_utils.scatter_nonzero(idx_nz, const_nz, like=const_zero) + const_zero
+        return const
@@ -2,10 +2,10 @@ import logging
 
 import tensorflow as tf
 
-import numpy as np
-
 from .external import ProcessModelGLM, ModelVarsGLM, BasicModelGraphGLM
 from .external import pkg_constants
+from .external import param_bounds_nb_glm
+from .external import op_utils
 
 logger = logging.getLogger(__name__)
 
@@ -17,37 +17,8 @@ class ProcessModel(ProcessModelGLM):
             dtype
     ):
         if isinstance(dtype, tf.DType):
-            dmin = dtype.min
-            dmax = dtype.max
             dtype = dtype.as_numpy_dtype
-        else:
-            dtype = np.dtype(dtype)
-            dmin = np.finfo(dtype).min
-            dmax = np.finfo(dtype).max
-            dtype = dtype.type
-
-        sf = dtype(pkg_constants.ACCURACY_MARGIN_RELATIVE_TO_LIMIT)
-        bounds_min = {
-            "a_var": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
-            "b_var": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
-            "eta_loc": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
-            "eta_scale": np.log(np.nextafter(0, np.inf, dtype=dtype)) / sf,
-            "mu": np.nextafter(0, np.inf, dtype=dtype),
-            "r": np.nextafter(0, np.inf, dtype=dtype),
-            "probs": dtype(0),
-            "log_probs": np.log(np.nextafter(0, np.inf, dtype=dtype)),
-        }
-        bounds_max = {
-            "a_var": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
-            "b_var": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
-            "eta_loc": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
-            "eta_scale": np.nextafter(np.log(dmax), -np.inf, dtype=dtype) / sf,
-            "mu": np.nextafter(dmax, -np.inf, dtype=dtype) / sf,
-            "r": np.nextafter(dmax, -np.inf, dtype=dtype) / sf,
-            "probs": dtype(1),
-            "log_probs": dtype(0),
-        }
-        return bounds_min, bounds_max
+        return param_bounds_nb_glm(dtype)
 
 
 class ModelVars(ProcessModel, ModelVarsGLM):
@@ -68,7 +39,8 @@ class BasicModelGraph(ProcessModel, BasicModelGraphGLM):
             a_var,
             b_var,
             dtype,
-            size_factors=None
+            size_factors=None,
+            design_idx=None
     ):
         BasicModelGraphGLM.__init__(
             self=self,
@@ -80,7 +52,8 @@ class BasicModelGraph(ProcessModel, BasicModelGraphGLM):
             a_var=a_var,
             b_var=b_var,
             dtype=dtype,
-            size_factors=size_factors
+            size_factors=size_factors,
+            design_idx=design_idx
         )
         
         # Inverse linker functions:
@@ -89,10 +62,21 @@ class BasicModelGraph(ProcessModel, BasicModelGraphGLM):
 
         # Log-likelihood:
         log_r_plus_mu = tf.log(model_scale + model_loc)
-        log_probs = tf.math.lgamma(model_scale + X) - \
-                    tf.math.lgamma(X + 1) - tf.math.lgamma(model_scale) + \
-                    tf.multiply(X, self.eta_loc - log_r_plus_mu) + \
-                    tf.multiply(model_scale, self.eta_scale - log_r_plus_mu)
+        if pkg_constants.SPARSE_KERNELS:
+            # All count-dependent terms vanish for X = 0; evaluate them only on the nonzero entries.
+            idx_nz, X_nz, r_nz, eta_loc_nz, log_r_plus_mu_nz = op_utils.gather_nonzero(
+                X, model_scale, self.eta_loc, log_r_plus_mu
+            )
+            log_probs_nz = tf.math.lgamma(r_nz + X_nz) - \
+                           tf.math.lgamma(X_nz + 1) - tf.math.lgamma(r_nz) + \
+                           tf.multiply(X_nz, eta_loc_nz - log_r_plus_mu_nz)
+            log_probs = op_utils.scatter_nonzero(idx_nz, log_probs_nz, like=log_r_plus_mu) + \
+                        tf.multiply(model_scale, self.eta_scale - log_r_plus_mu)
+        else:
+            log_probs = tf.math.lgamma(model_scale + X) - \
+                        tf.math.lgamma(X + 1) - tf.math.lgamma(model_scale) + \
+                        tf.multiply(X, self.eta_loc - log_r_plus_mu) + \
+                        tf.multiply(model_scale, self.eta_scale - log_r_plus_mu)
         log_probs = self.tf_clip_param(log_probs, "log_probs")
 
         # Variance:
@@ -0,0 +1,30 @@
+import logging
+
+from .external import StatisticsGLMALL
+from .fim import FIM
+from .hessians import Hessians
+from .jacobians import Jacobians
+
+logger = logging.getLogger(__name__)
+
+
+class Statistics(StatisticsGLMALL):
+    """
+    Fused statistics of the negative binomial GLM.
+
+    The coefficient invariant terms are shared with Jacobians, FIM and Hessians.
+    """
+
+    _W_jac_a = Jacobians._W_a
+    _W_jac_b = Jacobians._W_b
+    _W_a_sparse = Jacobians._W_a_sparse
+    _W_b_sparse = Jacobians._W_b_sparse
+
+    _W_fim_aa = FIM._W_aa
+    _W_fim_bb = FIM._W_bb
+
+    _W_hess_aa = Hessians._W_aa
+    _W_hess_bb = Hessians._W_bb
+    _W_hess_ab = Hessians._W_ab
+    _W_ab_sparse = Hessians._W_ab_sparse
+    _W_bb_sparse = Hessians._W_bb_sparse
@@ -1,5 +1,6 @@
 from typing import Union
 
+import numpy as np
 import tensorflow as tf
 
 
@@ -234,22 +235,99 @@ def keep_const(tensor: tf.Tensor, cond: tf.Tensor, constant: tf.Tensor = None, n
         return tf.where(cond, tensor, constant)
 
 
-def caching_placeholder(dtype, shape=None, name=None):
+def caching_placeholder(dtype, shape=None, name=None, collections=None, use_resource=None):
     """
     Placeholder which keeps its data after initialization.
     Saves feeding the data in each session run.
 
+    The placeholder which has to be fed when running `var.initializer` is available as `var.initial_value`.
+
     :param dtype: data type of the placeholder
     :param shape: shape of the placeholder
     :param name: name of the placeholder
+    :param collections: graph collections the variable is added to; see tf.Variable.
+        Use `[]` to exclude the cached data from checkpoints and from the global variable initializer.
+    :param use_resource: If True, creates a resource variable which can be captured by tf.data functions.
     :return: tf.Variable, initialized by the placeholder
     """
     placehldr = tf.placeholder(dtype, shape=shape, name=name)
 
-    var = tf.Variable(placehldr, trainable=False, name=name + "_cache")
+    var = tf.Variable(
+        placehldr,
+        trainable=False,
+        name=name + "_cache",
+        collections=collections,
+        use_resource=use_resource
+    )
     return var
 
 
+def gather_nonzero(X, *tensors, name="gather_nonzero"):
+    """
+    Gathers the nonzero entries of `X` and the entries of `tensors` at the same positions.
+
+    :param X: tensor which defines the sparsity pattern
+    :param tensors: further tensors of the same shape as `X`
+    :param name: name scope of this op
+    :return: tuple (indices, X_nz, *tensors_nz) where `indices` are the int64 coordinates of the nonzero entries
+    """
+    with tf.name_scope(name):
+        indices = tf.where(tf.not_equal(X, 0))
+        return (indices, tf.gather_nd(X, indices)) + tuple(tf.gather_nd(t, indices) for t in tensors)
+
+
+def scatter_nonzero(indices, values, like, name="scatter_nonzero"):
+    """
+    Inverse of `gather_nonzero()`: writes `values` to `indices` of a zero tensor with the shape of `like`.
+
+    :param indices: int64 coordinates as returned by `gather_nonzero()`
+    :param values: values at the coordinates
+    :param like: tensor defining the shape of the output
+    :param name: name scope of this op
+    :return: dense tensor of shape `tf.shape(like)`
+    """
+    with tf.name_scope(name):
+        return tf.scatter_nd(indices, values, shape=tf.shape(like, out_type=tf.int64))
+
+
+def scatter_rows(indices, values, num_rows, name="scatter_rows"):
+    """
+    Writes the rows `values` to the rows `indices` of a zero tensor with `num_rows` rows.
+
+    :param indices: 1D int64 tensor of row indices
+    :param values: tensor (indices x columns)
+    :param num_rows: number of rows of the output
+    :param name: name scope of this op
+    :return: dense tensor (num_rows x columns)
+    """
+    with tf.name_scope(name):
+        return tf.scatter_nd(
+            tf.expand_dims(indices, axis=-1),
+            values,
+            shape=tf.stack([
+                tf.cast(num_rows, dtype=tf.int64),
+                tf.shape(values, out_type=tf.int64)[1]
+            ])
+        )
+
+
+def groupwise_sum(values, group_idx, groups, name="groupwise_sum"):
+    """
+    Sums the rows of `values` which belong to the same group.
+
+    :param values: tensor (observations x ...)
+    :param group_idx: tensor (observations) with the group of each row of `values`;
+        if None, `values` is returned unchanged.
+    :param groups: tensor (groups x ...) whose first dimension defines the number of groups
+    :param name: name scope of this op
+    :return: tensor (groups x ...)
+    """
+    if group_idx is None:
+        return values
+    with tf.name_scope(name):
+        return tf.unsorted_segment_sum(values, group_idx, num_segments=tf.shape(groups)[0])
+
+
 def hessian_diagonal(ys, xs, name="hessian_diagonal", **kwargs):
     """
     Returns the second order derivative of ys wrt. xs.
@@ -279,12 +357,165 @@ def pinv(matrix, threshold=1e-5):
     s, u, v = tf.svd(matrix)  # , full_matrices=True, compute_uv=True)
 
     adj_threshold = tf.reduce_max(s, axis=-1, keepdims=True) * threshold
-    s_inv = tf.where(s > tf.broadcast_to(adj_threshold, s.shape), tf.reciprocal(s), tf.zeros_like(s))
+    s_inv = tf.where(s > tf.broadcast_to(adj_threshold, tf.shape(s)), tf.reciprocal(s), tf.zeros_like(s))
     s_inv = tf.matrix_diag(s_inv)
 
     return v @ (s_inv @ swap_dims(u, axis0=-1, axis1=-2))
 
 
+def cholesky_checked(matrix, rcond=None, name="cholesky_checked"):
+    r"""
+    Cholesky decomposition of a batch of symmetric matrices which flags failed decompositions instead of raising.
+
+    tf.cholesky() aborts on the first matrix of a batch which is not positive definite. This decomposition
+    is unrolled over the (static) number of columns instead. A pivot which is not finite or not larger than
+    `rcond` times the largest absolute diagonal element of its matrix marks the decomposition as failed;
+    the pivot is replaced by one so that the remaining columns stay finite. The factors of failed matrices
+    are not meaningful and have to be discarded by the caller.
+
+    :param matrix: tensor of shape (N, K, K) with symmetric matrices
+    :param rcond: relative threshold for the pivots, defaults to `K` times the machine precision
+    :param name: name scope of this op
+    :return: tuple (chol, is_pd)
+
+        - chol: tensor of shape (N, K, K) with the lower triangular Cholesky factors
+        - is_pd: boolean tensor of shape (N) which is True for successful decompositions
+    """
+    with tf.name_scope(name):
+        num_params = matrix.shape[-1].value
+        if rcond is None:
+            rcond = num_params * np.finfo(matrix.dtype.as_numpy_dtype).eps
+
+        diag = tf.matrix_diag_part(matrix)
+        threshold = rcond * tf.reduce_max(tf.abs(diag), axis=-1)
+
+        columns = []
+        pivots_ok = []
+        for j in range(num_params):
+            col = matrix[:, :, j]
+            if j > 0:
+                chol_left = tf.stack(columns, axis=-1)
+                col = col - tf.squeeze(tf.matmul(chol_left, tf.expand_dims(chol_left[:, j, :], axis=-1)), axis=-1)
+            pivot = col[:, j]
+            # Comparisons with NaN are false, non-finite pivots therefore fail as well.
+            pivot_ok = tf.logical_and(pivot > threshold, tf.is_finite(pivot))
+            scale = tf.rsqrt(tf.where(pivot_ok, pivot, tf.ones_like(pivot)))
+            row_mask = tf.constant([0.] * j + [1.] * (num_params - j), dtype=matrix.dtype)
+            columns.append(col * tf.expand_dims(scale, axis=-1) * row_mask)
+            pivots_ok.append(pivot_ok)
+
+        chol = tf.stack(columns, axis=-1)
+        is_pd = tf.reduce_all(tf.stack(pivots_ok, axis=-1), axis=-1)
+
+        return chol, is_pd
+
+
+def robust_solve(lhs, rhs, cholesky=True, rcond=None, name="robust_solve"):
+    r"""
+    Solve the batch of symmetric systems `lhs x = rhs` with a per-system fallback for ill-conditioned systems.
+
+    If `cholesky` is True, all systems are first decomposed with `cholesky_checked()` and the systems whose
+    decomposition succeeded are solved with their Cholesky factors. Only the remaining systems are gathered
+    and solved via the eigendecomposition in which eigenvalues with an absolute value below `rcond` times
+    the largest absolute eigenvalue are cut off, which yields the minimum norm least squares solution.
+    The solutions are scattered back into the order of the batch. Singular or indefinite systems therefore
+    do not produce NaNs and do not affect the other systems of the batch.
+
+    The condition numbers are computed from the eigenvalues of all systems. They do not enter the solution
+    and are only evaluated if they are fetched.
+
+    :param lhs: tensor of shape (N, K, K) with symmetric matrices
+    :param rhs: tensor of shape (N, K)
+    :param cholesky: whether to try the Cholesky decomposition first; otherwise all systems
+        are solved via the eigendecomposition
+    :param rcond: relative threshold for pivots and eigenvalues, defaults to `K` times the machine precision
+    :param name: name scope of this op
+    :return: tuple (x, condition_number)
+
+        - x: tensor of shape (N, K)
+        - condition_number: tensor of shape (N), ratio of the largest to the smallest absolute eigenvalue
+    """
+    with tf.name_scope(name):
+        num_params = lhs.shape[-1].value
+        if rcond is None:
+            rcond = num_params * np.finfo(lhs.dtype.as_numpy_dtype).eps
+
+        if cholesky:
+            chol, is_pd = cholesky_checked(lhs, rcond=rcond)
+        else:
+            chol = None
+            is_pd = tf.zeros(tf.shape(lhs)[:1], dtype=tf.bool)
+        idx_pd = tf.where(is_pd)
+        idx_fallback = tf.where(tf.logical_not(is_pd))
+
+        # Eigendecomposition based solve of the systems which could not be decomposed:
+        lhs_fallback = tf.gather_nd(lhs, idx_fallback)
+        rhs_fallback = tf.expand_dims(tf.gather_nd(rhs, idx_fallback), axis=-1)
+        eigval, eigvec = tf.linalg.eigh(lhs_fallback)
+        abs_eigval = tf.abs(eigval)
+        threshold = rcond * tf.reduce_max(abs_eigval, axis=-1, keepdims=True)
+        inv_eigval = tf.where(
+            abs_eigval > tf.broadcast_to(threshold, tf.shape(eigval)),
+            tf.reciprocal(eigval),
+            tf.zeros_like(eigval)
+        )
+        x_fallback = tf.squeeze(tf.matmul(
+            eigvec,
+            tf.expand_dims(inv_eigval, axis=-1) * tf.matmul(eigvec, rhs_fallback, transpose_a=True)
+        ), axis=-1)
+
+        if cholesky:
+            x_pd = tf.squeeze(tf.cholesky_solve(
+                tf.gather_nd(chol, idx_pd),
+                tf.expand_dims(tf.gather_nd(rhs, idx_pd), axis=-1)
+            ), axis=-1)
+            x = tf.scatter_nd(
+                tf.concat([idx_pd, idx_fallback], axis=0),
+                tf.concat([x_pd, x_fallback], axis=0),
+                shape=tf.shape(rhs, out_type=tf.int64)
+            )
+        else:
+            x = x_fallback
+
+        with tf.name_scope("condition_number"):
+            abs_eigval_all = tf.abs(tf.linalg.eigvalsh(lhs))
+            condition_number = tf.reduce_max(abs_eigval_all, axis=-1) / tf.reduce_min(abs_eigval_all, axis=-1)
+
+        return x, condition_number
+
+
+def robust_inverse(matrix, rcond=None, name="robust_inverse"):
+    r"""
+    Invert a batch of symmetric matrices with a per-matrix fallback for matrices which are not positive definite.
+
+    All matrices are first decomposed with `cholesky_checked()` and the matrices whose decomposition succeeded
+    are inverted with their Cholesky factors. Only the remaining matrices are gathered and replaced by their
+    Moore-Penrose pseudo-inverse, see `pinv()`. The inverses are scattered back into the order of the batch.
+
+    :param matrix: tensor of shape (N, K, K) with symmetric matrices
+    :param rcond: relative threshold for the pivots, defaults to `K` times the machine precision
+    :param name: name scope of this op
+    :return: tensor of shape (N, K, K) with the (pseudo-)inverses of `matrix`
+    """
+    with tf.name_scope(name):
+        num_params = matrix.shape[-1].value
+        chol, is_pd = cholesky_checked(matrix, rcond=rcond)
+
+        idx_pd = tf.where(is_pd)
+        idx_fallback = tf.where(tf.logical_not(is_pd))
+
+        chol_pd = tf.gather_nd(chol, idx_pd)
+        identity = tf.broadcast_to(tf.eye(num_params, dtype=matrix.dtype), tf.shape(chol_pd))
+        inv_pd = tf.cholesky_solve(chol_pd, identity)
+        inv_fallback = pinv(tf.gather_nd(matrix, idx_fallback))
+
+        return tf.scatter_nd(
+            tf.concat([idx_pd, idx_fallback], axis=0),
+            tf.concat([inv_pd, inv_fallback], axis=0),
+            shape=tf.shape(matrix, out_type=tf.int64)
+        )
+
+
 def stacked_lstsq(L, b, rcond=1e-10, name="stacked_lstsq"):
     r"""
     Solve `Lx = b`, via SVD least squares cutting of small singular values
@@ -1,7 +1,10 @@
 from typing import Union, Dict, Callable, List
 import contextlib
+import json
 import logging
+import os
 
+import queue
 import time
 import threading
 
@@ -20,7 +23,8 @@ class TimedRunHook(tf.train.SessionRunHook):
     _next_step: int
     _global_step_tensor: tf.Tensor
 
-    _threads: List[threading.Thread]
+    _queue: Union[queue.Queue, None]
+    _writer: Union[threading.Thread, None]
 
     def __init__(self,
                  run_steps=None,
@@ -29,6 +33,8 @@ class TimedRunHook(tf.train.SessionRunHook):
                  call_request_tensors: Dict[str, tf.Tensor] = None,
                  call_fn: Callable = None,
                  asynchronous: bool = False,
+                 queue_size: int = 2,
+                 overflow: str = "block",
                  ):
         """Initializes a `TimedRunHook`.
 
@@ -58,17 +64,31 @@ class TimedRunHook(tf.train.SessionRunHook):
             `call_fn` was executed the last time.
 
             `requested_data` will contain an equivalent result of session.run(`call_request_tensors`).
-        :param asynchronous: If true, `call_fn` will be executed in a new thread.
+        :param asynchronous: If true, `call_fn` will be executed by a single background thread which
+            processes the calls in order. `session` is None then, as the session must not be used
+            outside of the training loop.
 
-            This object will keep track of the thread and make sure it has completed before the main thread has ended.
+            This object will make sure that all queued calls have completed before the session has ended.
+        :param queue_size: Number of calls which can wait for the background thread.
+        :param overflow: What happens if the queue of the background thread is full:
+
+            - "block": wait until the background thread has taken the next call from the queue.
+            - "drop": skip this call.
         """
+        if overflow not in ["block", "drop"]:
+            raise ValueError("overflow policy %s not recognized" % overflow)
+
         self._time_measures = []
-        self._threads = []
+        self._queue = None
+        self._writer = None
+        self.num_dropped = 0
 
         self._step_offset = step_offset
         self.call_request_tensors = call_request_tensors
         self.call_fn = call_fn
         self.asynchronous = asynchronous
+        self.queue_size = queue_size
+        self.overflow = overflow
 
         self.run_secs = run_secs
         self.run_steps = run_steps
@@ -84,6 +104,33 @@ class TimedRunHook(tf.train.SessionRunHook):
             raise RuntimeError(
                 "Global step should be created to use TimedRunHook.")
 
+        if self.asynchronous and self._writer is None:
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._writer = threading.Thread(target=self._write_loop, name="TimedRunHook-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            args = self._queue.get()
+            try:
+                if args is None:
+                    return
+                self.call_fn(*args)
+            except Exception:
+                logger.exception("TimedRunHook: call_fn failed at step %s", args[1])
+            finally:
+                self._queue.task_done()
+
+    def _submit(self, args):
+        if self.overflow == "block":
+            self._queue.put(args)
+            return
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            self.num_dropped += 1
+            logger.warning("TimedRunHook: writer is busy, dropped the call of step %s", args[1])
+
     def before_run(self, run_context):
         if self._next_step is None:
             self._next_step = run_context.session.run(self._global_step_tensor) + 1
@@ -112,16 +159,11 @@ class TimedRunHook(tf.train.SessionRunHook):
                 request_data: dict = run_values.results.copy()
                 del request_data["global_step"]
 
-                args = (run_context.session, global_step, self._time_measures, request_data)
                 if self.asynchronous:
-                    thread = threading.Thread(
-                        target=self.call_fn,
-                        args=args
-                    )
-                    thread.start()
-                    self._threads.append(thread)
+                    # the session must not be used by the writer, the time measures are reused by this hook:
+                    self._submit((None, global_step, list(self._time_measures), request_data))
                 else:
-                    self.call_fn(*args)
+                    self.call_fn(run_context.session, global_step, self._time_measures, request_data)
 
             self._time_measures.clear()
 
@@ -136,8 +178,72 @@ class TimedRunHook(tf.train.SessionRunHook):
         return False
 
     def end(self, session):
-        for i in self._threads:
-            i.join()
+        if self._writer is not None:
+            # waits for all queued calls:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+
+
+class TrainingStateSaverListener(tf.train.CheckpointSaverListener):
+    """Writes state which is only kept in python next to each checkpoint."""
+
+    def __init__(self, path: str, state_fn: Callable[[], dict]):
+        """
+        :param path: json file which is overwritten after each checkpoint.
+        :param state_fn: returns the json-serializable state. The global step of the checkpoint is added
+            as "global_step", such that a stale state can be recognized when the checkpoint is restored.
+        """
+        self.path = path
+        self.state_fn = state_fn
+
+    def after_save(self, session, global_step_value):
+        state = dict(self.state_fn())
+        state["global_step"] = int(global_step_value)
+        # The previous state stays valid until the new one is complete:
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class DeferredCheckpointSaverHook(tf.train.CheckpointSaverHook):
+    """
+    Saves checkpoints like `tf.train.CheckpointSaverHook`, but only once the estimator completed the step.
+
+    The state which the estimator updates after the run of a training step, e.g. the feature-wise convergence
+    mask and metric, is written to the graph in separate runs. A checkpoint which is due after the training step
+    is therefore postponed until `save_pending()` is called, such that it pairs the parameters of a step
+    with the convergence state of the same step.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = False
+
+    def _save(self, session, step):
+        # Called by the base class if a checkpoint is due:
+        self._pending = True
+        return False
+
+    def save_pending(self, session):
+        """
+        Saves the postponed checkpoint, if any, at the current global step.
+
+        :param session: session which is not wrapped by the hooks, e.g. `MonitoredSession._tf_sess()`.
+        """
+        if self._pending:
+            self._pending = False
+            super()._save(session, session.run(self._global_step_tensor))
+
+    def end(self, session):
+        self.save_pending(session)
+        last_step = session.run(self._global_step_tensor)
+        if last_step != self._timer.last_triggered_step():
+            self._timer.update_last_triggered_step(last_step)
+            super()._save(session, last_step)
+        for listener in self._listeners:
+            listener.end(session, last_step)
 
 
 class StopAtLossHook(tf.train.SessionRunHook):
@@ -223,6 +329,10 @@ class MultiTrainer:
             apply_gradients: Union[callable, Dict[tf.Variable, callable]] = None,
             newton_delta: tf.Tensor = None,
             irls_delta: tf.Tensor = None,
+            newton_ls_delta: tf.Tensor = None,
+            irls_ls_delta: tf.Tensor = None,
+            lbfgs_delta: tf.Tensor = None,
+            lbfgs_state_update: tf.Operation = None,
             global_step=None,
             apply_train_ops: callable = None,
             provide_optimizers: Union[dict, None] = None,
@@ -240,6 +350,12 @@ class MultiTrainer:
             {tf.Variable: callable} mappings.
         :param newton_delta: tensor Precomputed custom newton-rhapson parameter update to apply.
         :param irls_delta: tensor Precomputed custom IRLS parameter update to apply.
+        :param newton_ls_delta: tensor Precomputed custom newton-rhapson parameter update with
+            feature-wise line search to apply.
+        :param irls_ls_delta: tensor Precomputed custom IRLS parameter update with feature-wise line search to apply.
+        :param lbfgs_delta: tensor Precomputed custom L-BFGS parameter update to apply.
+        :param lbfgs_state_update: operation which updates the history of the L-BFGS optimizer.
+            It is run before `lbfgs_delta` is applied.
         :param global_step: global step counter
         :param apply_train_ops: callable which will be applied to all train ops
         :param name: optional name scope
@@ -306,24 +422,6 @@ class MultiTrainer:
                 optim_RMSProp = None
                 train_op_RMSProp = None
 
-            # TFP optimizers:
-            #optim_bfgs = None
-            #if provide_optimizers["bfgs"]:
-            #    logger.debug(" **** Building optimizer: BFGS")
-            #    train_op_bfgs = tfp.optimizer.bfgs_minimize(
-            #        value_and_gradients_function = (gradients[0], fn),
-            #        initial_position,  # TODO: use init here
-            #        tolerance=1e-08,
-            #        x_tolerance=0,
-            #        f_relative_tolerance=0,
-            #        initial_inverse_hessian_estimate=None,
-            #        max_iterations=50,
-            #        parallel_iterations=1
-            #    )
-            #    # Writes results as namedtuple into train_op_bfgs.
-            #else:
-            #    train_op_bfgs = None
-
             # Custom optimizers.
             optim_nr = None
             if provide_optimizers["nr"] and newton_delta is not None:
@@ -351,6 +449,42 @@ class MultiTrainer:
             else:
                 train_op_irls = None
 
+            # Newton-type updates which were scaled by a feature-wise line search.
+            if provide_optimizers.get("nr_ls", False) and newton_ls_delta is not None:
+                logger.debug(" **** Building optimizer: NR with line search")
+                train_op_nr_ls = tf.group(
+                    tf.assign(variables, variables - learning_rate * newton_ls_delta),
+                    tf.assign_add(global_step, 1)
+                )
+                if apply_train_ops is not None:
+                    train_op_nr_ls = apply_train_ops(train_op_nr_ls)
+            else:
+                train_op_nr_ls = None
+
+            if provide_optimizers.get("irls_ls", False) and irls_ls_delta is not None:
+                logger.debug(" **** Building optimizer: IRLS with line search")
+                train_op_irls_ls = tf.group(
+                    tf.assign(variables, variables - learning_rate * irls_ls_delta),
+                    tf.assign_add(global_step, 1)
+                )
+                if apply_train_ops is not None:
+                    train_op_irls_ls = apply_train_ops(train_op_irls_ls)
+            else:
+                train_op_irls_ls = None
+
+            if provide_optimizers.get("lbfgs", False) and lbfgs_delta is not None:
+                logger.debug(" **** Building optimizer: L-BFGS")
+                # The history has to be written before the parameters change:
+                with tf.control_dependencies([lbfgs_state_update]):
+                    train_op_lbfgs = tf.group(
+                        tf.assign(variables, variables - learning_rate * lbfgs_delta),
+                        tf.assign_add(global_step, 1)
+                    )
+                if apply_train_ops is not None:
+                    train_op_lbfgs = apply_train_ops(train_op_lbfgs)
+            else:
+                train_op_lbfgs = None
+
             self.global_step = global_step
             self.plain_gradients = plain_gradients
             self.gradients = gradients
@@ -361,7 +495,6 @@ class MultiTrainer:
             self.optim_RMSProp = optim_RMSProp
             self.optim_NR = optim_nr
             self.optim_irls = optim_irls
-            #self.optim_bfgs = optim_bfgs
 
             self.train_op_GD = train_op_GD
             self.train_op_Adam = train_op_Adam
@@ -369,7 +502,9 @@ class MultiTrainer:
             self.train_op_RMSProp = train_op_RMSProp
             self.train_op_nr = train_op_nr
             self.train_op_irls = train_op_irls
-            #self.train_op_bfgs = train_op_bfgs
+            self.train_op_nr_ls = train_op_nr_ls
+            self.train_op_irls_ls = train_op_irls_ls
+            self.train_op_lbfgs = train_op_lbfgs
 
     def train_op_by_name(self, name: str):
         """
@@ -381,6 +516,10 @@ class MultiTrainer:
             - "Adagrad"
             - "RMSprop"
             - "GradientDescent" or "GD"
+            - "Newton" or "NR"
+            - "IRLS"
+            - "NR_LS" or "IRLS_LS": Newton-type updates with a feature-wise line search
+            - "LBFGS": limited-memory BFGS with a feature-wise line search
         :return: train op
         """
         name_lower = name.lower()
@@ -400,10 +539,11 @@ class MultiTrainer:
             if self.train_op_RMSProp is None:
                 raise ValueError("RMSProp decent not provided in initialization.")
             return self.train_op_RMSProp
-        elif name_lower == "bfgs":
-            if self.train_op_bfgs is None:
-                raise ValueError("BFGS not provided in initialization.")
-            return self.train_op_bfgs
+        elif name_lower == "lbfgs" or \
+                name_lower == "l-bfgs":
+            if self.train_op_lbfgs is None:
+                raise ValueError("L-BFGS not provided in initialization.")
+            return self.train_op_lbfgs
         elif name_lower.lower() == "newton" or \
                 name_lower.lower() == "newton-raphson" or \
                 name_lower.lower() == "newton_raphson" or \
@@ -416,6 +556,42 @@ class MultiTrainer:
             if self.train_op_irls is None:
                 raise ValueError("IRLS not provided in initialization.")
             return self.train_op_irls
+        elif name_lower == "newton_ls" or \
+                name_lower == "nr_ls":
+            if self.train_op_nr_ls is None:
+                raise ValueError("Newton-rhapson with line search not provided in initialization.")
+            return self.train_op_nr_ls
+        elif name_lower == "irls_ls" or \
+                name_lower == "iwls_ls":
+            if self.train_op_irls_ls is None:
+                raise ValueError("IRLS with line search not provided in initialization.")
+            return self.train_op_irls_ls
+        else:
+            raise ValueError("Unknown optimizer %s" % name)
+
+    @staticmethod
+    def optimizer_key(name: str) -> str:
+        """
+        Returns the key of `provide_optimizers` which builds the train op specified by the provided name.
+
+        :param name: name of the train op, see `train_op_by_name()`
+        :return: one of "gd", "adam", "adagrad", "rmsprop", "nr", "irls", "nr_ls", "irls_ls" and "lbfgs"
+        """
+        name_lower = name.lower()
+        if name_lower in ["gradient_descent", "gd"]:
+            return "gd"
+        elif name_lower in ["adam", "adagrad", "rmsprop"]:
+            return name_lower
+        elif name_lower in ["lbfgs", "l-bfgs"]:
+            return "lbfgs"
+        elif name_lower in ["newton", "newton-raphson", "newton_raphson", "nr"]:
+            return "nr"
+        elif name_lower in ["irls", "iwls"]:
+            return "irls"
+        elif name_lower in ["newton_ls", "nr_ls"]:
+            return "nr_ls"
+        elif name_lower in ["irls_ls", "iwls_ls"]:
+            return "irls_ls"
         else:
             raise ValueError("Unknown optimizer %s" % name)
 
@@ -0,0 +1,29 @@
+import os
+
+# This module is imported by worker processes before numpy or tensorflow and
+# must therefore only depend on the standard library.
+
+# Environment variables which set the size of the thread pools of tensorflow and of the BLAS libraries:
+THREAD_ENV_VARS = ["TF_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]
+
+
+def init_worker(num_threads: int):
+    """
+    Limits the number of threads of the current worker process; runs as initializer of a process pool.
+
+    Tensorflow and the BLAS libraries read their thread limits from the environment when they are loaded,
+    so this has to run before batchglm, numpy or tensorflow are imported in the worker. If numpy was already
+    imported, e.g. by the main module of a spawned process, its thread pools are limited with threadpoolctl
+    if it is installed.
+
+    :param num_threads: number of threads of this worker.
+    """
+    for key in THREAD_ENV_VARS:
+        os.environ[key] = str(num_threads)
+
+    try:
+        import threadpoolctl
+    except ImportError:
+        threadpoolctl = None
+    if threadpoolctl is not None:
+        threadpoolctl.threadpool_limits(limits=num_threads)
@@ -1,6 +1,7 @@
 import abc
 from typing import List
 import unittest
+import numpy as np
 import scipy.sparse
 
 from batchglm.models.base_glm import _Estimator_GLM, InputData, _Simulator_GLM
@@ -14,7 +15,7 @@ class _Test_DataTypes_GLM_Estim():
     ):
         self.estimator = estimator
 
-    def test_estimation(self):
+    def test_estimation(self, **kwargs):
         self.estimator.initialize()
 
         self.estimator.train_sequence(training_strategy=[
@@ -25,7 +26,7 @@ class _Test_DataTypes_GLM_Estim():
                 "optim_algo": "Newton",
             },
         ])
-        estimator_store = self.estimator.finalize()
+        estimator_store = self.estimator.finalize(**kwargs)
         return estimator_store
 
 
@@ -41,6 +42,9 @@ class Test_DataTypes_GLM(unittest.TestCase, metaclass=abc.ABCMeta):
         - Sparse X matrix: test_scipy_sparse()
         - Dense X in anndata: test_anndata_dense()
         - Sparse X in anndata: test_anndata_sparse()
+        - Sparse X kept in CSR format: test_scipy_sparse_keep_sparse(), test_anndata_sparse_keep_sparse()
+        - Unique design rows and group index of the observations: test_design_groups()
+        - Lazy evaluation of the estimator store: test_finalize_lazy()
     """
     sim: _Simulator_GLM
     _estims: List[_Estimator_GLM]
@@ -66,7 +70,8 @@ class Test_DataTypes_GLM(unittest.TestCase, metaclass=abc.ABCMeta):
             self,
             data,
             design_loc,
-            design_scale
+            design_scale,
+            keep_sparse=False
     ) -> InputData:
         pass
 
@@ -81,12 +86,14 @@ class Test_DataTypes_GLM(unittest.TestCase, metaclass=abc.ABCMeta):
             self,
             data,
             design_loc,
-            design_scale
+            design_scale,
+            keep_sparse=False
     ):
         input_data = self.input_data(
             data=data,
             design_loc=design_loc,
-            design_scale=design_scale
+            design_scale=design_scale,
+            keep_sparse=keep_sparse
         )
         estimator = self.get_estimator(input_data=input_data)
         return estimator.test_estimation()
@@ -122,6 +129,52 @@ class Test_DataTypes_GLM(unittest.TestCase, metaclass=abc.ABCMeta):
             design_scale=self.sim.design_scale
         )
 
+    def _test_scipy_sparse_keep_sparse(self):
+        return self.basic_test(
+            data=scipy.sparse.csr_matrix(self.sim.X),
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale,
+            keep_sparse=True
+        )
+
+    def _test_anndata_sparse_keep_sparse(self):
+        adata = self.sim.data_to_anndata()
+        adata.X = scipy.sparse.csr_matrix(adata.X)
+        return self.basic_test(
+            data=adata,
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale,
+            keep_sparse=True
+        )
+
+    def _test_design_groups(self):
+        input_data = self.input_data(
+            data=self.sim.X,
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale
+        )
+        design_group_idx = input_data.design_group_idx.values
+        # 2 batches x 2 conditions:
+        assert input_data.num_design_groups == 4
+        assert np.all(input_data.design_loc_groups.values[design_group_idx] == input_data.design_loc.values)
+        assert np.all(input_data.design_scale_groups.values[design_group_idx] == input_data.design_scale.values)
+        return True
+
+    def _test_finalize_lazy(self):
+        input_data = self.input_data(
+            data=self.sim.X,
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale
+        )
+        estimator = self.get_estimator(input_data=input_data)
+        estimator_store = estimator.test_estimation(outputs=["loss"], lazy=True)
+        assert "loss" in estimator_store.params
+        assert "hessians" not in estimator_store.params
+        assert estimator_store.hessians.shape[0] == input_data.num_features
+        assert "hessians" in estimator_store.params
+        estimator_store.close()
+        return True
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -29,7 +29,8 @@ class _Test_Accuracy_GLM_ALL_Estim(_Test_Accuracy_GLM_Estim):
                 raise ValueError("noise_model not recognized")
 
         batch_size = 200
-        provide_optimizers = {"gd": True, "adam": True, "adagrad": True, "rmsprop": True, "nr": True, "irls": True}
+        provide_optimizers = {"gd": True, "adam": True, "adagrad": True, "rmsprop": True, "nr": True, "irls": True,
+                              "nr_ls": True, "irls_ls": True, "lbfgs": True}
         estimator = Estimator(
             input_data=simulator.input_data,
             batch_size=batch_size,
@@ -101,6 +102,9 @@ class Test_Accuracy_GLM_ALL(
             train_scale
     ):
         algos = ["ADAM", "ADAGRAD", "NR", "IRLS"]
+        if not batched:
+            # The line search and L-BFGS are only defined for the full data updates.
+            algos = algos + ["NR_LS", "IRLS_LS", "LBFGS"]
         estimator = _Test_Accuracy_GLM_ALL_Estim(
             simulator=self.simulator(train_loc=train_loc),
             quick_scale=False if train_scale else True,
@@ -1,7 +1,11 @@
 from typing import List
+import os
+import tempfile
 import unittest
 import logging
 
+import numpy as np
+
 import batchglm.api as glm
 from batchglm.models.base_glm import _Estimator_GLM, _Simulator_GLM
 
@@ -53,6 +57,12 @@ class Test_DataTypes_GLM_ALL(Test_DataTypes_GLM, unittest.TestCase):
         - Sparse X matrix: test_scipy_sparse()
         - Dense X in anndata: test_anndata_dense()
         - Sparse X in anndata: test_anndata_sparse()
+        - Sparse X kept in CSR format: test_scipy_sparse_keep_sparse(), test_anndata_sparse_keep_sparse()
+        - Lazy evaluation of the estimator store: test_finalize_lazy()
+        - Graph and session shared by estimators of the same shape: test_reuse_graph()
+        - Graph restricted to the optimizers of the training strategy: test_training_strategy_graph()
+        - Chunk-aligned streaming from a file: test_streaming()
+        - Batches drawn from shuffled blocks of observations: test_block_sampler()
     """
     noise_model: str
     sim: _Simulator_GLM
@@ -73,7 +83,8 @@ class Test_DataTypes_GLM_ALL(Test_DataTypes_GLM, unittest.TestCase):
             self,
             data,
             design_loc,
-            design_scale
+            design_scale,
+            keep_sparse=False
     ):
         if self.noise_model is None:
             raise ValueError("noise_model is None")
@@ -87,6 +98,7 @@ class Test_DataTypes_GLM_ALL(Test_DataTypes_GLM, unittest.TestCase):
             data=data,
             design_loc=design_loc,
             design_scale=design_scale,
+            keep_sparse=keep_sparse
         )
 
     def get_estimator(
@@ -98,6 +110,227 @@ class Test_DataTypes_GLM_ALL(Test_DataTypes_GLM, unittest.TestCase):
             noise_model=self.noise_model
         )
 
+    def _test_reuse_graph(self):
+        if self.noise_model is None:
+            raise ValueError("noise_model is None")
+        else:
+            if self.noise_model=="nb":
+                from batchglm.api.models.glm_nb import Estimator
+            else:
+                raise ValueError("noise_model not recognized")
+
+        def fit(input_data, reuse_graph):
+            estimator = _Test_DataTypes_GLM_Estim(estimator=Estimator(
+                input_data=input_data,
+                quick_scale=True,
+                provide_optimizers={"gd": False, "adam": False, "adagrad": False, "rmsprop": False,
+                                    "nr": True, "irls": False},
+                termination_type="by_feature",
+                input_pipeline="resident",
+                reuse_graph=reuse_graph
+            ))
+            estimator_store = estimator.test_estimation()
+            estimator.estimator.close_session()
+            return estimator.estimator, estimator_store
+
+        Estimator.clear_graph_templates()
+        models = []
+        for _ in range(2):
+            self.simulate()
+            input_data = self.input_data(
+                data=self.sim.X,
+                design_loc=self.sim.design_loc,
+                design_scale=self.sim.design_scale
+            )
+            estimator, estimator_store = fit(input_data=input_data, reuse_graph=True)
+            models.append(estimator.model)
+            _, estimator_store_ref = fit(input_data=input_data, reuse_graph=False)
+            assert np.allclose(estimator_store.a_var.values, estimator_store_ref.a_var.values)
+            assert np.allclose(estimator_store.b_var.values, estimator_store_ref.b_var.values)
+        assert models[0] is models[1]
+        assert len(models[0].idle_sessions) == 1
+        Estimator.clear_graph_templates()
+        return True
+
+    def _test_training_strategy_graph(self):
+        if self.noise_model is None:
+            raise ValueError("noise_model is None")
+        else:
+            if self.noise_model=="nb":
+                from batchglm.api.models.glm_nb import Estimator
+            else:
+                raise ValueError("noise_model not recognized")
+
+        input_data = self.input_data(
+            data=self.sim.X,
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale
+        )
+        estimator = Estimator(
+            input_data=input_data,
+            quick_scale=True,
+            training_strategy="DEFAULT"
+        )
+        # The default strategy only uses IRLS on the full data:
+        assert estimator.model.trainer_batch is None
+        assert estimator.model.trainer_full.train_op_irls is not None
+        assert estimator.model.trainer_full.train_op_Adam is None
+        assert estimator.model.full_data_model.hessians_active is None
+        assert estimator.model.full_data_model.fim_active is not None
+
+        estimator = _Test_DataTypes_GLM_Estim(estimator=estimator)
+        self._estims.append(estimator)
+        estimator.estimator.initialize()
+        estimator.estimator.train_sequence(training_strategy="DEFAULT")
+        estimator.estimator.finalize()
+        return True
+
+    def _test_streaming(self):
+        if self.noise_model is None:
+            raise ValueError("noise_model is None")
+        else:
+            if self.noise_model=="nb":
+                from batchglm.api.models.glm_nb import Estimator, InputData
+            else:
+                raise ValueError("noise_model not recognized")
+
+        input_data = self.input_data(
+            data=self.sim.X,
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input_data.h5")
+            input_data.save(path, chunk_size=16)
+            input_data_file = InputData.from_file(path)
+            assert input_data_file.chunk_size == 16
+
+            idx = np.array([0, 3, 17, 18, 40])
+            assert np.array_equal(input_data_file.fetch_X(idx), input_data.fetch_X(idx))
+
+            estimator = _Test_DataTypes_GLM_Estim(estimator=Estimator(
+                input_data=input_data_file,
+                batch_size=16,
+                quick_scale=True,
+                provide_optimizers={"gd": False, "adam": True, "adagrad": False, "rmsprop": False,
+                                    "nr": True, "irls": False},
+                termination_type="by_feature",
+                input_pipeline="streaming"
+            ))
+            self._estims.append(estimator)
+            estimator.estimator.initialize()
+            # batched training draws whole chunks:
+            estimator.estimator.train(use_batching=True, optim_algo="adam", learning_rate=0.01,
+                                      convergence_criteria="step", stopping_criteria=5)
+            estimator_store = estimator.test_estimation()
+        assert np.all(np.isfinite(estimator_store.a_var.values))
+        return True
+
+    def _test_block_sampler(self):
+        if self.noise_model is None:
+            raise ValueError("noise_model is None")
+        else:
+            if self.noise_model=="nb":
+                from batchglm.api.models.glm_nb import Estimator
+            else:
+                raise ValueError("noise_model not recognized")
+
+        input_data = self.input_data(
+            data=self.sim.X,
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale
+        )
+        estimator = Estimator(
+            input_data=input_data,
+            batch_size=10,
+            quick_scale=True,
+            provide_optimizers={"gd": False, "adam": True, "adagrad": False, "rmsprop": False,
+                                "nr": False, "irls": False},
+            sampler="blocks",
+            block_size=8
+        )
+        estimator.initialize()
+        for _ in range(3):
+            idx = estimator.session.run(estimator.model.batched_data_model.sample_indices)
+            assert idx.shape[0] == 10
+            assert np.all(np.diff(idx) > 0)
+        estimator.train(use_batching=True, optim_algo="adam", learning_rate=0.01,
+                        convergence_criteria="step", stopping_criteria=5)
+        estimator_store = estimator.finalize()
+        assert np.all(np.isfinite(estimator_store.a_var.values))
+        return True
+
+    def _test_resume(self):
+        if self.noise_model is None:
+            raise ValueError("noise_model is None")
+        else:
+            if self.noise_model=="nb":
+                from batchglm.api.models.glm_nb import Estimator
+            else:
+                raise ValueError("noise_model not recognized")
+
+        input_data = self.input_data(
+            data=self.sim.X,
+            design_loc=self.sim.design_loc,
+            design_scale=self.sim.design_scale
+        )
+        training_strategy = [
+            {"convergence_criteria": "step", "stopping_criteria": 2, "use_batching": False, "optim_algo": "irls"},
+            {"convergence_criteria": "all_converged_ll", "stopping_criteria": 1e-6, "use_batching": False,
+             "optim_algo": "irls"},
+        ]
+
+        def new_estimator():
+            return Estimator(
+                input_data=input_data,
+                quick_scale=True,
+                provide_optimizers={"gd": False, "adam": False, "adagrad": False, "rmsprop": False,
+                                    "nr": False, "irls": True},
+                termination_type="by_feature"
+            )
+
+        # Reference without interruption:
+        estimator = new_estimator()
+        estimator.initialize()
+        estimator.train_sequence(training_strategy=training_strategy)
+        global_step_ref = estimator.global_step
+        a_var_ref = estimator.a_var.values
+        estimator.close_session()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Interrupt the second stage after its second step:
+            stop_step = 4
+            estimator = new_estimator()
+            estimator.initialize(working_dir=tmp_dir, save_checkpoint_steps=1, stop_at_step=stop_step)
+            estimator.train_sequence(training_strategy=training_strategy)
+            assert estimator.global_step == stop_step
+            assert estimator.train_stage == 1
+            converged = np.copy(estimator.model.model_vars.converged)
+            metric = estimator.run(estimator.model.model_vars.convergence_metric)
+            convergence_history = list(estimator.convergence_history)
+            estimator.close_session()
+            assert os.path.exists(os.path.join(tmp_dir, estimator.TRAINING_STATE_FILE))
+
+            # The checkpoint pairs the parameters of the last step with its convergence mask and metric:
+            estimator = new_estimator()
+            estimator.initialize(working_dir=tmp_dir)
+            assert estimator.global_step == stop_step
+            assert estimator.train_stage == 1
+            assert np.array_equal(estimator.model.model_vars.converged, converged)
+            assert np.array_equal(estimator.run(estimator.model.model_vars.convergence_metric), metric)
+            assert estimator.convergence_history == convergence_history
+            assert convergence_history[-1]["global_step"] == stop_step
+            # The first stage is skipped, the second stage continues on the features which did not converge:
+            estimator.train_sequence(training_strategy=training_strategy)
+            assert estimator.train_stage == -1
+            assert np.all(estimator.model.model_vars.converged)
+            assert estimator.global_step == global_step_ref
+            estimator_store = estimator.finalize()
+        assert np.allclose(estimator_store.a_var.values, a_var_ref)
+        # The reported gradients are evaluated on all features although all of them converged:
+        assert np.any(estimator_store.gradients.values != 0)
+        return True
+
     def _test_standard(self):
         self.simulate()
         logger.debug("* Running tests on numpy/scipy")
@@ -105,6 +338,22 @@ class Test_DataTypes_GLM_ALL(Test_DataTypes_GLM, unittest.TestCase):
         self._test_numpy_dense()
         logger.debug("** Running sparse test")
         self._test_scipy_sparse()
+        logger.debug("** Running CSR-backed sparse test")
+        self._test_scipy_sparse_keep_sparse()
+        logger.debug("** Running design group test")
+        self._test_design_groups()
+        logger.debug("** Running lazy estimator store test")
+        self._test_finalize_lazy()
+        logger.debug("** Running graph reuse test")
+        self._test_reuse_graph()
+        logger.debug("** Running training strategy graph test")
+        self._test_training_strategy_graph()
+        logger.debug("** Running streaming test")
+        self._test_streaming()
+        logger.debug("** Running block sampler test")
+        self._test_block_sampler()
+        logger.debug("** Running resume test")
+        self._test_resume()
 
     def _test_anndata(self):
         self.simulate()
@@ -113,6 +362,8 @@ class Test_DataTypes_GLM_ALL(Test_DataTypes_GLM, unittest.TestCase):
         self._test_anndata_dense()
         logger.debug("** Running sparse test")
         self._test_anndata_sparse()
+        logger.debug("** Running CSR-backed sparse test")
+        self._test_anndata_sparse_keep_sparse()
 
 
 class Test_DataTypes_GLM_NB(
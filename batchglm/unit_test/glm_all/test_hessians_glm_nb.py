@@ -85,9 +85,20 @@ class Test_Hessians_GLM_ALL(unittest.TestCase):
         t0_ob = time.time()
         self.H_ob = self.estimator_ob.hessians
         t1_ob = time.time()
+        self.fisher_inv_ob = self.estimator_ob.get_fisher_inv(features=[1, 3])
         self.estimator_ob.close_session()
         self.t_ob = t1_ob - t0_ob
 
+        logger.debug("* Running analytic Hessian by observation tests without fused statistics")
+        fused_statistics = pkg_constants.FUSED_STATISTICS
+        try:
+            pkg_constants.FUSED_STATISTICS = False
+            self.estimator_ob_unfused = self.estimate(input_data)
+            self.H_ob_unfused = self.estimator_ob_unfused.hessians
+            self.estimator_ob_unfused.close_session()
+        finally:
+            pkg_constants.FUSED_STATISTICS = fused_statistics
+
         logger.debug("* Running analytic Hessian by feature tests")
         pkg_constants.HESSIAN_MODE = "feature"
         self.estimator_fw = self.estimate(input_data)
@@ -119,8 +130,14 @@ class Test_Hessians_GLM_ALL(unittest.TestCase):
 
         max_rel_dev1 = np.max(np.abs((self.H_tf.values - self.H_ob.values) / self.H_tf.values))
         max_rel_dev2 = np.max(np.abs((self.H_tf.values - self.H_fw.values) / self.H_tf.values))
+        max_rel_dev3 = np.max(np.abs((self.H_ob_unfused.values - self.H_ob.values) / self.H_ob_unfused.values))
         assert max_rel_dev1 < 1e-10
         assert max_rel_dev2 < 1e-10
+        assert max_rel_dev3 < 1e-10
+
+        fisher_inv_ref = np.linalg.inv(-self.H_ob.values[[1, 3], :, :])
+        max_rel_dev4 = np.max(np.abs((fisher_inv_ref - self.fisher_inv_ob.values) / fisher_inv_ref))
+        assert max_rel_dev4 < 1e-8
         return True
 
 
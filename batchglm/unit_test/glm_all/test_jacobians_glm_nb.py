@@ -114,11 +114,59 @@ class Test_Jacobians_GLM_ALL(unittest.TestCase):
         assert max_rel_dev < 1e-10
         return True
 
+    def compare_jacs_sparse(
+            self,
+            design,
+            quick_scale
+    ):
+        """
+        Compare the analytic Jacobian evaluated with sparse kernels against the dense evaluation.
+        """
+        if self.noise_model is None:
+            raise ValueError("noise_model is None")
+        else:
+            if self.noise_model=="nb":
+                from batchglm.api.models.glm_nb import InputData
+            else:
+                raise ValueError("noise_model not recognized")
+
+        sample_description = data_utils.sample_description_from_xarray(self.sim.data, dim="observations")
+        design_loc = data_utils.design_matrix(sample_description, formula=design)
+        design_scale = data_utils.design_matrix(sample_description, formula=design)
+
+        input_data = InputData.new(self.sim.X, design_loc=design_loc, design_scale=design_scale)
+
+        pkg_constants.JACOBIAN_MODE = "analytic"
+        sparse_kernels = pkg_constants.SPARSE_KERNELS
+        try:
+            logger.debug("** Running dense Jacobian test")
+            pkg_constants.SPARSE_KERNELS = False
+            estimator_dense = self.estimate(input_data, quick_scale)
+            J_dense = estimator_dense._get_unsafe("full_gradient")
+            ll_dense = estimator_dense._get_unsafe("log_likelihood")
+            estimator_dense.close_session()
+
+            logger.debug("** Running sparse Jacobian test")
+            pkg_constants.SPARSE_KERNELS = True
+            estimator_sparse = self.estimate(input_data, quick_scale)
+            J_sparse = estimator_sparse._get_unsafe("full_gradient")
+            ll_sparse = estimator_sparse._get_unsafe("log_likelihood")
+            estimator_sparse.close_session()
+        finally:
+            pkg_constants.SPARSE_KERNELS = sparse_kernels
+
+        max_rel_dev = np.max(np.abs((J_dense - J_sparse) / J_dense))
+        assert max_rel_dev < 1e-10
+        max_rel_dev_ll = np.max(np.abs((ll_dense - ll_sparse) / ll_dense))
+        assert max_rel_dev_ll < 1e-10
+        return True
+
     def _test_compute_jacobians(self):
         self.simulate()
         self._test_compute_jacobians_a_and_b()
         self._test_compute_jacobians_a_only()
         self._test_compute_jacobians_b_only()
+        self._test_compute_jacobians_sparse()
 
     def _test_compute_jacobians_a_and_b(self):
         logger.debug("* Running Jacobian tests for a and b training")
@@ -141,6 +189,13 @@ class Test_Jacobians_GLM_ALL(unittest.TestCase):
             quick_scale=False
         )
 
+    def _test_compute_jacobians_sparse(self):
+        logger.debug("* Running Jacobian tests for sparse kernels")
+        return self.compare_jacs_sparse(
+            design="~ 1 + condition + batch",
+            quick_scale=False
+        )
+
 
 class Test_Jacobians_GLM_NB(Test_Jacobians_GLM_ALL, unittest.TestCase):
 
@@ -0,0 +1,108 @@
+import logging
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.sparse
+
+import xarray as xr
+
+import batchglm
+from batchglm.models.glm_nb import InputData, Simulator
+import batchglm.utils.io as io_utils
+
+batchglm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class Test_Storage(unittest.TestCase):
+    """
+    Test saving and loading of input data and simulations with the netcdf and the zarr storage backend.
+
+    Does not require tensorflow.
+    """
+
+    def setUp(self):
+        self.sim = Simulator(num_observations=100, num_features=10)
+        self.sim.generate_sample_description(num_batches=2, num_conditions=2)
+        self.sim.generate()
+
+    def _test_input_data(self, backend, ext):
+        input_data = self.sim.input_data
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input_data" + ext)
+            input_data.save(path, chunk_size=16, backend=backend)
+            input_data_file = InputData.from_file(path)
+
+            assert input_data_file.chunk_size == 16
+            assert np.array_equal(input_data_file.X.values, input_data.X.values)
+            assert np.array_equal(input_data_file.design_loc.values, input_data.design_loc.values)
+            idx = np.array([1, 2, 20, 50, 99])
+            assert np.array_equal(input_data_file.fetch_X(idx), input_data.fetch_X(idx))
+
+            # sparse data is stored as CSR buffers:
+            input_data_sparse = InputData.new(
+                data=scipy.sparse.csr_matrix(input_data.X.values),
+                design_loc=input_data.design_loc,
+                design_scale=input_data.design_scale,
+                keep_sparse=True
+            )
+            input_data_sparse.save(path, backend=backend)
+            input_data_file = InputData.from_file(path)
+            assert input_data_file.is_sparse
+            assert np.array_equal(input_data_file.fetch_X(idx), input_data.fetch_X(idx))
+
+    def _test_simulator(self, backend, ext):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "sim" + ext)
+            self.sim.save(path, chunk_size=32, backend=backend)
+
+            sim = Simulator()
+            sim.load(path)
+            assert np.array_equal(sim.X.values, self.sim.X.values)
+            assert np.allclose(sim.a_var.values, self.sim.a_var.values)
+
+    def _test_append(self, backend, ext):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "estimation" + ext)
+            for step in [10, 20, 30]:
+                data = xr.Dataset({"a": (("global_step", "features"), np.full([1, 5], step, dtype=float))})
+                data.coords["global_step"] = ("global_step",), [step]
+                io_utils.append_dataset(data, path, dim="global_step", backend=backend)
+
+            data = io_utils.open_appended(path, dim="global_step")
+            assert np.array_equal(data.global_step.values, [10, 20, 30])
+            assert np.array_equal(data.a.values[:, 0], [10., 20., 30.])
+            data.close()
+
+            # a resumed run drops the steps after its checkpoint and appends again:
+            io_utils.truncate_appended(path, dim="global_step", last=20, backend=backend)
+            data = xr.Dataset({"a": (("global_step", "features"), np.full([1, 5], 25, dtype=float))})
+            data.coords["global_step"] = ("global_step",), [25]
+            io_utils.append_dataset(data, path, dim="global_step", backend=backend)
+
+            data = io_utils.open_appended(path, dim="global_step")
+            assert np.array_equal(data.global_step.values, [10, 20, 25])
+            assert np.array_equal(data.a.values[:, 0], [10., 20., 25.])
+            data.close()
+
+    def test_netcdf(self):
+        self._test_input_data("netcdf", ".h5")
+        self._test_simulator("netcdf", ".h5")
+        self._test_append("netcdf", ".h5")
+
+    def test_zarr(self):
+        try:
+            import zarr
+        except ImportError:
+            raise unittest.SkipTest("zarr is not installed")
+        self._test_input_data("zarr", ".zarr")
+        self._test_simulator("zarr", ".zarr")
+        self._test_append("zarr", ".zarr")
+        # the backend is inferred from the extension:
+        self._test_input_data(None, ".zarr")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import logging
+import unittest
+
+import numpy as np
+
+import batchglm
+from batchglm.models.glm_nb import Simulator
+from batchglm.train.numpy.glm_nb import Estimator
+
+batchglm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class Test_Numpy_Estimator_GLM_NB(unittest.TestCase):
+    """
+    Test the numpy backend of the negative binomial GLM.
+
+    Does not require tensorflow.
+    """
+
+    def setUp(self):
+        self.sim = Simulator(num_observations=1000, num_features=50)
+        self.sim.generate_sample_description(num_batches=2, num_conditions=2)
+        self.sim.generate()
+
+    def _test_accuracy(self, algo):
+        estimator = Estimator(input_data=self.sim.input_data)
+        estimator.initialize()
+        estimator.train_sequence(training_strategy=[
+            {
+                "convergence_criteria": "all_converged_ll",
+                "stopping_criteria": 1e-8,
+                "optim_algo": algo,
+            },
+        ])
+        store = estimator.finalize()
+
+        mean_dev_a = np.mean(np.abs(store.a_var.values - self.sim.a_var.values))
+        mean_dev_b = np.mean(np.abs(store.b_var.values - self.sim.b_var.values))
+        logger.info("%s: mean deviation of a %f and of b %f", algo, mean_dev_a, mean_dev_b)
+        assert mean_dev_a < 0.1
+        assert mean_dev_b < 0.2
+        # The fit is a stationary point of the log-likelihood:
+        assert np.max(np.abs(store.gradients.values)) < 1e-2
+        return store
+
+    def test_accuracy_irls(self):
+        self._test_accuracy("IRLS")
+
+    def test_accuracy_nr_ls(self):
+        self._test_accuracy("NR_LS")
+
+    def test_statistics(self):
+        """
+        Compare the closed form Jacobian and Hessian to finite differences.
+        """
+        estimator = Estimator(input_data=self.sim.input_data)
+        estimator.initialize()
+
+        idx = np.arange(5)
+        a_var = estimator.a_var.values[:, idx]
+        b_var = estimator.b_var.values[:, idx]
+        num_loc_params = a_var.shape[0]
+        params = np.concatenate([a_var, b_var], axis=0)
+        stats = estimator._statistics(a_var, b_var, idx, hessian=True)
+
+        eps = 1e-6
+        jac = np.zeros_like(stats["jac"])
+        hessian = np.zeros_like(stats["hessian"])
+        for k in range(params.shape[0]):
+            params_plus = np.copy(params)
+            params_plus[k] += eps
+            params_minus = np.copy(params)
+            params_minus[k] -= eps
+            stats_plus = estimator._statistics(params_plus[:num_loc_params], params_plus[num_loc_params:], idx)
+            stats_minus = estimator._statistics(params_minus[:num_loc_params], params_minus[num_loc_params:], idx)
+            jac[:, k] = (stats_plus["log_likelihood"] - stats_minus["log_likelihood"]) / (2 * eps)
+            hessian[:, :, k] = (stats_plus["jac"] - stats_minus["jac"]) / (2 * eps)
+
+        assert np.max(np.abs(jac - stats["jac"])) / np.max(np.abs(jac)) < 1e-5
+        assert np.max(np.abs(hessian - stats["hessian"])) / np.max(np.abs(hessian)) < 1e-5
+
+    def test_finalize(self):
+        estimator = Estimator(input_data=self.sim.input_data)
+        estimator.initialize()
+        estimator.train_sequence(training_strategy="DEFAULT")
+
+        fisher_inv = estimator.get_fisher_inv(features=[1, 3])
+        store = estimator.finalize(outputs=["fisher_inv"])
+        fisher_inv_ref = np.linalg.inv(-store.hessians.values[[1, 3]])
+        assert np.max(np.abs((fisher_inv_ref - fisher_inv.values) / fisher_inv_ref)) < 1e-8
+        assert np.max(np.abs((fisher_inv_ref - store.fisher_inv.values[[1, 3]]) / fisher_inv_ref)) < 1e-8
+
+
+if __name__ == '__main__':
+    unittest.main()
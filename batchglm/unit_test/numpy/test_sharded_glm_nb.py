@@ -0,0 +1,71 @@
+import logging
+import os
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+import batchglm
+from batchglm.models.glm_nb import Simulator
+from batchglm.train.numpy.glm_nb import Estimator
+from batchglm.train.sharded import fit_sharded, partition_features
+from batchglm.train.worker import init_worker, THREAD_ENV_VARS
+
+batchglm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class Test_Sharded_GLM_NB(unittest.TestCase):
+    """
+    Test feature-sharded fitting in worker processes with the numpy backend.
+
+    Does not require tensorflow.
+    """
+
+    def test_partition(self):
+        costs = np.array([5., 1., 1., 3., 2., 2., 0.])
+        shards = partition_features(costs, num_shards=3)
+        assert np.array_equal(np.sort(np.concatenate(shards)), np.arange(costs.shape[0]))
+        shard_costs = [np.sum(costs[idx]) for idx in shards]
+        assert np.max(shard_costs) - np.min(shard_costs) <= 1.
+        assert len(partition_features(costs, num_shards=20)) == costs.shape[0]
+
+    def test_sharded_fit(self):
+        sim = Simulator(num_observations=500, num_features=20)
+        sim.generate_sample_description(num_batches=2, num_conditions=2)
+        sim.generate()
+
+        environ = dict(os.environ)
+        store = fit_sharded(sim.input_data, num_shards=3, num_workers=2, backend="numpy", threads_per_worker=1)
+        # The thread limits are only set in the workers:
+        assert dict(os.environ) == environ
+
+        estimator = Estimator(input_data=sim.input_data)
+        estimator.initialize()
+        estimator.train_sequence(training_strategy="DEFAULT")
+        store_ref = estimator.finalize()
+
+        assert np.array_equal(store.params.features.values, sim.input_data.features.values)
+        assert np.max(np.abs(store.a_var.values - store_ref.a_var.values)) < 1e-6
+        assert np.max(np.abs(store.b_var.values - store_ref.b_var.values)) < 1e-6
+        assert np.abs(store.params["loss"].values - store_ref.params["loss"].values) < 1e-6
+
+    def test_worker_thread_limits(self):
+        with ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(2,)
+        ) as executor:
+            worker_environ = executor.submit(_get_environ).result()
+        for key in THREAD_ENV_VARS:
+            assert worker_environ[key] == "2"
+
+
+def _get_environ():
+    return dict(os.environ)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import logging
+import unittest
+
+import numpy as np
+
+import batchglm
+from batchglm.models.glm_nb import InputData, Simulator
+from batchglm.train.numpy.glm_nb import Estimator, EstimatorStacked
+
+batchglm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class Test_Stacked_GLM_NB(unittest.TestCase):
+    """
+    Test fitting of several models in one stacked estimator with the numpy backend.
+
+    Does not require tensorflow.
+    """
+
+    def simulate(self):
+        sim = Simulator(num_observations=900, num_features=20)
+        sim.generate_sample_description(num_batches=2, num_conditions=2)
+        sim.generate()
+
+        X = sim.input_data.X.values
+        design_loc = sim.input_data.design_loc.values
+        design_scale = sim.input_data.design_scale.values
+        # Two subsets of the observations with different designs:
+        return [
+            InputData.new(X[:300], design_loc=design_loc[:300], design_scale=design_scale[:300]),
+            InputData.new(X[300:], design_loc=design_loc[300:, :2], design_scale=design_scale[300:, :1]),
+        ]
+
+    def test_stacked_fit(self):
+        input_data = self.simulate()
+        estimator = EstimatorStacked(input_data)
+        estimator.initialize()
+        estimator.train_sequence(training_strategy="DEFAULT")
+        assert estimator.converged_by_model.shape == (len(input_data), 20)
+        # The padded coefficients of the second model stay zero:
+        assert np.all(estimator.a_var_stacked[1, 2:] == 0)
+        assert np.all(estimator.b_var_stacked[1, 1:] == 0)
+
+        # The outputs are returned per model:
+        loss = estimator.loss
+        assert len(loss) == len(input_data)
+        assert estimator.get("loss") == loss
+        num_params = [(x.num_loc_params, x.num_scale_params) for x in input_data]
+        assert [a_var.shape for a_var in estimator.a_var] == [(n_loc, 20) for n_loc, _ in num_params]
+        assert [x.shape for x in estimator.get_fisher_inv()] == [(20, sum(n), sum(n)) for n in num_params]
+        stores = estimator.finalize()
+
+        assert len(stores) == len(input_data)
+        for x, store in zip(input_data, stores):
+            estimator_ref = Estimator(input_data=x)
+            estimator_ref.initialize()
+            estimator_ref.train_sequence(training_strategy="DEFAULT")
+            store_ref = estimator_ref.finalize()
+
+            assert store.a_var.shape == store_ref.a_var.shape
+            assert store.b_var.shape == store_ref.b_var.shape
+            assert np.max(np.abs(store.a_var.values - store_ref.a_var.values)) < 1e-4
+            assert np.max(np.abs(store.b_var.values - store_ref.b_var.values)) < 1e-4
+            assert np.max(np.abs(store.log_likelihood.values - store_ref.log_likelihood.values)) < 1e-4
+            assert np.abs(store.params["loss"].values - store_ref.params["loss"].values) < 1e-4
+            hessians_ref = store_ref.hessians.values
+            assert np.max(np.abs(store.hessians.values - hessians_ref)) < 1e-4 * np.max(np.abs(hessians_ref))
+            assert np.abs(loss[input_data.index(x)] - store_ref.params["loss"].values) < 1e-4
+
+    def test_stacked_chunks(self):
+        """
+        Evaluating the columns in chunks does not change the statistics.
+        """
+        input_data = self.simulate()
+        estimator = EstimatorStacked(input_data)
+        estimator.initialize()
+        hessians = estimator.hessians
+
+        chunk_size = batchglm.pkg_constants.STACKED_CHUNK_SIZE
+        batchglm.pkg_constants.STACKED_CHUNK_SIZE = 1000
+        try:
+            estimator.clear_cache()
+            hessians_chunked = estimator.hessians
+        finally:
+            batchglm.pkg_constants.STACKED_CHUNK_SIZE = chunk_size
+        for x, x_chunked in zip(hessians, hessians_chunked):
+            assert np.allclose(x.values, x_chunked.values)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import logging
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+import batchglm
+import batchglm.train.tf.ops as op_utils
+
+batchglm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class Test_RobustSolve(unittest.TestCase):
+    """
+    Test the Cholesky-first solve of batches of symmetric systems with its per-system fallback.
+    """
+
+    def setUp(self):
+        np.random.seed(1)
+        num_params = 4
+        a = np.random.normal(size=[num_params, num_params])
+        # Positive definite:
+        self.lhs_pd = a @ a.T + num_params * np.eye(num_params)
+        # Singular (rank 2):
+        b = np.random.normal(size=[num_params, 2])
+        self.lhs_singular = b @ b.T
+        # Indefinite:
+        self.lhs_indefinite = np.diag([3., 1., -1., -2.])
+        self.rhs = np.random.normal(size=[3, num_params])
+
+    def solve(self, lhs, rhs, cholesky=True):
+        with tf.Graph().as_default():
+            x, condition_number = op_utils.robust_solve(
+                tf.constant(lhs, dtype=tf.float64),
+                tf.constant(rhs, dtype=tf.float64),
+                cholesky=cholesky
+            )
+            _, is_pd = op_utils.cholesky_checked(tf.constant(lhs, dtype=tf.float64))
+            with tf.Session() as sess:
+                return sess.run((x, condition_number, is_pd))
+
+    def test_pd(self):
+        lhs = np.stack([self.lhs_pd, 2 * self.lhs_pd, np.diag([1., 2., 4., 8.])])
+        x, condition_number, is_pd = self.solve(lhs, self.rhs)
+
+        assert np.all(is_pd)
+        assert np.allclose(x, np.linalg.solve(lhs, self.rhs))
+        assert np.allclose(condition_number, np.linalg.cond(lhs))
+        assert np.isclose(condition_number[2], 8.)
+
+        x_eig, _, _ = self.solve(lhs, self.rhs, cholesky=False)
+        assert np.allclose(x_eig, x)
+
+    def test_singular(self):
+        lhs = np.stack([self.lhs_pd, self.lhs_singular, self.lhs_pd])
+        x, condition_number, is_pd = self.solve(lhs, self.rhs)
+
+        assert np.array_equal(is_pd, [True, False, True])
+        assert np.all(np.isfinite(x))
+        # The singular system does not affect the other systems of the batch:
+        assert np.allclose(x[[0, 2]], np.linalg.solve(lhs[[0, 2]], self.rhs[[0, 2]]))
+        # The singular system yields the minimum norm least squares solution:
+        assert np.allclose(x[1], np.linalg.pinv(self.lhs_singular) @ self.rhs[1])
+        assert condition_number[1] > 1e12
+
+    def test_indefinite(self):
+        lhs = np.stack([self.lhs_indefinite, self.lhs_pd, self.lhs_indefinite])
+        x, condition_number, is_pd = self.solve(lhs, self.rhs)
+
+        assert np.array_equal(is_pd, [False, True, False])
+        # The indefinite systems are regular and solved exactly by the fallback:
+        assert np.allclose(x, np.linalg.solve(lhs, self.rhs))
+        assert np.allclose(condition_number, [3., np.linalg.cond(self.lhs_pd), 3.])
+
+    def test_inverse(self):
+        matrix = np.stack([self.lhs_pd, self.lhs_singular, self.lhs_indefinite])
+        with tf.Graph().as_default():
+            inverse = op_utils.robust_inverse(tf.constant(matrix, dtype=tf.float64))
+            with tf.Session() as sess:
+                inverse = sess.run(inverse)
+
+        # Only the matrices which are not positive definite fall back to the pseudo-inverse:
+        assert np.allclose(inverse[0], np.linalg.inv(self.lhs_pd))
+        assert np.allclose(inverse[1], np.linalg.pinv(self.lhs_singular))
+        assert np.allclose(inverse[2], np.linalg.inv(self.lhs_indefinite))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+import logging
+import os
+import shutil
+from typing import Union
+
+import numpy as np
+import xarray as xr
+
+from batchglm import pkg_constants
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ["netcdf", "zarr"]
+
+
+def storage_backend(path: str = None, backend: Union[str, None] = None) -> str:
+    """
+    Resolves the storage backend of a file.
+
+    :param path: (optional) path of the store. Existing directories and new paths ending with ".zarr"
+        are zarr stores, existing files are netcdf files.
+    :param backend: "netcdf", "zarr" or None to infer the backend from `path`
+        and to fall back to pkg_constants.STORAGE_BACKEND.
+    :return: "netcdf" or "zarr"
+    """
+    if backend is None:
+        if path is not None and os.path.isdir(path):
+            backend = "zarr"
+        elif path is not None and os.path.isfile(path):
+            backend = "netcdf"
+        elif path is not None and path.rstrip("/").endswith(".zarr"):
+            backend = "zarr"
+        else:
+            backend = pkg_constants.STORAGE_BACKEND
+    backend = backend.lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError("storage backend %s not recognized" % backend)
+    return backend
+
+
+def zarr_compressor_encoding(cname: str = None) -> dict:
+    """
+    Encoding of the blosc compressor for the installed version of zarr.
+
+    :param cname: (optional) blosc codec, e.g. "zstd" or "lz4". Defaults to pkg_constants.ZARR_COMPRESSOR.
+        The compression level is pkg_constants.ZARR_COMPRESSION_LEVEL.
+    """
+    import zarr
+
+    if cname is None:
+        cname = pkg_constants.ZARR_COMPRESSOR
+    if int(zarr.__version__.split(".")[0]) >= 3:
+        from zarr.codecs import BloscCodec
+        return {"compressors": [BloscCodec(
+            cname=cname,
+            clevel=pkg_constants.ZARR_COMPRESSION_LEVEL,
+            shuffle="bitshuffle"
+        )]}
+    else:
+        from numcodecs import Blosc
+        return {"compressor": Blosc(
+            cname=cname,
+            clevel=pkg_constants.ZARR_COMPRESSION_LEVEL,
+            shuffle=Blosc.BITSHUFFLE
+        )}
+
+
+def remove_store(path: str):
+    """
+    Removes a file or a zarr directory store if it exists.
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def write_dataset(
+        data: xr.Dataset,
+        path: str,
+        group: str = "",
+        mode: str = "w",
+        backend: str = None,
+        chunks: dict = None,
+        compression: Union[bool, str] = None
+):
+    """
+    Writes a dataset with the chosen storage backend.
+
+    :param data: xr.Dataset to write.
+    :param path: path of the file or of the zarr directory store.
+    :param group: group inside the store.
+    :param mode: "w" to create the store or "a" to add the group to an existing store.
+    :param backend: "netcdf", "zarr" or None, see storage_backend().
+    :param chunks: (optional) dict mapping dimension names to chunk sizes, e.g. {"observations": batch_size}.
+        Dimensions which are not mentioned are stored in one chunk.
+    :param compression: Whether to compress the variables, with zlib for netcdf and blosc for zarr.
+        Defaults to compressing zarr stores only, as zlib compression is single-threaded and slow.
+        A string selects the blosc codec of zarr stores, see zarr_compressor_encoding().
+    """
+    backend = storage_backend(path, backend)
+    if compression is None:
+        compression = backend == "zarr"
+
+    encoding = {}
+    for key, var in data.data_vars.items():
+        opts = {}
+        if chunks is not None and len(var.dims) > 0 and any([d in chunks for d in var.dims]):
+            var_chunks = tuple([min(chunks.get(d, s), s) for d, s in zip(var.dims, var.shape)])
+            opts["chunks" if backend == "zarr" else "chunksizes"] = var_chunks
+        if compression and var.shape != ():
+            if backend == "zarr":
+                opts.update(zarr_compressor_encoding(compression if isinstance(compression, str) else None))
+            else:
+                opts["zlib"] = True
+        if len(opts) > 0:
+            encoding[key] = opts
+
+    if backend == "zarr":
+        # Encodings of the source of the data, e.g. netcdf chunk sizes, do not apply to zarr:
+        data = data.drop_encoding() if hasattr(data, "drop_encoding") else data
+        data.to_zarr(
+            path,
+            group=group if group != "" else None,
+            mode=mode,
+            encoding=encoding
+        )
+    else:
+        data.to_netcdf(
+            path,
+            group=group,
+            mode=mode,
+            engine=pkg_constants.XARRAY_NETCDF_ENGINE,
+            encoding=encoding
+        )
+
+
+def open_dataset(path: str, group: str = "", backend: str = None) -> xr.Dataset:
+    """
+    Opens a dataset lazily.
+
+    Zarr stores are opened as dask arrays with one dask chunk per stored chunk,
+    which can be read concurrently by several threads or processes.
+
+    :param path: path of the file or of the zarr directory store.
+    :param group: group inside the store.
+    :param backend: "netcdf", "zarr" or None, see storage_backend().
+    :return: xr.Dataset
+    """
+    backend = storage_backend(path, backend)
+    if backend == "zarr":
+        return xr.open_zarr(path, group=group if group != "" else None)
+    else:
+        return xr.open_dataset(
+            path,
+            group=group,
+            engine=pkg_constants.XARRAY_NETCDF_ENGINE
+        )
+
+
+def append_dataset(
+        data: xr.Dataset,
+        path: str,
+        dim: str,
+        backend: str = None,
+        compression: Union[bool, str] = None
+):
+    """
+    Appends a dataset along the dimension `dim` to a store, which is created if it does not exist.
+
+    Zarr stores are extended along `dim`. Netcdf files cannot be extended, each dataset is added
+    to the file as a separate group instead, see open_appended().
+    Existing entries are kept, use truncate_appended() or remove_store() to drop the entries of earlier runs.
+
+    :param data: xr.Dataset with the dimension `dim` and a coordinate for it.
+    :param path: path of the file or of the zarr directory store.
+    :param dim: dimension to append along, e.g. "global_step".
+    :param backend: "netcdf", "zarr" or None, see storage_backend().
+    :param compression: compression of the store, see write_dataset(). Only used when the store is created.
+    """
+    backend = storage_backend(path, backend)
+    exists = os.path.exists(path)
+    if backend == "zarr":
+        if exists:
+            data = data.drop_encoding() if hasattr(data, "drop_encoding") else data
+            data.to_zarr(path, mode="a", append_dim=dim)
+        else:
+            write_dataset(data, path, mode="w", backend=backend, compression=compression)
+    else:
+        group = "%s-%s" % (dim, "-".join([str(x) for x in data.coords[dim].values]))
+        write_dataset(data, path, group=group, mode="a" if exists else "w", backend=backend,
+                      compression=compression)
+
+
+def open_appended(path: str, dim: str, backend: str = None) -> xr.Dataset:
+    """
+    Opens a store which was written by append_dataset().
+
+    :param path: path of the file or of the zarr directory store.
+    :param dim: dimension which was appended along.
+    :param backend: "netcdf", "zarr" or None, see storage_backend().
+    :return: xr.Dataset
+    """
+    backend = storage_backend(path, backend)
+    if backend == "zarr":
+        return open_dataset(path, backend=backend)
+
+    import h5netcdf
+    with h5netcdf.File(path, "r") as f:
+        groups = [g for g in f.groups if g.startswith(dim + "-")]
+    data = xr.concat([open_dataset(path, group=g, backend=backend) for g in groups], dim=dim)
+    return data.sortby(dim)
+
+
+def truncate_appended(path: str, dim: str, last: int, backend: str = None, compression: Union[bool, str] = None):
+    """
+    Removes the entries beyond `last` along `dim` from a store which was written by append_dataset().
+
+    The remaining entries are rewritten if any entry is removed. The store is removed if no entry remains.
+
+    :param path: path of the file or of the zarr directory store.
+    :param dim: dimension which was appended along.
+    :param last: last coordinate of `dim` to keep, e.g. the global step of a restored checkpoint.
+    :param backend: "netcdf", "zarr" or None, see storage_backend().
+    :param compression: compression of the rewritten store, see write_dataset().
+    """
+    if not os.path.exists(path):
+        return
+    backend = storage_backend(path, backend)
+    data = open_appended(path, dim=dim, backend=backend)
+    keep = np.where(data.coords[dim].values <= last)[0]
+    if keep.shape[0] == data.sizes[dim]:
+        return
+
+    logger.info("removing %i entries beyond %s %s from %s", data.sizes[dim] - keep.shape[0], dim, str(last), path)
+    data = data.isel({dim: keep}).load()
+    remove_store(path)
+    for i in range(keep.shape[0]):
+        append_dataset(data.isel({dim: [i]}), path, dim=dim, backend=backend, compression=compression)
@@ -32,6 +32,97 @@ def stacked_lstsq(L, b, rcond=1e-10):
     return np.conj(x, out=x)
 
 
+def _stacked_cholesky(matrix):
+    """
+    Cholesky decomposition of the positive definite matrices in a stack.
+
+    :param matrix: array of shape (N, K, K) with symmetric matrices
+    :return: tuple (chol, idx_pd) of the Cholesky factors of the positive definite matrices
+        and a boolean array of shape (N,) which marks these matrices
+    """
+    def is_pd(m):
+        try:
+            np.linalg.cholesky(m)
+            return True
+        except np.linalg.LinAlgError:
+            return False
+
+    # Try to decompose the whole stack at once and only locate failing matrices if necessary:
+    try:
+        chol = np.linalg.cholesky(matrix)
+        idx_pd = np.ones(matrix.shape[0], dtype=bool)
+    except np.linalg.LinAlgError:
+        idx_pd = np.array([is_pd(m) for m in matrix], dtype=bool)
+        chol = np.linalg.cholesky(matrix[idx_pd])
+    if not np.all(idx_pd):
+        logger.debug("%d of %d matrices are not positive definite", np.sum(~idx_pd), idx_pd.size)
+
+    return chol, idx_pd
+
+
+def stacked_inv_sym(matrix, rcond=None):
+    r"""
+    Invert a stack of symmetric matrices, e.g. negative Hessians, via their Cholesky decomposition.
+
+    Matrices which are not positive definite fall back to the Moore-Penrose pseudo-inverse,
+    so that the SVD is only computed for these.
+
+    :param matrix: array of shape (..., K, K) with symmetric matrices
+    :param rcond: cutoff for small singular values of the pseudo-inverse, see `np.linalg.pinv`
+    :return: array of shape (..., K, K) with the (pseudo-)inverses of `matrix`
+    """
+    matrix = np.asarray(matrix)
+    shape = matrix.shape
+    matrix = matrix.reshape((-1,) + shape[-2:])
+    if rcond is None:
+        rcond = shape[-1] * np.finfo(matrix.dtype).eps
+
+    chol, idx_pd = _stacked_cholesky(matrix)
+
+    inv = np.zeros_like(matrix)
+    if np.any(idx_pd):
+        identity = np.broadcast_to(np.eye(shape[-1], dtype=matrix.dtype), chol.shape)
+        chol_inv = np.linalg.solve(chol, identity)
+        inv[idx_pd] = np.einsum('...ki,...kj->...ij', chol_inv, chol_inv)
+    if not np.all(idx_pd):
+        inv[~idx_pd] = np.linalg.pinv(matrix[~idx_pd], rcond=rcond)
+
+    return inv.reshape(shape)
+
+
+def stacked_solve_sym(matrix, rhs, rcond=None):
+    r"""
+    Solve a stack of linear systems `matrix x = rhs` with symmetric matrices, e.g. Fisher information
+    matrices, via the Cholesky decomposition.
+
+    Systems which are not positive definite fall back to the least squares solution via
+    the Moore-Penrose pseudo-inverse.
+
+    :param matrix: array of shape (..., K, K) with symmetric matrices
+    :param rhs: array of shape (..., K) with the right hand sides
+    :param rcond: cutoff for small singular values of the pseudo-inverse, see `np.linalg.pinv`
+    :return: array of shape (..., K) with the solutions
+    """
+    matrix = np.asarray(matrix)
+    rhs = np.asarray(rhs)
+    shape = rhs.shape
+    matrix = matrix.reshape((-1,) + matrix.shape[-2:])
+    rhs = rhs.reshape((-1, shape[-1], 1))
+    if rcond is None:
+        rcond = shape[-1] * np.finfo(matrix.dtype).eps
+
+    chol, idx_pd = _stacked_cholesky(matrix)
+
+    x = np.zeros_like(rhs)
+    if np.any(idx_pd):
+        y = np.linalg.solve(chol, rhs[idx_pd])
+        x[idx_pd] = np.linalg.solve(np.swapaxes(chol, -1, -2), y)
+    if not np.all(idx_pd):
+        x[~idx_pd] = np.matmul(np.linalg.pinv(matrix[~idx_pd], rcond=rcond), rhs[~idx_pd])
+
+    return x.reshape(shape)
+
+
 def groupwise_solve_lm(
         dmat,
         apply_fun: callable,
@@ -71,7 +162,9 @@ def groupwise_solve_lm(
     `dmat`.
     """
     # Get unqiue rows of design matrix and vector with group assignments:
-    unique_design, inverse_idx = np.unique(dmat, axis=0, return_inverse=True)
+    unique_design, inverse_idx = np.unique(np.asarray(dmat), axis=0, return_inverse=True)
+    inverse_idx = np.reshape(inverse_idx, -1)
+    constraints = np.asarray(constraints)
 
     full_rank = constraints.shape[1]
     rank = np.linalg.matrix_rank(np.matmul(unique_design, constraints))
@@ -92,7 +185,7 @@ def groupwise_solve_lm(
     logger.debug(" ** Solve lstsq problem")
     x_prime, rmsd, rank, s = np.linalg.lstsq(
         np.matmul(unique_design, constraints),
-        params,
+        np.asarray(params),
         rcond=None
     )
 
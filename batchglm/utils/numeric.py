@@ -6,6 +6,7 @@ except ImportError:
     xr = None
 
 import numpy as np
+import scipy.sparse
 
 
 def weighted_mean(input, weights=None, sum_of_weights=None, axis=None, keepdims=False):
@@ -93,6 +94,39 @@ def weighted_variance(input, weights=None, sum_of_weights=None, axis=None, keepd
     return retval
 
 
+def groupwise_mean(input, grouping, weights=None):
+    """
+    Calculates the (weighted) mean of the rows of `input` for each group.
+
+    The group sums are computed as product with a sparse group indicator matrix, so `input` can be a
+    scipy.sparse matrix without being densified.
+
+    :param input: np.ndarray or scipy.sparse matrix of shape (observations, features)
+    :param grouping: integer vector of length `observations` assigning each row to a group 0..(num_groups - 1)
+    :param weights: the weights of the rows; if `none` it will be ignored.
+    :return: np.ndarray of shape (num_groups, features)
+    """
+    grouping = np.asarray(grouping).reshape(-1)
+    num_observations = grouping.shape[0]
+    num_groups = np.max(grouping) + 1
+
+    if weights is None:
+        weights = np.ones([num_observations])
+    else:
+        weights = np.asarray(weights).reshape(-1)
+
+    indicator = scipy.sparse.csr_matrix(
+        (weights, (grouping, np.arange(num_observations))),
+        shape=(num_groups, num_observations)
+    )
+    group_sums = indicator.dot(input)
+    if scipy.sparse.issparse(group_sums):
+        group_sums = group_sums.toarray()
+    sum_of_weights = np.asarray(indicator.sum(axis=1))
+
+    return np.asarray(group_sums) / sum_of_weights
+
+
 def combine_matrices(list_of_matrices: List):
     """
     Combines a list of matrices to a 3D matrix.
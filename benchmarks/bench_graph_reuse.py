@@ -0,0 +1,66 @@
+"""
+Compares the time to fit a series of data sets of the same shape with and without a shared graph.
+
+Without `reuse_graph`, each estimator builds its own graph and session. With `reuse_graph`, the graph is
+built for the first data set only and all further estimators re-initialize its idle session with their data.
+
+Example:
+
+    python benchmarks/bench_graph_reuse.py --num_observations 2000 --num_features 100 --num_datasets 10
+"""
+import argparse
+import time
+
+import batchglm.api as glm
+from batchglm.api.models.glm_nb import Estimator, Simulator
+
+TRAINING_STRATEGY = [
+    {
+        "convergence_criteria": "all_converged_ll",
+        "stopping_criteria": 1e-6,
+        "use_batching": False,
+        "optim_algo": "irls",
+    },
+]
+
+
+def fit_all(datasets, reuse_graph: bool):
+    t0 = time.perf_counter()
+    for input_data in datasets:
+        estimator = Estimator(
+            input_data=input_data,
+            provide_optimizers={
+                "gd": False, "adam": False, "adagrad": False, "rmsprop": False, "nr": False, "irls": True
+            },
+            input_pipeline="resident",
+            reuse_graph=reuse_graph
+        )
+        estimator.initialize()
+        estimator.train_sequence(training_strategy=TRAINING_STRATEGY)
+        estimator.finalize(outputs=["a_var", "b_var", "log_likelihood"])
+    Estimator.clear_graph_templates()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_observations", type=int, default=2000)
+    parser.add_argument("--num_features", type=int, default=100)
+    parser.add_argument("--num_datasets", type=int, default=10)
+    args = parser.parse_args()
+
+    glm.setup_logging(verbosity="WARNING", stream="STDOUT")
+
+    datasets = []
+    for _ in range(args.num_datasets):
+        sim = Simulator(num_observations=args.num_observations, num_features=args.num_features)
+        sim.generate_sample_description(num_batches=2, num_conditions=2)
+        sim.generate()
+        datasets.append(sim.input_data)
+
+    print("%16s %16s" % ("new graph [s]", "shared graph [s]"))
+    print("%16.3f %16.3f" % (fit_all(datasets, reuse_graph=False), fit_all(datasets, reuse_graph=True)))
+
+
+if __name__ == "__main__":
+    main()
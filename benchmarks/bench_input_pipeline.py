@@ -0,0 +1,78 @@
+"""
+Compares the per-step training time of the `py_func` and the `resident` input pipelines.
+
+Example:
+
+    python benchmarks/bench_input_pipeline.py --num_observations 20000 --num_features 500 --steps 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+import batchglm.api as glm
+from batchglm.api.models.glm_nb import Estimator, Simulator
+
+
+def time_steps(estimator, steps: int, use_batching: bool, optim_algo: str):
+    # first step includes graph warm-up and is excluded:
+    estimator.train(
+        convergence_criteria="step",
+        stopping_criteria=1,
+        use_batching=use_batching,
+        optim_algo=optim_algo
+    )
+    step = estimator.session.run(estimator.model.global_step)
+
+    t0 = time.perf_counter()
+    estimator.train(
+        convergence_criteria="step",
+        stopping_criteria=step + steps,
+        use_batching=use_batching,
+        optim_algo=optim_algo
+    )
+    return (time.perf_counter() - t0) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_observations", type=int, default=10000)
+    parser.add_argument("--num_features", type=int, default=200)
+    parser.add_argument("--batch_size", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    glm.setup_logging(verbosity="WARNING", stream="STDOUT")
+
+    sim = Simulator(num_observations=args.num_observations, num_features=args.num_features)
+    sim.generate_sample_description(num_batches=2, num_conditions=2)
+    sim.generate()
+
+    settings = [
+        ("batched ADAM", True, "ADAM"),
+        ("full IRLS", False, "IRLS"),
+    ]
+    for input_pipeline in ["py_func", "resident"]:
+        estimator = Estimator(
+            input_data=sim.input_data,
+            batch_size=args.batch_size,
+            provide_optimizers={
+                "gd": False, "adam": True, "adagrad": False, "rmsprop": False, "nr": False, "irls": True
+            },
+            input_pipeline=input_pipeline
+        )
+        estimator.initialize()
+        for name, use_batching, optim_algo in settings:
+            times = [
+                time_steps(estimator, steps=args.steps, use_batching=use_batching, optim_algo=optim_algo)
+                for _ in range(args.repeats)
+            ]
+            print("%-9s %-13s %8.2f ms/step (min %8.2f ms/step)" % (
+                input_pipeline, name, np.mean(times) * 1e3, np.min(times) * 1e3
+            ))
+        estimator.finalize()
+
+
+if __name__ == "__main__":
+    main()
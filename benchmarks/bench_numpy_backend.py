@@ -0,0 +1,77 @@
+"""
+Compares the end-to-end fitting time of the numpy and the tensorflow backend over problem sizes.
+
+The time includes the construction of the estimator (and of the graph for tensorflow), the
+initialization, training with IRLS and `finalize()`. The tensorflow backend has a constant overhead
+for graph construction and session setup, the numpy backend scales with the size of the data.
+
+Example:
+
+    python benchmarks/bench_numpy_backend.py --num_observations 2000 --num_features 10 100 1000 10000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import batchglm.api as glm
+from batchglm.api.models.glm_nb import Simulator
+
+TRAINING_STRATEGY = [
+    {
+        "convergence_criteria": "all_converged_ll",
+        "stopping_criteria": 1e-6,
+        "use_batching": False,
+        "optim_algo": "irls",
+    },
+]
+
+
+def fit(backend: str, input_data):
+    t0 = time.perf_counter()
+    if backend == "tf":
+        from batchglm.api.models.glm_nb import Estimator
+        estimator = Estimator(
+            input_data=input_data,
+            provide_optimizers={
+                "gd": False, "adam": False, "adagrad": False, "rmsprop": False, "nr": False, "irls": True
+            }
+        )
+    elif backend == "numpy":
+        from batchglm.api.models.numpy.glm_nb import Estimator
+        estimator = Estimator(input_data=input_data)
+    else:
+        raise ValueError("backend %s not recognized" % backend)
+    estimator.initialize()
+    estimator.train_sequence(training_strategy=TRAINING_STRATEGY)
+    estimator.finalize(outputs=["a_var", "b_var", "log_likelihood"])
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_observations", type=int, default=2000)
+    parser.add_argument("--num_features", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--num_conditions", type=int, default=2)
+    parser.add_argument("--num_batches", type=int, default=2)
+    parser.add_argument("--backends", type=str, nargs="+", default=["numpy", "tf"])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    glm.setup_logging(verbosity="WARNING", stream="STDOUT")
+
+    print("%10s " % "features" + " ".join(["%16s" % ("%s [s]" % b) for b in args.backends]))
+    for num_features in args.num_features:
+        sim = Simulator(num_observations=args.num_observations, num_features=num_features)
+        sim.generate_sample_description(num_batches=args.num_batches, num_conditions=args.num_conditions)
+        sim.generate()
+
+        times = [
+            np.min([fit(backend, sim.input_data) for _ in range(args.repeats)])
+            for backend in args.backends
+        ]
+        print("%10d " % num_features + " ".join(["%16.3f" % t for t in times]))
+
+
+if __name__ == "__main__":
+    main()
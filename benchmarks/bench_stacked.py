@@ -0,0 +1,79 @@
+"""
+Compares the time to fit one model per subset of the observations with separate estimators and
+with one stacked estimator.
+
+Separate estimators each iterate over their own features, the stacked estimator evaluates the statistics
+of all models in one vectorised pass, solves their systems in one batch and tracks convergence per model
+and feature. Does not require tensorflow.
+
+Example:
+
+    python benchmarks/bench_stacked.py --num_observations 4000 --num_features 200 --num_models 10 20 40
+"""
+import argparse
+import time
+
+import numpy as np
+
+import batchglm
+from batchglm.models.glm_nb import InputData, Simulator
+from batchglm.train.numpy.glm_nb import Estimator, EstimatorStacked
+
+TRAINING_STRATEGY = [
+    {
+        "convergence_criteria": "all_converged_ll",
+        "stopping_criteria": 1e-6,
+        "use_batching": False,
+        "optim_algo": "irls",
+    },
+]
+OUTPUTS = ["a_var", "b_var", "log_likelihood"]
+
+
+def fit_separate(input_data):
+    t0 = time.perf_counter()
+    for x in input_data:
+        estimator = Estimator(input_data=x)
+        estimator.initialize()
+        estimator.train_sequence(training_strategy=TRAINING_STRATEGY)
+        estimator.finalize(outputs=OUTPUTS)
+    return time.perf_counter() - t0
+
+
+def fit_stacked(input_data):
+    t0 = time.perf_counter()
+    estimator = EstimatorStacked(input_data)
+    estimator.initialize()
+    estimator.train_sequence(training_strategy=TRAINING_STRATEGY)
+    estimator.finalize(outputs=OUTPUTS)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_observations", type=int, default=4000)
+    parser.add_argument("--num_features", type=int, default=200)
+    parser.add_argument("--num_models", type=int, nargs="+", default=[10])
+    args = parser.parse_args()
+
+    batchglm.setup_logging(verbosity="WARNING", stream="STDOUT")
+
+    sim = Simulator(num_observations=args.num_observations, num_features=args.num_features)
+    sim.generate_sample_description(num_batches=2, num_conditions=2)
+    sim.generate()
+
+    X = sim.input_data.X.values
+    design_loc = sim.input_data.design_loc.values
+    design_scale = sim.input_data.design_scale.values
+
+    print("%8s %16s %16s" % ("models", "separate [s]", "stacked [s]"))
+    for num_models in args.num_models:
+        input_data = [
+            InputData.new(X[idx], design_loc=design_loc[idx], design_scale=design_scale[idx])
+            for idx in np.array_split(np.random.permutation(args.num_observations), num_models)
+        ]
+        print("%8i %16.3f %16.3f" % (num_models, fit_separate(input_data), fit_stacked(input_data)))
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,10 @@ setup(
         #     "plotnine",
         #     "seaborn"
         # ],
+        'zarr': [
+            "zarr",
+            "numcodecs",
+        ],
         'tensorflow_gpu': [
             "tensorflow-gpu",
             "tensorflow-probability-gpu",